@@ -32,10 +32,15 @@ class BlockingConductor(impl_executor.ExecutorConductor):
     def __init__(self, name, jobboard,
                  persistence=None, engine=None,
                  engine_options=None, wait_timeout=None,
-                 log=None, max_simultaneous_jobs=MAX_SIMULTANEOUS_JOBS):
+                 log=None, max_simultaneous_jobs=MAX_SIMULTANEOUS_JOBS,
+                 selection_policy=None, flow_cache_size=None,
+                 concurrency_limiter=None):
         super(BlockingConductor, self).__init__(
             name, jobboard,
             persistence=persistence, engine=engine,
             engine_options=engine_options,
             wait_timeout=wait_timeout, log=log,
-            max_simultaneous_jobs=max_simultaneous_jobs)
+            max_simultaneous_jobs=max_simultaneous_jobs,
+            selection_policy=selection_policy,
+            flow_cache_size=flow_cache_size,
+            concurrency_limiter=concurrency_limiter)
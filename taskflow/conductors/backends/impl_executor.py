@@ -13,8 +13,8 @@
 #    under the License.
 
 import abc
+import collections
 import functools
-import itertools
 import threading
 
 try:
@@ -27,12 +27,12 @@ from oslo_utils import timeutils
 import six
 
 from taskflow.conductors import base
+from taskflow.conductors import selection
 from taskflow import exceptions as excp
 from taskflow.listeners import logging as logging_listener
 from taskflow import logging
 from taskflow import states
 from taskflow.types import timing as tt
-from taskflow.utils import iter_utils
 from taskflow.utils import misc
 
 LOG = logging.getLogger(__name__)
@@ -56,6 +56,22 @@ class ExecutorConductor(base.Conductor):
     transient issues that can be worked around by later execution). If a job
     after completing can not be consumed or abandoned the conductor relies
     upon the jobboard capabilities to automatically abandon these jobs.
+
+    NOTE: which jobs are claimed (when more are available than the
+    conductor has capacity for) is decided by a selection policy that can be
+    provided via keyword argument ``selection_policy``, if not provided
+    jobs are claimed in jobboard order (see :py:mod:`.selection` for
+    policies that share the conductor between tenants).
+
+    NOTE: instead of (or as well as) a fixed maximum number of
+    simultaneous jobs a limiter can be provided via keyword argument
+    ``concurrency_limiter`` (for example a
+    :py:class:`~taskflow.conductors.limiters.AIMDLimiter`) that adapts the
+    number of jobs in progress at the same time from the latency of
+    completed jobs (and other signals), when the limit changes a
+    ``concurrency_limit`` event is emitted (its details contain the new
+    ``limit``, the ``previous_limit``, the ``reason`` it was decreased, if
+    it was, and the signals the limiter used).
     """
 
     LOG = None
@@ -85,6 +101,12 @@ class ExecutorConductor(base.Conductor):
     https://bugs.python.org/issue22737 is ever implemented and released.
     """
 
+    CLAIM_BATCH_SIZE = 32
+    """
+    Maximum number of jobs that will be claimed together (when there is no
+    limit on the number of jobs that can be in progress at the same time).
+    """
+
     #: Exceptions that will **not** cause consumption to occur.
     NO_CONSUME_EXCEPTIONS = tuple([
         excp.ExecutionFailure,
@@ -101,6 +123,7 @@ class ExecutorConductor(base.Conductor):
         'validation_start', 'validation_end',
         'running_start', 'running_end',
         'job_consumed', 'job_abandoned',
+        'concurrency_limit',
     ])
     """Events will be emitted for each of the events above.  The event is
        emitted to listeners registered with the conductor.
@@ -109,10 +132,13 @@ class ExecutorConductor(base.Conductor):
     def __init__(self, name, jobboard,
                  persistence=None, engine=None,
                  engine_options=None, wait_timeout=None,
-                 log=None, max_simultaneous_jobs=MAX_SIMULTANEOUS_JOBS):
+                 log=None, max_simultaneous_jobs=MAX_SIMULTANEOUS_JOBS,
+                 selection_policy=None, flow_cache_size=None,
+                 concurrency_limiter=None):
         super(ExecutorConductor, self).__init__(
             name, jobboard, persistence=persistence,
-            engine=engine, engine_options=engine_options)
+            engine=engine, engine_options=engine_options,
+            flow_cache_size=flow_cache_size)
         self._wait_timeout = tt.convert_to_timeout(
             value=wait_timeout, default_value=self.WAIT_TIMEOUT,
             event_factory=self._event_factory)
@@ -122,6 +148,11 @@ class ExecutorConductor(base.Conductor):
             misc.pick_first_not_none(max_simultaneous_jobs,
                                      self.MAX_SIMULTANEOUS_JOBS))
         self._dispatched = set()
+        if selection_policy is None:
+            selection_policy = selection.OrderedPolicy()
+        self._selection_policy = selection_policy
+        self._concurrency_limiter = concurrency_limiter
+        self._timings = {}
 
     def _executor_factory(self):
         """Creates an executor to be used during dispatching."""
@@ -152,9 +183,13 @@ class ExecutorConductor(base.Conductor):
         return listeners
 
     def _dispatch_job(self, job):
+        timing = self._timings.get(job.uuid)
+        if timing is not None:
+            timing[1] = timeutils.now()
         engine = self._engine_from_job(job)
-        listeners = self._listeners_from_job(job, engine)
         with ExitStack() as stack:
+            stack.callback(self._release_engine, engine)
+            listeners = self._listeners_from_job(job, engine)
             for listener in listeners:
                 stack.enter_context(listener)
             self._log.debug("Dispatching engine for job '%s'", job)
@@ -216,6 +251,12 @@ class ExecutorConductor(base.Conductor):
             return consume
 
     def _try_finish_job(self, job, consume):
+        try:
+            self._finish_job(job, consume)
+        finally:
+            self._selection_policy.job_finished(job)
+
+    def _finish_job(self, job, consume):
         try:
             if consume:
                 self._jobboard.consume(job, self._name)
@@ -239,7 +280,33 @@ class ExecutorConductor(base.Conductor):
                 self._log.warn("Failed job abandonment: %s", job,
                                exc_info=True)
 
+    def _record_job_done(self, job):
+        limiter = self._concurrency_limiter
+        timing = self._timings.pop(job.uuid, None)
+        if limiter is None or timing is None:
+            return
+        submitted_at, started_at = timing
+        now = timeutils.now()
+        if started_at is None:
+            started_at = now
+        previous_limit = limiter.limit
+        reason = limiter.record(now - submitted_at,
+                                started_at - submitted_at,
+                                len(self._dispatched))
+        if limiter.limit != previous_limit:
+            details = limiter.signals
+            details.update({
+                'previous_limit': previous_limit,
+                'reason': reason,
+                'conductor': self,
+            })
+            self._log.debug("Concurrency limit changed from %s to %s"
+                            " (%s)", previous_limit, details['limit'],
+                            reason or 'increased')
+            self._notifier.notify('concurrency_limit', details)
+
     def _on_job_done(self, job, fut):
+        self._record_job_done(job)
         consume = False
         try:
             consume = fut.result()
@@ -253,15 +320,40 @@ class ExecutorConductor(base.Conductor):
         finally:
             self._dispatched.discard(fut)
 
-    def _can_claim_more_jobs(self, job):
-        if self._wait_timeout.is_stopped():
-            return False
-        if self._max_simultaneous_jobs <= 0:
-            return True
-        if len(self._dispatched) >= self._max_simultaneous_jobs:
-            return False
-        else:
-            return True
+    def _claim_limit(self):
+        limit = self._max_simultaneous_jobs
+        if self._concurrency_limiter is not None:
+            if limit <= 0:
+                limit = self._concurrency_limiter.limit
+            else:
+                limit = min(limit, self._concurrency_limiter.limit)
+        if limit <= 0:
+            return self.CLAIM_BATCH_SIZE
+        return max(0, limit - len(self._dispatched))
+
+    def _claim_jobs(self, job_it, limit):
+        # Keep on selecting (and claiming) until the limit is filled or the
+        # selection policy has nothing more to offer from this iterator, so
+        # that jobs that could not be claimed (because some other entity
+        # owns them) do not stop the jobs behind them from being claimed;
+        # returning fewer than ``limit`` jobs means the latter happened.
+        claimed = []
+        while len(claimed) < limit:
+            remaining = limit - len(claimed)
+            candidates = self._selection_policy.select(job_it, remaining)
+            if not candidates:
+                break
+            self._log.debug("Trying to claim %s of %s jobs: %s", remaining,
+                            len(candidates), candidates)
+            batch = self._jobboard.claim_many(candidates, self._name,
+                                              limit=remaining)
+            if len(batch) < len(candidates):
+                self._log.debug("%s jobs were already claimed or consumed",
+                                len(candidates) - len(batch))
+            for job in batch:
+                self._selection_policy.job_claimed(job)
+            claimed.extend(batch)
+        return claimed
 
     def _run_until_dead(self, executor, max_dispatches=None):
         total_dispatched = 0
@@ -270,7 +362,6 @@ class ExecutorConductor(base.Conductor):
             # then the  conductor will run indefinitely, and not
             # stop after 'n' number of dispatches
             max_dispatches = -1
-        dispatch_gen = iter_utils.iter_forever(max_dispatches)
         is_stopped = self._wait_timeout.is_stopped
         try:
             # Don't even do any work in the first place...
@@ -286,36 +377,50 @@ class ExecutorConductor(base.Conductor):
                     fresh_period.restart()
                 else:
                     ensure_fresh = False
-                job_it = itertools.takewhile(
-                    self._can_claim_more_jobs,
-                    self._jobboard.iterjobs(ensure_fresh=ensure_fresh))
-                for job in job_it:
-                    self._log.debug("Trying to claim job: %s", job)
-                    try:
-                        self._jobboard.claim(job, self._name)
-                    except (excp.UnclaimableJob, excp.NotFound):
-                        self._log.debug("Job already claimed or"
-                                        " consumed: %s", job)
-                    else:
+                job_it = self._jobboard.iterjobs(ensure_fresh=ensure_fresh)
+                while not is_stopped():
+                    # Fill up whatever capacity is free (claiming the jobs
+                    # that are needed for that in one go, if the board
+                    # supports doing that).
+                    limit = self._claim_limit()
+                    if max_dispatches > 0:
+                        limit = min(limit, max_dispatches - total_dispatched)
+                    if limit <= 0:
+                        break
+                    claimed = collections.deque(
+                        self._claim_jobs(job_it, limit))
+                    exhausted = len(claimed) < limit
+                    while claimed:
+                        job = claimed.popleft()
+                        if self._concurrency_limiter is not None:
+                            self._timings[job.uuid] = [timeutils.now(), None]
                         try:
                             fut = executor.submit(self._dispatch_job, job)
                         except RuntimeError:
                             with excutils.save_and_reraise_exception():
+                                self._timings.pop(job.uuid, None)
                                 self._log.warn("Job dispatch submitting"
                                                " failed: %s", job)
                                 self._try_finish_job(job, False)
+                                while claimed:
+                                    self._try_finish_job(claimed.popleft(),
+                                                         False)
                         else:
                             fut.job = job
                             self._dispatched.add(fut)
                             any_dispatched = True
                             fut.add_done_callback(
                                 functools.partial(self._on_job_done, job))
-                            total_dispatched = next(dispatch_gen)
+                            total_dispatched += 1
+                    if 0 < max_dispatches <= total_dispatched:
+                        raise StopIteration
+                    if exhausted:
+                        break
                 if not any_dispatched and not is_stopped():
                     self._wait_timeout.wait()
         except StopIteration:
-            # This will be raised from 'dispatch_gen' if it reaches its
-            # max dispatch number (which implies we should do no more work).
+            # This will be raised if the max dispatch number is reached
+            # (which implies we should do no more work).
             with excutils.save_and_reraise_exception():
                 if max_dispatches >= 0 and total_dispatched >= max_dispatches:
                     self._log.info("Maximum dispatch limit of %s reached",
@@ -54,12 +54,16 @@ class NonBlockingConductor(impl_executor.ExecutorConductor):
                  persistence=None, engine=None,
                  engine_options=None, wait_timeout=None,
                  log=None, max_simultaneous_jobs=MAX_SIMULTANEOUS_JOBS,
-                 executor_factory=None):
+                 executor_factory=None, selection_policy=None,
+                 flow_cache_size=None, concurrency_limiter=None):
         super(NonBlockingConductor, self).__init__(
             name, jobboard,
             persistence=persistence, engine=engine,
             engine_options=engine_options, wait_timeout=wait_timeout,
-            log=log, max_simultaneous_jobs=max_simultaneous_jobs)
+            log=log, max_simultaneous_jobs=max_simultaneous_jobs,
+            selection_policy=selection_policy,
+            flow_cache_size=flow_cache_size,
+            concurrency_limiter=concurrency_limiter)
         if executor_factory is None:
             self._executor_factory = self._default_executor_factory
         else:
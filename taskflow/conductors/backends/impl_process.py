@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import contextlib
+import multiprocessing
+import threading
+
+from oslo_utils import excutils
+from oslo_utils import timeutils
+import six
+from six.moves import queue as compat_queue
+
+from taskflow.conductors import base
+from taskflow.conductors.backends import impl_blocking
+from taskflow.conductors.backends import impl_executor
+from taskflow import exceptions as excp
+from taskflow.jobs import backends as job_backends
+from taskflow import logging
+from taskflow.persistence import backends as persistence_backends
+from taskflow.types import notifier
+from taskflow.types import timing as tt
+from taskflow.utils import misc
+from taskflow.utils import threading_utils as tu
+
+LOG = logging.getLogger(__name__)
+
+
+class _ChildConductor(impl_blocking.BlockingConductor):
+    """Blocking conductor that runs (and drains) inside a child process."""
+
+    def __init__(self, name, jobboard, budget=None, **kwargs):
+        super(_ChildConductor, self).__init__(name, jobboard, **kwargs)
+        self._budget = budget
+        self._draining = False
+
+    def drain(self):
+        """Stops claiming new jobs (stopping once the current job is done)."""
+        # NOTE: this does not interrupt the wait timeout (doing that
+        # would suspend the engine of the job being worked on), the next time
+        # the conductor looks for jobs to claim it will stop instead.
+        self._draining = True
+
+    def _claim_limit(self):
+        if self._draining:
+            if not self._dispatched:
+                self.stop()
+            return 0
+        return super(_ChildConductor, self)._claim_limit()
+
+    def _claim_jobs(self, job_it, limit):
+        if self._budget is None:
+            return super(_ChildConductor, self)._claim_jobs(job_it, limit)
+        # Reserve (and then return what was not used of) the shared budget of
+        # jobs that the parent allows all children to dispatch; the budget
+        # contains how many jobs may still be reserved and how many have been
+        # claimed (the parent stops the children once all have been claimed).
+        with self._budget.get_lock():
+            limit = min(limit, self._budget[0])
+            self._budget[0] -= limit
+        claimed = []
+        try:
+            if limit > 0:
+                claimed = super(_ChildConductor, self)._claim_jobs(job_it,
+                                                                   limit)
+        finally:
+            with self._budget.get_lock():
+                self._budget[0] += limit - len(claimed)
+                self._budget[1] += len(claimed)
+        return claimed
+
+
+def _run_child(name, board_conf, persistence_conf, conductor_options,
+               events, drain, budget):
+    """Runs a child conductor (this is the entrypoint of a child process)."""
+    persistence = None
+    if persistence_conf is not None:
+        persistence = persistence_backends.fetch(persistence_conf)
+    board = job_backends.fetch(name, board_conf, persistence=persistence)
+    conductor = _ChildConductor(name, board, budget=budget,
+                                persistence=persistence,
+                                **conductor_options)
+
+    def forward(event_type, details):
+        job = details.get('job')
+        events.put((name, event_type, {
+            'job_uuid': getattr(job, 'uuid', None),
+            'job_name': getattr(job, 'name', None),
+        }))
+
+    def drainer():
+        drain.wait()
+        conductor.drain()
+
+    conductor.notifier.register(notifier.Notifier.ANY, forward)
+    watcher = tu.daemon_thread(drainer)
+    watcher.start()
+    try:
+        conductor.connect()
+        with contextlib.closing(conductor):
+            conductor.run()
+    finally:
+        if persistence is not None:
+            persistence.close()
+
+
+class ProcessConductor(base.BaseConductor):
+    """Conductor that dispatches jobs using a pool of child processes.
+
+    Each child process runs its own (blocking) conductor that claims and
+    works on one job at a time, so CPU bound flows are not limited by
+    running in a single interpreter (and its global interpreter lock). The
+    parent process supervises the children (restarting them if they exit
+    unexpectedly) and aggregates their notifications and statistics; it does
+    not claim or run jobs itself.
+
+    Children that keep exiting soon after being started (for example because
+    the jobboard configuration is broken) are restarted after a delay that
+    doubles each time (up to ``MAX_RESTART_DELAY`` seconds); once a child
+    has been restarted ``max_restarts`` times in a row (without staying up
+    for ``MAX_RESTART_DELAY`` seconds in between) the children are drained
+    and :py:meth:`.run` raises a
+    :py:class:`~taskflow.exceptions.ConductorFailure`.
+
+    Because jobboard and persistence connections can not be shared across
+    processes the jobboard (and persistence) provided to this conductor must
+    be **configurations** (as accepted by
+    :py:func:`taskflow.jobs.backends.fetch` and
+    :py:func:`taskflow.persistence.backends.fetch`) that each child uses to
+    make its own connections (this means in-memory backends can not be
+    used). Each child claims jobs under its own name (this conductors name
+    suffixed with the index of the child).
+
+    Calling :py:meth:`.stop` drains the children, each child stops claiming
+    new jobs, finishes the job it is working on (if any) and then exits.
+
+    NOTE: the events emitted to this conductors notifier for
+    child conductor events have details containing the name of the child
+    conductor (``conductor``) and the uuid and name of the job
+    (``job_uuid`` and ``job_name``) instead of the job object itself.
+    """
+
+    #: Default timeout used to poll the children (and for children to idle).
+    WAIT_TIMEOUT = 0.5
+
+    #: Delay (in seconds) before a child that exited is first restarted.
+    RESTART_DELAY = 0.1
+
+    #: Maximum delay (in seconds) before a child that exited is restarted.
+    MAX_RESTART_DELAY = 30.0
+
+    #: Default number of times in a row a child is restarted (before giving
+    #: up on it).
+    MAX_RESTARTS = 10
+
+    EVENTS_EMITTED = impl_executor.ExecutorConductor.EVENTS_EMITTED + tuple([
+        'child_started', 'child_exited',
+    ])
+    """Events will be emitted for each of the events above.  The event is
+       emitted to listeners registered with the conductor.
+    """
+
+    def __init__(self, name, jobboard,
+                 persistence=None, engine=None,
+                 engine_options=None, wait_timeout=None,
+                 log=None, workers=None, flow_cache_size=None,
+                 max_restarts=None):
+        if not isinstance(jobboard, (dict,) + six.string_types):
+            raise TypeError("Jobboard configuration dictionary (or URI)"
+                            " expected not '%s' (%s)"
+                            % (jobboard, type(jobboard)))
+        if (persistence is not None and
+                not isinstance(persistence, (dict,) + six.string_types)):
+            raise TypeError("Persistence configuration dictionary (or URI)"
+                            " expected not '%s' (%s)"
+                            % (persistence, type(persistence)))
+        super(ProcessConductor, self).__init__(
+            name, jobboard, persistence=persistence,
+            engine=engine, engine_options=engine_options)
+        # Flows are cached (if asked to) by each child, the parent does not
+        # build (or run) any itself.
+        self._flow_cache_size = flow_cache_size
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers <= 0:
+            raise ValueError("At least one worker (child process) is"
+                             " required")
+        self._workers = workers
+        self._max_restarts = int(misc.pick_first_not_none(max_restarts,
+                                                          self.MAX_RESTARTS))
+        if self._max_restarts < 0:
+            raise ValueError("Maximum restarts must be greater than or"
+                             " equal to zero")
+        self._wait_timeout = tt.convert_to_timeout(
+            value=wait_timeout, default_value=self.WAIT_TIMEOUT)
+        self._log = misc.pick_first_not_none(log, LOG)
+        self._dead = threading.Event()
+        self._dead.set()
+        self._drain = multiprocessing.Event()
+        self._statistics = collections.defaultdict(int)
+
+    @property
+    def dispatching(self):
+        """Whether or not the children are still dispatching."""
+        return not self._dead.is_set()
+
+    @property
+    def statistics(self):
+        """Dictionary of statistics aggregated from the children.
+
+        Contains the number of children currently running (``children``),
+        how many times children were restarted (``restarts``), how many jobs
+        children started running (``dispatched``) and how many jobs were
+        consumed (``job_consumed``) and abandoned (``job_abandoned``).
+        """
+        statistics = dict(self._statistics)
+        for key in ('children', 'restarts', 'dispatched',
+                    'job_consumed', 'job_abandoned'):
+            statistics.setdefault(key, 0)
+        return statistics
+
+    def connect(self):
+        """Noop (each child process makes its own connections)."""
+
+    def close(self):
+        """Noop (each child process closes its own connections)."""
+
+    def stop(self):
+        """Requests the children to drain (and then exit).
+
+        The method returns immediately regardless of whether the children
+        have stopped.
+        """
+        self._drain.set()
+
+    def _start_child(self, index, events, budget):
+        name = "%s-%s" % (self._name, index)
+        conductor_options = {
+            'engine': self._engine,
+            'engine_options': self._engine_options,
+            'wait_timeout': self._wait_timeout.value,
+            'flow_cache_size': self._flow_cache_size,
+        }
+        child = multiprocessing.Process(
+            target=_run_child, name=name,
+            args=(name, self._jobboard, self._persistence,
+                  conductor_options, events, self._drain, budget))
+        child.daemon = True
+        child.start()
+        child.started_at = timeutils.now()
+        self._statistics['children'] += 1
+        self._notifier.notify('child_started', {
+            'conductor': name,
+            'pid': child.pid,
+        })
+        return child
+
+    def _reap_child(self, child):
+        child.join()
+        self._statistics['children'] -= 1
+        self._notifier.notify('child_exited', {
+            'conductor': child.name,
+            'pid': child.pid,
+            'exitcode': child.exitcode,
+        })
+
+    def _process_events(self, events, timeout=None):
+        while True:
+            try:
+                if timeout is not None:
+                    name, event_type, details = events.get(timeout=timeout)
+                    timeout = None
+                else:
+                    name, event_type, details = events.get_nowait()
+            except compat_queue.Empty:
+                break
+            if event_type == 'compilation_start':
+                self._statistics['dispatched'] += 1
+            elif event_type in ('job_consumed', 'job_abandoned'):
+                self._statistics[event_type] += 1
+            details['conductor'] = name
+            self._notifier.notify(event_type, details)
+
+    def _restart_delay(self, failures):
+        return min(self.RESTART_DELAY * (2 ** (failures - 1)),
+                   self.MAX_RESTART_DELAY)
+
+    def _run_until_dead(self, events, budget, max_dispatches):
+        children = [self._start_child(i, events, budget)
+                    for i in six.moves.range(0, self._workers)]
+        # How many times in a row each child exited unexpectedly (and when
+        # it is to be restarted, if it is waiting to be).
+        failures = [0] * self._workers
+        restart_at = [None] * self._workers
+        failed = None
+        while True:
+            self._process_events(events, timeout=self._wait_timeout.value)
+            if budget is not None and budget[1] >= max_dispatches:
+                # All jobs that may be dispatched have been claimed, let the
+                # children finish them (and then exit).
+                self._drain.set()
+            for index, child in enumerate(children):
+                if child is None:
+                    if restart_at[index] is None:
+                        continue
+                    if self._drain.is_set():
+                        restart_at[index] = None
+                    elif timeutils.now() >= restart_at[index]:
+                        restart_at[index] = None
+                        self._statistics['restarts'] += 1
+                        children[index] = self._start_child(index, events,
+                                                            budget)
+                    continue
+                if child.is_alive():
+                    continue
+                self._reap_child(child)
+                children[index] = None
+                if self._drain.is_set():
+                    continue
+                if (timeutils.now() - child.started_at >=
+                        self.MAX_RESTART_DELAY):
+                    # It stayed up for a while, so start counting again.
+                    failures[index] = 0
+                failures[index] += 1
+                if failures[index] > self._max_restarts:
+                    self._log.error("Child conductor %s (pid %s) exited"
+                                    " unexpectedly with exit code %s after"
+                                    " being restarted %s times in a row,"
+                                    " giving up", child.name, child.pid,
+                                    child.exitcode, self._max_restarts)
+                    failed = child
+                    self._drain.set()
+                    continue
+                delay = self._restart_delay(failures[index])
+                self._log.warn("Child conductor %s (pid %s) exited"
+                               " unexpectedly with exit code %s, restarting"
+                               " it in %0.2f seconds", child.name, child.pid,
+                               child.exitcode, delay)
+                restart_at[index] = timeutils.now() + delay
+            if all(child is None for child in children):
+                if all(when is None for when in restart_at):
+                    break
+        # Pick up anything the children sent just before exiting.
+        self._process_events(events)
+        if failed is not None:
+            raise excp.ConductorFailure("Child conductor %s kept exiting"
+                                        " unexpectedly (last exit code %s)"
+                                        % (failed.name, failed.exitcode))
+
+    def run(self, max_dispatches=None):
+        self._dead.clear()
+        self._drain.clear()
+        self._statistics.clear()
+        if max_dispatches is None or max_dispatches < 0:
+            budget = None
+        else:
+            budget = multiprocessing.Array('i', [max_dispatches, 0])
+        events = multiprocessing.Queue()
+        try:
+            if max_dispatches != 0:
+                self._run_until_dead(events, budget, max_dispatches)
+        except KeyboardInterrupt:
+            with excutils.save_and_reraise_exception():
+                self._log.warn("Job dispatching interrupted")
+                self._drain.set()
+        finally:
+            events.close()
+            self._dead.set()
+
+    # Inherit the docs, so we can reference them in our class docstring,
+    # if we don't do this sphinx gets confused...
+    run.__doc__ = base.BaseConductor.run.__doc__
+
+    def wait(self, timeout=None):
+        """Waits for the conductor (and its children) to gracefully exit.
+
+        This method waits for the conductor to gracefully exit. An optional
+        timeout can be provided, which will cause the method to return
+        within the specified timeout. If the timeout is reached, the returned
+        value will be ``False``, otherwise it will be ``True``.
+
+        :param timeout: Maximum number of seconds that the :meth:`wait` method
+                        should block for.
+        """
+        return self._dead.wait(timeout)
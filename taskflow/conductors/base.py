@@ -17,8 +17,10 @@ import os
 import threading
 
 import fasteners
+from oslo_utils import excutils
 import six
 
+from taskflow.conductors import flow_cache
 from taskflow import engines
 from taskflow import exceptions as excp
 from taskflow.types import entity
@@ -27,15 +29,14 @@ from taskflow.utils import misc
 
 
 @six.add_metaclass(abc.ABCMeta)
-class Conductor(object):
-    """Base for all conductor implementations.
-
-    Conductors act as entities which extract jobs from a jobboard, assign
-    there work to some engine (using some desired configuration) and then wait
-    for that work to complete. If the work fails then they abandon the claimed
-    work (or if the process they are running in crashes or dies this
-    abandonment happens automatically) and then another conductor at a later
-    period of time will finish up the prior failed conductors work.
+class BaseConductor(object):
+    """Base for all conductors (including those that do not run jobs).
+
+    This holds what every conductor has (a name, the jobboard jobs come
+    from, the persistence and engine configuration used to run them and a
+    notifier); conductors that claim jobs and run them in engines themselves
+    derive from :py:class:`.Conductor`, ones that delegate that work (for
+    example to child processes) derive from this directly.
     """
 
     #: Entity kind used when creating new entity objects
@@ -74,6 +75,75 @@ class Conductor(object):
         """
         return self._notifier
 
+    @fasteners.locked
+    def connect(self):
+        """Ensures the jobboard is connected (noop if it is already)."""
+        if not self._jobboard.connected:
+            self._jobboard.connect()
+
+    @fasteners.locked
+    def close(self):
+        """Closes the contained jobboard, disallowing further use."""
+        self._jobboard.close()
+
+    @abc.abstractmethod
+    def run(self, max_dispatches=None):
+        """Continuously claims, runs, and consumes jobs (and repeat).
+
+        :param max_dispatches: An upper bound on the number of jobs that will
+                               be dispatched, if none or negative this implies
+                               there is no limit to the number of jobs that
+                               will be dispatched, otherwise if positive this
+                               run method will return when that amount of jobs
+                               has been dispatched (instead of running
+                               forever and/or until stopped).
+        """
+
+
+class Conductor(BaseConductor):
+    """Base for conductor implementations that run jobs (in engines).
+
+    Conductors act as entities which extract jobs from a jobboard, assign
+    there work to some engine (using some desired configuration) and then wait
+    for that work to complete. If the work fails then they abandon the claimed
+    work (or if the process they are running in crashes or dies this
+    abandonment happens automatically) and then another conductor at a later
+    period of time will finish up the prior failed conductors work.
+    """
+
+    FLOW_CACHE_SIZE = 0
+    """
+    Default maximum number of (idle) built & compiled flows that are retained
+    for reuse by later jobs (zero disables retaining them); see
+    :py:class:`~taskflow.conductors.flow_cache.FlowCache`.
+    """
+
+    def __init__(self, name, jobboard,
+                 persistence=None, engine=None, engine_options=None,
+                 flow_cache_size=None):
+        super(Conductor, self).__init__(name, jobboard,
+                                        persistence=persistence,
+                                        engine=engine,
+                                        engine_options=engine_options)
+        self._flow_cache = flow_cache.FlowCache(
+            max_templates=int(misc.pick_first_not_none(flow_cache_size,
+                                                       self.FLOW_CACHE_SIZE)))
+        self._templates = {}
+
+    @property
+    def flow_cache(self):
+        """The cache of flow factories (and flows) used to create engines."""
+        return self._flow_cache
+
+    def reload_flows(self):
+        """Forgets cached flow factories and flows (reloading them on use).
+
+        This should be called after the code that provides flow factories has
+        been updated (so that jobs dispatched after this call use the
+        updated factories).
+        """
+        self._flow_cache.reload()
+
     def _flow_detail_from_job(self, job):
         """Extracts a flow detail from a job (via some manner).
 
@@ -110,7 +180,13 @@ class Conductor(object):
         return flow_detail
 
     def _engine_from_job(self, job):
-        """Extracts an engine from a job (via some manner)."""
+        """Extracts an engine from a job (via some manner).
+
+        When flows are cached (see :py:attr:`.flow_cache`) the engine runs a
+        flow checked out of that cache, subclasses must then call
+        :py:meth:`._release_engine` once the engine has finished running (so
+        that the flow is returned to the cache for later jobs to reuse).
+        """
         flow_detail = self._flow_detail_from_job(job)
         store = {}
 
@@ -120,12 +196,32 @@ class Conductor(object):
         if job.details and 'store' in job.details:
             store.update(job.details["store"])
 
-        engine = engines.load_from_detail(flow_detail, store=store,
-                                          engine=self._engine,
-                                          backend=self._persistence,
-                                          **self._engine_options)
+        template = self._flow_cache.checkout(flow_detail)
+        engine_options = self._engine_options
+        if template.key is not None:
+            engine_options = dict(engine_options, compiler=template.compiler)
+        try:
+            engine = engines.load(template.flow, flow_detail=flow_detail,
+                                  store=store, engine=self._engine,
+                                  backend=self._persistence,
+                                  **engine_options)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._flow_cache.checkin(template)
+        if template.key is not None:
+            self._templates[engine] = template
         return engine
 
+    def _release_engine(self, engine):
+        """Releases an engine (made from a job) once it has finished.
+
+        This is a no-op for engines whose flow did not come from the flow
+        cache (so it is safe to call for any engine).
+        """
+        template = self._templates.pop(engine, None)
+        if template is not None:
+            self._flow_cache.checkin(template)
+
     def _listeners_from_job(self, job, engine):
         """Returns a list of listeners to be attached to an engine.
 
@@ -141,30 +237,6 @@ class Conductor(object):
         #                listener factories over the jobboard
         return []
 
-    @fasteners.locked
-    def connect(self):
-        """Ensures the jobboard is connected (noop if it is already)."""
-        if not self._jobboard.connected:
-            self._jobboard.connect()
-
-    @fasteners.locked
-    def close(self):
-        """Closes the contained jobboard, disallowing further use."""
-        self._jobboard.close()
-
-    @abc.abstractmethod
-    def run(self, max_dispatches=None):
-        """Continuously claims, runs, and consumes jobs (and repeat).
-
-        :param max_dispatches: An upper bound on the number of jobs that will
-                               be dispatched, if none or negative this implies
-                               there is no limit to the number of jobs that
-                               will be dispatched, otherwise if positive this
-                               run method will return when that amount of jobs
-                               has been dispatched (instead of running
-                               forever and/or until stopped).
-        """
-
     @abc.abstractmethod
     def _dispatch_job(self, job):
         """Dispatches a claimed job for work completion.
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+
+from oslo_serialization import jsonutils
+from oslo_utils import importutils
+
+from taskflow.engines.action_engine import compiler
+
+
+class Template(object):
+    """A flow (and its compiler) that was built from a flow factory."""
+
+    def __init__(self, key, generation, flow):
+        self.key = key
+        self.generation = generation
+        self.flow = flow
+        self.compiler = compiler.PatternCompiler(flow)
+
+
+class FlowCache(object):
+    """Caches flow factories and (optionally) built & compiled flows.
+
+    Flow details name the factory that creates their flow (see
+    :py:func:`~taskflow.engines.helpers.save_factory_details`), resolving
+    that name involves an import by name, the result of which is cached (up
+    to ``max_factories`` factories are retained).
+
+    When ``max_templates`` is greater than zero the flows that factories
+    create are also kept (along with their compilation) and reused by later
+    flow details that name the same factory with the same arguments and
+    keyword arguments. A template is only ever used by one engine at a time
+    (it is checked out while in use and checked back in when that engine
+    has finished), so a conductor running many jobs at the same time will
+    build as many templates as it has jobs in progress, and up to
+    ``max_templates`` idle templates are retained.
+
+    NOTE: reusing templates means the atoms in a flow will be
+    reused across jobs (so atoms that retain state between executions
+    must not be used with this enabled).
+    """
+
+    #: Default maximum number of factories that are retained.
+    MAX_FACTORIES = 64
+
+    def __init__(self, max_templates=0, max_factories=MAX_FACTORIES):
+        if max_templates < 0:
+            raise ValueError("Maximum templates must be greater than or"
+                             " equal to zero")
+        if max_factories <= 0:
+            raise ValueError("Maximum factories must be greater than zero")
+        self._max_templates = max_templates
+        self._max_factories = max_factories
+        self._lock = threading.Lock()
+        self._factories = collections.OrderedDict()
+        self._templates = collections.OrderedDict()
+        self._idle = 0
+        self._generation = 0
+        self._statistics = {
+            'hits': 0,
+            'misses': 0,
+            'reloads': 0,
+        }
+
+    @property
+    def statistics(self):
+        """Dictionary of hits, misses, reloads (and idle templates)."""
+        with self._lock:
+            statistics = dict(self._statistics)
+            statistics['idle'] = self._idle
+            return statistics
+
+    def reload(self):
+        """Forgets all cached factories and templates.
+
+        Factories (and the flows they create) will be resolved again when
+        next needed; templates that are checked out when this is called are
+        dropped (instead of being retained) when they are checked back in.
+        """
+        with self._lock:
+            self._factories.clear()
+            self._templates.clear()
+            self._idle = 0
+            self._generation += 1
+            self._statistics['reloads'] += 1
+
+    def _fetch_factory(self, factory_name):
+        with self._lock:
+            try:
+                factory_fun = self._factories.pop(factory_name)
+            except KeyError:
+                pass
+            else:
+                self._factories[factory_name] = factory_fun
+                return factory_fun
+        factory_fun = importutils.import_class(factory_name)
+        with self._lock:
+            self._factories[factory_name] = factory_fun
+            while len(self._factories) > self._max_factories:
+                self._factories.popitem(last=False)
+        return factory_fun
+
+    def checkout(self, flow_detail):
+        """Gets a template that can be used to run the given flow detail.
+
+        Raises the same errors as
+        :py:func:`~taskflow.engines.helpers.flow_from_detail` when the flow
+        details metadata does not name a (importable) factory.
+        """
+        try:
+            factory_data = flow_detail.meta['factory']
+        except (KeyError, AttributeError, TypeError):
+            raise ValueError('Cannot reconstruct flow %s %s: '
+                             'no factory information saved.'
+                             % (flow_detail.name, flow_detail.uuid))
+        args = factory_data.get('args', ())
+        kwargs = factory_data.get('kwargs', {})
+        key = None
+        if self._max_templates > 0:
+            key = jsonutils.dumps([factory_data.get('name'), args, kwargs],
+                                  sort_keys=True)
+            with self._lock:
+                templates = self._templates.get(key)
+                if templates:
+                    template = templates.pop()
+                    if not templates:
+                        self._templates.pop(key)
+                    self._idle -= 1
+                    self._statistics['hits'] += 1
+                    return template
+        try:
+            factory_fun = self._fetch_factory(factory_data['name'])
+        except (KeyError, ImportError, ValueError):
+            raise ImportError('Could not import factory for flow %s %s'
+                              % (flow_detail.name, flow_detail.uuid))
+        with self._lock:
+            self._statistics['misses'] += 1
+            generation = self._generation
+        return Template(key, generation, factory_fun(*args, **kwargs))
+
+    def checkin(self, template):
+        """Returns a template (that is no longer in use) to the cache."""
+        if template.key is None:
+            return
+        with self._lock:
+            if template.generation != self._generation:
+                return
+            try:
+                templates = self._templates.pop(template.key)
+            except KeyError:
+                templates = []
+            templates.append(template)
+            self._templates[template.key] = templates
+            self._idle += 1
+            while self._idle > self._max_templates:
+                oldest_key, oldest = next(iter(self._templates.items()))
+                oldest.pop(0)
+                self._idle -= 1
+                if not oldest:
+                    self._templates.pop(oldest_key)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import multiprocessing
+import os
+import threading
+
+
+def _host_load():
+    """Returns the 1 minute load average per cpu (or none if unknown)."""
+    try:
+        load = os.getloadavg()[0]
+        cpus = multiprocessing.cpu_count()
+    except (AttributeError, OSError, NotImplementedError):
+        return None
+    return load / max(1, cpus)
+
+
+class AIMDLimiter(object):
+    """Adapts how many jobs may be in progress using observed signals.
+
+    The limit is increased additively (by about ``increase`` each time a
+    limits worth of jobs complete while the limit is being reached) when
+    jobs are completing in a healthy manner and decreased multiplicatively
+    (by ``backoff``, at most once per limits worth of completed jobs) when
+    any of the following signals degrade:
+
+    * The recent job completion latency (a fast moving average) exceeds
+      ``tolerance`` times the long term latency (a slow moving average);
+      this is a latency *gradient* so it adapts to the jobs being ran
+      instead of needing an absolute latency target.
+    * The recent time jobs spent queued in the executor (before starting to
+      run) exceeds ``queue_tolerance`` times the long term latency (the
+      executor has more jobs than it can run at the same time).
+    * The hosts load average (per cpu) exceeds ``max_load`` (if provided).
+
+    :param initial: limit to start with
+    :param minimum: lowest the limit will go
+    :param maximum: highest the limit will go
+    """
+
+    #: How many samples are needed before the latency gradient is used.
+    WARMUP_SAMPLES = 5
+
+    #: Weight given to new samples in the fast moving averages.
+    FAST_ALPHA = 0.5
+
+    #: Weight given to new samples in the slow moving average.
+    SLOW_ALPHA = 0.05
+
+    def __init__(self, initial=4, minimum=1, maximum=64,
+                 increase=1.0, backoff=0.75, tolerance=1.5,
+                 queue_tolerance=0.25, max_load=None,
+                 load_func=_host_load):
+        if not (0 < minimum <= initial <= maximum):
+            raise ValueError("Limits must satisfy 0 < minimum <= initial"
+                             " <= maximum")
+        if not (0 < backoff < 1):
+            raise ValueError("Backoff must be between zero and one")
+        if increase <= 0 or tolerance <= 1 or queue_tolerance <= 0:
+            raise ValueError("Increase and queue tolerance must be greater"
+                             " than zero and tolerance greater than one")
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._increase = increase
+        self._backoff = backoff
+        self._tolerance = tolerance
+        self._queue_tolerance = queue_tolerance
+        self._max_load = max_load
+        self._load_func = load_func
+        self._lock = threading.Lock()
+        self._samples = 0
+        self._since_decrease = 0
+        self._latency = None
+        self._baseline = None
+        self._queue_time = None
+        self._load = None
+
+    @staticmethod
+    def _average(average, value, alpha):
+        if average is None:
+            return value
+        return average + alpha * (value - average)
+
+    @property
+    def limit(self):
+        """The current limit (on jobs in progress at the same time)."""
+        return int(self._limit)
+
+    @property
+    def signals(self):
+        """Dictionary of the signals the current limit is derived from."""
+        with self._lock:
+            return {
+                'limit': int(self._limit),
+                'latency': self._latency,
+                'baseline_latency': self._baseline,
+                'queue_time': self._queue_time,
+                'load': self._load,
+            }
+
+    def _degraded(self):
+        if self._max_load is not None and self._load is not None:
+            if self._load > self._max_load:
+                return 'load'
+        if self._samples < self.WARMUP_SAMPLES:
+            return None
+        if self._latency > self._tolerance * self._baseline:
+            return 'latency'
+        if self._queue_time > self._queue_tolerance * self._baseline:
+            return 'queue_time'
+        return None
+
+    def record(self, latency, queue_time, in_progress):
+        """Records a completed job (and adjusts the limit).
+
+        :param latency: how long (in seconds) the job took from being
+                        submitted to the executor to completing
+        :param queue_time: how long (in seconds) of that the job spent
+                           waiting in the executor before starting to run
+        :param in_progress: how many jobs were in progress (including this
+                            one) when this job completed
+
+        :returns: the reason (``latency``, ``queue_time`` or ``load``) the
+                  limit was decreased or none if it was not decreased
+        """
+        with self._lock:
+            self._samples += 1
+            self._since_decrease += 1
+            self._latency = self._average(self._latency, latency,
+                                          self.FAST_ALPHA)
+            self._baseline = self._average(self._baseline, latency,
+                                           self.SLOW_ALPHA)
+            self._queue_time = self._average(self._queue_time, queue_time,
+                                             self.FAST_ALPHA)
+            if self._load_func is not None:
+                self._load = self._load_func()
+            reason = self._degraded()
+            if reason is not None:
+                # Only back off once per (current) limits worth of jobs,
+                # the jobs that were already running when the limit was
+                # last decreased will likely show the same degradation.
+                if self._since_decrease >= self._limit:
+                    self._limit = max(self._minimum,
+                                      self._limit * self._backoff)
+                    self._since_decrease = 0
+                    return reason
+            elif in_progress >= int(self._limit):
+                self._limit = min(self._maximum,
+                                  self._limit + self._increase / self._limit)
+            return None
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import collections
+import heapq
+import itertools
+import threading
+
+import six
+
+
+@six.add_metaclass(abc.ABCMeta)
+class SelectionPolicy(object):
+    """Decides which of the jobs on a jobboard a conductor tries to claim.
+
+    A conductor asks its policy for candidates (via :py:meth:`.select`) each
+    time it has capacity free, attempts to claim the returned jobs and then
+    tells the policy which of them it managed to claim (and later when each
+    of those claimed jobs has finished being worked on).
+    """
+
+    @abc.abstractmethod
+    def select(self, job_it, limit):
+        """Selects up to ``limit`` jobs (from a job iterator) to claim.
+
+        The provided iterator is the same object for as long as the conductor
+        is working through one listing of the jobboard (a new one is provided
+        when the conductor starts a new pass over the jobboard); jobs taken
+        from it that are not returned may be held onto and returned from
+        later calls made with the same iterator.
+        """
+
+    def job_claimed(self, job):
+        """Called when a job returned from :py:meth:`.select` is claimed."""
+
+    def job_finished(self, job):
+        """Called when a claimed job has been consumed or abandoned."""
+
+
+class OrderedPolicy(SelectionPolicy):
+    """Selects jobs in the order the jobboard iterator provides them.
+
+    This is the default policy (jobs are claimed in ``(priority, sequence)``
+    order regardless of who posted them).
+    """
+
+    def select(self, job_it, limit):
+        return list(itertools.islice(job_it, limit))
+
+
+class CappedPolicy(SelectionPolicy):
+    """Selects jobs in jobboard order, limiting in-progress jobs per key.
+
+    Each job is mapped to a key using a field of its details (for example
+    ``tenant``) or a callable that is given the job. Jobs taken from the job
+    iterator are placed into a per-key index (so that jobs whose key has
+    reached its concurrency cap can be passed over without rescanning them
+    each time a selection is made) and selections are merged across the keys
+    that still have room.
+
+    :param key: job details field (or callable taking a job) that determines
+                the key of each job (jobs that lack the field all share the
+                ``None`` key)
+    :param caps: dictionary of key to maximum number of jobs with that key
+                 that may be in progress at the same time
+    :param default_cap: cap used for keys not in ``caps`` (``None`` means no
+                        limit)
+    :param max_pending: maximum number of jobs indexed per key (jobs beyond
+                        this are skipped until the next jobboard pass)
+    :param max_scan: maximum number of jobs taken from the job iterator per
+                     selection (``None`` means no limit)
+    """
+
+    #: Default maximum number of jobs indexed per key.
+    MAX_PENDING = 64
+
+    def __init__(self, key='tenant', caps=None, default_cap=None,
+                 max_pending=MAX_PENDING, max_scan=None):
+        if six.callable(key):
+            self._key_func = key
+        else:
+            self._key_func = lambda job: (job.details or {}).get(key)
+        self._caps = dict(caps or {})
+        for cap in itertools.chain(six.itervalues(self._caps),
+                                   [default_cap]):
+            if cap is not None and cap <= 0:
+                raise ValueError("Caps must be greater than zero (or None)")
+        self._default_cap = default_cap
+        if max_pending <= 0:
+            raise ValueError("Maximum pending jobs per key must be greater"
+                             " than zero")
+        self._max_pending = max_pending
+        if max_scan is not None and max_scan <= 0:
+            raise ValueError("Maximum scan must be greater than zero"
+                             " (or None)")
+        self._max_scan = max_scan
+        self._lock = threading.Lock()
+        self._in_flight = collections.defaultdict(int)
+        self._claimed = {}
+        self._job_it = None
+        self._pending = {}
+        self._position = itertools.count()
+
+    def _cap(self, key):
+        return self._caps.get(key, self._default_cap)
+
+    def _has_room(self, key, taken):
+        cap = self._cap(key)
+        if cap is None:
+            return True
+        return self._in_flight.get(key, 0) + taken.get(key, 0) < cap
+
+    def _order(self, key, taken):
+        return 0
+
+    def _index(self, job_it):
+        if job_it is not self._job_it:
+            self._job_it = job_it
+            self._pending.clear()
+        scanned = 0
+        while self._max_scan is None or scanned < self._max_scan:
+            try:
+                job = six.next(job_it)
+            except StopIteration:
+                break
+            scanned += 1
+            key = self._key_func(job)
+            try:
+                jobs = self._pending[key]
+            except KeyError:
+                jobs = self._pending[key] = collections.deque()
+            if len(jobs) < self._max_pending:
+                jobs.append((six.next(self._position), job))
+
+    def select(self, job_it, limit):
+        with self._lock:
+            self._index(job_it)
+            taken = {}
+            heap = []
+            for key, jobs in six.iteritems(self._pending):
+                if jobs and self._has_room(key, taken):
+                    heap.append((self._order(key, taken), jobs[0][0], key))
+            heapq.heapify(heap)
+            selected = []
+            while heap and len(selected) < limit:
+                _order, _position, key = heapq.heappop(heap)
+                jobs = self._pending[key]
+                selected.append(jobs.popleft()[1])
+                taken[key] = taken.get(key, 0) + 1
+                if not jobs:
+                    self._pending.pop(key)
+                elif self._has_room(key, taken):
+                    heapq.heappush(heap, (self._order(key, taken),
+                                          jobs[0][0], key))
+            return selected
+
+    def _on_claimed(self, key):
+        pass
+
+    def _on_finished(self, key):
+        pass
+
+    def job_claimed(self, job):
+        key = self._key_func(job)
+        with self._lock:
+            self._claimed[job.uuid] = key
+            self._in_flight[key] += 1
+            self._on_claimed(key)
+
+    def job_finished(self, job):
+        with self._lock:
+            try:
+                key = self._claimed.pop(job.uuid)
+            except KeyError:
+                return
+            self._in_flight[key] -= 1
+            if self._in_flight[key] <= 0:
+                self._in_flight.pop(key)
+            self._on_finished(key)
+
+    @property
+    def in_flight(self):
+        """Dictionary of key to number of claimed (and unfinished) jobs."""
+        with self._lock:
+            return dict(self._in_flight)
+
+
+class FairSharePolicy(CappedPolicy):
+    """Selects jobs so that each key gets its weighted share of claims.
+
+    Uses start-time fair queueing over the keys of the jobs: each key has a
+    virtual time that advances by ``1 / weight`` each time one of its jobs is
+    claimed and the key with the lowest virtual time (ties broken by jobboard
+    order) is selected from next. A key that has been idle starts again from
+    the current virtual time (so it can not build up credit while it has no
+    jobs posted). This means one key that posts many jobs can not starve
+    the other keys, and a key with weight ``2`` gets about twice the claims
+    of a key with weight ``1`` when both have jobs waiting.
+
+    Accepts the same keyword arguments as :py:class:`.CappedPolicy` (the caps
+    are still applied) along with the following:
+
+    :param weights: dictionary of key to weight (greater than zero)
+    :param default_weight: weight used for keys not in ``weights``
+    """
+
+    def __init__(self, key='tenant', weights=None, default_weight=1,
+                 **kwargs):
+        super(FairSharePolicy, self).__init__(key=key, **kwargs)
+        self._weights = dict(weights or {})
+        for weight in itertools.chain(six.itervalues(self._weights),
+                                      [default_weight]):
+            if weight <= 0:
+                raise ValueError("Weights must be greater than zero")
+        self._default_weight = default_weight
+        self._vtimes = {}
+        self._vclock = 0.0
+
+    def _weight(self, key):
+        return float(self._weights.get(key, self._default_weight))
+
+    def _start(self, key):
+        return max(self._vtimes.get(key, 0.0), self._vclock)
+
+    def _order(self, key, taken):
+        return self._start(key) + taken.get(key, 0) / self._weight(key)
+
+    def _on_claimed(self, key):
+        start = self._start(key)
+        self._vclock = start
+        self._vtimes[key] = start + 1.0 / self._weight(key)
+
+    def _on_finished(self, key):
+        # Forget keys that have no credit to remember (they will start from
+        # the virtual clock when they are next seen anyway).
+        if (key not in self._in_flight and
+                self._vtimes.get(key, 0.0) <= self._vclock):
+            self._vtimes.pop(key, None)
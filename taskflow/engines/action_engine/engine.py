@@ -170,7 +170,12 @@ class ActionEngine(base.Engine):
         self._runtime = None
         self._compiled = False
         self._compilation = None
-        self._compiler = compiler.PatternCompiler(flow)
+        # NOTE: a compiler of the same flow can be provided (and
+        # shared between engines that run the same flow, one at a time) so
+        # that the flow does not need to be compiled again.
+        self._compiler = self._options.get('compiler')
+        if self._compiler is None:
+            self._compiler = compiler.PatternCompiler(flow)
         self._lock = threading.RLock()
         self._storage_ensured = False
         self._validated = False
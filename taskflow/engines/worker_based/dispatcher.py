@@ -54,9 +54,18 @@ class Handler(object):
 
 
 class TypeDispatcher(object):
-    """Receives messages and dispatches to type specific handlers."""
-
-    def __init__(self, type_handlers=None, requeue_filters=None):
+    """Receives messages and dispatches to type specific handlers.
+
+    The ``validation_rate`` (between zero and one) is the fraction of
+    received messages that are validated (using the validator of the handler
+    the message is dispatched to) before being processed; deployments where
+    all senders are trusted can lower it (or set it to zero) to skip
+    (some or all of) the validation, messages that are not validated are
+    evenly spread out over all messages received.
+    """
+
+    def __init__(self, type_handlers=None, requeue_filters=None,
+                 validation_rate=1.0):
         if type_handlers is not None:
             self._type_handlers = dict(type_handlers)
         else:
@@ -65,6 +74,12 @@ class TypeDispatcher(object):
             self._requeue_filters = list(requeue_filters)
         else:
             self._requeue_filters = []
+        if not (0 <= validation_rate <= 1):
+            raise ValueError("Validation rate must be between zero and one")
+        self._validation_rate = validation_rate
+        self._validation_credit = 0.0
+        self._validated = 0
+        self._skipped = 0
 
     @property
     def type_handlers(self):
@@ -94,6 +109,25 @@ class TypeDispatcher(object):
         """
         return self._requeue_filters
 
+    @property
+    def statistics(self):
+        """Dictionary of how many messages were validated (and skipped)."""
+        return {
+            'validated': self._validated,
+            'skipped': self._skipped,
+        }
+
+    def _should_validate(self):
+        # NOTE: messages are dispatched from a single thread so
+        # this does not need to be locked.
+        if self._validation_rate >= 1:
+            return True
+        self._validation_credit += self._validation_rate
+        if self._validation_credit >= 1:
+            self._validation_credit -= 1
+            return True
+        return False
+
     def _collect_requeue_votes(self, data, message):
         # Returns how many of the filters asked for the message to be requeued.
         requeue_votes = 0
@@ -130,15 +164,21 @@ class TypeDispatcher(object):
                         " '%s'", message_type, ku.DelayedPretty(message))
         else:
             if handler.validator is not None:
-                try:
-                    handler.validator(data)
-                except excp.InvalidFormat as e:
-                    message.reject_log_error(
-                        logger=LOG, errors=(kombu_exc.MessageStateError,))
-                    LOG.warning("Message '%s' (%s) was rejected due to it"
-                                " being in an invalid format: %s",
-                                ku.DelayedPretty(message), message_type, e)
-                    return
+                if not self._should_validate():
+                    self._skipped += 1
+                else:
+                    self._validated += 1
+                    try:
+                        handler.validator(data)
+                    except excp.InvalidFormat as e:
+                        message.reject_log_error(
+                            logger=LOG,
+                            errors=(kombu_exc.MessageStateError,))
+                        LOG.warning("Message '%s' (%s) was rejected due to"
+                                    " it being in an invalid format: %s",
+                                    ku.DelayedPretty(message), message_type,
+                                    e)
+                        return
             message.ack_log_error(logger=LOG,
                                   errors=(kombu_exc.MessageStateError,))
             if message.acknowledged:
@@ -14,18 +14,38 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import threading
+
 from oslo_utils import reflection
 
 from taskflow.engines.action_engine import executor
+from taskflow import logging
+
+LOG = logging.getLogger(__name__)
 
 
 class Endpoint(object):
-    """Represents a single task with execute/revert methods."""
+    """Represents a single task with execute/revert methods.
 
-    def __init__(self, task_cls):
+    When a ``pool_size`` is provided the task instances this endpoint
+    generates are pooled (keyed by task name and version) and reused by
+    later requests instead of being recreated each time (up to
+    ``pool_size`` idle instances are kept per task name and version). Before
+    an instance is reused its ``reset`` method (if the task declares one) is
+    called so that it can clear any state left over from the request that
+    last used it; instances that fail to reset are discarded.
+    """
+
+    def __init__(self, task_cls, pool_size=None):
         self._task_cls = task_cls
         self._task_cls_name = reflection.get_class_name(task_cls)
         self._executor = executor.SerialTaskExecutor()
+        self._pool_size = pool_size
+        self._pools = collections.defaultdict(list)
+        self._pools_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
 
     def __str__(self):
         return self._task_cls_name
@@ -34,12 +54,102 @@ class Endpoint(object):
     def name(self):
         return self._task_cls_name
 
-    def generate(self, name=None):
+    @property
+    def pooling(self):
+        """If task instances generated by this endpoint are pooled."""
+        return bool(self._pool_size)
+
+    @property
+    def statistics(self):
+        """Dictionary of this endpoints task instance pool statistics.
+
+        Contains how many generated task instances came from the pool
+        (``hits``), how many had to be created (``misses``) and how many
+        idle instances are currently pooled (``pooled``).
+        """
+        with self._pools_lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'pooled': sum(len(pool) for pool in self._pools.values()),
+            }
+
+    @staticmethod
+    def _make_key(name, version):
+        if isinstance(version, (list, tuple)):
+            version = '.'.join(str(item) for item in version)
+        elif version is not None:
+            version = str(version)
+        return (name, version)
+
+    def _create(self, name):
         # NOTE(skudriashev): Note that task is created here with the `name`
         # argument passed to its constructor. This will be a problem when
         # task's constructor requires any other arguments.
         return self._task_cls(name=name)
 
+    def generate(self, name=None, version=None):
+        if not self.pooling:
+            return self._create(name)
+        key = self._make_key(name, version)
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool:
+                self._hits += 1
+                return pool.pop()
+            self._misses += 1
+        return self._create(name)
+
+    def release(self, task, name=None, version=None):
+        """Returns a generated task instance (so that it can be reused).
+
+        The ``name`` and ``version`` must be the same ones the instance was
+        generated with (when not provided the instances own version is
+        used). Does nothing if this endpoint does not pool task instances.
+        """
+        if not self.pooling:
+            return False
+        if version is None:
+            version = task.version
+        reset = getattr(task, 'reset', None)
+        if reset is not None:
+            try:
+                reset()
+            except Exception:
+                LOG.warning("Failed resetting task '%s' (it will not be"
+                            " reused)", task, exc_info=True)
+                return False
+        key = self._make_key(name, version)
+        with self._pools_lock:
+            pool = self._pools[key]
+            if len(pool) >= self._pool_size:
+                return False
+            pool.append(task)
+            return True
+
+    def warm(self, names=None, count=None):
+        """Pre-creates pooled task instances (for the given task names).
+
+        Creates up to ``count`` (or up to the pool size if not provided)
+        instances for each task name so that the requests that follow do
+        not have to wait for them to be created. Returns how many task
+        instances were created.
+        """
+        if not self.pooling:
+            return 0
+        if not names:
+            names = [self._task_cls_name]
+        if count is None:
+            count = self._pool_size
+        created = 0
+        for name in names:
+            for _i in range(0, min(count, self._pool_size)):
+                task = self._create(name)
+                if not self.release(task, name=name):
+                    break
+                created += 1
+        return created
+
     def execute(self, task, **kwargs):
         event, result = self._executor.execute_task(task, **kwargs).result()
         return result
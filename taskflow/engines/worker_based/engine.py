@@ -16,7 +16,9 @@
 
 from taskflow.engines.action_engine import engine
 from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import payloads
 from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import serializers
 
 
 class WorkerBasedActionEngine(engine.ActionEngine):
@@ -50,6 +52,40 @@ class WorkerBasedActionEngine(engine.ActionEngine):
                           have **not** responded back to a prior
                           notification/ping request (this defaults
                           to 60 seconds).
+    :param selection_policy: policy (see :py:mod:`.selection`) that picks
+                             which of the workers that can perform a task is
+                             sent it (defaults to picking one at random).
+    :param validation_rate: fraction (between zero and one) of received
+                            messages that are validated before being
+                            processed (this defaults to one; lowering it is
+                            only appropriate when all workers are trusted).
+    :param serializer: name of the serializer (see
+                       :py:mod:`~taskflow.engines.worker_based.serializers`)
+                       requests are sent with to workers that accept it
+                       (other workers are sent json, which is the default);
+                       workers reply using the same serializer.
+    :param batch_window: how long (in seconds) requests headed for the same
+                         worker are collected for before being sent to it
+                         together (in one message); this is disabled by
+                         default (requests are sent as they are submitted).
+    :param batch_size: the most requests that are sent together (when
+                       batching).
+    :param payload_store: store (see :py:class:`.payloads.Store`) that
+                          large request arguments and results are sent
+                          through (out-of-band) to and from workers that use
+                          the same store (instead of through the broker).
+    :param payload_threshold: size (in bytes) above which request arguments
+                              are sent out-of-band (when a payload store is
+                              used).
+    :param drop_unwatched_events: whether requests tell workers to only send
+                                  back the task events that have listeners
+                                  (by default all events are sent back).
+    :param passive_discovery: whether workers are learned about from the
+                              announcements they broadcast (topics are then
+                              only asked to notify when requests are waiting
+                              for a worker) instead of by periodically asking
+                              every topic to notify (workers must be given
+                              a ``heartbeat_period`` to broadcast them).
     """
 
     def __init__(self, flow, flow_detail, backend, options):
@@ -82,4 +118,15 @@ class WorkerBasedActionEngine(engine.ActionEngine):
                                                pr.REQUEST_TIMEOUT),
                 worker_expiry=options.get('worker_expiry',
                                           pr.EXPIRES_AFTER),
+                selection_policy=options.get('selection_policy'),
+                validation_rate=options.get('validation_rate', 1.0),
+                serializer=options.get('serializer', serializers.JSON),
+                batch_window=options.get('batch_window'),
+                batch_size=options.get('batch_size', pr.BATCH_SIZE),
+                payload_store=options.get('payload_store'),
+                payload_threshold=options.get('payload_threshold',
+                                              payloads.THRESHOLD),
+                drop_unwatched_events=options.get('drop_unwatched_events',
+                                                  False),
+                passive_discovery=options.get('passive_discovery', False),
             )
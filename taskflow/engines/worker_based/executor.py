@@ -14,20 +14,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import functools
+import heapq
 import threading
 
+from oslo_utils import reflection
 from oslo_utils import timeutils
-import six
 
 from taskflow.engines.action_engine import executor
 from taskflow.engines.worker_based import dispatcher
+from taskflow.engines.worker_based import payloads
 from taskflow.engines.worker_based import protocol as pr
 from taskflow.engines.worker_based import proxy
+from taskflow.engines.worker_based import serializers
 from taskflow.engines.worker_based import types as wt
 from taskflow import exceptions as exc
 from taskflow import logging
 from taskflow.task import EVENT_UPDATE_PROGRESS  # noqa
+from taskflow.types import notifier as nt
 from taskflow.utils import kombu_utils as ku
 from taskflow.utils import misc
 from taskflow.utils import threading_utils as tu
@@ -36,36 +41,96 @@ LOG = logging.getLogger(__name__)
 
 
 class WorkerTaskExecutor(executor.TaskExecutor):
-    """Executes tasks on remote workers."""
+    """Executes tasks on remote workers.
+
+    When a ``batch_window`` (in seconds) is provided the requests sent to
+    the same worker within that window (up to ``batch_size`` of them) are
+    sent together in a single message (to workers that accept batches, the
+    others are still sent requests one at a time).
+
+    When a ``payload_store`` (see
+    :py:class:`~taskflow.engines.worker_based.payloads.Store`) is provided
+    the arguments (and results) of requests that are larger than the
+    ``payload_threshold`` (in bytes) are sent through it instead of through
+    the broker (to and from workers that use the same store); they are
+    deleted from the store once the request finishes (or expires).
+
+    When ``drop_unwatched_events`` is true each request tells the worker
+    which of the events its task emits have listeners (here) and the worker
+    does not send back the others.
+
+    When ``passive_discovery`` is true workers are learned about from the
+    announcements (and heartbeats) they broadcast instead of by periodically
+    asking every topic for notifications; topics are then only asked when
+    there are requests waiting for a worker that can perform them.
+    """
+
+    # How long (in seconds) to wait before checking again whether a request
+    # whose deadline has passed has expired (its own timer may not agree).
+    _CLOCK_GRANULARITY = 0.01
 
     def __init__(self, uuid, exchange, topics,
                  transition_timeout=pr.REQUEST_TIMEOUT,
                  url=None, transport=None, transport_options=None,
-                 retry_options=None, worker_expiry=pr.EXPIRES_AFTER):
+                 retry_options=None, worker_expiry=pr.EXPIRES_AFTER,
+                 selection_policy=None, validation_rate=1.0,
+                 serializer=serializers.JSON, batch_window=None,
+                 batch_size=pr.BATCH_SIZE, payload_store=None,
+                 payload_threshold=payloads.THRESHOLD,
+                 drop_unwatched_events=False, passive_discovery=False):
         self._uuid = uuid
         self._ongoing_requests = {}
         self._ongoing_requests_lock = threading.RLock()
+        # NOTE: these avoid having to look at all the ongoing
+        # requests (on every wait cycle) to find the ones that have expired
+        # or that are waiting for a worker that can perform them; expired
+        # requests are found using a heap of (deadline, request uuid) tuples
+        # and waiting requests are indexed by the task class they are for.
+        # Both of these are accessed while holding the ongoing requests lock.
+        self._deadlines = []
+        self._waiting_requests = collections.defaultdict(
+            collections.OrderedDict)
+        if payload_store is not None:
+            self._offloader = payloads.Offloader(payload_store,
+                                                 threshold=payload_threshold)
+        else:
+            self._offloader = None
+        # Keys of the payloads (of ongoing requests) that were sent
+        # out-of-band (accessed while holding the ongoing requests lock).
+        self._payload_keys = {}
         self._transition_timeout = transition_timeout
+        self._drop_unwatched_events = drop_unwatched_events
+        self._passive_discovery = passive_discovery
         self._proxy = proxy.Proxy(uuid, exchange,
                                   on_wait=self._on_wait, url=url,
                                   transport=transport,
                                   transport_options=transport_options,
-                                  retry_options=retry_options)
+                                  retry_options=retry_options,
+                                  validation_rate=validation_rate,
+                                  receive_broadcasts=passive_discovery)
         # NOTE(harlowja): This is the most simplest finder impl. that
         # doesn't have external dependencies (outside of what this engine
         # already requires); it though does create periodic 'polling' traffic
-        # to workers to 'learn' of the tasks they can perform (and requires
+        # to workers to 'learn' of the tasks they can perform (unless it is
+        # passively listening for the workers announcements) and requires
         # pre-existing knowledge of the topics those workers are on to gather
-        # and update this information).
-        self._finder = wt.ProxyWorkerFinder(uuid, self._proxy, topics,
-                                            worker_expiry=worker_expiry)
+        # and update this information.
+        self._finder = wt.ProxyWorkerFinder(
+            uuid, self._proxy, topics, worker_expiry=worker_expiry,
+            selection_policy=selection_policy, serializer=serializer)
         self._proxy.dispatcher.type_handlers.update({
             pr.RESPONSE: dispatcher.Handler(self._process_response,
                                             validator=pr.Response.validate),
+            pr.BATCH_RESPONSE: dispatcher.Handler(
+                self._process_batch_response,
+                validator=pr.BatchResponse.validate),
             pr.NOTIFY: dispatcher.Handler(
                 self._finder.process_response,
                 validator=functools.partial(pr.Notify.validate,
                                             response=True)),
+            pr.ANNOUNCE: dispatcher.Handler(
+                self._finder.process_announcement,
+                validator=pr.Announcement.validate),
         })
         # Thread that will run the message dispatching (and periodically
         # call the on_wait callback to do various things) loop...
@@ -73,6 +138,16 @@ class WorkerTaskExecutor(executor.TaskExecutor):
         self._messages_processed = {
             'finder': self._finder.messages_processed,
         }
+        if batch_window:
+            self._batcher = wt.Batcher(self._publish_batch, batch_window,
+                                       max_size=batch_size)
+        else:
+            self._batcher = None
+
+    @property
+    def statistics(self):
+        """Dictionary of how many received messages were validated/skipped."""
+        return self._proxy.dispatcher.statistics
 
     def _process_response(self, response, message):
         """Process response from remote side."""
@@ -85,32 +160,82 @@ class WorkerTaskExecutor(executor.TaskExecutor):
                         " missing in message '%s'",
                         ku.DelayedPretty(message))
         else:
-            request = self._ongoing_requests.get(request_uuid)
-            if request is not None:
-                response = pr.Response.from_dict(response)
-                LOG.debug("Extracted response '%s' and matched it to"
-                          " request '%s'", response, request)
-                if response.state == pr.RUNNING:
-                    request.transition_and_log_error(pr.RUNNING, logger=LOG)
-                elif response.state == pr.EVENT:
-                    # Proxy the event + details to the task notifier so
-                    # that it shows up in the local process (and activates
-                    # any local callbacks...); thus making it look like
-                    # the task is running locally (in some regards).
-                    event_type = response.data['event_type']
-                    details = response.data['details']
-                    request.task.notifier.notify(event_type, details)
-                elif response.state in (pr.FAILURE, pr.SUCCESS):
-                    if request.transition_and_log_error(response.state,
-                                                        logger=LOG):
-                        with self._ongoing_requests_lock:
-                            del self._ongoing_requests[request.uuid]
-                        request.set_result(result=response.data['result'])
-                else:
-                    LOG.warning("Unexpected response status '%s'",
-                                response.state)
+            self._handle_response(request_uuid, response)
+
+    def _process_batch_response(self, batch, message):
+        """Process a batch of responses from remote side."""
+        LOG.debug("Started processing batch response message '%s'",
+                  ku.DelayedPretty(message))
+        for entry in batch['responses']:
+            self._handle_response(entry['uuid'], entry['response'])
+
+    def _handle_response(self, request_uuid, response):
+        """Process a response (to the request with the given uuid)."""
+        request = self._ongoing_requests.get(request_uuid)
+        if request is not None:
+            response = pr.Response.from_dict(response)
+            LOG.debug("Extracted response '%s' and matched it to"
+                      " request '%s'", response, request)
+            if response.state == pr.RUNNING:
+                request.transition_and_log_error(pr.RUNNING, logger=LOG)
+            elif response.state == pr.EVENT:
+                # Proxy the event + details to the task notifier so
+                # that it shows up in the local process (and activates
+                # any local callbacks...); thus making it look like
+                # the task is running locally (in some regards).
+                event_type = response.data['event_type']
+                details = response.data['details']
+                request.task.notifier.notify(event_type, details)
+            elif response.state in (pr.FAILURE, pr.SUCCESS):
+                if request.transition_and_log_error(response.state,
+                                                    logger=LOG):
+                    with self._ongoing_requests_lock:
+                        del self._ongoing_requests[request.uuid]
+                    self._finder.request_finished(request.uuid)
+                    self._release_payloads(request.uuid)
+                    result = response.data['result']
+                    if payloads.is_reference(result):
+                        result = self._fetch_result(request, result)
+                    request.set_result(result=result)
             else:
-                LOG.debug("Request with id='%s' not found", request_uuid)
+                LOG.warning("Unexpected response status '%s'",
+                            response.state)
+        else:
+            LOG.debug("Request with id='%s' not found", request_uuid)
+            if self._offloader is not None:
+                # Its result may have been sent out-of-band (and nobody
+                # else is going to fetch it now).
+                result = response.get('data', {}).get('result')
+                key = payloads.Offloader.get_key(result)
+                if key is not None:
+                    self._offloader.delete([key])
+
+    def _fetch_result(self, request, reference):
+        """Fetches a result that was sent out-of-band (and deletes it)."""
+        key = payloads.Offloader.get_key(reference)
+        try:
+            if self._offloader is None:
+                raise exc.NotFound("No payload store to fetch the"
+                                   " out-of-band result of '%s' from"
+                                   % request)
+            return self._offloader.fetch(reference)
+        except Exception:
+            with misc.capture_failure() as failure:
+                LOG.warning("Failed to fetch the out-of-band result of"
+                            " '%s'", request, exc_info=True)
+                return failure
+        finally:
+            if self._offloader is not None:
+                self._offloader.delete([key])
+
+    def _release_payloads(self, request_uuid):
+        """Deletes the payloads a (finished) request sent out-of-band."""
+        if self._offloader is None:
+            return
+        with self._ongoing_requests_lock:
+            keys = self._payload_keys.pop(request_uuid, None)
+        if keys:
+            self._offloader.delete(keys)
 
     @staticmethod
     def _handle_expired_request(request):
@@ -137,51 +262,109 @@ class WorkerTaskExecutor(executor.TaskExecutor):
             return True
         return False
 
-    def _clean(self):
-        if not self._ongoing_requests:
-            return
+    def _track_request(self, request):
+        """Adds a request to the ongoing requests (and tracks its expiry)."""
+        deadline = request.created_on + self._transition_timeout
+        with self._ongoing_requests_lock:
+            self._ongoing_requests[request.uuid] = request
+            heapq.heappush(self._deadlines, (deadline, request.uuid))
+            if request.current_state == pr.WAITING:
+                self._track_waiting(request)
+
+    def _track_waiting(self, request):
+        task_cls = reflection.get_class_name(request.task)
+        with self._ongoing_requests_lock:
+            self._waiting_requests[task_cls][request.uuid] = request
+
+    def _untrack_waiting(self, request):
+        task_cls = reflection.get_class_name(request.task)
         with self._ongoing_requests_lock:
-            ongoing_requests_uuids = set(six.iterkeys(self._ongoing_requests))
-        waiting_requests = {}
-        expired_requests = {}
-        for request_uuid in ongoing_requests_uuids:
             try:
-                request = self._ongoing_requests[request_uuid]
+                waiting = self._waiting_requests[task_cls]
             except KeyError:
-                # Guess it got removed before we got to it...
                 pass
             else:
+                waiting.pop(request.uuid, None)
+                if not waiting:
+                    del self._waiting_requests[task_cls]
+
+    def _clean_expired(self):
+        now = timeutils.now()
+        with self._ongoing_requests_lock:
+            if not self._deadlines or self._deadlines[0][0] > now:
+                return
+            not_yet_expired = []
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _deadline, request_uuid = heapq.heappop(self._deadlines)
+                try:
+                    request = self._ongoing_requests[request_uuid]
+                except KeyError:
+                    # Guess it finished before it got to expire...
+                    continue
                 if request.expired:
-                    expired_requests[request_uuid] = request
-                elif request.current_state == pr.WAITING:
-                    waiting_requests[request_uuid] = request
-        if expired_requests:
-            with self._ongoing_requests_lock:
-                while expired_requests:
-                    request_uuid, request = expired_requests.popitem()
                     if self._handle_expired_request(request):
                         del self._ongoing_requests[request_uuid]
-        if waiting_requests:
-            finder = self._finder
-            new_messages_processed = finder.messages_processed
-            last_messages_processed = self._messages_processed['finder']
-            if new_messages_processed > last_messages_processed:
-                # Some new message got to the finder, so we can see
-                # if any new workers match (if no new messages have been
-                # processed we might as well not do anything).
-                while waiting_requests:
-                    _request_uuid, request = waiting_requests.popitem()
-                    worker = finder.get_worker_for_task(request.task)
-                    if (worker is not None and
-                            request.transition_and_log_error(pr.PENDING,
-                                                             logger=LOG)):
-                        self._publish_request(request, worker)
-                self._messages_processed['finder'] = new_messages_processed
+                        self._finder.request_finished(request_uuid)
+                        self._untrack_waiting(request)
+                        self._release_payloads(request_uuid)
+                elif request.current_state in pr.WAITING_STATES:
+                    # NOTE: the requests own timer is what decides
+                    # if it has expired, so check it again later (this should
+                    # only happen due to clock granularity).
+                    not_yet_expired.append(request_uuid)
+            for request_uuid in not_yet_expired:
+                heapq.heappush(self._deadlines,
+                               (now + self._CLOCK_GRANULARITY, request_uuid))
+
+    def _clean_waiting(self):
+        finder = self._finder
+        new_messages_processed = finder.messages_processed
+        last_messages_processed = self._messages_processed['finder']
+        if new_messages_processed <= last_messages_processed:
+            return
+        # Some new message got to the finder, so we can see if any new
+        # workers match (if no new messages have been processed we might as
+        # well not do anything); only requests for tasks that a worker can
+        # now perform are looked at.
+        with self._ongoing_requests_lock:
+            task_clss = list(self._waiting_requests)
+        for task_cls in task_clss:
+            if not finder.has_worker_for_task(task_cls):
+                continue
+            with self._ongoing_requests_lock:
+                waiting = self._waiting_requests.pop(task_cls, None)
+            while waiting:
+                _request_uuid, request = waiting.popitem(last=False)
+                if request.current_state != pr.WAITING:
+                    continue
+                worker = finder.get_worker_for_task(request.task)
+                if worker is None:
+                    # Guess the worker(s) went away before we got to it...
+                    self._track_waiting(request)
+                elif request.transition_and_log_error(pr.PENDING,
+                                                      logger=LOG):
+                    self._publish_request(request, worker)
+        self._messages_processed['finder'] = new_messages_processed
+
+    def _clean(self):
+        if not self._ongoing_requests:
+            if self._deadlines:
+                # All the requests these are for have finished...
+                with self._ongoing_requests_lock:
+                    if not self._ongoing_requests:
+                        self._deadlines = []
+            return
+        self._clean_expired()
+        if self._waiting_requests:
+            self._clean_waiting()
 
     def _on_wait(self):
         """This function is called cyclically between draining events."""
-        # Publish any finding messages (used to locate workers).
-        self._finder.maybe_publish()
+        # Publish any finding messages (used to locate workers); when workers
+        # announce themselves this is only needed if there are requests that
+        # no (currently known) worker can perform.
+        if not self._passive_discovery or self._waiting_requests:
+            self._finder.maybe_publish()
         # If the finder hasn't heard from workers in a given amount
         # of time, then those workers are likely dead, so clean them out...
         self._finder.clean()
@@ -190,16 +373,35 @@ class WorkerTaskExecutor(executor.TaskExecutor):
         # a worker located).
         self._clean()
 
+    @staticmethod
+    def _watched_events(task, progress_callback=None):
+        """Gets the events the task emits that have listeners (if known)."""
+        events = set()
+        if progress_callback is not None:
+            events.add(EVENT_UPDATE_PROGRESS)
+        for event_type, _listeners in task.notifier.listeners_iter():
+            if event_type == nt.Notifier.ANY:
+                return None
+            events.add(event_type)
+        return sorted(events)
+
     def _submit_task(self, task, task_uuid, action, arguments,
                      progress_callback=None, result=pr.NO_RESULT,
                      failures=None):
         """Submit task request to a worker."""
+        if (progress_callback is not None and
+                not task.notifier.can_be_registered(EVENT_UPDATE_PROGRESS)):
+            progress_callback = None
+        if self._drop_unwatched_events:
+            events = self._watched_events(task,
+                                          progress_callback=progress_callback)
+        else:
+            events = None
         request = pr.Request(task, task_uuid, action, arguments,
                              timeout=self._transition_timeout,
-                             result=result, failures=failures)
+                             result=result, failures=failures, events=events)
         # Register the callback, so that we can proxy the progress correctly.
-        if (progress_callback is not None and
-                task.notifier.can_be_registered(EVENT_UPDATE_PROGRESS)):
+        if progress_callback is not None:
             task.notifier.register(EVENT_UPDATE_PROGRESS, progress_callback)
             request.future.add_done_callback(
                 lambda _fut: task.notifier.deregister(EVENT_UPDATE_PROGRESS,
@@ -208,14 +410,12 @@ class WorkerTaskExecutor(executor.TaskExecutor):
         worker = self._finder.get_worker_for_task(task)
         if worker is not None:
             if request.transition_and_log_error(pr.PENDING, logger=LOG):
-                with self._ongoing_requests_lock:
-                    self._ongoing_requests[request.uuid] = request
+                self._track_request(request)
                 self._publish_request(request, worker)
         else:
             LOG.debug("Delaying submission of '%s', no currently known"
                       " worker/s available to process it", request)
-            with self._ongoing_requests_lock:
-                self._ongoing_requests[request.uuid] = request
+            self._track_request(request)
         return request.future
 
     def _publish_request(self, request, worker):
@@ -225,18 +425,71 @@ class WorkerTaskExecutor(executor.TaskExecutor):
                   " correlation_id=%s) - waited %0.3f seconds to"
                   " get published", request, worker, self._uuid,
                   request.uuid, timeutils.now() - request.created_on)
+        # NOTE: this is recorded before publishing since the
+        # response may be processed (by the message processing thread) before
+        # publishing returns.
+        self._finder.request_sent(request.uuid, worker)
+        if (self._offloader is not None and
+                worker.payload_store == self._offloader.uri):
+            try:
+                keys = request.offload(self._offloader)
+            except Exception:
+                with misc.capture_failure() as failure:
+                    LOG.critical("Failed to send the payloads of '%s'"
+                                 " out-of-band (transitioning it to %s)",
+                                 request, pr.FAILURE, exc_info=True)
+                    self._handle_publish_failure(request, failure)
+                    return
+            if keys:
+                with self._ongoing_requests_lock:
+                    self._payload_keys[request.uuid] = keys
+        if self._batcher is not None and worker.batching:
+            self._batcher.add((worker.topic, worker.serializer), request)
+            return
         try:
             self._proxy.publish(request, worker.topic,
                                 reply_to=self._uuid,
-                                correlation_id=request.uuid)
+                                correlation_id=request.uuid,
+                                serializer=worker.serializer)
         except Exception:
             with misc.capture_failure() as failure:
                 LOG.critical("Failed to submit '%s' (transitioning it to"
                              " %s)", request, pr.FAILURE, exc_info=True)
-                if request.transition_and_log_error(pr.FAILURE, logger=LOG):
-                    with self._ongoing_requests_lock:
-                        del self._ongoing_requests[request.uuid]
-                    request.set_result(failure)
+                self._handle_publish_failure(request, failure)
+
+    def _publish_batch(self, key, requests):
+        """Publish the batched requests (for the same worker) together."""
+        topic, serializer = key
+        # Requests may have expired while they were being batched...
+        requests = [request for request in requests
+                    if request.current_state == pr.PENDING]
+        if not requests:
+            return
+        if len(requests) == 1:
+            msg = requests[0]
+            correlation_id = msg.uuid
+        else:
+            msg = pr.BatchRequest(requests)
+            correlation_id = None
+        try:
+            self._proxy.publish(msg, topic, reply_to=self._uuid,
+                                correlation_id=correlation_id,
+                                serializer=serializer)
+        except Exception:
+            with misc.capture_failure() as failure:
+                LOG.critical("Failed to submit batch of %s requests"
+                             " (transitioning them to %s)", len(requests),
+                             pr.FAILURE, exc_info=True)
+                for request in requests:
+                    self._handle_publish_failure(request, failure)
+
+    def _handle_publish_failure(self, request, failure):
+        self._finder.request_finished(request.uuid)
+        if request.transition_and_log_error(pr.FAILURE, logger=LOG):
+            with self._ongoing_requests_lock:
+                del self._ongoing_requests[request.uuid]
+            self._release_payloads(request.uuid)
+            request.set_result(failure)
 
     def execute_task(self, task, task_uuid, arguments,
                      progress_callback=None):
@@ -269,9 +522,15 @@ class WorkerTaskExecutor(executor.TaskExecutor):
         self._helper = tu.daemon_thread(self._proxy.start)
         self._helper.start()
         self._proxy.wait()
+        if self._batcher is not None:
+            self._batcher.start()
 
     def stop(self):
         """Stops message processing thread."""
+        if self._batcher is not None:
+            # NOTE: any requests that have not been sent yet are
+            # expired (like all other ongoing requests) below.
+            self._batcher.stop(flush=False)
         if self._helper is not None:
             self._proxy.stop()
             self._helper.join()
@@ -280,5 +539,8 @@ class WorkerTaskExecutor(executor.TaskExecutor):
             while self._ongoing_requests:
                 _request_uuid, request = self._ongoing_requests.popitem()
                 self._handle_expired_request(request)
+                self._release_payloads(request.uuid)
+            self._deadlines = []
+            self._waiting_requests.clear()
         self._finder.reset()
         self._messages_processed['finder'] = self._finder.messages_processed
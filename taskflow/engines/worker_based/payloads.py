@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import errno
+import hashlib
+import os
+import tempfile
+
+from oslo_utils import excutils
+from oslo_utils import uuidutils
+import six
+
+from taskflow.engines.worker_based import serializers
+from taskflow import exceptions as exc
+from taskflow import logging
+
+LOG = logging.getLogger(__name__)
+
+#: Payloads (arguments and results) that are larger than this (in bytes,
+#: once serialized) are sent out-of-band (when a store is being used).
+THRESHOLD = 256 * 1024
+
+# Key of the (single key) dictionary that payloads sent out-of-band are
+# replaced with in messages.
+_REFERENCE = '__taskflow_payload__'
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Store(object):
+    """Side channel that large payloads are sent through (out-of-band).
+
+    Only a reference to (and hash of) each payload put in a store is sent
+    through the broker; the receiver then gets the payload from the same
+    store (so engines and workers must have access to the same one).
+    """
+
+    @abc.abstractproperty
+    def uri(self):
+        """Identifies the store (and where its payloads are).
+
+        Payloads are only sent out-of-band to peers that use a store with
+        the same uri.
+        """
+
+    @abc.abstractmethod
+    def put(self, data):
+        """Stores the data (bytes) and returns the key to fetch it with."""
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Gets the data stored with the key.
+
+        Raises :py:class:`~taskflow.exceptions.NotFound` if nothing is
+        stored with the key.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Deletes the data stored with the key (if any)."""
+
+
+class DirectoryStore(Store):
+    """Store that keeps payloads as files in a (shared) directory."""
+
+    def __init__(self, path):
+        self._path = os.path.abspath(path)
+
+    @property
+    def uri(self):
+        return 'file://%s' % self._path
+
+    def _make_path(self, key):
+        # Keys are generated by this store, but are received in messages...
+        if not key or os.path.basename(key) != key:
+            raise exc.NotFound("Invalid payload key '%s'" % key)
+        return os.path.join(self._path, key)
+
+    def put(self, data):
+        key = uuidutils.generate_uuid()
+        # Write to a temporary file first so that a partially written
+        # payload is never visible (to readers) under its key.
+        fd, tmp_path = tempfile.mkstemp(dir=self._path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.rename(tmp_path, self._make_path(key))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                _remove(tmp_path)
+        return key
+
+    def get(self, key):
+        try:
+            with open(self._make_path(key), 'rb') as fh:
+                return fh.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            exc.raise_with_cause(exc.NotFound,
+                                 "No payload stored with key '%s'" % key,
+                                 cause=e)
+
+    def delete(self, key):
+        _remove(self._make_path(key))
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def _max_size(value):
+    """Gets the most bytes a (simple) value can take up once serialized.
+
+    Returns none for values this can not be (cheaply) worked out for (those
+    have to be serialized to find out how large they are).
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, float):
+        return 9
+    if isinstance(value, six.integer_types):
+        if -2 ** 63 <= value < 2 ** 64:
+            return 9
+        return None
+    # Strings and bytes have (at most) a five byte header (and unicode
+    # characters take at most four bytes each once encoded).
+    if isinstance(value, six.binary_type):
+        return len(value) + 5
+    if isinstance(value, six.text_type):
+        return len(value) * 4 + 5
+    return None
+
+
+def is_reference(value):
+    """Checks if a value is a reference to a payload sent out-of-band."""
+    return isinstance(value, dict) and len(value) == 1 and _REFERENCE in value
+
+
+class Offloader(object):
+    """Sends payloads larger than a threshold out-of-band (using a store).
+
+    Payloads are serialized (using the msgpack serializer, so they can be
+    anything that serializer accepts) before being put in the store and the
+    references that replace them carry the payloads hash (which is checked
+    when the payload is fetched).
+    """
+
+    def __init__(self, store, threshold=THRESHOLD):
+        self._store = store
+        self._threshold = threshold
+
+    @property
+    def uri(self):
+        """The uri of the store payloads are sent out-of-band through."""
+        return self._store.uri
+
+    def offload(self, value):
+        """Sends the value out-of-band (if it is larger than the threshold).
+
+        Returns a tuple of the value (or of the reference to the value sent
+        out-of-band) and the key it was stored with (or none if it was not
+        stored).
+        """
+        # Most values are small enough that they can be skipped without
+        # having to serialize them to find out...
+        max_size = _max_size(value)
+        if max_size is not None and max_size <= self._threshold:
+            return (value, None)
+        data = serializers.dumps(value)
+        if len(data) <= self._threshold:
+            return (value, None)
+        key = self._store.put(data)
+        reference = {
+            _REFERENCE: {
+                'key': key,
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'size': len(data),
+            },
+        }
+        return (reference, key)
+
+    def fetch(self, value):
+        """Gets the value a reference is for (other values are returned).
+
+        Raises :py:class:`~taskflow.exceptions.NotFound` if the payload is
+        not in the store and :py:class:`~taskflow.exceptions.InvalidFormat`
+        if the payload is not the one the reference was made for.
+        """
+        if not is_reference(value):
+            return value
+        reference = value[_REFERENCE]
+        data = self._store.get(reference['key'])
+        if hashlib.sha256(data).hexdigest() != reference['sha256']:
+            raise exc.InvalidFormat("Payload stored with key '%s' does not"
+                                    " match its reference (its hash"
+                                    " differs)" % reference['key'])
+        return serializers.loads(data)
+
+    def delete(self, keys):
+        """Deletes payloads (by key) that are no longer needed."""
+        for key in keys:
+            try:
+                self._store.delete(key)
+            except Exception:
+                LOG.warning("Failed deleting payload stored with key '%s'",
+                            key, exc_info=True)
+
+    @staticmethod
+    def get_key(value):
+        """Gets the key of the payload a reference is for (or none)."""
+        if not is_reference(value):
+            return None
+        return value[_REFERENCE].get('key')
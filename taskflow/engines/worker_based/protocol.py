@@ -18,11 +18,10 @@ import abc
 import collections
 import threading
 
-from automaton import exceptions as machine_excp
 from automaton import machines
-import fasteners
 import futurist
 from oslo_serialization import jsonutils
+from oslo_utils import excutils
 from oslo_utils import reflection
 from oslo_utils import timeutils
 import six
@@ -79,10 +78,24 @@ NOTIFY_PERIOD = 5
 # being used/targeted for further work.
 EXPIRES_AFTER = 60
 
+# How often (in seconds) workers announce themselves (to executors that
+# listen for announcements instead of periodically asking workers to notify).
+HEARTBEAT_PERIOD = 5
+
+# How long (in seconds) workers collect the replies to batched requests for
+# before sending them back (together).
+BATCH_WINDOW = 0.01
+
+# The most requests (or replies) that are sent in a single batch message.
+BATCH_SIZE = 64
+
 # Message types.
 NOTIFY = 'NOTIFY'
 REQUEST = 'REQUEST'
 RESPONSE = 'RESPONSE'
+BATCH_REQUEST = 'BATCH_REQUEST'
+BATCH_RESPONSE = 'BATCH_RESPONSE'
+ANNOUNCE = 'ANNOUNCE'
 
 # Object that denotes nothing (none can actually be valid).
 NO_RESULT = object()
@@ -95,26 +108,18 @@ def make_an_event(new_state):
     return ('on_%s' % new_state).lower()
 
 
-def build_a_machine(freeze=True):
-    """Builds a state machine that requests are allowed to go through."""
-
-    m = machines.FiniteMachine()
-    for st in (WAITING, PENDING, RUNNING):
-        m.add_state(st)
-    for st in (SUCCESS, FAILURE):
-        m.add_state(st, terminal=True)
-
+# Request state transitions (the states requests are allowed to go through).
+_ALLOWED_TRANSITIONS = frozenset((
     # When a executor starts to publish a request to a selected worker but the
     # executor has not recved confirmation from that worker that anything has
     # happened yet.
-    m.default_start_state = WAITING
-    m.add_transition(WAITING, PENDING, make_an_event(PENDING))
+    (WAITING, PENDING),
 
     # When a request expires (isn't able to be processed by any worker).
-    m.add_transition(WAITING, FAILURE, make_an_event(FAILURE))
+    (WAITING, FAILURE),
 
     # Worker has started executing a request.
-    m.add_transition(PENDING, RUNNING, make_an_event(RUNNING))
+    (PENDING, RUNNING),
 
     # Worker failed to construct/process a request to run (either the worker
     # did not transition to RUNNING in the given timeout or the worker itself
@@ -122,13 +127,32 @@ def build_a_machine(freeze=True):
     #
     # Also used by the executor if the request was attempted to be published
     # but that did publishing process did not work out.
-    m.add_transition(PENDING, FAILURE, make_an_event(FAILURE))
+    (PENDING, FAILURE),
 
     # Execution failed due to some type of remote failure.
-    m.add_transition(RUNNING, FAILURE, make_an_event(FAILURE))
+    (RUNNING, FAILURE),
 
     # Execution succeeded & has completed.
-    m.add_transition(RUNNING, SUCCESS, make_an_event(SUCCESS))
+    (RUNNING, SUCCESS),
+))
+
+
+def build_a_machine(freeze=True):
+    """Builds a state machine that requests are allowed to go through.
+
+    NOTE: requests themselves do not use this machine (they check
+    transitions against the same transitions this machine is built from),
+    it is retained for those that want to examine or draw it.
+    """
+
+    m = machines.FiniteMachine()
+    for st in (WAITING, PENDING, RUNNING):
+        m.add_state(st)
+    for st in (SUCCESS, FAILURE):
+        m.add_state(st, terminal=True)
+    m.default_start_state = WAITING
+    for (start_state, end_state) in sorted(_ALLOWED_TRANSITIONS):
+        m.add_transition(start_state, end_state, make_an_event(end_state))
 
     # No further changes allowed.
     if freeze:
@@ -152,6 +176,8 @@ def failure_to_dict(failure):
 class Message(object):
     """Base class for all message types."""
 
+    __slots__ = ()
+
     def __repr__(self):
         return ("<%s object at 0x%x with contents %s>"
                 % (reflection.get_class_name(self, fully_qualified=False),
@@ -172,6 +198,27 @@ class Notify(Message):
     # to send back a notification response) schema is different than the
     # worker response schema (that's why there are two schemas here).
 
+    # NOTE: workers also (optionally) report how many requests
+    # they can work on at the same time (``capacity``), how many requests
+    # they have received that have not finished (``in_flight``) and how many
+    # of those are still waiting to be worked on (``queued``); executors use
+    # this to send requests to less loaded workers. They also say which
+    # serializers they accept messages in (``serializers``), those that do
+    # not are sent json, and whether they accept batches of requests
+    # (``batching``), those that do not are sent requests one at a time.
+    # Workers that send (and fetch) large payloads out-of-band report the
+    # uri of the store they use (``payload_store``), executors only send
+    # references to payloads to workers that use the same store. Older
+    # executors reject responses with any of these fields in them, so they
+    # are only sent to executors that set the :py:attr:`.EXTENDED_HEADER`
+    # header on their notify requests (the request body can not be used for
+    # this, older workers reject requests with anything in them).
+
+    #: Notify request (message) header executors set to tell workers that
+    #: they accept responses with the optional fields (load, serializers,
+    #: batching and payload store) in them.
+    EXTENDED_HEADER = 'taskflow_notify_extended'
+
     #: Expected notify *response* message schema (in json schema format).
     RESPONSE_SCHEMA = {
         "type": "object",
@@ -184,7 +231,31 @@ class Notify(Message):
                 "items": {
                     "type": "string",
                 },
-            }
+            },
+            'capacity': {
+                "type": "integer",
+                "minimum": 1,
+            },
+            'in_flight': {
+                "type": "integer",
+                "minimum": 0,
+            },
+            'queued': {
+                "type": "integer",
+                "minimum": 0,
+            },
+            'serializers': {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                },
+            },
+            'batching': {
+                "type": "boolean",
+            },
+            'payload_store': {
+                "type": "string",
+            },
         },
         "required": ["topic", 'tasks'],
         "additionalProperties": False,
@@ -207,6 +278,30 @@ class Notify(Message):
     def tasks(self):
         return self._data.get('tasks')
 
+    @property
+    def capacity(self):
+        return self._data.get('capacity')
+
+    @property
+    def in_flight(self):
+        return self._data.get('in_flight')
+
+    @property
+    def queued(self):
+        return self._data.get('queued')
+
+    @property
+    def serializers(self):
+        return self._data.get('serializers')
+
+    @property
+    def batching(self):
+        return self._data.get('batching', False)
+
+    @property
+    def payload_store(self):
+        return self._data.get('payload_store')
+
     def to_dict(self):
         return self._data
 
@@ -264,6 +359,12 @@ class Request(Message):
     #: String constant representing this message type.
     TYPE = REQUEST
 
+    # NOTE: many of these are created (and go through their states)
+    # when an engine is busy, so keep them small.
+    __slots__ = ('_action', '_event', '_arguments', '_result', '_failures',
+                 '_watch', '_lock', '_state', '_payload_store', '_events',
+                 'task', 'uuid', 'created_on', 'future')
+
     #: Expected message schema (in json schema format).
     SCHEMA = {
         "type": "object",
@@ -299,13 +400,27 @@ class Request(Message):
             'arguments': {
                 "type": "object",
             },
+            # The uri of the store large payloads were sent out-of-band
+            # through (when any were); the result may be sent back through
+            # it too.
+            'payload_store': {
+                "type": "string",
+            },
+            # The events the sender wants the task to send back (when not
+            # provided all of them are sent).
+            'events': {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                },
+            },
         },
         'required': ['task_cls', 'task_name', 'task_version', 'action'],
     }
 
     def __init__(self, task, uuid, action,
                  arguments, timeout=REQUEST_TIMEOUT, result=NO_RESULT,
-                 failures=None):
+                 failures=None, events=None):
         self._action = action
         self._event = ACTION_TO_EVENT[action]
         self._arguments = arguments
@@ -313,8 +428,9 @@ class Request(Message):
         self._failures = failures
         self._watch = timeutils.StopWatch(duration=timeout).start()
         self._lock = threading.Lock()
-        self._machine = build_a_machine()
-        self._machine.initialize()
+        self._state = WAITING
+        self._payload_store = None
+        self._events = events
         self.task = task
         self.uuid = uuid
         self.created_on = timeutils.now()
@@ -324,7 +440,7 @@ class Request(Message):
     @property
     def current_state(self):
         """Current state the request is in."""
-        return self._machine.current_state
+        return self._state
 
     def set_result(self, result):
         """Sets the responses futures result."""
@@ -341,10 +457,38 @@ class Request(Message):
         state for more then the given timeout (it is not considered to be
         expired in any other state).
         """
-        if self._machine.current_state in WAITING_STATES:
+        if self._state in WAITING_STATES:
             return self._watch.expired()
         return False
 
+    def offload(self, offloader):
+        """Sends large arguments (and result) out-of-band.
+
+        Each argument (and the result, unless it is a failure) larger than
+        the offloaders threshold is replaced with a reference to it. Returns
+        the keys the payloads that were sent out-of-band were stored with
+        (so that they can be deleted once this request is finished).
+        """
+        keys = []
+        try:
+            arguments = {}
+            for name, value in six.iteritems(self._arguments):
+                arguments[name], key = offloader.offload(value)
+                if key is not None:
+                    keys.append(key)
+            result = self._result
+            if result is not NO_RESULT and not isinstance(result, ft.Failure):
+                result, key = offloader.offload(result)
+                if key is not None:
+                    keys.append(key)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                offloader.delete(keys)
+        self._arguments = arguments
+        self._result = result
+        self._payload_store = offloader.uri
+        return keys
+
     def to_dict(self):
         """Return json-serializable request.
 
@@ -369,6 +513,10 @@ class Request(Message):
             request['failures'] = {}
             for atom_name, failure in six.iteritems(self._failures):
                 request['failures'][atom_name] = failure_to_dict(failure)
+        if self._payload_store is not None:
+            request['payload_store'] = self._payload_store
+        if self._events is not None:
+            request['events'] = list(self._events)
         return request
 
     def transition_and_log_error(self, new_state, logger=None):
@@ -391,7 +539,6 @@ class Request(Message):
                         new_state, exc_info=True)
         return moved
 
-    @fasteners.locked
     def transition(self, new_state):
         """Transitions the request to a new state.
 
@@ -400,21 +547,20 @@ class Request(Message):
         valid (and will not be performed), it raises an InvalidState
         exception.
         """
-        old_state = self._machine.current_state
-        if old_state == new_state:
-            return False
-        try:
-            self._machine.process_event(make_an_event(new_state))
-        except (machine_excp.NotFound, machine_excp.InvalidState) as e:
-            raise excp.InvalidState("Request transition from %s to %s is"
-                                    " not allowed: %s" % (old_state,
-                                                          new_state, e))
-        else:
+        with self._lock:
+            old_state = self._state
+            if old_state == new_state:
+                return False
+            if (old_state, new_state) not in _ALLOWED_TRANSITIONS:
+                raise excp.InvalidState("Request transition from %s to %s is"
+                                        " not allowed" % (old_state,
+                                                          new_state))
+            self._state = new_state
             if new_state in STOP_TIMER_STATES:
                 self._watch.stop()
-            LOG.debug("Transitioned '%s' from %s state to %s state", self,
-                      old_state, new_state)
-            return True
+        LOG.debug("Transitioned '%s' from %s state to %s state", self,
+                  old_state, new_state)
+        return True
 
     @classmethod
     def validate(cls, data):
@@ -569,3 +715,186 @@ class Response(Message):
             state = data['state']
             if state == FAILURE and 'result' in data:
                 ft.Failure.validate(data['result'])
+
+
+class BatchRequest(Message):
+    """Represents a batch of requests (sent to the same worker together).
+
+    Each request in the batch is processed (and replied to) as if it had
+    been sent on its own, with the replies being collected into
+    :py:class:`.BatchResponse` messages.
+    """
+
+    #: String constant representing this message type.
+    TYPE = BATCH_REQUEST
+
+    #: Expected message schema (in json schema format).
+    SCHEMA = {
+        "type": "object",
+        'properties': {
+            'requests': {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    'properties': {
+                        # What would otherwise be the correlation id of the
+                        # (single) request message.
+                        'uuid': {
+                            "type": "string",
+                        },
+                        'request': {
+                            "type": "object",
+                        },
+                    },
+                    "required": ["uuid", 'request'],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["requests"],
+        "additionalProperties": False,
+    }
+
+    def __init__(self, requests):
+        self.requests = requests
+
+    def to_dict(self):
+        return {
+            'requests': [{'uuid': request.uuid, 'request': request.to_dict()}
+                         for request in self.requests],
+        }
+
+    @classmethod
+    def validate(cls, data):
+        try:
+            su.schema_validate(data, cls.SCHEMA)
+        except su.ValidationError as e:
+            cls_name = reflection.get_class_name(cls, fully_qualified=False)
+            excp.raise_with_cause(excp.InvalidFormat,
+                                  "%s message response data not of the"
+                                  " expected format: %s" % (cls_name,
+                                                            e.message),
+                                  cause=e)
+        else:
+            for entry in data['requests']:
+                Request.validate(entry['request'])
+
+
+class BatchResponse(Message):
+    """Represents a batch of responses (to batched requests)."""
+
+    #: String constant representing this message type.
+    TYPE = BATCH_RESPONSE
+
+    #: Expected message schema (in json schema format).
+    SCHEMA = {
+        "type": "object",
+        'properties': {
+            'responses': {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    'properties': {
+                        # The uuid of the request this is a response to.
+                        'uuid': {
+                            "type": "string",
+                        },
+                        'response': {
+                            "type": "object",
+                        },
+                    },
+                    "required": ["uuid", 'response'],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["responses"],
+        "additionalProperties": False,
+    }
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    def to_dict(self):
+        return {
+            'responses': [{'uuid': uuid, 'response': response.to_dict()}
+                          for uuid, response in self.responses],
+        }
+
+    @classmethod
+    def validate(cls, data):
+        try:
+            su.schema_validate(data, cls.SCHEMA)
+        except su.ValidationError as e:
+            cls_name = reflection.get_class_name(cls, fully_qualified=False)
+            excp.raise_with_cause(excp.InvalidFormat,
+                                  "%s message response data not of the"
+                                  " expected format: %s" % (cls_name,
+                                                            e.message),
+                                  cause=e)
+        else:
+            for entry in data['responses']:
+                Response.validate(entry['response'])
+
+
+class Announcement(Message):
+    """Represents a worker announcing itself (to all executors listening).
+
+    Workers send these (through a fanout exchange) when they start, every
+    so often while they run (as heartbeats) and when they stop (with
+    ``leaving`` set). They carry the same details a :py:class:`.Notify`
+    response does and the ``identity`` of the worker sending them (many
+    workers may be consuming from the same topic).
+    """
+
+    #: String constant representing this message type.
+    TYPE = ANNOUNCE
+
+    #: Expected message schema (in json schema format).
+    SCHEMA = {
+        "type": "object",
+        'properties': {
+            'identity': {
+                "type": "string",
+            },
+            'worker': {
+                "type": "object",
+            },
+            'leaving': {
+                "type": "boolean",
+            },
+        },
+        "required": ["identity", 'worker'],
+        "additionalProperties": False,
+    }
+
+    def __init__(self, identity, notify, leaving=False):
+        self.identity = identity
+        self.notify = notify
+        self.leaving = leaving
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['identity'], Notify(**data['worker']),
+                   leaving=data.get('leaving', False))
+
+    def to_dict(self):
+        return {
+            'identity': self.identity,
+            'worker': self.notify.to_dict(),
+            'leaving': self.leaving,
+        }
+
+    @classmethod
+    def validate(cls, data):
+        try:
+            su.schema_validate(data, cls.SCHEMA)
+        except su.ValidationError as e:
+            cls_name = reflection.get_class_name(cls, fully_qualified=False)
+            excp.raise_with_cause(excp.InvalidFormat,
+                                  "%s message data not of the"
+                                  " expected format: %s" % (cls_name,
+                                                            e.message),
+                                  cause=e)
+        else:
+            Notify.validate(data['worker'], response=True)
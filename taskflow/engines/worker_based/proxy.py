@@ -22,6 +22,7 @@ from kombu import exceptions as kombu_exceptions
 import six
 
 from taskflow.engines.worker_based import dispatcher
+from taskflow.engines.worker_based import serializers
 from taskflow import logging
 
 LOG = logging.getLogger(__name__)
@@ -71,7 +72,8 @@ class Proxy(object):
     def __init__(self, topic, exchange,
                  type_handlers=None, on_wait=None, url=None,
                  transport=None, transport_options=None,
-                 retry_options=None):
+                 retry_options=None, validation_rate=1.0,
+                 receive_broadcasts=False):
         self._topic = topic
         self._exchange_name = exchange
         self._on_wait = on_wait
@@ -80,7 +82,7 @@ class Proxy(object):
             # NOTE(skudriashev): Process all incoming messages only if proxy is
             # running, otherwise requeue them.
             requeue_filters=[lambda data, message: not self.is_running],
-            type_handlers=type_handlers)
+            type_handlers=type_handlers, validation_rate=validation_rate)
 
         ensure_options = self.DEFAULT_RETRY_OPTIONS.copy()
         if retry_options is not None:
@@ -114,6 +116,12 @@ class Proxy(object):
         self._exchange = kombu.Exchange(name=self._exchange_name,
                                         durable=False, auto_delete=True)
 
+        # create (fanout) exchange that broadcasts are sent through
+        self._broadcast_exchange = kombu.Exchange(
+            name="%s_broadcast" % self._exchange_name, type='fanout',
+            durable=False, auto_delete=True)
+        self._receive_broadcasts = receive_broadcasts
+
     @property
     def dispatcher(self):
         """Dispatcher internally used to dispatch message(s) that match."""
@@ -152,8 +160,22 @@ class Proxy(object):
                            exchange=exchange, auto_delete=True,
                            channel=channel)
 
-    def publish(self, msg, routing_key, reply_to=None, correlation_id=None):
-        """Publish message to the named exchange with given routing key."""
+    def _make_broadcast_queue(self, channel=None):
+        """Make a (named) queue that receives this proxies broadcasts."""
+        queue_name = "%s_broadcast_%s" % (self._exchange_name, self._topic)
+        return kombu.Queue(name=queue_name, routing_key=self._topic,
+                           durable=False, exchange=self._broadcast_exchange,
+                           auto_delete=True, channel=channel)
+
+    def publish(self, msg, routing_key, reply_to=None, correlation_id=None,
+                serializer=serializers.JSON, headers=None):
+        """Publish message to the named exchange with given routing key.
+
+        The message is serialized using the named (kombu) serializer, the
+        receiver must accept messages serialized that way (see
+        :py:mod:`~taskflow.engines.worker_based.serializers`). Any headers
+        given are sent along with the message (as its application headers).
+        """
         if isinstance(routing_key, six.string_types):
             routing_keys = [routing_key]
         else:
@@ -175,7 +197,9 @@ class Proxy(object):
                              declare=[queue],
                              type=msg.TYPE,
                              reply_to=reply_to,
-                             correlation_id=correlation_id)
+                             correlation_id=correlation_id,
+                             serializer=serializer,
+                             headers=headers)
 
         def _publish_errback(exc, interval):
             LOG.exception('Publishing error: %s', exc)
@@ -191,6 +215,34 @@ class Proxy(object):
                 for routing_key in routing_keys:
                     safe_publish(producer, routing_key)
 
+    def broadcast(self, msg, serializer=serializers.JSON):
+        """Publish message to every proxy that receives broadcasts.
+
+        Proxies receive broadcasts (sent through the fanout exchange that
+        goes with the named exchange) only when created to; if none are
+        then the message is dropped (by the broker).
+        """
+
+        def _broadcast(producer):
+            producer.publish(body=msg.to_dict(),
+                             exchange=self._broadcast_exchange,
+                             declare=[self._broadcast_exchange],
+                             type=msg.TYPE,
+                             serializer=serializer)
+
+        def _broadcast_errback(exc, interval):
+            LOG.exception('Broadcasting error: %s', exc)
+            LOG.info('Retry triggering in %s seconds', interval)
+
+        LOG.debug("Broadcasting '%s' message", msg)
+        with kombu.connections[self._conn].acquire(block=True) as conn:
+            with conn.Producer() as producer:
+                ensure_kwargs = self._ensure_options.copy()
+                ensure_kwargs['errback'] = _broadcast_errback
+                safe_broadcast = conn.ensure(producer, _broadcast,
+                                             **ensure_kwargs)
+                safe_broadcast(producer)
+
     def start(self):
         """Start proxy."""
 
@@ -207,9 +259,13 @@ class Proxy(object):
         LOG.info("Starting to consume from the '%s' exchange.",
                  self._exchange_name)
         with kombu.connections[self._conn].acquire(block=True) as conn:
-            queue = self._make_queue(self._topic, self._exchange, channel=conn)
+            queues = [
+                self._make_queue(self._topic, self._exchange, channel=conn),
+            ]
+            if self._receive_broadcasts:
+                queues.append(self._make_broadcast_queue(channel=conn))
             callbacks = [self._dispatcher.on_message]
-            with conn.Consumer(queues=queue, callbacks=callbacks) as consumer:
+            with conn.Consumer(queues=queues, callbacks=callbacks) as consumer:
                 ensure_kwargs = self._ensure_options.copy()
                 ensure_kwargs['errback'] = _drain_errback
                 safe_drain = conn.ensure(consumer, _drain, **ensure_kwargs)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import random
+
+import six
+
+
+def _least_loaded(workers):
+    lowest = min(worker.load for worker in workers)
+    return random.choice([worker for worker in workers
+                          if worker.load == lowest])
+
+
+@six.add_metaclass(abc.ABCMeta)
+class SelectionPolicy(object):
+    """Decides which of the workers that can perform a task is sent it.
+
+    Policies are given the workers (see
+    :py:class:`~taskflow.engines.worker_based.types.TopicWorker`) that are
+    capable of performing a task, each of which knows how many requests the
+    executor has sent it that have not finished (``in_flight``), what it
+    last reported about itself (``capacity``, ``reported_in_flight`` and
+    ``reported_queued``) and the load that is derived from those
+    (``outstanding`` and ``load``).
+    """
+
+    @abc.abstractmethod
+    def select(self, task, workers):
+        """Selects one of the (geq one) workers to perform the given task."""
+
+
+class RandomPolicy(SelectionPolicy):
+    """Selects a worker at random (ignoring their load).
+
+    This is the default policy.
+    """
+
+    def select(self, task, workers):
+        return random.choice(workers)
+
+
+class LeastOutstandingPolicy(SelectionPolicy):
+    """Selects the worker with the lowest load.
+
+    The load of a worker is its outstanding requests divided by its reported
+    capacity (workers that do not report a capacity are assumed to be able
+    to work on one request at a time); ties are broken at random.
+    """
+
+    def select(self, task, workers):
+        return _least_loaded(workers)
+
+
+class PowerOfTwoPolicy(SelectionPolicy):
+    """Selects the least loaded of two workers picked at random.
+
+    This avoids (most of) the herding that comes from always selecting the
+    least loaded worker (when the load information is stale, for example
+    when many executors share the same workers) while still rarely selecting
+    a worker that is much busier than the others.
+    """
+
+    def select(self, task, workers):
+        if len(workers) > 2:
+            workers = random.sample(workers, 2)
+        return _least_loaded(workers)
+
+
+class WeightedPolicy(SelectionPolicy):
+    """Selects a worker at random in proportion to its weight and load.
+
+    Each worker is selected with a probability proportional to
+    ``weight / (1 + outstanding)`` (so a worker with twice the weight of the
+    others is sent about twice the requests, until it has more outstanding
+    requests than they do).
+
+    :param weights: dictionary of worker topic to weight (greater than zero)
+    :param default_weight: weight used for workers whose topic is not in
+                           ``weights`` (if none, the capacity the worker
+                           reports is used or one if it reports none)
+    """
+
+    def __init__(self, weights=None, default_weight=None):
+        self._weights = dict(weights or {})
+        for weight in six.itervalues(self._weights):
+            if weight <= 0:
+                raise ValueError("Weights must be greater than zero")
+        if default_weight is not None and default_weight <= 0:
+            raise ValueError("Default weight must be greater than zero")
+        self._default_weight = default_weight
+
+    def _weight(self, worker):
+        try:
+            return float(self._weights[worker.topic])
+        except KeyError:
+            if self._default_weight is not None:
+                return float(self._default_weight)
+            return float(worker.capacity or 1)
+
+    def select(self, task, workers):
+        shares = [self._weight(worker) / (1 + worker.outstanding)
+                  for worker in workers]
+        point = random.uniform(0, sum(shares))
+        for worker, share in zip(workers, shares):
+            point -= share
+            if point <= 0:
+                return worker
+        return workers[-1]
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import array
+
+from kombu import serialization
+from oslo_serialization import msgpackutils
+import six
+
+#: Name of the (kombu default) json serializer.
+JSON = 'json'
+
+#: Name of the msgpack serializer (registered with kombu by this module).
+MSGPACK = 'taskflow-msgpack'
+
+#: Serializers workers accept (and advertise), most preferred first.
+SUPPORTED = (MSGPACK, JSON)
+
+_MSGPACK_CONTENT_TYPE = 'application/x-taskflow-msgpack'
+
+
+class ArrayHandler(object):
+    """Msgpack extension handler for :py:class:`array.array` objects."""
+
+    # NOTE: this is the first identity that oslo.serialization
+    # leaves for applications to use.
+    identity = 33
+    handles = (array.array,)
+
+    @staticmethod
+    def serialize(obj):
+        if six.PY2:
+            data = obj.tostring()
+        else:
+            data = obj.tobytes()
+        return obj.typecode.encode('ascii') + data
+
+    @staticmethod
+    def deserialize(data):
+        obj = array.array(str(data[0:1].decode('ascii')))
+        if six.PY2:
+            obj.fromstring(data[1:])
+        else:
+            obj.frombytes(data[1:])
+        return obj
+
+
+# Extensions used by the msgpack serializer (the ones oslo.serialization
+# provides plus our own).
+_REGISTRY = msgpackutils.default_registry.copy(unfreeze=True)
+_REGISTRY.register(ArrayHandler())
+
+
+def register_handler(handler, override=False):
+    """Registers a msgpack extension handler (for some type of payload).
+
+    Handlers are expected to follow the same interface as the handlers in
+    :py:mod:`oslo_serialization.msgpackutils` (and must have an identity in
+    the non-reserved extension range that is not already used). The same
+    handlers must be registered by both the engines and the workers that
+    send such payloads to each other.
+    """
+    _REGISTRY.register(handler, override=override)
+
+
+def dumps(obj):
+    """Serializes an object using the msgpack serializer."""
+    return msgpackutils.dumps(obj, registry=_REGISTRY)
+
+
+def loads(data):
+    """Deserializes data made by the msgpack serializer."""
+    return msgpackutils.loads(data, registry=_REGISTRY)
+
+
+def negotiate(preferred, accepted):
+    """Picks the serializer to send messages with to a peer.
+
+    Peers that do not say what they accept (for example workers from before
+    serializers were negotiated) are sent json.
+    """
+    if preferred in (accepted or (JSON,)):
+        return preferred
+    return JSON
+
+
+def from_content_type(content_type):
+    """Gets the name of the supported serializer for a content type.
+
+    Returns json when the content type is not one of a supported serializer.
+    """
+    name = serialization.registry.type_to_name.get(content_type)
+    if name in SUPPORTED:
+        return name
+    return JSON
+
+
+serialization.register(MSGPACK, dumps, loads,
+                       content_type=_MSGPACK_CONTENT_TYPE,
+                       content_encoding='binary')
@@ -15,14 +15,22 @@
 #    under the License.
 
 import functools
+import threading
 
 from oslo_utils import reflection
 from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import six
 
 from taskflow.engines.worker_based import dispatcher
+from taskflow.engines.worker_based import payloads
 from taskflow.engines.worker_based import protocol as pr
 from taskflow.engines.worker_based import proxy
+from taskflow.engines.worker_based import serializers
+from taskflow.engines.worker_based import types as wt
+from taskflow import exceptions as exc
 from taskflow import logging
+from taskflow import task as t_task
 from taskflow.types import failure as ft
 from taskflow.types import notifier as nt
 from taskflow.utils import kombu_utils as ku
@@ -32,37 +40,95 @@ LOG = logging.getLogger(__name__)
 
 
 class Server(object):
-    """Server implementation that waits for incoming tasks requests."""
+    """Server implementation that waits for incoming tasks requests.
+
+    Requests that arrive in a batch are each processed on their own (as if
+    they had arrived one at a time) and their replies are collected for up
+    to ``batch_window`` seconds before being sent back together.
+
+    When a ``payload_store`` is provided the request arguments that were
+    sent out-of-band (through it) are fetched from it right before the task
+    is ran, and results larger than the ``payload_threshold`` (in bytes) are
+    sent back through it (to engines that use the same store).
+
+    When an ``event_interval`` (in seconds) is provided the events each task
+    emits are sent back at most once per interval (together, keeping only
+    the latest progress update of the ones emitted in between) instead of
+    as they are emitted; events that are held back are sent once the
+    interval has passed (even if the task emits nothing after them).
+
+    When a ``heartbeat_period`` (in seconds) is provided the server
+    announces itself (broadcasting the same details it replies to notify
+    requests with) when it starts, every period while it runs and when it
+    stops; executors that passively discover workers learn about it this
+    way.
+    """
 
     def __init__(self, topic, exchange, executor, endpoints,
                  url=None, transport=None, transport_options=None,
-                 retry_options=None):
+                 retry_options=None, capacity=None, validation_rate=1.0,
+                 batch_window=pr.BATCH_WINDOW, payload_store=None,
+                 payload_threshold=payloads.THRESHOLD, event_interval=None,
+                 heartbeat_period=None):
+        self._process_batched = self._delayed_process(
+            self._process_batched_request, tracked=True)
         type_handlers = {
             pr.NOTIFY: dispatcher.Handler(
                 self._delayed_process(self._process_notify),
                 validator=functools.partial(pr.Notify.validate,
                                             response=False)),
             pr.REQUEST: dispatcher.Handler(
-                self._delayed_process(self._process_request),
+                self._delayed_process(self._process_request, tracked=True),
                 validator=pr.Request.validate),
+            pr.BATCH_REQUEST: dispatcher.Handler(
+                self._process_batch_request,
+                validator=pr.BatchRequest.validate),
         }
         self._executor = executor
         self._proxy = proxy.Proxy(topic, exchange,
                                   type_handlers=type_handlers,
+                                  on_wait=self._on_wait,
                                   url=url, transport=transport,
                                   transport_options=transport_options,
-                                  retry_options=retry_options)
+                                  retry_options=retry_options,
+                                  validation_rate=validation_rate)
         self._topic = topic
         self._endpoints = dict([(endpoint.name, endpoint)
                                 for endpoint in endpoints])
+        self._capacity = capacity
+        self._load_lock = threading.Lock()
+        self._in_flight = 0
+        self._queued = 0
+        self._replies = wt.Batcher(self._publish_replies, batch_window)
+        self._event_interval = event_interval
+        self._coalescers = set()
+        self._coalescers_lock = threading.Lock()
+        self._identity = uuidutils.generate_uuid()
+        if heartbeat_period:
+            self._heartbeat = timeutils.StopWatch(duration=heartbeat_period)
+        else:
+            self._heartbeat = None
+        if payload_store is not None:
+            self._offloader = payloads.Offloader(payload_store,
+                                                 threshold=payload_threshold)
+        else:
+            self._offloader = None
 
-    def _delayed_process(self, func):
+    def _adjust_load(self, in_flight, queued):
+        with self._load_lock:
+            self._in_flight += in_flight
+            self._queued += queued
+
+    def _delayed_process(self, func, tracked=False):
         """Runs the function using the instances executor (eventually).
 
         This adds a *nice* benefit on showing how long it took for the
         function to finally be executed from when the message was received
         to when it was finally ran (which can be a nice thing to know
         to determine bottle-necks...).
+
+        When tracked, the message counts towards the load this server
+        reports (while it waits to be ran and while it runs).
         """
         func_name = reflection.get_callable_name(func)
 
@@ -71,16 +137,26 @@ class Server(object):
                       " function/method '%s' with"
                       " message '%s'", watch.elapsed(), func_name,
                       ku.DelayedPretty(message))
-            return func(content, message)
+            if not tracked:
+                return func(content, message)
+            self._adjust_load(0, -1)
+            try:
+                return func(content, message)
+            finally:
+                self._adjust_load(-1, 0)
 
         def _on_receive(content, message):
             LOG.debug("Submitting message '%s' for execution in the"
                       " future to '%s'", ku.DelayedPretty(message), func_name)
             watch = timeutils.StopWatch()
             watch.start()
+            if tracked:
+                self._adjust_load(1, 1)
             try:
                 self._executor.submit(_on_run, watch, content, message)
             except RuntimeError:
+                if tracked:
+                    self._adjust_load(-1, -1)
                 LOG.error("Unable to continue processing message '%s',"
                           " submission to instance executor (with later"
                           " execution by '%s') was unsuccessful",
@@ -93,6 +169,30 @@ class Server(object):
     def connection_details(self):
         return self._proxy.connection_details
 
+    @property
+    def statistics(self):
+        """Dictionary of how many received messages were validated/skipped."""
+        return self._proxy.dispatcher.statistics
+
+    @property
+    def load(self):
+        """Dictionary of this servers capacity and current load.
+
+        Contains how many requests the executor can work on at the same time
+        (``capacity``, only when known), how many requests have been received
+        that have not finished (``in_flight``) and how many of those are
+        waiting for the executor to get around to working on them
+        (``queued``).
+        """
+        with self._load_lock:
+            load = {
+                'in_flight': self._in_flight,
+                'queued': self._queued,
+            }
+        if self._capacity is not None:
+            load['capacity'] = self._capacity
+        return load
+
     @staticmethod
     def _parse_message(message):
         """Extracts required attributes out of the messages properties.
@@ -109,7 +209,8 @@ class Server(object):
                                  prop)
         return properties
 
-    def _reply(self, capture, reply_to, task_uuid, state=pr.FAILURE, **kwargs):
+    def _reply(self, capture, reply_to, task_uuid, state=pr.FAILURE,
+               serializer=serializers.JSON, **kwargs):
         """Send a reply to the `reply_to` queue with the given information.
 
         Can capture failures to publish and if capturing will log associated
@@ -119,7 +220,8 @@ class Server(object):
         response = pr.Response(state, **kwargs)
         published = False
         try:
-            self._proxy.publish(response, reply_to, correlation_id=task_uuid)
+            self._proxy.publish(response, reply_to, correlation_id=task_uuid,
+                                serializer=serializer)
             published = True
         except Exception:
             if not capture:
@@ -129,13 +231,123 @@ class Server(object):
                          exc_info=True)
         return published
 
-    def _on_event(self, reply_to, task_uuid, event_type, details):
-        """Send out a task event notification."""
+    def _on_events(self, reply_to, task_uuid, serializer, events):
+        """Send out (one or more) task event notifications."""
         # NOTE(harlowja): the executor that will trigger this using the
         # task notification/listener mechanism will handle logging if this
         # fails, so thats why capture is 'False' is used here.
-        self._reply(False, reply_to, task_uuid, pr.EVENT,
-                    event_type=event_type, details=details)
+        if len(events) == 1:
+            event_type, details = events[0]
+            self._reply(False, reply_to, task_uuid, pr.EVENT,
+                        serializer=serializer, event_type=event_type,
+                        details=details)
+        else:
+            response = pr.BatchResponse([
+                (task_uuid, pr.Response(pr.EVENT, event_type=event_type,
+                                        details=details))
+                for event_type, details in events
+            ])
+            self._proxy.publish(response, reply_to, serializer=serializer)
+
+    def _reply_batched(self, key, task_uuid, state=pr.FAILURE, **kwargs):
+        """Collect a reply (to a batched request) to be sent later."""
+        self._replies.add(key, (task_uuid, pr.Response(state, **kwargs)))
+        return True
+
+    def _on_batched_events(self, key, task_uuid, events):
+        """Collect task event notifications (to be sent later)."""
+        for event_type, details in events:
+            self._reply_batched(key, task_uuid, pr.EVENT,
+                                event_type=event_type, details=details)
+
+    @staticmethod
+    def _flush_events(coalescer, expired_only=False):
+        try:
+            if expired_only:
+                coalescer.flush_expired()
+            else:
+                coalescer.flush()
+        except Exception:
+            LOG.warning("Failed to send held back task events",
+                        exc_info=True)
+
+    def _publish_replies(self, key, replies):
+        """Send the collected replies (to the same `reply_to` queue)."""
+        reply_to, serializer = key
+        response = pr.BatchResponse(replies)
+        try:
+            self._proxy.publish(response, reply_to, serializer=serializer)
+        except Exception:
+            LOG.critical("Failed to send reply to '%s' with batch response"
+                         " %s", reply_to, response, exc_info=True)
+
+    def _fetch_payload(self, value):
+        if not payloads.is_reference(value):
+            return value
+        if self._offloader is None:
+            raise exc.NotFound("Unable to fetch payload sent out-of-band"
+                               " (no payload store is being used)")
+        return self._offloader.fetch(value)
+
+    def _fetch_payloads(self, arguments):
+        """Fetches the request arguments (and result) sent out-of-band."""
+        fetched = dict(arguments)
+        fetched['arguments'] = dict(
+            (name, self._fetch_payload(value))
+            for name, value in six.iteritems(arguments['arguments']))
+        if 'result' in fetched:
+            fetched['result'] = self._fetch_payload(fetched['result'])
+        return fetched
+
+    def _offload_result(self, request, result):
+        """Sends the result out-of-band (if the request sender can get it)."""
+        if (self._offloader is None or
+                request.get('payload_store') != self._offloader.uri):
+            return result
+        try:
+            result, _key = self._offloader.offload(result)
+        except Exception:
+            LOG.warning("Failed to send result out-of-band (sending it"
+                        " inline instead)", exc_info=True)
+        return result
+
+    def _make_notify(self, extended=True):
+        """Makes the notify response this server replies (and announces).
+
+        Only the topic and tasks are included when ``extended`` is false (as
+        older executors reject responses with anything else in them).
+        """
+        if not extended:
+            return pr.Notify(topic=self._topic,
+                             tasks=list(self._endpoints.keys()))
+        details = self.load
+        if self._offloader is not None:
+            details['payload_store'] = self._offloader.uri
+        return pr.Notify(topic=self._topic,
+                         tasks=list(self._endpoints.keys()),
+                         serializers=list(serializers.SUPPORTED),
+                         batching=True,
+                         **details)
+
+    def _announce(self, leaving=False):
+        """Broadcasts an announcement (to executors that listen for them)."""
+        announcement = pr.Announcement(self._identity, self._make_notify(),
+                                       leaving=leaving)
+        try:
+            self._proxy.broadcast(announcement)
+        except Exception:
+            LOG.warning("Failed to broadcast announcement '%s'",
+                        announcement, exc_info=True)
+
+    def _on_wait(self):
+        """This function is called cyclically between draining events."""
+        if self._heartbeat is not None and self._heartbeat.expired():
+            self._announce()
+            self._heartbeat.restart()
+        with self._coalescers_lock:
+            coalescers = list(self._coalescers)
+        for coalescer in coalescers:
+            self._flush_events(coalescer, expired_only=True)
 
     def _process_notify(self, notify, message):
         """Process notify message and reply back."""
@@ -146,8 +358,9 @@ class Server(object):
                         " in received notify message '%s'",
                         ku.DelayedPretty(message), exc_info=True)
         else:
-            response = pr.Notify(topic=self._topic,
-                                 tasks=list(self._endpoints.keys()))
+            headers = message.headers or {}
+            response = self._make_notify(
+                extended=bool(headers.get(pr.Notify.EXTENDED_HEADER)))
             try:
                 self._proxy.publish(response, routing_key=reply_to)
             except Exception:
@@ -155,6 +368,29 @@ class Server(object):
                              " response '%s'", reply_to, response,
                              exc_info=True)
 
+    def _process_batch_request(self, batch, message):
+        """Process batch request message (each request on its own)."""
+        try:
+            message.properties['reply_to']
+        except KeyError:
+            LOG.warn("The 'reply_to' message property is missing in"
+                     " received batch request message '%s'",
+                     ku.DelayedPretty(message))
+        else:
+            for entry in batch['requests']:
+                self._process_batched(entry, message)
+
+    def _process_batched_request(self, entry, message):
+        """Process a request (from a batch) and collect replies to it."""
+        task_uuid = entry['uuid']
+        serializer = serializers.from_content_type(message.content_type)
+        key = (message.properties['reply_to'], serializer)
+        self._perform_request(entry['request'], task_uuid, message,
+                              functools.partial(self._reply_batched, key,
+                                                task_uuid),
+                              functools.partial(self._on_batched_events, key,
+                                                task_uuid))
+
     def _process_request(self, request, message):
         """Process request message and reply back."""
         try:
@@ -168,13 +404,24 @@ class Server(object):
                      ku.DelayedPretty(message), exc_info=True)
             return
         else:
-            # prepare reply callback
+            # prepare reply callback (replying using the same serializer
+            # the request was sent with)
+            serializer = serializers.from_content_type(message.content_type)
             reply_callback = functools.partial(self._reply, True, reply_to,
-                                               task_uuid)
+                                               task_uuid,
+                                               serializer=serializer)
+            events_callback = functools.partial(self._on_events, reply_to,
+                                                task_uuid, serializer)
+        self._perform_request(request, task_uuid, message,
+                              reply_callback, events_callback)
 
+    def _perform_request(self, request, task_uuid, message,
+                         reply_callback, events_callback):
+        """Perform the request (replying back using the given callbacks)."""
         # Parse the request to get the activity/work to perform.
         try:
             work = pr.Request.from_dict(request, task_uuid=task_uuid)
+            task_version = request.get('task_version')
         except ValueError:
             with misc.capture_failure() as failure:
                 LOG.warning("Failed to parse request contents"
@@ -207,7 +454,8 @@ class Server(object):
                     return
             else:
                 try:
-                    task = endpoint.generate(name=work.task_name)
+                    task = endpoint.generate(name=work.task_name,
+                                             version=task_version)
                 except Exception:
                     with misc.capture_failure() as failure:
                         LOG.warning("The '%s' task '%s' generation for request"
@@ -218,40 +466,75 @@ class Server(object):
                         return
                 else:
                     if not reply_callback(state=pr.RUNNING):
+                        endpoint.release(task, name=work.task_name,
+                                         version=task_version)
                         return
 
-        # Associate *any* events this task emits with a proxy that will
-        # emit them back to the engine... for handling at the engine side
-        # of things...
-        if task.notifier.can_be_registered(nt.Notifier.ANY):
-            task.notifier.register(nt.Notifier.ANY,
-                                   functools.partial(self._on_event,
-                                                     reply_to, task_uuid))
+        # Associate *any* events this task emits (or only the ones the engine
+        # said it wants) with a proxy that will emit them back to the
+        # engine... for handling at the engine side of things...
+        coalescer = wt.EventCoalescer(
+            events_callback, interval=self._event_interval,
+            coalesced=[t_task.EVENT_UPDATE_PROGRESS])
+        event_callback = coalescer.add
+        wanted_events = request.get('events')
+        if wanted_events is not None:
+            event_types = [event_type for event_type in wanted_events
+                           if task.notifier.can_be_registered(event_type)]
+        elif task.notifier.can_be_registered(nt.Notifier.ANY):
+            event_types = [nt.Notifier.ANY]
         elif isinstance(task.notifier, nt.RestrictedNotifier):
             # Only proxy the allowable events then...
-            for event_type in task.notifier.events_iter():
-                task.notifier.register(event_type,
-                                       functools.partial(self._on_event,
-                                                         reply_to, task_uuid))
+            event_types = list(task.notifier.events_iter())
+        else:
+            event_types = []
+        for event_type in event_types:
+            task.notifier.register(event_type, event_callback)
+
+        if self._event_interval:
+            # Events held back (with nothing emitted after them) are sent
+            # from the wait cycle once the interval has passed.
+            with self._coalescers_lock:
+                self._coalescers.add(coalescer)
 
-        # Perform the task action.
+        # Perform the task action (getting any of its arguments that were
+        # sent out-of-band first).
         try:
-            result = handler(task, **work.arguments)
+            result = handler(task, **self._fetch_payloads(work.arguments))
         except Exception:
             with misc.capture_failure() as failure:
                 LOG.warning("The '%s' endpoint '%s' execution for request"
                             " message '%s' failed", endpoint, work.action,
                             ku.DelayedPretty(message), exc_info=True)
+                self._flush_events(coalescer)
                 reply_callback(result=pr.failure_to_dict(failure))
         else:
             # And be done with it!
+            self._flush_events(coalescer)
             if isinstance(result, ft.Failure):
                 reply_callback(result=result.to_dict())
             else:
-                reply_callback(state=pr.SUCCESS, result=result)
+                reply_callback(state=pr.SUCCESS,
+                               result=self._offload_result(request, result))
+        finally:
+            # NOTE: the task instance may be reused by later
+            # requests (if its endpoint pools them) so it must stop sending
+            # its events to the engine that sent this request.
+            for event_type in event_types:
+                task.notifier.deregister(event_type, event_callback)
+            with self._coalescers_lock:
+                self._coalescers.discard(coalescer)
+            endpoint.release(task, name=work.task_name,
+                             version=task_version)
 
     def start(self):
         """Start processing incoming requests."""
+        self._replies.start()
+        if self._heartbeat is not None:
+            # NOTE: requests sent (by executors that learn about
+            # this server) before it starts consuming are queued for it.
+            self._announce()
+            self._heartbeat.restart()
         self._proxy.start()
 
     def wait(self):
@@ -260,4 +543,9 @@ class Server(object):
 
     def stop(self):
         """Stop processing incoming requests."""
+        if self._heartbeat is not None and self._proxy.is_running:
+            self._announce(leaving=True)
         self._proxy.stop()
+        # NOTE: replies to batched requests that finish after this
+        # are sent as soon as they are made.
+        self._replies.stop()
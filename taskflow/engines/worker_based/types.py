@@ -14,7 +14,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import random
 import threading
 
 from oslo_utils import reflection
@@ -22,8 +21,11 @@ from oslo_utils import timeutils
 import six
 
 from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import selection
+from taskflow.engines.worker_based import serializers
 from taskflow import logging
 from taskflow.utils import kombu_utils as ku
+from taskflow.utils import threading_utils as tu
 
 LOG = logging.getLogger(__name__)
 
@@ -45,6 +47,36 @@ class TopicWorker(object):
         self.topic = topic
         self.identity = identity
         self.last_seen = None
+        # NOTE: the following are *not* part of this workers
+        # (immutable) identity, they are updated as requests are sent to the
+        # worker and as it reports its capacity and load.
+        self.capacity = None
+        self.reported_in_flight = 0
+        self.reported_queued = 0
+        self.in_flight = 0
+        self.serializer = serializers.JSON
+        self.batching = False
+        self.payload_store = None
+
+    @property
+    def outstanding(self):
+        """Estimated number of requests the worker has not finished.
+
+        This is the larger of how many requests this side has sent to the
+        worker (that have not finished) and how many the worker last
+        reported it has not finished (which includes requests sent by other
+        executors).
+        """
+        return max(self.in_flight, self.reported_in_flight)
+
+    @property
+    def load(self):
+        """Outstanding requests relative to the workers (reported) capacity.
+
+        Workers that do not report a capacity are assumed to be able to work
+        on one request at a time.
+        """
+        return float(self.outstanding) / max(1, self.capacity or 1)
 
     def performs(self, task):
         if not isinstance(task, six.string_types):
@@ -85,7 +117,8 @@ class ProxyWorkerFinder(object):
 
     def __init__(self, uuid, proxy, topics,
                  beat_periodicity=pr.NOTIFY_PERIOD,
-                 worker_expiry=pr.EXPIRES_AFTER):
+                 worker_expiry=pr.EXPIRES_AFTER,
+                 selection_policy=None, serializer=serializers.JSON):
         self._cond = threading.Condition()
         self._proxy = proxy
         self._topics = topics
@@ -96,6 +129,14 @@ class ProxyWorkerFinder(object):
         self._messages_published = 0
         self._worker_expiry = worker_expiry
         self._watch = timeutils.StopWatch(duration=beat_periodicity)
+        if selection_policy is None:
+            selection_policy = selection.RandomPolicy()
+        self._selection_policy = selection_policy
+        self._serializer = serializer
+        self._sent = {}
+        # Identities of the (announcing) workers consuming from each topic;
+        # a topics worker is only removed once all of them have left.
+        self._announcers = {}
 
     @property
     def total_workers(self):
@@ -122,8 +163,7 @@ class ProxyWorkerFinder(object):
                 self._cond.wait(watch.leftover(return_none=True))
             return 0
 
-    @staticmethod
-    def _match_worker(task, available_workers):
+    def _match_worker(self, task, available_workers):
         """Select a worker (from geq 1 workers) that can best perform the task.
 
         NOTE(harlowja): this method will be activated when there exists
@@ -132,15 +172,18 @@ class ProxyWorkerFinder(object):
         task that is being requested to perform and the result should be one
         of those workers using whatever best-fit algorithm is possible (or
         random at the least).
+
+        The worker returned is the one picked by the selection policy this
+        finder was created with.
         """
         if len(available_workers) == 1:
             return available_workers[0]
         else:
-            return random.choice(available_workers)
+            return self._selection_policy.select(task, available_workers)
 
     @property
     def messages_processed(self):
-        """How many notify response messages have been processed."""
+        """How many notify responses (and announcements) were processed."""
         return self._messages_processed
 
     def _next_worker(self, topic, tasks, temporary=False):
@@ -159,17 +202,19 @@ class ProxyWorkerFinder(object):
         match workers to tasks to run).
         """
         if self._messages_published == 0:
-            self._proxy.publish(pr.Notify(),
-                                self._topics, reply_to=self._uuid)
+            self._publish_notify()
             self._messages_published += 1
             self._watch.restart()
         else:
             if self._watch.expired():
-                self._proxy.publish(pr.Notify(),
-                                    self._topics, reply_to=self._uuid)
+                self._publish_notify()
                 self._messages_published += 1
                 self._watch.restart()
 
+    def _publish_notify(self):
+        self._proxy.publish(pr.Notify(), self._topics, reply_to=self._uuid,
+                            headers={pr.Notify.EXTENDED_HEADER: True})
+
     def _add(self, topic, tasks):
         """Adds/updates a worker for the topic for the given tasks."""
         try:
@@ -183,10 +228,36 @@ class ProxyWorkerFinder(object):
             # a new one; so that the existing object doesn't get
             # affected (workers objects are supposed to be immutable).
         except KeyError:
-            pass
-        worker = self._next_worker(topic, tasks)
-        self._workers[topic] = worker
-        return (worker, True)
+            worker = None
+        new_worker = self._next_worker(topic, tasks)
+        if worker is not None:
+            # Requests sent to the replaced worker still count against the
+            # same (remote) worker.
+            new_worker.in_flight = worker.in_flight
+            for request_uuid, sent_to in list(six.iteritems(self._sent)):
+                if sent_to is worker:
+                    self._sent[request_uuid] = new_worker
+        self._workers[topic] = new_worker
+        return (new_worker, True)
+
+    def _update(self, response):
+        """Adds/updates a worker from a notify response (or announcement).
+
+        NOTE: this must be called while holding the condition.
+        """
+        worker, new_or_updated = self._add(response.topic, response.tasks)
+        if new_or_updated:
+            LOG.debug("Updated worker '%s' (%s total workers are"
+                      " currently known)", worker, self.total_workers)
+            self._cond.notify_all()
+        worker.last_seen = timeutils.now()
+        worker.capacity = response.capacity
+        worker.reported_in_flight = response.in_flight or 0
+        worker.reported_queued = response.queued or 0
+        worker.serializer = serializers.negotiate(self._serializer,
+                                                  response.serializers)
+        worker.batching = response.batching
+        worker.payload_store = response.payload_store
 
     def process_response(self, data, message):
         """Process notify message sent from remote side."""
@@ -195,15 +266,53 @@ class ProxyWorkerFinder(object):
         response = pr.Notify(**data)
         LOG.debug("Extracted notify response '%s'", response)
         with self._cond:
-            worker, new_or_updated = self._add(response.topic,
-                                               response.tasks)
-            if new_or_updated:
-                LOG.debug("Updated worker '%s' (%s total workers are"
-                          " currently known)", worker, self.total_workers)
-                self._cond.notify_all()
-            worker.last_seen = timeutils.now()
+            self._update(response)
             self._messages_processed += 1
 
+    def process_announcement(self, data, message):
+        """Process announcement message (broadcast) by a remote worker."""
+        LOG.debug("Started processing announcement message '%s'",
+                  ku.DelayedPretty(message))
+        announcement = pr.Announcement.from_dict(data)
+        response = announcement.notify
+        if response.topic not in self._topics:
+            # Workers on the same exchange but a topic this finder was not
+            # told about are not used (like they would not be if polled).
+            LOG.trace("Ignoring announcement by worker on unknown topic"
+                      " '%s'", response.topic)
+            return
+        with self._cond:
+            announcers = self._announcers.setdefault(response.topic, set())
+            if not announcement.leaving:
+                announcers.add(announcement.identity)
+                self._update(response)
+            else:
+                announcers.discard(announcement.identity)
+                if not announcers:
+                    del self._announcers[response.topic]
+                    worker = self._workers.pop(response.topic, None)
+                    if worker is not None:
+                        LOG.info("Removed worker '%s' as it has announced"
+                                 " it is leaving", worker)
+                        self._cond.notify_all()
+            self._messages_processed += 1
+
+    def request_sent(self, request_uuid, worker):
+        """Records that a request is (about to be) sent to a worker."""
+        with self._cond:
+            self._sent[request_uuid] = worker
+            worker.in_flight += 1
+
+    def request_finished(self, request_uuid):
+        """Records that a request (previously sent) has finished."""
+        with self._cond:
+            try:
+                worker = self._sent.pop(request_uuid)
+            except KeyError:
+                pass
+            else:
+                worker.in_flight = max(0, worker.in_flight - 1)
+
     def clean(self):
         """Cleans out any dead/expired/not responding workers.
 
@@ -223,6 +332,7 @@ class ProxyWorkerFinder(object):
                     dead_workers[topic] = (worker, secs_since_last_seen)
             for topic in six.iterkeys(dead_workers):
                 self._workers.pop(topic)
+                self._announcers.pop(topic, None)
             if dead_workers:
                 self._cond.notify_all()
         if dead_workers and LOG.isEnabledFor(logging.INFO):
@@ -236,11 +346,21 @@ class ProxyWorkerFinder(object):
         """Resets finders internal state."""
         with self._cond:
             self._workers.clear()
+            self._sent.clear()
+            self._announcers.clear()
             self._messages_processed = 0
             self._messages_published = 0
             self._seen_workers = 0
             self._cond.notify_all()
 
+    def has_worker_for_task(self, task):
+        """Checks if any (known) worker can perform a given task."""
+        with self._cond:
+            for worker in six.itervalues(self._workers):
+                if worker.performs(task):
+                    return True
+        return False
+
     def get_worker_for_task(self, task):
         """Gets a worker that can perform a given task."""
         available_workers = []
@@ -252,3 +372,167 @@ class ProxyWorkerFinder(object):
             return self._match_worker(task, available_workers)
         else:
             return None
+
+
+class Batcher(object):
+    """Collects items (per key) so that they can be sent out together.
+
+    Items added under the same key are given (in the order they were added)
+    to the flush function, ``flush_func(key, items)``, once ``max_size`` of
+    them have been collected or (by a thread that is started when the first
+    item is added) once ``window`` seconds have passed. Flushes happen one
+    at a time so items are never flushed out of order.
+
+    When not started (or once stopped) items are flushed as they are added.
+    """
+
+    def __init__(self, flush_func, window, max_size=pr.BATCH_SIZE):
+        if window <= 0:
+            raise ValueError("Window must be greater than zero")
+        if max_size is not None and max_size < 1:
+            raise ValueError("Max size must be greater than zero")
+        self._flush_func = flush_func
+        self._window = window
+        self._max_size = max_size
+        self._batches = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._running = False
+        self._dead = threading.Event()
+        self._flusher = None
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(items) for items in six.itervalues(self._batches))
+
+    def start(self):
+        """Starts collecting items (instead of flushing them as added)."""
+        with self._lock:
+            if self._running:
+                raise RuntimeError("Batcher must be stopped before it can"
+                                   " be started")
+            self._running = True
+            self._dead.clear()
+
+    def stop(self, flush=True):
+        """Stops collecting items (flushing or discarding collected ones).
+
+        :returns: the items that were discarded (if not flushing)
+        """
+        with self._lock:
+            self._running = False
+            self._dead.set()
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join()
+        if flush:
+            self.flush()
+            return []
+        with self._lock:
+            batches, self._batches = self._batches, {}
+        discarded = []
+        for items in six.itervalues(batches):
+            discarded.extend(items)
+        return discarded
+
+    def add(self, key, item):
+        """Adds an item to the batch (of items) with the given key."""
+        with self._lock:
+            collected = self._running
+            if collected:
+                items = self._batches.setdefault(key, [])
+                items.append(item)
+                if self._flusher is None:
+                    self._flusher = tu.daemon_thread(self._run)
+                    self._flusher.start()
+                if self._max_size is None or len(items) < self._max_size:
+                    return
+        with self._flush_lock:
+            if collected:
+                # NOTE: this may have been flushed (or discarded)
+                # by someone else before we got the flush lock.
+                with self._lock:
+                    items = self._batches.pop(key, None)
+            else:
+                items = [item]
+            if items:
+                self._flush_func(key, items)
+
+    def flush(self):
+        """Flushes all the currently collected items."""
+        with self._flush_lock:
+            with self._lock:
+                batches, self._batches = self._batches, {}
+            for key, items in six.iteritems(batches):
+                self._flush_func(key, items)
+
+    def _run(self):
+        while not self._dead.wait(self._window):
+            try:
+                self.flush()
+            except Exception:
+                LOG.exception("Failed flushing batched items")
+
+
+class EventCoalescer(object):
+    """Coalesces the events a task emits before they are sent.
+
+    Events are given to the send function, ``send_func(events)`` (a list of
+    ``(event_type, details)`` tuples in the order they were emitted), at
+    most once every ``interval`` seconds; the events emitted in between are
+    held back and only the latest of the held back events of each of the
+    ``coalesced`` event types (for example progress updates) is kept. Held
+    back events are sent when the next event is emitted after the interval
+    has passed, when expired events are flushed (which should be done
+    periodically, so that events are not held back for longer than the
+    interval when no later event is emitted) or when flushed (which should be
+    done before the final reply to the request is sent).
+
+    When no interval is provided events are sent as they are emitted.
+    """
+
+    def __init__(self, send_func, interval=None, coalesced=()):
+        self._send_func = send_func
+        self._coalesced = frozenset(coalesced)
+        self._pending = []
+        self._lock = threading.Lock()
+        if interval:
+            self._watch = timeutils.StopWatch(duration=interval)
+        else:
+            self._watch = None
+
+    def add(self, event_type, details):
+        """Adds an event (sending it, and any held back ones, if due)."""
+        if self._watch is None:
+            self._send_func([(event_type, details)])
+            return
+        with self._lock:
+            if event_type in self._coalesced:
+                self._pending = [(pending_type, pending_details)
+                                 for (pending_type, pending_details)
+                                 in self._pending
+                                 if pending_type != event_type]
+            self._pending.append((event_type, details))
+            if self._watch.has_started() and not self._watch.expired():
+                return
+            events, self._pending = self._pending, []
+            self._watch.restart()
+            self._send_func(events)
+
+    def flush_expired(self):
+        """Sends any held back events (if the interval has passed)."""
+        if self._watch is None:
+            return
+        with self._lock:
+            if not self._pending or not self._watch.expired():
+                return
+            events, self._pending = self._pending, []
+            self._watch.restart()
+            self._send_func(events)
+
+    def flush(self):
+        """Sends any held back events."""
+        with self._lock:
+            events, self._pending = self._pending, []
+            if events:
+                self._send_func(events)
@@ -21,8 +21,11 @@ import sys
 
 import futurist
 from oslo_utils import reflection
+import six
 
 from taskflow.engines.worker_based import endpoint
+from taskflow.engines.worker_based import payloads
+from taskflow.engines.worker_based import protocol as pr
 from taskflow.engines.worker_based import server
 from taskflow import logging
 from taskflow import task as t_task
@@ -55,12 +58,52 @@ class Worker(object):
                               options imply and are expected to be)
     :param retry_options: retry specific options
                           (see: :py:attr:`~.proxy.Proxy.DEFAULT_RETRY_OPTIONS`)
+    :param capacity: how many requests the worker reports it can work on at
+                     the same time (used by engines to send requests to less
+                     loaded workers); defaults to the threads count when
+                     the default executor is created with a threads count
+    :param validation_rate: fraction (between zero and one) of received
+                            messages that are validated before being
+                            processed (lowering this is only appropriate
+                            when all engines sending requests are trusted)
+    :param batch_window: how long (in seconds) replies to requests that
+                         arrive in a batch are collected for before being
+                         sent back together
+    :param pool_size: how many idle task instances to keep (per task name
+                      and version) for reuse by later requests instead of
+                      creating a new task instance for every request; either
+                      a number (used for all tasks) or a dictionary of task
+                      class names (or task classes) to numbers (tasks not
+                      in it are not pooled); by default nothing is pooled
+    :param warm_up: dictionary of task class names (or task classes) to the
+                    task names to create pooled task instances for when the
+                    worker is ran (so that early requests do not have to wait
+                    for them to be created)
+    :param payload_store: store (see :py:class:`.payloads.Store`) that
+                          large request arguments and results are sent
+                          through (out-of-band) instead of through the broker
+                          (engines must use the same store)
+    :param payload_threshold: size (in bytes) above which results are sent
+                              out-of-band (when a payload store is used)
+    :param event_interval: how often (in seconds) the events a task emits
+                           are sent back (together, keeping only the latest
+                           progress update of the ones emitted in between);
+                           by default events are sent as they are emitted
+    :param heartbeat_period: how often (in seconds) the worker announces
+                             itself to engines that passively discover
+                             workers (it also does when it starts and
+                             stops); by default the worker does not announce
+                             itself
     """
 
     def __init__(self, exchange, topic, tasks,
                  executor=None, threads_count=None, url=None,
                  transport=None, transport_options=None,
-                 retry_options=None):
+                 retry_options=None, capacity=None, validation_rate=1.0,
+                 batch_window=pr.BATCH_WINDOW, pool_size=None,
+                 warm_up=None, payload_store=None,
+                 payload_threshold=payloads.THRESHOLD, event_interval=None,
+                 heartbeat_period=None):
         self._topic = topic
         self._executor = executor
         self._owns_executor = False
@@ -68,19 +111,63 @@ class Worker(object):
             self._executor = futurist.ThreadPoolExecutor(
                 max_workers=threads_count)
             self._owns_executor = True
-        self._endpoints = self._derive_endpoints(tasks)
+            if capacity is None:
+                capacity = threads_count
+        self._endpoints = self._derive_endpoints(tasks, pool_size=pool_size)
+        self._warm_up = self._normalize_task_keys(warm_up)
         self._exchange = exchange
         self._server = server.Server(topic, exchange, self._executor,
                                      self._endpoints, url=url,
                                      transport=transport,
                                      transport_options=transport_options,
-                                     retry_options=retry_options)
+                                     retry_options=retry_options,
+                                     capacity=capacity,
+                                     validation_rate=validation_rate,
+                                     batch_window=batch_window,
+                                     payload_store=payload_store,
+                                     payload_threshold=payload_threshold,
+                                     event_interval=event_interval,
+                                     heartbeat_period=heartbeat_period)
 
     @staticmethod
-    def _derive_endpoints(tasks):
+    def _normalize_task_keys(mapping):
+        if not mapping:
+            return {}
+        normalized = {}
+        for task_cls, value in six.iteritems(mapping):
+            if not isinstance(task_cls, six.string_types):
+                task_cls = reflection.get_class_name(task_cls)
+            normalized[task_cls] = value
+        return normalized
+
+    @classmethod
+    def _derive_endpoints(cls, tasks, pool_size=None):
         """Derive endpoints from list of strings, classes or packages."""
         derived_tasks = misc.find_subclasses(tasks, t_task.Task)
-        return [endpoint.Endpoint(task) for task in derived_tasks]
+        if isinstance(pool_size, dict):
+            pool_sizes = cls._normalize_task_keys(pool_size)
+        else:
+            pool_sizes = None
+        endpoints = []
+        for task in derived_tasks:
+            if pool_sizes is not None:
+                task_pool_size = pool_sizes.get(
+                    reflection.get_class_name(task))
+            else:
+                task_pool_size = pool_size
+            endpoints.append(endpoint.Endpoint(task,
+                                               pool_size=task_pool_size))
+        return endpoints
+
+    @property
+    def pool_statistics(self):
+        """Dictionary of the task instance pool statistics of each endpoint.
+
+        Only endpoints that pool task instances are included (see
+        :py:attr:`~.endpoint.Endpoint.statistics` for what each contains).
+        """
+        return dict((ep.name, ep.statistics)
+                    for ep in self._endpoints if ep.pooling)
 
     @misc.cachedproperty
     def banner(self):
@@ -121,10 +208,21 @@ class Worker(object):
                 'Thread id': tu.get_ident(),
             },
         }
+        pool_statistics = self.pool_statistics
+        if pool_statistics:
+            chapters['Task pools'] = dict(
+                (name, "%(pooled)s pooled, %(hits)s hits,"
+                       " %(misses)s misses" % stats)
+                for name, stats in six.iteritems(pool_statistics))
         return banner.make_banner('WBE worker', chapters)
 
     def run(self, display_banner=True, banner_writer=None):
         """Runs the worker."""
+        for ep in self._endpoints:
+            if ep.name in self._warm_up:
+                created = ep.warm(names=self._warm_up[ep.name])
+                LOG.debug("Created %s pooled '%s' task instances", created,
+                          ep)
         if display_banner:
             if banner_writer is None:
                 for line in self.banner.splitlines():
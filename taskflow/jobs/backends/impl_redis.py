@@ -38,6 +38,7 @@ from taskflow import logging
 from taskflow import states
 from taskflow.utils import misc
 from taskflow.utils import redis_utils as ru
+from taskflow.utils import threading_utils
 
 
 LOG = logging.getLogger(__name__)
@@ -218,6 +219,62 @@ class RedisJob(base.Job):
                                             value_from_callable=True)
 
 
+class RedisClaimMonitor(base.ClaimMonitor):
+    """Monitors claims by periodically fetching the owner keys in bulk.
+
+    All watched claims owner keys are fetched (every ``interval`` seconds)
+    using a single pipeline; claims whose owner key has expired (or is owned
+    by someone else) are marked as lost.
+    """
+
+    def _check_claims(self, watches):
+        with _translate_failures():
+            # NOTE: the boards client may be recreated when it
+            # reconnects, so always use its current one...
+            pipe = self._board._client.pipeline(transaction=False)
+            for watch in watches:
+                pipe.get(watch.job.owner_key)
+            raw_owners = pipe.execute()
+        lost = []
+        for watch, raw_owner in zip(watches, raw_owners):
+            if (not raw_owner or
+                    self._board._decode_owner(raw_owner) != watch.owner):
+                lost.append(watch)
+        return lost
+
+
+class RedisLeaseManager(base.LeaseManager):
+    """Renews claims by extending their owner keys expiry in bulk.
+
+    All leases that are due are renewed using a single lua script call that
+    extends the expiry of each owner key (only if it is still owned by the
+    expected owner, leases whose owner key has expired or is owned by someone
+    else fail to be renewed).
+    """
+
+    def _renew_leases(self, leases):
+        script = self._board._get_script('renew')
+        keys = []
+        args = []
+        for lease in leases:
+            keys.append(lease.job.owner_key)
+            args.extend([self._board._encode_owner(lease.owner),
+                         int(lease.expiry * 1000.0)])
+        with _translate_failures():
+            raw_result = script(keys=keys, args=args)
+            result = self._board._loads(raw_result)
+        status = result['status']
+        if status != self._board.SCRIPT_STATUS_OK:
+            raise exc.JobFailure("Failure to renew %s leases, unknown"
+                                 " internal error (reason=%s)"
+                                 % (len(leases), result.get('reason')))
+        # NOTE: lua indexes start at one (and an empty lua table is
+        # packed as an empty map, and not an empty list).
+        renewed = set(result.get('renewed') or [])
+        return [lease for i, lease in enumerate(leases, 1)
+                if i not in renewed]
+
+
 class RedisJobBoard(base.JobBoard):
     """A jobboard backed by `redis`_.
 
@@ -245,6 +302,25 @@ class RedisJobBoard(base.JobBoard):
     using :meth:`.abandon` to manually abandon the job so that it can be
     consumed/worked on by others.
 
+    When the ``notify`` configuration option is enabled every board also
+    publishes (using redis `pubsub`_) what postings were added or removed
+    from the listings hash (the publishing happens in the same lua scripts
+    that mutate the listings hash, so it is atomic with those mutations). Each
+    board then maintains a local cache of the jobs it knows about that
+    is incrementally updated from those notifications (by a background
+    listener thread) so that :meth:`.iterjobs` and :meth:`.wait` no longer
+    need to fetch (and decode) the whole listings hash on each call; the
+    whole listings hash is then only fetched on :meth:`.connect` (and when
+    the listener has to resubscribe after its connection was lost) or when
+    ``ensure_fresh`` is requested. All boards that share the same namespace
+    should use the same ``notify`` setting (boards without it enabled will
+    not publish what they change).
+
+    The keys of claimed jobs are also kept in a redis `set`_ (by the same lua
+    scripts that claim, abandon, consume and trash jobs) so that unclaimed
+    jobs can be found in bulk (instead of having to check the state of each
+    job one at a time).
+
     NOTE(harlowja): by default the :meth:`.claim` has no expiry (which
     means claims will be persistent, even under claiming entity failure). To
     ensure a expiry occurs pass a numeric value for the ``expiry`` keyword
@@ -256,6 +332,8 @@ class RedisJobBoard(base.JobBoard):
     .. _msgpack: https://msgpack.org/
     .. _redis: https://redis.io/
     .. _hash: https://redis.io/topics/data-types#hashes
+    .. _pubsub: https://redis.io/topics/pubsub
+    .. _set: https://redis.io/topics/data-types#sets
     """
 
     CLIENT_CONF_TRANSFERS = tuple([
@@ -346,12 +424,33 @@ class RedisJobBoard(base.JobBoard):
     #: Expected lua script error response when the job is already claimed.
     SCRIPT_ALREADY_CLAIMED = "Job already claimed!"
 
+    #: Expected lua script error response when the job is already posted.
+    SCRIPT_ALREADY_POSTED = "Job already posted!"
+
+    #: Notification event published when a job is added to the listings.
+    NOTIFY_POSTED = b"posted"
+
+    #: Notification event published when a job is removed from the listings.
+    NOTIFY_REMOVED = b"removed"
+
+    #: Separator used to combine the pieces of a notification together.
+    NOTIFY_SEP = b":"
+
+    #: How long (in seconds) the notification listener waits per poll.
+    NOTIFY_POLL_DELAY = 0.25
+
+    #: Maximum delay (in seconds) between notification resubscribe attempts.
+    NOTIFY_MAX_RETRY_DELAY = 5.0
+
     SCRIPT_TEMPLATES = {
         'consume': """
 -- Extract *all* the variables (so we can easily know what they are)...
 local owner_key = KEYS[1]
 local listings_key = KEYS[2]
 local last_modified_key = KEYS[3]
+local claimed_key = KEYS[4]
+-- This will be nil if notifications are not enabled...
+local notify_key = KEYS[5]
 
 local expected_owner = ARGV[1]
 local job_key = ARGV[2]
@@ -369,6 +468,11 @@ if redis.call("hexists", listings_key, job_key) == 1 then
             -- worked on again, instead of the reverse)...
             redis.call("del", owner_key, last_modified_key)
             redis.call("hdel", listings_key, job_key)
+            redis.call("srem", claimed_key, job_key)
+            if notify_key ~= nil then
+                redis.call("publish", notify_key,
+                           "${removed}" .. "${sep}" .. job_key)
+            end
             result["status"] = "${ok}"
         end
     else
@@ -392,6 +496,7 @@ end
 local owner_key = KEYS[1]
 local listings_key = KEYS[2]
 local last_modified_key = KEYS[3]
+local claimed_key = KEYS[4]
 
 local expected_owner = ARGV[1]
 local job_key = ARGV[2]
@@ -418,6 +523,7 @@ if redis.call("hexists", listings_key, job_key) == 1 then
         redis.call("set", owner_key, expected_owner)
         redis.call("set", last_modified_key, last_modified_blob)
         apply_ttl(owner_key, ms_expiry)
+        redis.call("sadd", claimed_key, job_key)
         result["status"] = "${ok}"
     end
 else
@@ -425,12 +531,78 @@ else
     result["reason"] = "${unknown_job}"
 end
 return cmsgpack.pack(result)
+""",
+        'claim_many': """
+local function apply_ttl(key, ms_expiry)
+    if ms_expiry ~= nil then
+        redis.call("pexpire", key, ms_expiry)
+    end
+end
+
+-- Extract *all* the variables (so we can easily know what they are)...
+local listings_key = KEYS[1]
+local claimed_key = KEYS[2]
+
+local expected_owner = ARGV[1]
+local last_modified_blob = ARGV[2]
+
+-- If this is non-numeric (which it may be) this becomes nil
+local ms_expiry = nil
+if ARGV[3] ~= "none" then
+    ms_expiry = tonumber(ARGV[3])
+end
+local limit = tonumber(ARGV[4])
+
+-- Each job has its key in ARGV (starting at 5) and its owner key and last
+-- modified key in KEYS (starting at 3), in the same order...
+local claimed = {}
+for i = 5, #ARGV do
+    if #claimed >= limit then
+        break
+    end
+    local job_key = ARGV[i]
+    local owner_key = KEYS[(i - 5) * 2 + 3]
+    local last_modified_key = KEYS[(i - 5) * 2 + 4]
+    if redis.call("hexists", listings_key, job_key) == 1 then
+        if redis.call("exists", owner_key) == 0 then
+            redis.call("set", owner_key, expected_owner)
+            redis.call("set", last_modified_key, last_modified_blob)
+            apply_ttl(owner_key, ms_expiry)
+            redis.call("sadd", claimed_key, job_key)
+            table.insert(claimed, job_key)
+        end
+    end
+end
+local result = {}
+result["status"] = "${ok}"
+result["claimed"] = claimed
+return cmsgpack.pack(result)
+""",
+        'renew': """
+-- Each claim being renewed has its owner key in KEYS and the owner that is
+-- expected to own it and its new expiry in ARGV (in pairs, in the same
+-- order)...
+local renewed = {}
+for i = 1, #KEYS do
+    local owner_key = KEYS[i]
+    local expected_owner = ARGV[(i - 1) * 2 + 1]
+    local ms_expiry = tonumber(ARGV[(i - 1) * 2 + 2])
+    if redis.call("get", owner_key) == expected_owner then
+        redis.call("pexpire", owner_key, ms_expiry)
+        table.insert(renewed, i)
+    end
+end
+local result = {}
+result["status"] = "${ok}"
+result["renewed"] = renewed
+return cmsgpack.pack(result)
 """,
         'abandon': """
 -- Extract *all* the variables (so we can easily know what they are)...
 local owner_key = KEYS[1]
 local listings_key = KEYS[2]
 local last_modified_key = KEYS[3]
+local claimed_key = KEYS[4]
 
 local expected_owner = ARGV[1]
 local job_key = ARGV[2]
@@ -446,6 +618,7 @@ if redis.call("hexists", listings_key, job_key) == 1 then
         else
             redis.call("del", owner_key)
             redis.call("set", last_modified_key, last_modified_blob)
+            redis.call("srem", claimed_key, job_key)
             result["status"] = "${ok}"
         end
     else
@@ -464,6 +637,9 @@ local owner_key = KEYS[1]
 local listings_key = KEYS[2]
 local last_modified_key = KEYS[3]
 local trash_listings_key = KEYS[4]
+local claimed_key = KEYS[5]
+-- This will be nil if notifications are not enabled...
+local notify_key = KEYS[6]
 
 local expected_owner = ARGV[1]
 local job_key = ARGV[2]
@@ -484,6 +660,11 @@ if redis.call("hexists", listings_key, job_key) == 1 then
             redis.call("set", last_modified_key, last_modified_blob)
             redis.call("del", owner_key)
             redis.call("hdel", listings_key, job_key)
+            redis.call("srem", claimed_key, job_key)
+            if notify_key ~= nil then
+                redis.call("publish", notify_key,
+                           "${removed}" .. "${sep}" .. job_key)
+            end
             result["status"] = "${ok}"
         end
     else
@@ -495,6 +676,52 @@ else
     result["reason"] = "${unknown_job}"
 end
 return cmsgpack.pack(result)
+""",
+        'post_many': """
+-- Extract *all* the variables (so we can easily know what they are)...
+local listings_key = KEYS[1]
+-- This will be nil if notifications are not enabled...
+local notify_key = KEYS[2]
+
+-- Each job has its key and raw posting in ARGV (in pairs); either all of
+-- them are posted or none of them are...
+local result = {}
+for i = 1, #ARGV, 2 do
+    if redis.call("hexists", listings_key, ARGV[i]) == 1 then
+        result["status"] = "${error}"
+        result["reason"] = "${already_posted}"
+        result["job_key"] = ARGV[i]
+        return cmsgpack.pack(result)
+    end
+end
+for i = 1, #ARGV, 2 do
+    redis.call("hset", listings_key, ARGV[i], ARGV[i + 1])
+    if notify_key ~= nil then
+        redis.call("publish", notify_key,
+                   "${posted}" .. "${sep}" .. ARGV[i] .. "${sep}" ..
+                   ARGV[i + 1])
+    end
+end
+result["status"] = "${ok}"
+return cmsgpack.pack(result)
+""",
+        'post': """
+-- Extract *all* the variables (so we can easily know what they are)...
+local listings_key = KEYS[1]
+local notify_key = KEYS[2]
+
+local job_key = ARGV[1]
+local raw_posting = ARGV[2]
+local result = {}
+if redis.call("hsetnx", listings_key, job_key, raw_posting) == 1 then
+    redis.call("publish", notify_key,
+               "${posted}" .. "${sep}" .. job_key .. "${sep}" .. raw_posting)
+    result["status"] = "${ok}"
+else
+    result["status"] = "${error}"
+    result["reason"] = "${already_posted}"
+end
+return cmsgpack.pack(result)
 """,
     }
     """`Lua`_ **template** scripts that will be used by various methods (they
@@ -586,6 +813,18 @@ return cmsgpack.pack(result)
         # Redis server version connected to + scripts (populated on connect).
         self._redis_version = None
         self._scripts = {}
+        # Local job cache (and the listener that keeps it updated), only
+        # used when notifications are enabled.
+        self._notify = strutils.bool_from_string(
+            self._conf.get('notify', False))
+        # Claims (made with an expiry) are renewed by the lease manager
+        # when this is enabled.
+        self._renew_claims = strutils.bool_from_string(
+            self._conf.get('renew_claims', False))
+        self._known_jobs = {}
+        self._job_cond = threading.Condition()
+        self._listener = None
+        self._listener_death = threading.Event()
         # The backend to load the full logbooks from, since what is sent over
         # the data connection is only the logbook uuid and name, and not the
         # full logbook.
@@ -635,8 +874,20 @@ return cmsgpack.pack(result)
         """Key where a hash will be stored with active jobs in it."""
         return self.join(b"listings")
 
+    @misc.cachedproperty
+    def claimed_key(self):
+        """Key where a set will be stored with the keys of claimed jobs."""
+        return self.join(b"claimed")
+
+    @misc.cachedproperty
+    def notify_key(self):
+        """Channel where job posting/removal notifications are published."""
+        return self.join(b"notifications")
+
     @property
     def job_count(self):
+        if self._notify:
+            return len(self._known_jobs)
         with _translate_failures():
             return self._client.hlen(self.listings_key)
 
@@ -681,6 +932,12 @@ return cmsgpack.pack(result)
                     'unknown_owner': self.SCRIPT_UNKNOWN_OWNER,
                     'unknown_job': self.SCRIPT_UNKNOWN_JOB,
                     'already_claimed': self.SCRIPT_ALREADY_CLAIMED,
+                    'already_posted': self.SCRIPT_ALREADY_POSTED,
+
+                    # Notification events (and how they are combined).
+                    'posted': misc.binary_decode(self.NOTIFY_POSTED),
+                    'removed': misc.binary_decode(self.NOTIFY_REMOVED),
+                    'sep': misc.binary_decode(self.NOTIFY_SEP),
                 }
                 prepared_scripts = {}
                 for n, raw_script_tpl in six.iteritems(self.SCRIPT_TEMPLATES):
@@ -689,10 +946,25 @@ return cmsgpack.pack(result)
                     script = self._client.register_script(script_blob)
                     prepared_scripts[n] = script
                 self._scripts.update(prepared_scripts)
-                self._closed = False
+        if self._notify:
+            # Subscribe (and do the initial full fetch) before returning so
+            # that the local cache is populated once connected...
+            pubsub = self._subscribe()
+            self._listener_death.clear()
+            self._listener = threading_utils.daemon_thread(
+                self._listen, pubsub)
+            self._listener.start()
+        self._closed = False
 
     @fasteners.locked(lock='_open_close_lock')
     def close(self):
+        if self._listener is not None:
+            self._listener_death.set()
+            self._listener.join()
+            self._listener = None
+        with self._job_cond:
+            self._known_jobs.clear()
+        self.lease_manager.clear()
         if self._owns_client:
             self._client.close()
         self._scripts.clear()
@@ -749,19 +1021,108 @@ return cmsgpack.pack(result)
         with _translate_failures():
             raw_posting = self._dumps(posting)
             raw_job_uuid = six.b(job_uuid)
-            was_posted = bool(self._client.hsetnx(self.listings_key,
-                                                  raw_job_uuid, raw_posting))
+            if self._notify:
+                script = self._get_script('post')
+                raw_result = script(keys=[self.listings_key, self.notify_key],
+                                    args=[raw_job_uuid, raw_posting])
+                result = self._loads(raw_result)
+                was_posted = result['status'] == self.SCRIPT_STATUS_OK
+            else:
+                was_posted = bool(self._client.hsetnx(self.listings_key,
+                                                      raw_job_uuid,
+                                                      raw_posting))
             if not was_posted:
                 raise exc.JobFailure("New job located at '%s[%s]' could not"
                                      " be posted" % (self.listings_key,
                                                      raw_job_uuid))
             else:
-                return RedisJob(self, name, sequence, raw_job_uuid,
-                                uuid=job_uuid, details=details,
-                                created_on=posting['created_on'],
-                                book=book, book_data=posting.get('book'),
-                                backend=self._persistence,
-                                priority=job_priority)
+                job = RedisJob(self, name, sequence, raw_job_uuid,
+                               uuid=job_uuid, details=details,
+                               created_on=posting['created_on'],
+                               book=book, book_data=posting.get('book'),
+                               backend=self._persistence,
+                               priority=job_priority)
+                if self._notify:
+                    # Make it visible locally right away (instead of waiting
+                    # for our own notification to come back to us).
+                    self._add_job(job)
+                return job
+
+    def post_many(self, postings):
+        """Creates and posts many jobs to the jobboard.
+
+        All the jobs sequence numbers are allocated using a single ``INCRBY``
+        and all of the jobs are then posted using a single lua script call,
+        so either all of the jobs are posted or none of them are (if a
+        failure happens the allocated sequence numbers are skipped).
+        """
+        prepared = []
+        for posting in postings:
+            job_uuid = uuidutils.generate_uuid()
+            job_priority = base.JobPriority.convert(
+                posting.get('priority', base.JobPriority.NORMAL))
+            prepared.append((job_uuid, job_priority, posting,
+                             base.format_posting(
+                                 job_uuid, posting['name'],
+                                 created_on=timeutils.utcnow(),
+                                 book=posting.get('book'),
+                                 details=posting.get('details'),
+                                 priority=job_priority)))
+        if not prepared:
+            return []
+        script = self._get_script('post_many')
+        keys = [self.listings_key]
+        if self._notify:
+            keys.append(self.notify_key)
+        with _translate_failures():
+            last_sequence = self._client.incrby(self.sequence_key,
+                                                len(prepared))
+        sequence = last_sequence - len(prepared)
+        args = []
+        for _job_uuid, _job_priority, _posting, job_posting in prepared:
+            sequence += 1
+            job_posting['sequence'] = sequence
+        with _translate_failures():
+            for job_uuid, _job_priority, _posting, job_posting in prepared:
+                args.extend([six.b(job_uuid), self._dumps(job_posting)])
+            raw_result = script(keys=keys, args=args)
+            result = self._loads(raw_result)
+        if result['status'] != self.SCRIPT_STATUS_OK:
+            raise exc.JobFailure("New jobs located at '%s' could not be"
+                                 " posted (reason=%s)"
+                                 % (self.listings_key, result.get('reason')))
+        jobs = []
+        for job_uuid, job_priority, posting, job_posting in prepared:
+            job = RedisJob(self, posting['name'], job_posting['sequence'],
+                           six.b(job_uuid), uuid=job_uuid,
+                           details=posting.get('details'),
+                           created_on=job_posting['created_on'],
+                           book=posting.get('book'),
+                           book_data=job_posting.get('book'),
+                           backend=self._persistence,
+                           priority=job_priority)
+            if self._notify:
+                self._add_job(job)
+            jobs.append(job)
+        return jobs
+
+    def _wait_notified(self, timeout=None):
+        watch = timeutils.StopWatch(duration=timeout)
+        watch.start()
+        with self._job_cond:
+            while not self._known_jobs:
+                if watch.expired():
+                    raise exc.NotFound("Expired waiting for jobs to"
+                                       " arrive; waited %s seconds"
+                                       % watch.elapsed())
+                # The given timeout can not be directly provided to the
+                # condition variable (since we may be spuriously awoken), so
+                # we must recalculate the amount of time we really have left.
+                self._job_cond.wait(watch.leftover(return_none=True))
+            curr_jobs = sorted(six.itervalues(self._known_jobs),
+                               reverse=True)
+        return base.JobBoardIterator(
+            self, LOG, board_fetch_func=lambda ensure_fresh: curr_jobs)
 
     def wait(self, timeout=None, initial_delay=0.005,
              max_delay=1.0, sleep_func=time.sleep):
@@ -769,10 +1130,11 @@ return cmsgpack.pack(result)
             raise ValueError("Initial delay %s must be less than or equal"
                              " to the provided max delay %s"
                              % (initial_delay, max_delay))
+        if self._notify:
+            return self._wait_notified(timeout=timeout)
         # This does a spin-loop that backs off by doubling the delay
-        # up to the provided max-delay. In the future we could try having
-        # a secondary client connected into redis pubsub and use that
-        # instead, but for now this is simpler.
+        # up to the provided max-delay (when notifications are enabled the
+        # local job cache is waited on instead).
         w = timeutils.StopWatch(duration=timeout)
         w.start()
         delay = initial_delay
@@ -796,43 +1158,176 @@ return cmsgpack.pack(result)
                     delay = min(delay * 2, max_delay)
                 sleep_func(delay)
 
-    def _fetch_jobs(self):
+    def _load_job(self, raw_job_key, raw_posting):
+        job_data = self._loads(raw_posting)
+        try:
+            job_priority = job_data['priority']
+            job_priority = base.JobPriority.convert(job_priority)
+        except KeyError:
+            job_priority = base.JobPriority.NORMAL
+        job_created_on = job_data['created_on']
+        job_uuid = job_data['uuid']
+        job_name = job_data['name']
+        job_sequence_id = job_data['sequence']
+        job_details = job_data.get('details', {})
+        return RedisJob(self, job_name, job_sequence_id,
+                        raw_job_key, uuid=job_uuid,
+                        details=job_details,
+                        created_on=job_created_on,
+                        book_data=job_data.get('book'),
+                        backend=self._persistence,
+                        priority=job_priority)
+
+    def _scan_jobs(self):
         with _translate_failures():
             raw_postings = self._client.hgetall(self.listings_key)
-        postings = []
+        jobs = {}
         for raw_job_key, raw_posting in six.iteritems(raw_postings):
             try:
-                job_data = self._loads(raw_posting)
-                try:
-                    job_priority = job_data['priority']
-                    job_priority = base.JobPriority.convert(job_priority)
-                except KeyError:
-                    job_priority = base.JobPriority.NORMAL
-                job_created_on = job_data['created_on']
-                job_uuid = job_data['uuid']
-                job_name = job_data['name']
-                job_sequence_id = job_data['sequence']
-                job_details = job_data.get('details', {})
+                jobs[raw_job_key] = self._load_job(raw_job_key, raw_posting)
             except (ValueError, TypeError, KeyError):
                 with excutils.save_and_reraise_exception():
                     LOG.warning("Incorrectly formatted job data found at"
                                 " key: %s[%s]", self.listings_key,
                                 raw_job_key, exc_info=True)
+        return jobs
+
+    def _fetch_jobs(self, ensure_fresh=False):
+        if self._notify and not ensure_fresh:
+            with self._job_cond:
+                jobs = list(six.itervalues(self._known_jobs))
+        else:
+            jobs = list(six.itervalues(self._scan_jobs()))
+        return sorted(jobs, reverse=True)
+
+    def _add_job(self, job):
+        with self._job_cond:
+            self._known_jobs[job.key] = job
+            self._job_cond.notify_all()
+
+    def _remove_job(self, raw_job_key):
+        with self._job_cond:
+            self._known_jobs.pop(raw_job_key, None)
+
+    def _on_notification(self, data):
+        event, _sep, data = data.partition(self.NOTIFY_SEP)
+        if event == self.NOTIFY_POSTED:
+            raw_job_key, _sep, raw_posting = data.partition(self.NOTIFY_SEP)
+            try:
+                job = self._load_job(raw_job_key, raw_posting)
+            except (exc.JobFailure, ValueError, TypeError, KeyError):
+                LOG.warning("Incorrectly formatted job data found in"
+                            " notification about key: %s[%s]",
+                            self.listings_key, raw_job_key, exc_info=True)
             else:
-                postings.append(RedisJob(self, job_name, job_sequence_id,
-                                         raw_job_key, uuid=job_uuid,
-                                         details=job_details,
-                                         created_on=job_created_on,
-                                         book_data=job_data.get('book'),
-                                         backend=self._persistence,
-                                         priority=job_priority))
-        return sorted(postings, reverse=True)
+                self._add_job(job)
+        elif event == self.NOTIFY_REMOVED:
+            self._remove_job(data)
+        else:
+            LOG.warning("Unknown notification event '%s' received on"
+                        " channel '%s'", event, self.notify_key)
+
+    def _resync(self):
+        jobs = self._scan_jobs()
+        with self._job_cond:
+            self._known_jobs = jobs
+            self._job_cond.notify_all()
+
+    def _subscribe(self):
+        with _translate_failures():
+            pubsub = self._client.pubsub()
+            try:
+                pubsub.subscribe(self.notify_key)
+                # NOTE: the full fetch must only happen after the
+                # subscription is active (otherwise notifications sent
+                # in-between could be missed); any notifications received
+                # after that fetch are applied in order after it (and they
+                # are all idempotent) so the cache will then be consistent.
+                message = pubsub.get_message(
+                    timeout=self.NOTIFY_MAX_RETRY_DELAY)
+                if not message or message['type'] != 'subscribe':
+                    raise exc.JobFailure("Subscription to notification"
+                                         " channel '%s' was not"
+                                         " confirmed" % self.notify_key)
+                self._resync()
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    pubsub.close()
+        return pubsub
+
+    def _listen(self, pubsub):
+        delay = self.NOTIFY_POLL_DELAY
+        while not self._listener_death.is_set():
+            if pubsub is None:
+                try:
+                    pubsub = self._subscribe()
+                except (exc.JobFailure, ValueError, TypeError, KeyError):
+                    LOG.warning("Failed subscribing to notification"
+                                " channel '%s', retrying in %s seconds",
+                                self.notify_key, delay, exc_info=True)
+                    self._listener_death.wait(delay)
+                    delay = min(delay * 2, self.NOTIFY_MAX_RETRY_DELAY)
+                    continue
+                else:
+                    delay = self.NOTIFY_POLL_DELAY
+            try:
+                with _translate_failures():
+                    message = pubsub.get_message(
+                        timeout=self.NOTIFY_POLL_DELAY)
+                    if not message:
+                        continue
+                    if message['type'] == 'subscribe':
+                        # The client transparently reconnected (and
+                        # resubscribed) so notifications may have been
+                        # missed in the meantime, fetch everything again...
+                        self._resync()
+                    elif message['type'] == 'message':
+                        self._on_notification(message['data'])
+            except (exc.JobFailure, ValueError, TypeError, KeyError):
+                if not self._listener_death.is_set():
+                    LOG.warning("Lost connection to notification channel"
+                                " '%s', resubscribing", self.notify_key,
+                                exc_info=True)
+                pubsub.close()
+                pubsub = None
+        if pubsub is not None:
+            pubsub.close()
+
+    def _filter_unclaimed(self, jobs):
+        # NOTE: the claimed set is maintained by the lua scripts
+        # (so it only contains jobs that were claimed and not yet abandoned,
+        # consumed or trashed); claims can expire though so the owner keys
+        # of the (typically few) jobs in it are checked to see if they still
+        # exist (jobs claimed by boards that do not maintain this set will
+        # not be filtered out, the state check done afterwards will).
+        with _translate_failures():
+            claimed_keys = self._client.smembers(self.claimed_key)
+            maybe_claimed = [job for job in jobs if job.key in claimed_keys]
+            if not maybe_claimed:
+                return jobs
+            pipe = self._client.pipeline(transaction=False)
+            for job in maybe_claimed:
+                pipe.exists(job.owner_key)
+            claimed = set()
+            for job, owner_exists in zip(maybe_claimed, pipe.execute()):
+                if owner_exists:
+                    claimed.add(job.key)
+        return [job for job in jobs if job.key not in claimed]
+
+    def _make_claim_monitor(self):
+        interval = self._conf.get('claim_check_interval',
+                                  base.ClaimMonitor.DEFAULT_INTERVAL)
+        return RedisClaimMonitor(self, interval=interval)
+
+    def _make_lease_manager(self):
+        return RedisLeaseManager(self)
 
     def iterjobs(self, only_unclaimed=False, ensure_fresh=False):
         return base.JobBoardIterator(
             self, LOG, only_unclaimed=only_unclaimed,
             ensure_fresh=ensure_fresh,
-            board_fetch_func=lambda ensure_fresh: self._fetch_jobs())
+            board_fetch_func=self._fetch_jobs,
+            board_unclaimed_func=self._filter_unclaimed)
 
     def register_entity(self, entity):
         # Will implement a redis jobboard conductor register later
@@ -841,14 +1336,20 @@ return cmsgpack.pack(result)
     @base.check_who
     def consume(self, job, who):
         script = self._get_script('consume')
+        keys = [job.owner_key, self.listings_key, job.last_modified_key,
+                self.claimed_key]
+        if self._notify:
+            keys.append(self.notify_key)
         with _translate_failures():
             raw_who = self._encode_owner(who)
-            raw_result = script(keys=[job.owner_key, self.listings_key,
-                                      job.last_modified_key],
-                                args=[raw_who, job.key])
+            raw_result = script(keys=keys, args=[raw_who, job.key])
             result = self._loads(raw_result)
         status = result['status']
-        if status != self.SCRIPT_STATUS_OK:
+        if status == self.SCRIPT_STATUS_OK:
+            self.lease_manager.remove(job)
+            if self._notify:
+                self._remove_job(job.key)
+        else:
             reason = result.get('reason')
             if reason == self.SCRIPT_UNKNOWN_JOB:
                 raise exc.NotFound("Job %s not found to be"
@@ -891,7 +1392,8 @@ return cmsgpack.pack(result)
         with _translate_failures():
             raw_who = self._encode_owner(who)
             raw_result = script(keys=[job.owner_key, self.listings_key,
-                                      job.last_modified_key],
+                                      job.last_modified_key,
+                                      self.claimed_key],
                                 args=[raw_who, job.key,
                                       # NOTE(harlowja): we need to send this
                                       # in as a blob (even if it's not
@@ -901,7 +1403,10 @@ return cmsgpack.pack(result)
                                       ms_expiry])
             result = self._loads(raw_result)
         status = result['status']
-        if status != self.SCRIPT_STATUS_OK:
+        if status == self.SCRIPT_STATUS_OK:
+            if expiry is not None and self._renew_claims:
+                self.lease_manager.add(job, who, expiry)
+        else:
             reason = result.get('reason')
             if reason == self.SCRIPT_UNKNOWN_JOB:
                 raise exc.NotFound("Job %s not found to be"
@@ -921,18 +1426,62 @@ return cmsgpack.pack(result)
                                      " unknown internal error (reason=%s)"
                                      % (job.uuid, reason))
 
+    @base.check_who
+    def claim_many(self, jobs, who, limit=None, expiry=None):
+        if expiry is None:
+            ms_expiry = "none"
+        else:
+            ms_expiry = int(expiry * 1000.0)
+            if ms_expiry <= 0:
+                raise ValueError("Provided expiry (when converted to"
+                                 " milliseconds) must be greater"
+                                 " than zero instead of %s" % (expiry))
+        jobs = list(jobs)
+        if limit is None:
+            limit = len(jobs)
+        if not jobs or limit <= 0:
+            return []
+        script = self._get_script('claim_many')
+        keys = [self.listings_key, self.claimed_key]
+        args = [self._encode_owner(who),
+                self._dumps(timeutils.utcnow()),
+                ms_expiry, limit]
+        for job in jobs:
+            keys.extend([job.owner_key, job.last_modified_key])
+            args.append(job.key)
+        with _translate_failures():
+            raw_result = script(keys=keys, args=args)
+            result = self._loads(raw_result)
+        status = result['status']
+        if status != self.SCRIPT_STATUS_OK:
+            raise exc.JobFailure("Failure to claim %s jobs, unknown internal"
+                                 " error (reason=%s)"
+                                 % (len(jobs), result.get('reason')))
+        # NOTE: an empty lua table is packed as an empty map (and
+        # not an empty list), so this handles that as well.
+        claimed_keys = set(misc.binary_encode(key)
+                           for key in (result.get('claimed') or []))
+        claimed = [job for job in jobs if job.key in claimed_keys]
+        if expiry is not None and self._renew_claims:
+            for job in claimed:
+                self.lease_manager.add(job, who, expiry)
+        return claimed
+
     @base.check_who
     def abandon(self, job, who):
         script = self._get_script('abandon')
         with _translate_failures():
             raw_who = self._encode_owner(who)
             raw_result = script(keys=[job.owner_key, self.listings_key,
-                                      job.last_modified_key],
+                                      job.last_modified_key,
+                                      self.claimed_key],
                                 args=[raw_who, job.key,
                                       self._dumps(timeutils.utcnow())])
             result = self._loads(raw_result)
         status = result.get('status')
-        if status != self.SCRIPT_STATUS_OK:
+        if status == self.SCRIPT_STATUS_OK:
+            self.lease_manager.remove(job)
+        else:
             reason = result.get('reason')
             if reason == self.SCRIPT_UNKNOWN_JOB:
                 raise exc.NotFound("Job %s not found to be"
@@ -970,15 +1519,22 @@ return cmsgpack.pack(result)
     @base.check_who
     def trash(self, job, who):
         script = self._get_script('trash')
+        keys = [job.owner_key, self.listings_key,
+                job.last_modified_key, self.trash_key, self.claimed_key]
+        if self._notify:
+            keys.append(self.notify_key)
         with _translate_failures():
             raw_who = self._encode_owner(who)
-            raw_result = script(keys=[job.owner_key, self.listings_key,
-                                      job.last_modified_key, self.trash_key],
+            raw_result = script(keys=keys,
                                 args=[raw_who, job.key,
                                       self._dumps(timeutils.utcnow())])
             result = self._loads(raw_result)
         status = result['status']
-        if status != self.SCRIPT_STATUS_OK:
+        if status == self.SCRIPT_STATUS_OK:
+            self.lease_manager.remove(job)
+            if self._notify:
+                self._remove_job(job.key)
+        else:
             reason = result.get('reason')
             if reason == self.SCRIPT_UNKNOWN_JOB:
                 raise exc.NotFound("Job %s not found to be"
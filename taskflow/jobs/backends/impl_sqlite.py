@@ -0,0 +1,572 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import functools
+import sqlite3
+import threading
+import time
+
+import fasteners
+from oslo_serialization import jsonutils
+from oslo_utils import strutils
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+
+from taskflow import exceptions as exc
+from taskflow.jobs import base
+from taskflow import logging
+from taskflow import states
+from taskflow.utils import misc
+
+LOG = logging.getLogger(__name__)
+
+
+def _now():
+    # NOTE: claims are shared across processes (that all use the
+    # same database file) so this must be the (wall clock) time, and not a
+    # monotonic one that is only valid in a single process.
+    return int(time.time() * 1000)
+
+
+@contextlib.contextmanager
+def _translate_failures():
+    """Translates common sqlite exceptions into taskflow exceptions."""
+    try:
+        yield
+    except sqlite3.Error:
+        exc.raise_with_cause(exc.JobFailure, "Failed to communicate with"
+                             " the sqlite database")
+
+
+class SqliteJob(base.Job):
+    """A sqlite job."""
+
+    def __init__(self, board, name, sequence,
+                 uuid=None, details=None, backend=None,
+                 book=None, book_data=None, created_on=None,
+                 priority=base.JobPriority.NORMAL):
+        super(SqliteJob, self).__init__(board, name, uuid=uuid,
+                                        details=details, backend=backend,
+                                        book=book, book_data=book_data)
+        self._sequence = sequence
+        self._created_on = created_on
+        self._priority = priority
+
+    @property
+    def sequence(self):
+        """Sequence number of the current job."""
+        return self._sequence
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @property
+    def created_on(self):
+        return self._created_on
+
+    @property
+    def last_modified(self):
+        with self.board._cursor() as cursor:
+            cursor.execute("SELECT last_modified FROM jobs WHERE uuid = ?",
+                           [self.uuid])
+            row = cursor.fetchone()
+        if row is None or row[0] is None:
+            return None
+        return misc.millis_to_datetime(row[0])
+
+    @property
+    def state(self):
+        with self.board._cursor() as cursor:
+            row = self.board._fetch_claim(cursor, self)
+        if row is None:
+            # No row, this job has been completed (or trashed).
+            return states.COMPLETE
+        if row[0] is None:
+            return states.UNCLAIMED
+        return states.CLAIMED
+
+    def expires_in(self):
+        """How many seconds until the claim expires.
+
+        Returns ``None`` if the job is not claimed or its claim does not
+        expire.
+        """
+        with self.board._cursor() as cursor:
+            cursor.execute("SELECT expires_at FROM jobs WHERE uuid = ?"
+                           " AND owner IS NOT NULL", [self.uuid])
+            row = cursor.fetchone()
+        if row is None or row[0] is None:
+            return None
+        return max(0.0, (row[0] - _now()) / 1000.0)
+
+    def extend_expiry(self, expiry):
+        """Extends the claim expiry for this job.
+
+        Returns ``True`` if the claim expiry was extended otherwise
+        ``False`` (the job is not, or is no longer, claimed).
+        """
+        ms_expiry = self.board._convert_expiry(expiry)
+        now = _now()
+        with self.board._cursor() as cursor:
+            cursor.execute("UPDATE jobs SET expires_at = ? WHERE uuid = ?"
+                           " AND owner IS NOT NULL AND"
+                           " (expires_at IS NULL OR expires_at > ?)",
+                           [now + ms_expiry, self.uuid, now])
+            return cursor.rowcount == 1
+
+    def __lt__(self, other):
+        if not isinstance(other, SqliteJob):
+            return NotImplemented
+        if self.board.path == other.board.path:
+            return ((base.JobPriority.rank(self.priority), self.sequence) <
+                    (base.JobPriority.rank(other.priority), other.sequence))
+        else:
+            # Different jobboards with different database paths...
+            return self.board.path < other.board.path
+
+    def __eq__(self, other):
+        if not isinstance(other, SqliteJob):
+            return NotImplemented
+        return ((self.board.path, self.sequence) ==
+                (other.board.path, other.sequence))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.board.path, self.sequence))
+
+
+class SqliteLeaseManager(base.LeaseManager):
+    """Renews claims by extending their expiry in a single transaction."""
+
+    def _renew_leases(self, leases):
+        now = _now()
+        failed = []
+        with self._board._cursor(transaction=True) as cursor:
+            for lease in leases:
+                cursor.execute("UPDATE jobs SET expires_at = ? WHERE"
+                               " uuid = ? AND owner = ? AND"
+                               " (expires_at IS NULL OR expires_at > ?)",
+                               [now + int(lease.expiry * 1000.0),
+                                lease.job.uuid, lease.owner, now])
+                if cursor.rowcount != 1:
+                    failed.append(lease)
+        return failed
+
+
+class SqliteJobBoard(base.JobBoard):
+    """A jobboard backed by a `sqlite`_ database (file).
+
+    This jobboard is meant for single host deployments (where running an
+    external coordination service is not desired), all of the boards (in
+    one or more processes) that use the same database file share the same
+    jobs. Jobs are rows in a ``jobs`` table (ordered by priority and then
+    by their sequence number, which is the rows primary key) and claims are
+    stored in the same row (the owner and when the claim expires, if it
+    does); all changes to claims are done using (transactional) row updates
+    that only succeed if the row is in the expected state (so only one
+    entity will ever successfully claim a job, even across processes).
+
+    Waiting for jobs to arrive is done by polling a change counter (the
+    ``data_version`` pragma, which changes when other connections commit
+    changes to the database) and only querying for jobs when it changed.
+
+    Claims made with an expiry are (by default) renewed by the boards
+    :py:attr:`~taskflow.jobs.base.JobBoard.lease_manager` until they are
+    consumed, abandoned or trashed, so that they only expire when the entity
+    that holds them goes away (and not while it is still working on them).
+
+    .. _sqlite: https://www.sqlite.org/
+    """
+
+    #: Default number of seconds to wait for other connections to release
+    #: their locks on the database (before failing).
+    DEFAULT_TIMEOUT = 10.0
+
+    #: Statements that create the tables (and indexes) that this board uses.
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        " sequence INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " uuid TEXT NOT NULL UNIQUE,"
+        " name TEXT NOT NULL,"
+        " priority INTEGER NOT NULL,"
+        " posting TEXT NOT NULL,"
+        " created_on INTEGER NOT NULL,"
+        " last_modified INTEGER,"
+        " owner TEXT,"
+        " expires_at INTEGER)",
+        # This makes fetching the next (highest priority, oldest) jobs a
+        # scan of this index (instead of a scan and sort of the table).
+        "CREATE INDEX IF NOT EXISTS jobs_by_priority"
+        " ON jobs (priority, sequence)",
+        "CREATE TABLE IF NOT EXISTS trash ("
+        " uuid TEXT PRIMARY KEY,"
+        " sequence INTEGER NOT NULL,"
+        " name TEXT NOT NULL,"
+        " priority INTEGER NOT NULL,"
+        " posting TEXT NOT NULL,"
+        " created_on INTEGER NOT NULL,"
+        " trashed_on INTEGER NOT NULL)",
+    )
+
+    # Rows whose claim (if any) has expired are unclaimed.
+    _UNCLAIMED = ("(owner IS NULL OR"
+                  " (expires_at IS NOT NULL AND expires_at <= ?))")
+
+    def __init__(self, name, conf, persistence=None):
+        super(SqliteJobBoard, self).__init__(name, conf)
+        path = self._conf.get('path')
+        if not path:
+            raise ValueError("A sqlite database path is required")
+        self._path = path
+        self._timeout = float(self._conf.get('timeout',
+                                             self.DEFAULT_TIMEOUT))
+        # Claims (made with an expiry) are renewed by the lease manager
+        # when this is enabled.
+        self._renew_claims = strutils.bool_from_string(
+            self._conf.get('renew_claims', True))
+        self._conn = None
+        # The connection is shared by all threads (but only used by one of
+        # them at a time).
+        self._lock = threading.RLock()
+        self._open_close_lock = threading.RLock()
+        # Changes made using our connection do not change the data version
+        # (as seen by our connection), so we count those ourselves.
+        self._local_changes = 0
+        # The backend to load the full logbooks from, since what is stored
+        # in the database is only the logbook uuid and name, and not the
+        # full logbook.
+        self._persistence = persistence
+
+    @property
+    def path(self):
+        """Path of the sqlite database (file) jobs are stored in."""
+        return self._path
+
+    @property
+    def connected(self):
+        return self._conn is not None
+
+    @fasteners.locked(lock='_open_close_lock')
+    def connect(self):
+        self.close()
+        with _translate_failures():
+            conn = sqlite3.connect(self._path, timeout=self._timeout,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+            try:
+                # Allows readers to not be blocked by writers (and the
+                # reverse), which other processes will appreciate.
+                conn.execute("PRAGMA journal_mode=WAL")
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            except sqlite3.Error:
+                conn.close()
+                raise
+        with self._lock:
+            self._conn = conn
+
+    @fasteners.locked(lock='_open_close_lock')
+    def close(self):
+        self.lease_manager.clear()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @contextlib.contextmanager
+    def _cursor(self, transaction=False):
+        with self._lock:
+            if self._conn is None:
+                raise exc.JobFailure("Can not access the sqlite database"
+                                     " (has this board been connected?)")
+            with _translate_failures():
+                cursor = self._conn.cursor()
+                try:
+                    if transaction:
+                        # Take the write lock now (instead of when the first
+                        # write happens) so that what is read in the
+                        # transaction can not change underneath it.
+                        cursor.execute("BEGIN IMMEDIATE")
+                        try:
+                            yield cursor
+                        except Exception:
+                            try:
+                                cursor.execute("ROLLBACK")
+                            except sqlite3.Error:
+                                LOG.warning("Failed rolling back",
+                                            exc_info=True)
+                            raise
+                        else:
+                            cursor.execute("COMMIT")
+                        self._local_changes += 1
+                    else:
+                        yield cursor
+                        if cursor.rowcount > 0:
+                            self._local_changes += 1
+                finally:
+                    cursor.close()
+
+    @staticmethod
+    def _convert_expiry(expiry):
+        ms_expiry = int(expiry * 1000.0)
+        if ms_expiry <= 0:
+            raise ValueError("Provided expiry (when converted to"
+                             " milliseconds) must be greater"
+                             " than zero instead of %s" % (expiry))
+        return ms_expiry
+
+    def _fetch_claim(self, cursor, job):
+        """Returns the (owner, expires_at) row of a job (or ``None``).
+
+        The owner will be ``None`` if the job is not (or no longer) claimed.
+        """
+        cursor.execute("SELECT owner, expires_at FROM jobs WHERE uuid = ?",
+                       [job.uuid])
+        row = cursor.fetchone()
+        if row is not None:
+            owner, expires_at = row
+            if expires_at is not None and expires_at <= _now():
+                owner = None
+            row = (owner, expires_at)
+        return row
+
+    def _check_owner(self, cursor, job, who, action, past_action):
+        row = self._fetch_claim(cursor, job)
+        if row is None:
+            raise exc.NotFound("Job %s not found to be %s"
+                               % (job.uuid, past_action))
+        owner = row[0]
+        if owner is None:
+            raise exc.NotFound("Can not %s job %s which we can not"
+                               " determine the owner of"
+                               % (action, job.uuid))
+        if owner != who:
+            raise exc.JobFailure("Can not %s job %s which is not owned by"
+                                 " %s (it is actively owned by %s)"
+                                 % (action, job.uuid, who, owner))
+
+    def _load_job(self, row):
+        sequence, job_uuid, name, priority, raw_posting, created_on = row
+        posting = jsonutils.loads(raw_posting)
+        return SqliteJob(self, name, sequence, uuid=job_uuid,
+                         details=posting.get('details'),
+                         book_data=posting.get('book'),
+                         created_on=misc.millis_to_datetime(created_on),
+                         backend=self._persistence,
+                         priority=base.JobPriority.convert(
+                             posting['priority']))
+
+    def _fetch_jobs(self, ensure_fresh=False, only_unclaimed=False,
+                    limit=None):
+        # NOTE: nothing is cached locally, so every fetch is a
+        # fresh one...
+        query = ("SELECT sequence, uuid, name, priority, posting, created_on"
+                 " FROM jobs")
+        args = []
+        if only_unclaimed:
+            query += " WHERE " + self._UNCLAIMED
+            args.append(_now())
+        query += " ORDER BY priority, sequence"
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+        with self._cursor() as cursor:
+            cursor.execute(query, args)
+            rows = cursor.fetchall()
+        return [self._load_job(row) for row in rows]
+
+    def next_unclaimed(self, limit=1):
+        """Returns the next (highest priority, oldest) unclaimed jobs."""
+        return self._fetch_jobs(only_unclaimed=True, limit=limit)
+
+    @property
+    def job_count(self):
+        with self._cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM jobs")
+            return cursor.fetchone()[0]
+
+    def iterjobs(self, only_unclaimed=False, ensure_fresh=False):
+        return base.JobBoardIterator(
+            self, LOG, only_unclaimed=only_unclaimed,
+            ensure_fresh=ensure_fresh,
+            board_fetch_func=functools.partial(
+                self._fetch_jobs, only_unclaimed=only_unclaimed))
+
+    def _make_lease_manager(self):
+        return SqliteLeaseManager(self)
+
+    def _change_version(self):
+        with self._cursor() as cursor:
+            cursor.execute("PRAGMA data_version")
+            return (cursor.fetchone()[0], self._local_changes)
+
+    def wait(self, timeout=None, initial_delay=0.005,
+             max_delay=1.0, sleep_func=time.sleep):
+        if initial_delay > max_delay:
+            raise ValueError("Initial delay %s must be less than or equal"
+                             " to the provided max delay %s"
+                             % (initial_delay, max_delay))
+        # This does a spin-loop that backs off by doubling the delay
+        # up to the provided max-delay (the jobs are only queried for when
+        # the database has changed since the last time they were).
+        w = timeutils.StopWatch(duration=timeout)
+        w.start()
+        delay = initial_delay
+        last_version = None
+        while True:
+            version = self._change_version()
+            if version != last_version:
+                last_version = version
+                curr_jobs = self._fetch_jobs()
+                if curr_jobs:
+                    return base.JobBoardIterator(
+                        self, LOG,
+                        board_fetch_func=lambda ensure_fresh: curr_jobs)
+            if w.expired():
+                raise exc.NotFound("Expired waiting for jobs to"
+                                   " arrive; waited %s seconds"
+                                   % w.elapsed())
+            else:
+                remaining = w.leftover(return_none=True)
+                if remaining is not None:
+                    delay = min(delay * 2, remaining, max_delay)
+                else:
+                    delay = min(delay * 2, max_delay)
+                sleep_func(delay)
+
+    def find_owner(self, job):
+        with self._cursor() as cursor:
+            row = self._fetch_claim(cursor, job)
+        if row is None:
+            return None
+        return row[0]
+
+    def _insert_job(self, cursor, name, book=None, details=None,
+                    priority=base.JobPriority.NORMAL):
+        job_uuid = uuidutils.generate_uuid()
+        job_priority = base.JobPriority.convert(priority)
+        posting = base.format_posting(job_uuid, name, book=book,
+                                      details=details, priority=job_priority)
+        created_on = _now()
+        cursor.execute("INSERT INTO jobs (uuid, name, priority, posting,"
+                       " created_on, last_modified) VALUES (?, ?, ?, ?, ?, ?)",
+                       [job_uuid, name, base.JobPriority.rank(job_priority),
+                        jsonutils.dumps(posting), created_on, created_on])
+        return SqliteJob(self, name, cursor.lastrowid, uuid=job_uuid,
+                         details=details, book=book,
+                         book_data=posting.get('book'),
+                         created_on=misc.millis_to_datetime(created_on),
+                         backend=self._persistence, priority=job_priority)
+
+    def post(self, name, book=None, details=None,
+             priority=base.JobPriority.NORMAL):
+        with self._cursor() as cursor:
+            return self._insert_job(cursor, name, book=book,
+                                    details=details, priority=priority)
+
+    def post_many(self, postings):
+        """Creates and posts many jobs to the jobboard.
+
+        All of the jobs are posted in a single transaction, so either all
+        of them are posted or none of them are.
+        """
+        postings = list(postings)
+        if not postings:
+            return []
+        with self._cursor(transaction=True) as cursor:
+            return [self._insert_job(cursor, **posting)
+                    for posting in postings]
+
+    def _claim(self, cursor, job, who, expires_at):
+        now = _now()
+        cursor.execute("UPDATE jobs SET owner = ?, expires_at = ?,"
+                       " last_modified = ? WHERE uuid = ? AND " +
+                       self._UNCLAIMED,
+                       [who, expires_at, now, job.uuid, now])
+        return cursor.rowcount == 1
+
+    def _expires_at(self, expiry):
+        if expiry is None:
+            return None
+        return _now() + self._convert_expiry(expiry)
+
+    @base.check_who
+    def claim(self, job, who, expiry=None):
+        expires_at = self._expires_at(expiry)
+        with self._cursor(transaction=True) as cursor:
+            if not self._claim(cursor, job, who, expires_at):
+                row = self._fetch_claim(cursor, job)
+                if row is None:
+                    raise exc.NotFound("Job %s not found to be"
+                                       " claimed" % (job.uuid))
+                raise exc.UnclaimableJob("Job %s already claimed by %s"
+                                         % (job.uuid, row[0]))
+        if expiry is not None and self._renew_claims:
+            self.lease_manager.add(job, who, expiry)
+
+    @base.check_who
+    def claim_many(self, jobs, who, limit=None, expiry=None):
+        expires_at = self._expires_at(expiry)
+        jobs = list(jobs)
+        if limit is None:
+            limit = len(jobs)
+        if not jobs or limit <= 0:
+            return []
+        claimed = []
+        with self._cursor(transaction=True) as cursor:
+            for job in jobs:
+                if len(claimed) >= limit:
+                    break
+                if self._claim(cursor, job, who, expires_at):
+                    claimed.append(job)
+        if expiry is not None and self._renew_claims:
+            for job in claimed:
+                self.lease_manager.add(job, who, expiry)
+        return claimed
+
+    @base.check_who
+    def abandon(self, job, who):
+        with self._cursor(transaction=True) as cursor:
+            self._check_owner(cursor, job, who, 'abandon', 'abandoned')
+            cursor.execute("UPDATE jobs SET owner = NULL, expires_at = NULL,"
+                           " last_modified = ? WHERE uuid = ?",
+                           [_now(), job.uuid])
+        self.lease_manager.remove(job)
+
+    @base.check_who
+    def consume(self, job, who):
+        with self._cursor(transaction=True) as cursor:
+            self._check_owner(cursor, job, who, 'consume', 'consumed')
+            cursor.execute("DELETE FROM jobs WHERE uuid = ?", [job.uuid])
+        self.lease_manager.remove(job)
+
+    @base.check_who
+    def trash(self, job, who):
+        with self._cursor(transaction=True) as cursor:
+            self._check_owner(cursor, job, who, 'trash', 'trashed')
+            cursor.execute("INSERT OR REPLACE INTO trash (uuid, sequence,"
+                           " name, priority, posting, created_on,"
+                           " trashed_on) SELECT uuid, sequence, name,"
+                           " priority, posting, created_on, ? FROM jobs"
+                           " WHERE uuid = ?", [_now(), job.uuid])
+            cursor.execute("DELETE FROM jobs WHERE uuid = ?", [job.uuid])
+        self.lease_manager.remove(job)
+
+    def register_entity(self, entity):
+        # Will implement a sqlite jobboard conductor register later
+        pass
@@ -50,11 +50,14 @@ class ZookeeperJob(base.Job):
     def __init__(self, board, name, client, path,
                  uuid=None, details=None, book=None, book_data=None,
                  created_on=None, backend=None,
-                 priority=base.JobPriority.NORMAL):
+                 priority=base.JobPriority.NORMAL, raw_data=None):
         super(ZookeeperJob, self).__init__(board, name,
                                            uuid=uuid, details=details,
                                            backend=backend,
                                            book=book, book_data=book_data)
+        # When provided the details and book data are only decoded from
+        # this (raw job posting) on first access.
+        self._raw_data = raw_data
         self._client = client
         self._path = k_paths.normpath(path)
         self._lock_path = self._path + board.LOCK_POSTFIX
@@ -79,6 +82,29 @@ class ZookeeperJob(base.Job):
         """Path the job data znode is stored."""
         return self._path
 
+    def _decode_raw_data(self):
+        raw_data = self._raw_data
+        if raw_data is not None:
+            job_data = misc.decode_json(raw_data)
+            self._details = job_data.get("details") or {}
+            self._book_data = job_data.get("book") or {}
+            self._raw_data = None
+
+    @property
+    def details(self):
+        self._decode_raw_data()
+        return super(ZookeeperJob, self).details
+
+    @property
+    def book_uuid(self):
+        self._decode_raw_data()
+        return super(ZookeeperJob, self).book_uuid
+
+    @property
+    def book_name(self):
+        self._decode_raw_data()
+        return super(ZookeeperJob, self).book_name
+
     @property
     def sequence(self):
         """Sequence number of the current job."""
@@ -208,6 +234,50 @@ class ZookeeperJob(base.Job):
         return hash(self.path)
 
 
+class ZookeeperClaimMonitor(base.ClaimMonitor):
+    """Monitors claims using data watches on the jobs lock nodes.
+
+    Since claims (lock nodes) are ephemeral they are lost when the session
+    that created them expires (in which case all watched claims are marked
+    as lost) or when the lock node is deleted (or changed to a different
+    owner), which the data watches are notified about (so no periodic
+    checking is done).
+    """
+
+    def __init__(self, board, client):
+        super(ZookeeperClaimMonitor, self).__init__(board)
+        self._client = client
+
+    def _on_lock_change(self, watch, data, stat):
+        if watch not in self._watches:
+            # Returning false stops the data watch (no longer needed).
+            return False
+        lost = False
+        if data is None:
+            lost = True
+        else:
+            try:
+                lost = misc.decode_json(data).get("owner") != watch.owner
+            except ValueError:
+                lost = True
+        if lost:
+            watch.mark_lost()
+            return False
+
+    def _start_watching(self, watch):
+        self._statistics['remote_checks'] += 1
+        watchers.DataWatch(self._client, watch.job.lock_path,
+                           func=functools.partial(self._on_lock_change,
+                                                  watch))
+
+    def on_session_lost(self):
+        """Marks all watched claims as lost (they are ephemeral)."""
+        with self._lock:
+            watches = list(self._watches)
+        for watch in watches:
+            watch.mark_lost()
+
+
 class ZookeeperJobBoard(base.NotifyingJobBoard):
     """A jobboard backed by `zookeeper`_.
 
@@ -272,6 +342,9 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
     for history tracking and debugging connectivity issues.
     """
 
+    #: Default maximum number of job postings fetched (hydrated) at once.
+    DEFAULT_MAX_HYDRATIONS = 64
+
     NO_FETCH_STATES = (k_states.KazooState.LOST, k_states.KazooState.SUSPENDED)
     """
     Client states underwhich we return empty lists from fetching routines,
@@ -303,8 +376,35 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
         # the data connection is only the logbook uuid and name, and not the
         # full logbook.
         self._persistence = persistence
+        self._max_hydrations = int(conf.get("max_hydrations",
+                                            self.DEFAULT_MAX_HYDRATIONS))
+        if self._max_hydrations < 1:
+            raise ValueError("Maximum hydrations must be greater than or"
+                             " equal to one")
+        self._max_indexed = conf.get("max_indexed")
+        if self._max_indexed is not None:
+            self._max_indexed = int(self._max_indexed)
+            if self._max_indexed < 1:
+                raise ValueError("Maximum indexed jobs must be greater than"
+                                 " or equal to one")
         # Misc. internal details
         self._known_jobs = {}
+        # Paths of the jobs waiting to be (and being) fetched/hydrated (and
+        # the time they started being fetched at), paths of the jobs that
+        # were fetched but not kept (when only the top-K jobs are indexed)
+        # and statistics about all of this.
+        self._hydrate_queue = collections.OrderedDict()
+        self._hydrating = {}
+        self._unindexed_paths = set()
+        self._hydration_statistics = {
+            'hydrated': 0,
+            'latency': 0.0,
+            'max_latency': 0.0,
+            'evicted': 0,
+        }
+        # Paths of the jobs that have a lock (aka are claimed), as seen by
+        # the children watch (since lock nodes are siblings of job nodes).
+        self._locked_paths = set()
         self._job_cond = threading.Condition()
         self._open_close_lock = threading.RLock()
         self._client.add_listener(self._state_change_listener)
@@ -354,6 +454,25 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
     def job_count(self):
         return len(self._known_jobs)
 
+    @property
+    def hydration_statistics(self):
+        """Dictionary of statistics about the fetching (hydration) of jobs.
+
+        It contains how many job postings are waiting to be fetched
+        (``queued``), are being fetched (``hydrating``) and were fetched
+        (``hydrated``), the average (``latency``) and maximum
+        (``max_latency``) number of seconds fetching a posting took (including
+        the time it spent waiting to be fetched) and, when only the top-K
+        jobs are indexed, how many jobs were dropped from the index
+        (``evicted``) and are currently not indexed (``unindexed``).
+        """
+        with self._job_cond:
+            statistics = dict(self._hydration_statistics)
+            statistics['queued'] = len(self._hydrate_queue)
+            statistics['hydrating'] = len(self._hydrating)
+            statistics['unindexed'] = len(self._unindexed_paths)
+        return statistics
+
     def _fetch_jobs(self, ensure_fresh=False):
         try:
             last_state = self._last_states[0]
@@ -391,18 +510,26 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
             excp.raise_with_cause(excp.JobFailure,
                                   "Refreshing failure, internal error")
 
+    def _filter_unclaimed(self, jobs):
+        return [job for job in jobs if job.path not in self._locked_paths]
+
+    def _make_claim_monitor(self):
+        return ZookeeperClaimMonitor(self, self._client)
+
     def iterjobs(self, only_unclaimed=False, ensure_fresh=False):
         board_removal_func = lambda job: self._remove_job(job.path)
         return base.JobBoardIterator(
             self, LOG, only_unclaimed=only_unclaimed,
             ensure_fresh=ensure_fresh, board_fetch_func=self._fetch_jobs,
-            board_removal_func=board_removal_func)
+            board_removal_func=board_removal_func,
+            board_unclaimed_func=self._filter_unclaimed)
 
     def _remove_job(self, path):
         if path not in self._known_jobs:
             return False
         with self._job_cond:
             job = self._known_jobs.pop(path, None)
+            self._locked_paths.discard(path)
         if job is not None:
             LOG.debug("Removed job that was at path '%s'", path)
             self._try_emit(base.REMOVAL, details={'job': job})
@@ -410,6 +537,69 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
         else:
             return False
 
+    def _index_job(self, path, job):
+        """Indexes a job (dropping the lowest ranked one if over the limit).
+
+        NOTE: must be called with the job condition held, returns
+        whether the given job was indexed.
+        """
+        self._known_jobs[path] = job
+        self._job_cond.notify_all()
+        if (self._max_indexed is None or
+                len(self._known_jobs) <= self._max_indexed):
+            return True
+        evicted = max(six.itervalues(self._known_jobs),
+                      key=lambda job: (base.JobPriority.rank(job.priority),
+                                       job.sequence))
+        del self._known_jobs[evicted.path]
+        self._unindexed_paths.add(evicted.path)
+        self._hydration_statistics['evicted'] += 1
+        LOG.debug("Dropped job at path '%s' from the index (only the top"
+                  " %s jobs are indexed)", evicted.path, self._max_indexed)
+        return evicted is not job
+
+    def _hydrate(self, paths):
+        """Queues paths to be fetched (with a bounded number at once)."""
+        now = timeutils.now()
+        with self._job_cond:
+            for path in paths:
+                if path not in self._hydrating:
+                    self._hydrate_queue.setdefault(path, now)
+        self._hydrate_more()
+
+    def _hydrate_more(self):
+        requested = []
+        with self._job_cond:
+            while (self._hydrate_queue and
+                   len(self._hydrating) < self._max_hydrations):
+                path, queued_at = self._hydrate_queue.popitem(last=False)
+                self._hydrating[path] = queued_at
+                requested.append(path)
+        for path in requested:
+            # This method is *usually* called from a asynchronous handler so
+            # it's better to exit from this quickly to allow other
+            # asynchronous handlers to be executed.
+            request = self._client.get_async(path)
+            request.rawlink(functools.partial(self._on_hydrated, path))
+
+    def _on_hydrated(self, path, request):
+        try:
+            self._process_child(path, request)
+        finally:
+            with self._job_cond:
+                queued_at = self._hydrating.pop(path, None)
+                if queued_at is not None:
+                    self._record_hydration(queued_at)
+            self._hydrate_more()
+
+    def _record_hydration(self, started_at):
+        statistics = self._hydration_statistics
+        latency = max(0.0, timeutils.now() - started_at)
+        statistics['hydrated'] += 1
+        statistics['latency'] += ((latency - statistics['latency']) /
+                                  statistics['hydrated'])
+        statistics['max_latency'] = max(latency, statistics['max_latency'])
+
     def _process_child(self, path, request, quiet=True):
         """Receives the result of a child data fetch request."""
         job = None
@@ -450,26 +640,34 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
                 # jobs information into the known job set (if it's already
                 # existing then just leave it alone).
                 if path not in self._known_jobs:
+                    # NOTE: the job details and book data are
+                    # decoded (again) on first access (since most jobs are
+                    # never looked at in detail, this saves memory).
                     job = ZookeeperJob(self, job_name,
                                        self._client, path,
                                        backend=self._persistence,
                                        uuid=job_uuid,
-                                       book_data=job_data.get("book"),
-                                       details=job_data.get("details", {}),
                                        created_on=job_created_on,
-                                       priority=job_priority)
-                    self._known_jobs[path] = job
-                    self._job_cond.notify_all()
+                                       priority=job_priority,
+                                       raw_data=raw_data)
+                    if not self._index_job(path, job):
+                        job = None
         if job is not None:
             self._try_emit(base.POSTED, details={'job': job})
 
     def _on_job_posting(self, children, delayed=True):
         LOG.debug("Got children %s under path %s", children, self.path)
         child_paths = []
+        locked_paths = set()
         for c in children:
-            if (c.endswith(self.LOCK_POSTFIX) or
-                    not c.startswith(self.JOB_PREFIX)):
-                # Skip lock paths or non-job-paths (these are not valid jobs)
+            if not c.startswith(self.JOB_PREFIX):
+                # Skip non-job-paths (these are not valid jobs)
+                continue
+            if c.endswith(self.LOCK_POSTFIX):
+                # Lock paths are not jobs, but they do tell us which jobs
+                # are claimed (which is used to filter out claimed jobs).
+                locked_paths.add(k_paths.join(self.path,
+                                              c[0:-len(self.LOCK_POSTFIX)]))
                 continue
             child_paths.append(k_paths.join(self.path, c))
         # Figure out what we really should be investigating and what we
@@ -478,10 +676,25 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
         # need to trigger population of (without holding the job lock).
         investigate_paths = []
         pending_removals = []
+        child_paths_set = frozenset(child_paths)
         with self._job_cond:
+            self._locked_paths = locked_paths
             for path in six.iterkeys(self._known_jobs):
-                if path not in child_paths:
+                if path not in child_paths_set:
                     pending_removals.append(path)
+            self._unindexed_paths &= child_paths_set
+            for path in list(self._hydrate_queue):
+                if path not in child_paths_set:
+                    del self._hydrate_queue[path]
+            if self._max_indexed is not None:
+                # Fetch (lowest sequence first) jobs that were previously
+                # not indexed if there is now room for them.
+                room = (self._max_indexed - len(self._known_jobs) -
+                        len(self._hydrate_queue) - len(self._hydrating) +
+                        len(pending_removals))
+                if room > 0 and self._unindexed_paths:
+                    for path in sorted(self._unindexed_paths)[0:room]:
+                        self._unindexed_paths.discard(path)
         for path in child_paths:
             if path in self._bad_paths:
                 continue
@@ -490,7 +703,10 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
             # reduce the amount of duplicated requests in general; later when
             # the job information has been populated we will ensure that we
             # are not adding duplicates into the currently known jobs...
-            if path in self._known_jobs:
+            if path in self._known_jobs or path in self._unindexed_paths:
+                continue
+            if delayed and (path in self._hydrating or
+                            path in self._hydrate_queue):
                 continue
             if path not in investigate_paths:
                 investigate_paths.append(path)
@@ -503,17 +719,21 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
                 finally:
                     if am_removed:
                         self._job_cond.notify_all()
-        for path in investigate_paths:
-            # Fire off the request to populate this job.
-            #
-            # This method is *usually* called from a asynchronous handler so
-            # it's better to exit from this quickly to allow other asynchronous
-            # handlers to be executed.
-            request = self._client.get_async(path)
-            if delayed:
-                request.rawlink(functools.partial(self._process_child, path))
-            else:
+        if delayed:
+            # Fire off the requests to populate these jobs (only a limited
+            # number of them will be outstanding at once, the others are
+            # queued until prior ones finish).
+            self._hydrate(investigate_paths)
+        else:
+            for path in investigate_paths:
+                with self._job_cond:
+                    started_at = self._hydrate_queue.pop(path, None)
+                if started_at is None:
+                    started_at = timeutils.now()
+                request = self._client.get_async(path)
                 self._process_child(path, request, quiet=False)
+                with self._job_cond:
+                    self._record_hydration(started_at)
 
     def post(self, name, book=None, details=None,
              priority=base.JobPriority.NORMAL):
@@ -539,11 +759,62 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
                                book_data=job_posting.get('book'),
                                priority=job_priority)
             with self._job_cond:
-                self._known_jobs[job_path] = job
-                self._job_cond.notify_all()
-            self._try_emit(base.POSTED, details={'job': job})
+                indexed = self._index_job(job_path, job)
+            if indexed:
+                self._try_emit(base.POSTED, details={'job': job})
             return job
 
+    def post_many(self, postings):
+        """Creates and posts many jobs to the jobboard.
+
+        The jobs are created using as few multi-operation transactions as
+        possible (see :py:func:`~taskflow.utils.kazoo_utils.chunk_operations`
+        for how they are split up), each transaction (chunk of jobs) is
+        either posted or not posted as a whole; if posting a chunk fails the
+        jobs of the chunks that were posted before it stay posted and the
+        failure is raised.
+        """
+        prepared = collections.deque()
+        operations = []
+        for posting in postings:
+            job_uuid = uuidutils.generate_uuid()
+            job_priority = base.JobPriority.convert(
+                posting.get('priority', base.JobPriority.NORMAL))
+            job_posting = base.format_posting(job_uuid, posting['name'],
+                                              book=posting.get('book'),
+                                              details=posting.get('details'),
+                                              priority=job_priority)
+            raw_job_posting = misc.binary_encode(jsonutils.dumps(job_posting))
+            prepared.append((job_uuid, job_priority, posting, job_posting))
+            operations.append(('create', self._job_base, raw_job_posting,
+                               None, False, True))
+        jobs = []
+        for chunk in kazoo_utils.chunk_operations(operations):
+            with self._wrap("%s jobs" % len(chunk), None,
+                            fail_msg_tpl="Posting failure: %s",
+                            ensure_known=False):
+                txn = self._client.transaction()
+                for op in chunk:
+                    getattr(txn, op[0])(*op[1:])
+                job_paths = kazoo_utils.checked_commit(txn)
+            chunk_jobs = []
+            for job_path in job_paths:
+                job_uuid, job_priority, posting, job_posting = \
+                    prepared.popleft()
+                chunk_jobs.append(ZookeeperJob(
+                    self, posting['name'], self._client, job_path,
+                    backend=self._persistence, book=posting.get('book'),
+                    details=posting.get('details'), uuid=job_uuid,
+                    book_data=job_posting.get('book'),
+                    priority=job_priority))
+            with self._job_cond:
+                indexed = [job for job in chunk_jobs
+                           if self._index_job(job.path, job)]
+            for job in indexed:
+                self._try_emit(base.POSTED, details={'job': job})
+            jobs.extend(chunk_jobs)
+        return jobs
+
     @base.check_who
     def claim(self, job, who):
         def _unclaimable_try_find_owner(cause):
@@ -576,6 +847,7 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
                        ephemeral=True)
             try:
                 kazoo_utils.checked_commit(txn)
+                self._locked_paths.add(job.path)
             except k_exceptions.NodeExistsError as e:
                 _unclaimable_try_find_owner(e)
             except kazoo_utils.KazooTransactionException as e:
@@ -595,6 +867,65 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
                             "Job %s claim failed due to transaction"
                             " not succeeding" % (job.uuid), cause=e)
 
+    @base.check_who
+    def claim_many(self, jobs, who, limit=None):
+        jobs = [job for job in jobs if job.path in self._known_jobs]
+        if limit is None:
+            limit = len(jobs)
+        if not jobs or limit <= 0:
+            return []
+        value = misc.binary_encode(jsonutils.dumps({
+            'owner': who,
+        }))
+        with self._wrap("%s jobs" % len(jobs), None,
+                        fail_msg_tpl="Claiming failure: %s",
+                        ensure_known=False):
+            # Find out (using pipelined requests) which of the jobs still
+            # exist (and at what version) and which are not yet claimed...
+            requests = []
+            for job in jobs:
+                requests.append((job,
+                                 self._client.get_async(job.path),
+                                 self._client.exists_async(job.lock_path)))
+            candidates = []
+            for job, data_request, lock_request in requests:
+                try:
+                    _job_data, job_stat = data_request.get()
+                except k_exceptions.NoNodeError:
+                    continue
+                if lock_request.get() is None:
+                    candidates.append((job, job_stat.version))
+            # Now try to claim as many of them as wanted in a single
+            # transaction; if some other entity claims (or changes) some of
+            # them in the meantime the transaction will fail, so then drop
+            # those (they can't be claimed anyway) and try again...
+            while candidates:
+                attempt = candidates[0:limit]
+                txn = self._client.transaction()
+                for job, job_version in attempt:
+                    txn.check(job.path, version=job_version)
+                    txn.create(job.lock_path, value=value, ephemeral=True)
+                try:
+                    kazoo_utils.checked_commit(txn)
+                except kazoo_utils.KazooTransactionException as e:
+                    failed_paths = set()
+                    for op, result in e.failures:
+                        if not isinstance(result, (
+                                k_exceptions.RolledBackError,
+                                k_exceptions.RuntimeInconsistency)):
+                            failed_paths.add(op.path)
+                    if not failed_paths:
+                        raise
+                    candidates = [(job, job_version)
+                                  for job, job_version in candidates
+                                  if (job.path not in failed_paths and
+                                      job.lock_path not in failed_paths)]
+                else:
+                    claimed = [job for job, _job_version in attempt]
+                    self._locked_paths.update(job.path for job in claimed)
+                    return claimed
+            return []
+
     @contextlib.contextmanager
     def _wrap(self, job_uuid, job_path,
               fail_msg_tpl="Failure: %s", ensure_known=True):
@@ -713,6 +1044,7 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
             txn = self._client.transaction()
             txn.delete(job.lock_path, version=lock_stat.version)
             kazoo_utils.checked_commit(txn)
+            self._locked_paths.discard(job.path)
 
     @base.check_who
     def trash(self, job, who):
@@ -737,6 +1069,7 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
             txn.delete(job.lock_path, version=lock_stat.version)
             txn.delete(job.path, version=data_stat.version)
             kazoo_utils.checked_commit(txn)
+            self._locked_paths.discard(job.path)
 
     def _state_change_listener(self, state):
         if self._last_states:
@@ -749,6 +1082,7 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
         self._last_states.appendleft(state)
         if state == k_states.KazooState.LOST:
             self._connected = False
+            self.claim_monitor.on_session_lost()
             # When the client is itself closing itself down this will be
             # triggered, but in that case we expect it, so we don't need
             # to emit a warning message.
@@ -803,6 +1137,9 @@ class ZookeeperJobBoard(base.NotifyingJobBoard):
             self._worker = None
         with self._job_cond:
             self._known_jobs.clear()
+            self._locked_paths.clear()
+            self._unindexed_paths.clear()
+            self._hydrate_queue.clear()
         LOG.debug("Stopped & cleared local state")
         self._connected = False
         self._last_states.clear()
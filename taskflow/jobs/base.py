@@ -18,6 +18,7 @@
 import abc
 import collections
 import contextlib
+import threading
 import time
 
 import enum
@@ -26,9 +27,14 @@ from oslo_utils import uuidutils
 import six
 
 from taskflow import exceptions as excp
+from taskflow import logging
 from taskflow import states
 from taskflow.types import notifier
 from taskflow.utils import iter_utils
+from taskflow.utils import misc
+from taskflow.utils import threading_utils
+
+LOG = logging.getLogger(__name__)
 
 
 class JobPriority(enum.Enum):
@@ -62,6 +68,11 @@ class JobPriority(enum.Enum):
             raise ValueError("'%s' is not a valid priority, valid"
                              " priorities are %s" % (value, valids))
 
+    @classmethod
+    def rank(cls, value):
+        """Returns the rank of a priority (zero being the most urgent)."""
+        return list(cls).index(cls.convert(value))
+
     @classmethod
     def reorder(cls, *values):
         """Reorders (priority, value) tuples -> priority ordered values."""
@@ -280,6 +291,12 @@ class JobBoardIterator(six.Iterator):
       set of jobs this will cause the iterator to force the backend to
       refresh (ensuring that the jobboard has the most recent job listings)
     * ``board``: the board this iterator was created from
+
+    When only iterating over unclaimed jobs boards may provide a function
+    that (in bulk) filters out the jobs that are known to be claimed, the
+    state of each remaining job is then still checked (one at a time) before
+    it is returned (so the filtering function need not be exact, but it
+    should never filter out unclaimed jobs).
     """
 
     _UNCLAIMED_JOB_STATES = (states.UNCLAIMED,)
@@ -287,11 +304,13 @@ class JobBoardIterator(six.Iterator):
 
     def __init__(self, board, logger,
                  board_fetch_func=None, board_removal_func=None,
-                 only_unclaimed=False, ensure_fresh=False):
+                 only_unclaimed=False, ensure_fresh=False,
+                 board_unclaimed_func=None):
         self._board = board
         self._logger = logger
         self._board_removal_func = board_removal_func
         self._board_fetch_func = board_fetch_func
+        self._board_unclaimed_func = board_unclaimed_func
         self._fetched = False
         self._jobs = collections.deque()
         self.only_unclaimed = only_unclaimed
@@ -331,9 +350,17 @@ class JobBoardIterator(six.Iterator):
         if not self._jobs:
             if not self._fetched:
                 if self._board_fetch_func is not None:
-                    self._jobs.extend(
-                        self._board_fetch_func(
-                            ensure_fresh=self.ensure_fresh))
+                    jobs = self._board_fetch_func(
+                        ensure_fresh=self.ensure_fresh)
+                    if (jobs and self.only_unclaimed and
+                            self._board_unclaimed_func is not None):
+                        try:
+                            jobs = self._board_unclaimed_func(jobs)
+                        except excp.JobFailure:
+                            # Just check the state of each of them then...
+                            self._logger.warn("Failed filtering out claimed"
+                                              " jobs", exc_info=True)
+                    self._jobs.extend(jobs)
                 self._fetched = True
         job = self._next_job()
         if job is None:
@@ -342,6 +369,310 @@ class JobBoardIterator(six.Iterator):
             return job
 
 
+class ClaimWatch(object):
+    """Locally cached status of a claim (on a job) that is being monitored.
+
+    Instances of this are created (and kept up to date) by a
+    :py:class:`.ClaimMonitor`, checking if the claim has been lost is a
+    local operation (that does not contact the jobboard backend).
+    """
+
+    def __init__(self, monitor, job, owner):
+        self.job = job
+        self.owner = owner
+        self._monitor = monitor
+        self._lost = threading.Event()
+
+    def is_lost(self):
+        """Returns if the claim was (last known to be) lost."""
+        self._monitor._statistics['local_checks'] += 1
+        return self._lost.is_set()
+
+    def wait(self, timeout=None):
+        """Waits until the claim is lost (returns if it was lost)."""
+        return self._lost.wait(timeout)
+
+    def mark_lost(self):
+        """Marks the claim as lost (the monitor calls this when it is)."""
+        if not self._lost.is_set():
+            self._lost.set()
+            self._monitor._statistics['losses'] += 1
+            LOG.debug("Claim on job '%s' (owned by '%s') has been lost",
+                      self.job, self.owner)
+
+
+class ClaimMonitor(object):
+    """Monitors (in the background) that claims on jobs are still held.
+
+    This default monitor periodically (every ``interval`` seconds) checks
+    (using a background thread that only runs while there are claims being
+    watched) that each watched job is still claimed by its owner, backends
+    are expected to provide monitors that either check in bulk or are
+    notified by their backend when claims are lost instead.
+    """
+
+    #: Default number of seconds between checks of the watched claims.
+    DEFAULT_INTERVAL = 1.0
+
+    def __init__(self, board, interval=DEFAULT_INTERVAL):
+        interval = float(interval)
+        if interval <= 0:
+            raise ValueError("Claim check interval must be greater"
+                             " than zero")
+        self._board = board
+        self._interval = interval
+        self._watches = set()
+        self._lock = threading.Lock()
+        self._poller = None
+        self._statistics = {
+            'local_checks': 0,
+            'remote_checks': 0,
+            'losses': 0,
+        }
+
+    @property
+    def statistics(self):
+        """Dictionary of statistics about the checks done (and saved).
+
+        It contains how many claims are currently ``watched``, how many times
+        the claim of a job was checked by contacting the jobboard backend
+        (``remote_checks``) and how many times it was checked locally
+        (``local_checks``, each of these previously required contacting the
+        jobboard backend) and how many claims were found to be ``lost``.
+        """
+        statistics = dict(self._statistics)
+        statistics['watched'] = len(self._watches)
+        return statistics
+
+    def watch(self, job, owner):
+        """Starts watching the claim of the given owner on the given job."""
+        watch = ClaimWatch(self, job, owner)
+        with self._lock:
+            self._watches.add(watch)
+            self._start_watching(watch)
+        return watch
+
+    def unwatch(self, watch):
+        """Stops watching the claim of the given watch."""
+        with self._lock:
+            self._watches.discard(watch)
+            self._stop_watching(watch)
+
+    def mark_lost(self, job, owner):
+        """Marks the watched claims of the given owner on a job as lost."""
+        with self._lock:
+            watches = [watch for watch in self._watches
+                       if watch.job == job and watch.owner == owner]
+        for watch in watches:
+            watch.mark_lost()
+
+    def check(self):
+        """Checks (by contacting the jobboard backend) the watched claims."""
+        with self._lock:
+            watches = [watch for watch in self._watches
+                       if not watch._lost.is_set()]
+        if watches:
+            self._statistics['remote_checks'] += len(watches)
+            for watch in self._check_claims(watches):
+                watch.mark_lost()
+
+    def _check_claims(self, watches):
+        """Returns which of the provided watches claims have been lost."""
+        lost = []
+        for watch in watches:
+            try:
+                job_state = watch.job.state
+                job_owner = self._board.find_owner(watch.job)
+            except (excp.NotFound, excp.JobFailure):
+                lost.append(watch)
+            else:
+                if job_state == states.UNCLAIMED or watch.owner != job_owner:
+                    lost.append(watch)
+        return lost
+
+    def _start_watching(self, watch):
+        if self._poller is None:
+            self._poller = threading_utils.daemon_thread(self._poll)
+            self._poller.start()
+
+    def _stop_watching(self, watch):
+        pass
+
+    def _poll(self):
+        while True:
+            time.sleep(self._interval)
+            with self._lock:
+                if not self._watches:
+                    self._poller = None
+                    return
+            try:
+                self.check()
+            except Exception:
+                LOG.warning("Failed checking %s watched claims",
+                            len(self._watches), exc_info=True)
+
+
+class Lease(object):
+    """A claim (that expires) on a job that is being renewed."""
+
+    def __init__(self, job, owner, expiry, renewed_at):
+        self.job = job
+        self.owner = owner
+        self.expiry = expiry
+        self.renewed_at = renewed_at
+
+    def renew_at(self, fraction):
+        """Time at which the lease should next be renewed."""
+        return self.renewed_at + self.expiry * fraction
+
+
+class LeaseManager(object):
+    """Renews (in the background) expiring claims on jobs, in batches.
+
+    Leases (claims that expire) that are added to this manager are renewed
+    by a background thread (that only runs while there are leases) once
+    ``RENEW_FRACTION`` of their expiry has passed; when a lease is due all
+    other leases that would soon be due (within ``EARLY_FRACTION`` of their
+    expiry) are renewed together with it (backends are expected to do this
+    using a single request). Leases that fail to be renewed (because the
+    claim was already lost) are removed and their claims are marked as lost
+    in the boards :py:attr:`~.JobBoard.claim_monitor` (so that a
+    :py:class:`~taskflow.listeners.claims.CheckingClaimListener` will react to
+    this by default by suspending its engine).
+
+    This default manager does not renew anything (claims on boards that use
+    it do not expire, they are instead lost when the entity that claimed
+    them is, which the claim monitor notices).
+    """
+
+    #: Fraction of a leases expiry after which it will be renewed.
+    RENEW_FRACTION = 0.5
+
+    #: Fraction of a leases expiry it may be renewed early (to batch it).
+    EARLY_FRACTION = 0.25
+
+    #: Delay (in seconds) before retrying renewals that failed to happen.
+    RETRY_DELAY = 0.1
+
+    def __init__(self, board):
+        self._board = board
+        self._leases = {}
+        self._cond = threading.Condition()
+        self._renewer = None
+        self._statistics = {
+            'batches': 0,
+            'renewals': 0,
+            'failures': 0,
+            'last_lag': 0.0,
+            'max_lag': 0.0,
+        }
+
+    @property
+    def statistics(self):
+        """Dictionary of statistics about the renewals done.
+
+        It contains how many leases are currently tracked (``leases``), how
+        many renewal ``batches`` were done, how many leases were renewed
+        (``renewals``) and failed to be renewed (``failures``) and the
+        lag (how many seconds past when it should have been renewed the
+        most late lease was renewed at) of the last batch (``last_lag``)
+        and of all of them (``max_lag``).
+        """
+        statistics = dict(self._statistics)
+        statistics['leases'] = len(self._leases)
+        return statistics
+
+    def add(self, job, owner, expiry):
+        """Starts renewing the claim (that expires) of an owner on a job."""
+        expiry = float(expiry)
+        if expiry <= 0:
+            raise ValueError("Lease expiry must be greater than zero")
+        with self._cond:
+            self._leases[job] = Lease(job, owner, expiry, timeutils.now())
+            if self._renewer is None:
+                self._renewer = threading_utils.daemon_thread(self._run)
+                self._renewer.start()
+            self._cond.notify_all()
+
+    def remove(self, job):
+        """Stops renewing the claim on a job (if it was being renewed)."""
+        with self._cond:
+            if self._leases.pop(job, None) is not None:
+                self._cond.notify_all()
+
+    def clear(self):
+        """Stops renewing all claims."""
+        with self._cond:
+            self._leases.clear()
+            self._cond.notify_all()
+
+    def renew(self, force=False):
+        """Renews (together) the leases that are due to be renewed.
+
+        :param force: renew all leases (not just the ones that are due, or
+                      will soon be due)
+        :returns: the leases that failed to be renewed
+        """
+        now = timeutils.now()
+        with self._cond:
+            due = list(six.itervalues(self._leases))
+        if not force:
+            if not any(lease.renew_at(self.RENEW_FRACTION) <= now
+                       for lease in due):
+                return []
+            early_fraction = self.RENEW_FRACTION - self.EARLY_FRACTION
+            due = [lease for lease in due
+                   if lease.renew_at(early_fraction) <= now]
+        if not due:
+            return []
+        failed = self._renew_leases(due)
+        renewed_at = timeutils.now()
+        lag = max(0.0, max(now - lease.renew_at(self.RENEW_FRACTION)
+                           for lease in due))
+        with self._cond:
+            for lease in due:
+                if lease in failed:
+                    if self._leases.get(lease.job) is lease:
+                        del self._leases[lease.job]
+                else:
+                    lease.renewed_at = renewed_at
+        self._statistics['batches'] += 1
+        self._statistics['renewals'] += len(due) - len(failed)
+        self._statistics['failures'] += len(failed)
+        self._statistics['last_lag'] = lag
+        self._statistics['max_lag'] = max(lag, self._statistics['max_lag'])
+        for lease in failed:
+            LOG.warning("Failed renewing claim on job '%s' (owned by '%s')",
+                        lease.job, lease.owner)
+            self._board.claim_monitor.mark_lost(lease.job, lease.owner)
+        return failed
+
+    def _renew_leases(self, leases):
+        """Renews the given leases (returns the ones that were not)."""
+        return []
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._leases:
+                    self._renewer = None
+                    return
+                renew_at = min(lease.renew_at(self.RENEW_FRACTION)
+                               for lease in six.itervalues(self._leases))
+                delay = renew_at - timeutils.now()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            try:
+                self.renew()
+            except Exception:
+                with self._cond:
+                    if self._leases:
+                        LOG.warning("Failed renewing %s leases",
+                                    len(self._leases), exc_info=True)
+                        self._cond.wait(self.RETRY_DELAY)
+
+
 @six.add_metaclass(abc.ABCMeta)
 class JobBoard(object):
     """A place where jobs can be posted, reposted, claimed and transferred.
@@ -417,6 +748,22 @@ class JobBoard(object):
         """The non-uniquely identifying name of this jobboard."""
         return self._name
 
+    @misc.cachedproperty
+    def claim_monitor(self):
+        """The :py:class:`.ClaimMonitor` that watches claims on this board."""
+        return self._make_claim_monitor()
+
+    def _make_claim_monitor(self):
+        return ClaimMonitor(self)
+
+    @misc.cachedproperty
+    def lease_manager(self):
+        """The :py:class:`.LeaseManager` that renews claims on this board."""
+        return self._make_lease_manager()
+
+    def _make_lease_manager(self):
+        return LeaseManager(self)
+
     @abc.abstractmethod
     def consume(self, job, who):
         """Permanently (and atomically) removes a job from the jobboard.
@@ -455,6 +802,23 @@ class JobBoard(object):
         Returns a job object representing the information that was posted.
         """
 
+    def post_many(self, postings):
+        """Creates and posts many jobs to the jobboard.
+
+        Each posting is a dictionary of the keyword arguments that
+        :meth:`.post` accepts (``name`` is required, ``book``, ``details``
+        and ``priority`` are optional). Backends that can post many jobs
+        using a few requests (instead of one or more requests per job) are
+        expected to override this method and document how atomic that is; by
+        default this calls :meth:`.post` for each posting (so if posting a
+        job fails, the jobs that were posted before it stay posted and the
+        failure is raised).
+
+        Returns job objects representing the information that was posted
+        (in the same order as the postings).
+        """
+        return [self.post(**posting) for posting in postings]
+
     @abc.abstractmethod
     def claim(self, job, who):
         """Atomically attempts to claim the provided job.
@@ -471,6 +835,37 @@ class JobBoard(object):
         :param who: string that names the claiming entity.
         """
 
+    def claim_many(self, jobs, who, limit=None):
+        """Attempts to claim (up to ``limit``) jobs of the provided jobs.
+
+        Unlike :meth:`.claim` jobs that can not be claimed (because they have
+        already been claimed or no longer exist) are skipped (instead of
+        raising an exception). Backends that can claim many jobs in a
+        single request (instead of one request per job) are expected to
+        override this method (by default this calls :meth:`.claim` for
+        each job until enough jobs have been claimed).
+
+        :param jobs: jobs on this jobboard that should be claimed (they
+            are attempted to be claimed in the order provided).
+        :param who: string that names the claiming entity.
+        :param limit: maximum number of jobs to claim (if none then all of
+            the provided jobs that can be claimed will be).
+
+        :returns: list of the jobs that were actually claimed (in the order
+                  they were provided in)
+        """
+        claimed = []
+        for job in jobs:
+            if limit is not None and len(claimed) >= limit:
+                break
+            try:
+                self.claim(job, who)
+            except (excp.UnclaimableJob, excp.NotFound):
+                pass
+            else:
+                claimed.append(job)
+        return claimed
+
     @abc.abstractmethod
     def abandon(self, job, who):
         """Atomically attempts to abandon the provided job.
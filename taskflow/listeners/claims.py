@@ -23,7 +23,6 @@ import six
 
 from taskflow import exceptions
 from taskflow.listeners import base
-from taskflow import states
 
 LOG = logging.getLogger(__name__)
 
@@ -39,12 +38,14 @@ class CheckingClaimListener(base.Listener):
     occurs, a associated handler (or the default) will be activated to
     determine how to react to this *hopefully* exceptional case.
 
-    NOTE(harlowja): this may create more traffic than desired to the
+    NOTE: to avoid creating more traffic than desired to the
     jobboard backend (zookeeper or other), since the amount of state change
-    per task and flow is non-zero (and checking during each state change will
-    result in quite a few calls to that management system to check the jobs
-    claim status); this could be later optimized to check less (or only check
-    on a smaller set of states)
+    per task and flow is non-zero, the claim is watched (while this listener
+    is registered) using the boards
+    :py:attr:`~taskflow.jobs.base.JobBoard.claim_monitor` which checks the
+    claim in the background (or is notified by the backend when it is lost)
+    so that each state change only checks the last known claim status
+    (which is a local operation).
 
     NOTE(harlowja): if a custom ``on_job_loss`` callback is provided it must
     accept three positional arguments, the first being the current engine being
@@ -57,6 +58,7 @@ class CheckingClaimListener(base.Listener):
         self._job = job
         self._board = board
         self._owner = owner
+        self._watch = None
         if on_job_loss is None:
             self._on_job_loss = self._suspend_engine_on_loss
         else:
@@ -74,6 +76,25 @@ class CheckingClaimListener(base.Listener):
                         " '%s'):%s%s", engine, self._owner, os.linesep,
                         e.pformat())
 
+    @property
+    def watch(self):
+        """The claim watch (only exists while registered)."""
+        return self._watch
+
+    def register(self):
+        if self._watch is None:
+            self._watch = self._board.claim_monitor.watch(self._job,
+                                                          self._owner)
+        super(CheckingClaimListener, self).register()
+
+    def deregister(self):
+        try:
+            super(CheckingClaimListener, self).deregister()
+        finally:
+            if self._watch is not None:
+                self._board.claim_monitor.unwatch(self._watch)
+                self._watch = None
+
     def _flow_receiver(self, state, details):
         self._claim_checker(state, details)
 
@@ -81,16 +102,7 @@ class CheckingClaimListener(base.Listener):
         self._claim_checker(state, details)
 
     def _has_been_lost(self):
-        try:
-            job_state = self._job.state
-            job_owner = self._board.find_owner(self._job)
-        except (exceptions.NotFound, exceptions.JobFailure):
-            return True
-        else:
-            if job_state == states.UNCLAIMED or self._owner != job_owner:
-                return True
-            else:
-                return False
+        return self._watch is not None and self._watch.is_lost()
 
     def _claim_checker(self, state, details):
         if not self._has_been_lost():
@@ -20,6 +20,7 @@ from stevedore import driver
 
 from taskflow import exceptions as exc
 from taskflow import logging
+from taskflow.persistence import caching
 from taskflow.utils import misc
 
 
@@ -49,6 +50,12 @@ def fetch(conf, namespace=BACKEND_NAMESPACE, **kwargs):
     a configuration object composed of the URI's components, in this case that
     is ``{'a': 'b', 'c': 'd'}`` to the constructor of that persistence backend
     instance.
+
+    If the configuration has a true ``cache`` key (for example
+    ``mysql://<not-used>/?cache=true``) the fetched backend will be wrapped
+    in a :py:class:`~taskflow.persistence.caching.CachingBackend` (which
+    will be provided the same configuration, so that any of its ``cache_``
+    prefixed options can also be provided).
     """
     backend, conf = misc.extract_driver_and_conf(conf, 'connection')
     # If the backend is like 'mysql+pymysql://...' which informs the
@@ -62,9 +69,11 @@ def fetch(conf, namespace=BACKEND_NAMESPACE, **kwargs):
                                    invoke_on_load=True,
                                    invoke_args=(conf,),
                                    invoke_kwds=kwargs)
-        return mgr.driver
     except RuntimeError as e:
         raise exc.NotFound("Could not find backend %s: %s" % (backend, e))
+    if caching.is_enabled(conf):
+        return caching.CachingBackend(mgr.driver, conf)
+    return mgr.driver
 
 
 @contextlib.contextmanager
@@ -19,6 +19,7 @@ from __future__ import absolute_import
 
 import contextlib
 import copy
+import datetime
 import functools
 import threading
 import time
@@ -108,6 +109,10 @@ DEFAULT_TXN_ISOLATION_LEVELS = {
     'postgres': 'READ COMMITTED',
 }
 
+# Logbooks without a creation time are ordered (when paging) as if they
+# were created at this time (so that they come first).
+_EPOCH = datetime.datetime(1970, 1, 1)
+
 
 def _log_statements(log_level, conn, cursor, statement, parameters, *args):
     if LOG.isEnabledFor(log_level):
@@ -502,6 +507,32 @@ class Connection(base.Connection):
             exc.raise_with_cause(exc.StorageFailure,
                                  "Failed destroying logbook '%s'" % book_uuid)
 
+    def destroy_logbooks(self, book_uuids):
+        book_uuids = list(book_uuids)
+        if not book_uuids:
+            return 0
+        try:
+            logbooks = self._tables.logbooks
+            flowdetails = self._tables.flowdetails
+            atomdetails = self._tables.atomdetails
+            with self._engine.begin() as conn:
+                # NOTE: do the cascading ourselves, since not all
+                # databases (for example sqlite, by default) enforce the
+                # 'ondelete' foreign key actions.
+                flow_uuids = (sql.select([flowdetails.c.uuid]).
+                              where(flowdetails.c.parent_uuid.in_(book_uuids)))
+                conn.execute(atomdetails.delete().
+                             where(atomdetails.c.parent_uuid.in_(flow_uuids)))
+                conn.execute(flowdetails.delete().
+                             where(flowdetails.c.parent_uuid.in_(book_uuids)))
+                r = conn.execute(logbooks.delete().
+                                 where(logbooks.c.uuid.in_(book_uuids)))
+                return r.rowcount
+        except sa_exc.DBAPIError:
+            exc.raise_with_cause(exc.StorageFailure,
+                                 "Failed destroying %s logbooks"
+                                 % len(book_uuids))
+
     def save_logbook(self, book):
         try:
             logbooks = self._tables.logbooks
@@ -568,6 +599,48 @@ class Connection(base.Connection):
         for book in gathered:
             yield book
 
+    def get_logbooks_page(self, marker=None, limit=100):
+        gathered = []
+        try:
+            logbooks = self._tables.logbooks
+            flowdetails = self._tables.flowdetails
+            # Keyset paging (so that pages deep into the logbooks are as
+            # cheap to get as the first one); the flow detail states of
+            # the page are then joined in (so that only one query is done).
+            created_at = sql.func.coalesce(logbooks.c.created_at, _EPOCH)
+            q = sql.select([logbooks, created_at.label('sort_created_at')])
+            if marker is not None:
+                marker_created_at, marker_uuid = marker
+                if marker_created_at is None:
+                    marker_created_at = _EPOCH
+                q = q.where(sql.or_(
+                    created_at > marker_created_at,
+                    sql.and_(created_at == marker_created_at,
+                             logbooks.c.uuid > marker_uuid)))
+            page = (q.order_by(created_at, logbooks.c.uuid).
+                    limit(limit).alias('page'))
+            q = (sql.select([page,
+                             flowdetails.c.uuid.label('flow_uuid'),
+                             flowdetails.c.state.label('flow_state')]).
+                 select_from(page.outerjoin(
+                     flowdetails, flowdetails.c.parent_uuid == page.c.uuid)).
+                 order_by(page.c.sort_created_at, page.c.uuid))
+            with contextlib.closing(self._engine.connect()) as conn:
+                for row in conn.execute(q):
+                    row = dict(row.items())
+                    row.pop('sort_created_at')
+                    flow_uuid = row.pop('flow_uuid')
+                    flow_state = row.pop('flow_state')
+                    if not gathered or gathered[-1][0].uuid != row['uuid']:
+                        book = self._converter.convert_book(row)
+                        gathered.append((book, []))
+                    if flow_uuid is not None:
+                        gathered[-1][1].append(flow_state)
+        except sa_exc.DBAPIError:
+            exc.raise_with_cause(exc.StorageFailure,
+                                 "Failed getting a page of logbooks")
+        return gathered
+
     def get_flows_for_book(self, book_uuid, lazy=False):
         gathered = []
         try:
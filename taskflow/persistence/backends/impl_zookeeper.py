@@ -38,8 +38,20 @@ class ZkBackend(path_based.PathBasedBackend):
         conf = {
             "hosts": "192.168.0.1:2181,192.168.0.2:2181,192.168.0.3:2181",
             "path": "/taskflow",
+            # Optional, maximum number of (estimated) bytes a single
+            # zookeeper transaction may contain before the writes are split
+            # across multiple transactions.
+            "transaction_max_bytes": 1000000,
         }
 
+    Writes of a logbook (or flow detail) are grouped into a single
+    zookeeper multi-op transaction (the existence checks and reads that
+    they depend on are pipelined using the asynchronous kazoo api). If that
+    transaction would become larger than ``transaction_max_bytes`` (which
+    should be kept under the zookeeper servers ``jute.maxbuffer`` setting)
+    it will be split up into multiple (ordered) transactions, in which case
+    the writes are **no** longer atomic as a whole.
+
     Do note that the creation of a kazoo client is achieved
     by :py:func:`~taskflow.utils.kazoo_utils.make_client` and the transfer
     of this backend configuration to that function to make a
@@ -65,6 +77,16 @@ class ZkBackend(path_based.PathBasedBackend):
             self._client = k_utils.make_client(self._conf)
             self._owned = True
         self._validated = False
+        self._max_txn_bytes = int(self._conf.get(
+            'transaction_max_bytes', k_utils.DEFAULT_MAX_TXN_BYTES))
+        if self._max_txn_bytes <= 0:
+            raise ValueError("Transaction maximum bytes must be greater"
+                             " than zero")
+
+    @property
+    def max_transaction_bytes(self):
+        """Maximum (estimated) bytes a single transaction may contain."""
+        return self._max_txn_bytes
 
     def get_connection(self):
         conn = ZkConnection(self, self._client, self._conf)
@@ -84,6 +106,63 @@ class ZkBackend(path_based.PathBasedBackend):
                                  "Unable to finalize client")
 
 
+class _BatchedTransaction(object):
+    """Collects writes that will later be committed as multi-op requests.
+
+    Creating versus updating a node requires knowing if that node exists,
+    instead of asking zookeeper about each node one at a time the existence
+    checks are delayed until commit time and then pipelined (using the
+    asynchronous kazoo api) before the resulting operations are committed
+    using as few transactions as possible.
+    """
+
+    def __init__(self, client, max_bytes):
+        self._client = client
+        self._max_bytes = max_bytes
+        self._ops = []
+
+    def upsert(self, path, data):
+        self._ops.append(('upsert', path, data))
+
+    def ensure(self, path):
+        self._ops.append(('ensure', path, None))
+
+    def delete(self, path):
+        self._ops.append(('delete', path, None))
+
+    def _fetch_existence(self):
+        pending = []
+        seen = set()
+        for kind, path, _data in self._ops:
+            if kind != 'delete' and path not in seen:
+                seen.add(path)
+                pending.append((path, self._client.exists_async(path)))
+        return dict((path, result.get() is not None)
+                    for path, result in pending)
+
+    def commit(self):
+        if not self._ops:
+            return 0
+        exists = self._fetch_existence()
+        operations = []
+        for kind, path, data in self._ops:
+            if kind == 'upsert':
+                if exists[path]:
+                    operations.append(('set_data', path, data))
+                else:
+                    operations.append(('create', path, data))
+                exists[path] = True
+            elif kind == 'ensure':
+                if not exists[path]:
+                    operations.append(('create', path))
+                exists[path] = True
+            else:
+                operations.append(('delete', path))
+                exists[path] = False
+        return k_utils.chunked_commit(self._client, operations,
+                                      max_bytes=self._max_bytes)
+
+
 class ZkConnection(path_based.PathBasedConnection):
     def __init__(self, backend, client, conf):
         super(ZkConnection, self).__init__(backend)
@@ -127,12 +206,23 @@ class ZkConnection(path_based.PathBasedConnection):
             data, _ = self._client.get(path)
         return misc.decode_json(data)
 
+    def _get_items(self, paths):
+        items = {}
+        with self._exc_wrapper():
+            pending = [(path, self._client.get_async(path))
+                       for path in paths]
+            for path, result in pending:
+                try:
+                    data, _ = result.get()
+                except k_exc.NoNodeError:
+                    pass
+                else:
+                    items[path] = misc.decode_json(data)
+        return items
+
     def _set_item(self, path, value, transaction):
         data = misc.binary_encode(jsonutils.dumps(value))
-        if not self._client.exists(path):
-            transaction.create(path, data)
-        else:
-            transaction.set_data(path, data)
+        transaction.upsert(path, data)
 
     def _del_tree(self, path, transaction):
         for child in self._get_children(path):
@@ -143,20 +233,48 @@ class ZkConnection(path_based.PathBasedConnection):
         with self._exc_wrapper():
             return self._client.get_children(path)
 
+    def _get_children_many(self, paths):
+        children = {}
+        with self._exc_wrapper():
+            pending = [(path, self._client.get_children_async(path))
+                       for path in paths]
+            for path, result in pending:
+                try:
+                    children[path] = result.get()
+                except k_exc.NoNodeError:
+                    pass
+        return children
+
+    def _del_trees(self, paths, transaction):
+        # Discover the nodes level by level (pipelining the listing of
+        # each level) and then delete them from the deepest level up, since
+        # zookeeper does not allow deleting nodes that have children.
+        levels = []
+        level = list(paths)
+        while level:
+            children = self._get_children_many(level)
+            level = [path for path in level if path in children]
+            levels.append(level)
+            level = [self._join_path(path, child)
+                     for path in level for child in children[path]]
+        for level in reversed(levels):
+            for path in level:
+                transaction.delete(path)
+
     def _ensure_path(self, path):
         with self._exc_wrapper():
             self._client.ensure_path(path)
 
     def _create_link(self, src_path, dest_path, transaction):
-        if not self._client.exists(dest_path):
-            transaction.create(dest_path)
+        transaction.ensure(dest_path)
 
     @contextlib.contextmanager
     def _transaction(self):
-        transaction = self._client.transaction()
+        transaction = _BatchedTransaction(
+            self._client, self._backend.max_transaction_bytes)
         with self._exc_wrapper():
             yield transaction
-            k_utils.checked_commit(transaction)
+            transaction.commit()
 
     def validate(self):
         with self._exc_wrapper():
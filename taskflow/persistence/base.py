@@ -18,6 +18,7 @@ import abc
 
 import six
 
+from taskflow import exceptions as exc
 from taskflow.persistence import models
 
 
@@ -97,6 +98,26 @@ class Connection(object):
     def destroy_logbook(self, book_uuid):
         """Deletes/destroys a logbook matching the given uuid."""
 
+    def destroy_logbooks(self, book_uuids):
+        """Deletes/destroys many logbooks matching the given uuids.
+
+        Logbooks that do not exist (for example because they were destroyed
+        by someone else already) are skipped. Backends that can destroy
+        many logbooks in bulk should override this, the default destroys
+        each logbook one after the other.
+
+        :returns: the number of logbooks that were destroyed
+        """
+        destroyed = 0
+        for book_uuid in book_uuids:
+            try:
+                self.destroy_logbook(book_uuid)
+            except exc.NotFound:
+                pass
+            else:
+                destroyed += 1
+        return destroyed
+
     @abc.abstractmethod
     def get_logbook(self, book_uuid, lazy=False):
         """Fetches a logbook object matching the given uuid."""
@@ -105,6 +126,27 @@ class Connection(object):
     def get_logbooks(self, lazy=False):
         """Return an iterable of logbook objects."""
 
+    def get_logbooks_page(self, marker=None, limit=100):
+        """Fetches a page of (lazy) logbooks and their flow detail states.
+
+        Logbooks are ordered by their creation time and then by their uuid
+        (logbooks without a creation time come first); the page holds at
+        most ``limit`` of the logbooks that come after the ``marker`` (a
+        ``(created_at, uuid)`` tuple of the last logbook of the prior page,
+        which does not need to still exist). Backends that can fetch such a
+        page together (without fetching each logbooks flow details on their
+        own) should override this, by default this is not supported.
+
+        :returns: a list of ``(logbook, flow_states)`` tuples (where
+                  ``flow_states`` is a list of the states of the flow
+                  details of that logbook); an empty list once there are
+                  no more logbooks
+        :raises: :py:class:`~taskflow.exceptions.NotImplementedError` if
+                 the backend does not support this
+        """
+        raise exc.NotImplementedError("Paging through logbooks is not"
+                                      " supported by this backend")
+
     @abc.abstractmethod
     def get_flows_for_book(self, book_uuid):
         """Return an iterable of flowdetails for a given logbook uuid."""
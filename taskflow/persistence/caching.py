@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+
+import cachetools
+from oslo_serialization import jsonutils
+from oslo_utils import strutils
+from oslo_utils import timeutils
+
+from taskflow import logging
+from taskflow.persistence import base
+from taskflow.persistence import models
+from taskflow.utils import misc
+
+LOG = logging.getLogger(__name__)
+
+#: Default memory budget (in bytes) of a caching backend.
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Kinds of objects that get cached (these are used as the first
+# component of the cache keys).
+_BOOK = 'book'
+_FLOW = 'flow'
+_ATOM = 'atom'
+
+# Rough estimate of the bytes a single cache entry takes up (beyond the
+# size of its serialized data).
+_ENTRY_OVERHEAD = 256
+
+# Maximum number of keys whose last invalidation generation is remembered
+# (keys that are forgotten are treated as if they were just invalidated).
+_MAX_INVALIDATIONS = 4096
+
+_Entry = collections.namedtuple('_Entry', ['data', 'children', 'size',
+                                           'created_at', 'version'])
+
+
+def is_enabled(conf):
+    """Checks if a persistence configuration asks for a caching backend."""
+    return strutils.bool_from_string(conf.get('cache', False))
+
+
+def _serialize(kind, obj):
+    if kind == _BOOK:
+        return jsonutils.dumps(obj.to_dict(marshal_time=True))
+    elif kind == _FLOW:
+        return jsonutils.dumps(obj.to_dict())
+    else:
+        return jsonutils.dumps(base._format_atom(obj))
+
+
+def _deserialize(kind, data):
+    data = misc.decode_json(data)
+    if kind == _BOOK:
+        return models.LogBook.from_dict(data, unmarshal_time=True)
+    elif kind == _FLOW:
+        return models.FlowDetail.from_dict(data)
+    else:
+        atom_cls = models.atom_detail_class(data['type'])
+        return atom_cls.from_dict(data['atom'])
+
+
+class _LRUCache(cachetools.LRUCache):
+    """LRU cache that informs its owner about evictions."""
+
+    def __init__(self, maxsize, getsizeof, on_evicted):
+        super(_LRUCache, self).__init__(maxsize, getsizeof=getsizeof)
+        self._on_evicted = on_evicted
+
+    def popitem(self):
+        key, value = super(_LRUCache, self).popitem()
+        self._on_evicted(key, value)
+        return key, value
+
+
+class CachingBackend(base.Backend):
+    """A backend that adds a read-through cache in front of another backend.
+
+    Logbooks, flow details and atom details that are read using connections
+    of this backend are kept (in serialized form) in a least recently used
+    cache that is bounded by a memory budget; later reads of the same
+    uuids are then served from that cache instead of the wrapped backend.
+    Writes done through connections of this backend are passed to the
+    wrapped backend and invalidate the cached objects they touch.
+
+    When other processes (or other backend objects) may write to the same
+    storage the cache can go stale, for those cases a ``cache_ttl`` can
+    be provided (entries older than that many seconds are re-fetched) and/or
+    a ``cache_validator`` callable that will be called with the kind of
+    object (one of ``book``, ``flow`` or ``atom``) and its uuid and that
+    returns some (cheap to obtain) version token for that object; a cached
+    entry is only used when its token matches the one that was returned when
+    that entry was cached.
+
+    Objects read from the wrapped backend are only cached when none of them
+    were invalidated while they were being read (so that a read that races
+    with a write can not cache what the write replaced).
+
+    Example configuration::
+
+        conf = {
+            "connection": "mysql://...",
+            # Enables the caching backend (when fetched through
+            # :py:func:`taskflow.persistence.backends.fetch`).
+            "cache": True,
+            # Optional, memory budget in bytes.
+            "cache_max_bytes": 16 * 1024 * 1024,
+            # Optional, maximum age (in seconds) of a cached entry.
+            "cache_ttl": 30,
+            # Optional, version token callable.
+            "cache_validator": validator_func,
+        }
+    """
+
+    def __init__(self, backend, conf=None):
+        if conf is None:
+            conf = {}
+        super(CachingBackend, self).__init__(conf)
+        self._backend = backend
+        max_bytes = int(self._conf.get('cache_max_bytes', DEFAULT_MAX_BYTES))
+        if max_bytes < 1:
+            raise ValueError("Cache maximum bytes must be greater than"
+                             " or equal to one")
+        ttl = self._conf.get('cache_ttl')
+        if ttl is not None:
+            ttl = float(ttl)
+            if ttl <= 0:
+                raise ValueError("Cache ttl must be greater than zero")
+        self._ttl = ttl
+        self._validator = self._conf.get('cache_validator')
+        self._lock = threading.Lock()
+        self._cache = _LRUCache(max_bytes, lambda entry: entry.size,
+                                self._on_evicted)
+        # Invalidations bump the generation, the generation of the last
+        # invalidation of each (recently invalidated) key is remembered so
+        # that objects read before it happened are not cached after it.
+        self._generation = 0
+        self._invalidations = collections.OrderedDict()
+        self._forgotten_generation = 0
+        self._statistics = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    @property
+    def backend(self):
+        """The backend that this backend is caching reads from."""
+        return self._backend
+
+    @property
+    def statistics(self):
+        """A dictionary of cache statistics this backend has gathered.
+
+        This includes the number of ``hits``, ``misses``, ``evictions``
+        and ``invalidations`` as well as the current number of ``entries``
+        in the cache and the (estimated) ``bytes`` they use.
+        """
+        with self._lock:
+            statistics = dict(self._statistics)
+            statistics['entries'] = len(self._cache)
+            statistics['bytes'] = self._cache.currsize
+        return statistics
+
+    def _on_evicted(self, key, entry):
+        self._statistics['evictions'] += 1
+
+    def fetch_version(self, kind, uuid):
+        """Fetches the version token of an object (if validating)."""
+        if self._validator is None:
+            return None
+        return self._validator(kind, uuid)
+
+    def _lookup(self, kind, uuid):
+        key = (kind, uuid)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and self._ttl is not None:
+                if timeutils.now() - entry.created_at > self._ttl:
+                    self._cache.pop(key, None)
+                    entry = None
+        if entry is not None and self._validator is not None:
+            if self.fetch_version(kind, uuid) != entry.version:
+                with self._lock:
+                    if self._cache.get(key) is entry:
+                        self._cache.pop(key, None)
+                entry = None
+        return entry
+
+    def get(self, kind, uuid):
+        """Returns a cached ``(obj, children)`` tuple (or ``None``)."""
+        entry = self._lookup(kind, uuid)
+        with self._lock:
+            if entry is None:
+                self._statistics['misses'] += 1
+                return None
+            self._statistics['hits'] += 1
+        return (_deserialize(kind, entry.data), entry.children)
+
+    @property
+    def generation(self):
+        """The current invalidation generation (see :py:meth:`.put`)."""
+        with self._lock:
+            return self._generation
+
+    def _invalidated_since(self, key, generation):
+        last_generation = self._invalidations.get(key)
+        if last_generation is None:
+            last_generation = self._forgotten_generation
+        return last_generation > generation
+
+    def put(self, kind, obj, children=None, version=None, generation=None):
+        """Caches the given object (and its children uuids, if known).
+
+        When the :py:attr:`.generation` (obtained *before* the object was
+        read) is provided the object is not cached if it was invalidated
+        since then (as it may have been read before it was changed).
+        """
+        if version is None and self._validator is not None:
+            # Without a version token (obtained *before* the object was
+            # read) the entry could never be validated, so skip it.
+            return
+        data = _serialize(kind, obj)
+        if children is not None:
+            children = tuple(children)
+            size = _ENTRY_OVERHEAD + len(data) + sum(len(c) for c in children)
+        else:
+            size = _ENTRY_OVERHEAD + len(data)
+        entry = _Entry(data, children, size, timeutils.now(), version)
+        key = (kind, obj.uuid)
+        with self._lock:
+            if (generation is not None and
+                    self._invalidated_since(key, generation)):
+                LOG.debug("Not caching %s '%s' (it was invalidated while"
+                          " it was being read)", kind, obj.uuid)
+                return
+            try:
+                self._cache[key] = entry
+            except ValueError:
+                # Bigger than the whole memory budget, just skip it...
+                LOG.debug("Not caching %s '%s' (%s bytes exceeds the cache"
+                          " maximum size)", kind, obj.uuid, size)
+
+    def invalidate(self, kind, uuid):
+        """Removes a cached object (if it is cached)."""
+        key = (kind, uuid)
+        with self._lock:
+            self._generation += 1
+            self._invalidations.pop(key, None)
+            self._invalidations[key] = self._generation
+            while len(self._invalidations) > _MAX_INVALIDATIONS:
+                _key, generation = self._invalidations.popitem(last=False)
+                self._forgotten_generation = generation
+            if self._cache.pop(key, None) is not None:
+                self._statistics['invalidations'] += 1
+
+    def children(self, kind, uuid):
+        """Returns the cached children uuids of an object (or ``None``)."""
+        entry = self._lookup(kind, uuid)
+        if entry is None:
+            return None
+        return entry.children
+
+    def clear(self):
+        """Removes all cached objects."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations.clear()
+            self._forgotten_generation = self._generation
+            self._statistics['invalidations'] += len(self._cache)
+            self._cache.clear()
+
+    def get_connection(self):
+        return CachingConnection(self, self._backend.get_connection())
+
+    def close(self):
+        self.clear()
+        self._backend.close()
+
+
+class CachingConnection(base.Connection):
+    """Connection that reads through (and invalidates) a backend cache."""
+
+    def __init__(self, backend, connection):
+        self._backend = backend
+        self._connection = connection
+
+    @property
+    def backend(self):
+        return self._backend
+
+    def close(self):
+        self._connection.close()
+
+    def upgrade(self):
+        self._connection.upgrade()
+
+    def validate(self):
+        self._connection.validate()
+
+    def clear_all(self):
+        try:
+            return self._connection.clear_all()
+        finally:
+            self._backend.clear()
+
+    def _invalidate_flow(self, flow_detail):
+        self._backend.invalidate(_FLOW, flow_detail.uuid)
+        for atom_detail in flow_detail:
+            self._backend.invalidate(_ATOM, atom_detail.uuid)
+
+    def update_atom_details(self, atom_detail):
+        try:
+            return self._connection.update_atom_details(atom_detail)
+        finally:
+            self._backend.invalidate(_ATOM, atom_detail.uuid)
+
+    def update_flow_details(self, flow_detail):
+        try:
+            return self._connection.update_flow_details(flow_detail)
+        finally:
+            self._invalidate_flow(flow_detail)
+
+    def save_logbook(self, book):
+        try:
+            return self._connection.save_logbook(book)
+        finally:
+            self._backend.invalidate(_BOOK, book.uuid)
+            for flow_detail in book:
+                self._invalidate_flow(flow_detail)
+
+    def _invalidate_book(self, book_uuid, flow_uuids):
+        self._backend.invalidate(_BOOK, book_uuid)
+        for flow_uuid in flow_uuids:
+            atom_uuids = self._backend.children(_FLOW, flow_uuid) or ()
+            self._backend.invalidate(_FLOW, flow_uuid)
+            for atom_uuid in atom_uuids:
+                self._backend.invalidate(_ATOM, atom_uuid)
+
+    def destroy_logbook(self, book_uuid):
+        flow_uuids = self._backend.children(_BOOK, book_uuid) or ()
+        try:
+            return self._connection.destroy_logbook(book_uuid)
+        finally:
+            self._invalidate_book(book_uuid, flow_uuids)
+
+    def destroy_logbooks(self, book_uuids):
+        book_uuids = list(book_uuids)
+        flow_uuids = [self._backend.children(_BOOK, book_uuid) or ()
+                      for book_uuid in book_uuids]
+        try:
+            return self._connection.destroy_logbooks(book_uuids)
+        finally:
+            for book_uuid, book_flow_uuids in zip(book_uuids, flow_uuids):
+                self._invalidate_book(book_uuid, book_flow_uuids)
+
+    def get_logbooks(self, lazy=False):
+        # NOTE: listing is always done against the wrapped backend
+        # since the cache can not know about logbooks it has never seen.
+        return self._connection.get_logbooks(lazy=lazy)
+
+    def get_logbooks_page(self, marker=None, limit=100):
+        return self._connection.get_logbooks_page(marker=marker, limit=limit)
+
+    def get_logbook(self, book_uuid, lazy=False):
+        cached = self._backend.get(_BOOK, book_uuid)
+        if cached is None:
+            generation = self._backend.generation
+            version = self._backend.fetch_version(_BOOK, book_uuid)
+            book = self._connection.get_logbook(book_uuid, lazy=lazy)
+            flow_uuids = None
+            if not lazy:
+                flow_uuids = [fd.uuid for fd in book]
+                for flow_detail in book:
+                    self._cache_flow(flow_detail, generation=generation)
+            self._backend.put(_BOOK, book, children=flow_uuids,
+                              version=version, generation=generation)
+            return book
+        book, flow_uuids = cached
+        if not lazy:
+            if flow_uuids is None:
+                for flow_detail in self.get_flows_for_book(book_uuid):
+                    book.add(flow_detail)
+            else:
+                for flow_uuid in flow_uuids:
+                    book.add(self.get_flow_details(flow_uuid))
+        return book
+
+    def get_flows_for_book(self, book_uuid, lazy=False):
+        flow_uuids = self._backend.children(_BOOK, book_uuid)
+        if flow_uuids is None:
+            generation = self._backend.generation
+            flow_details = list(self._connection.get_flows_for_book(book_uuid))
+            for flow_detail in flow_details:
+                self._cache_flow(flow_detail, generation=generation)
+            return flow_details
+        return [self.get_flow_details(flow_uuid, lazy=lazy)
+                for flow_uuid in flow_uuids]
+
+    def _cache_flow(self, flow_detail, version=None, generation=None):
+        atom_uuids = [ad.uuid for ad in flow_detail]
+        for atom_detail in flow_detail:
+            self._backend.put(_ATOM, atom_detail, generation=generation)
+        self._backend.put(_FLOW, flow_detail, children=atom_uuids,
+                          version=version, generation=generation)
+
+    def get_flow_details(self, fd_uuid, lazy=False):
+        cached = self._backend.get(_FLOW, fd_uuid)
+        if cached is None:
+            generation = self._backend.generation
+            version = self._backend.fetch_version(_FLOW, fd_uuid)
+            flow_detail = self._connection.get_flow_details(fd_uuid, lazy=lazy)
+            if lazy:
+                self._backend.put(_FLOW, flow_detail, version=version,
+                                  generation=generation)
+            else:
+                self._cache_flow(flow_detail, version=version,
+                                 generation=generation)
+            return flow_detail
+        flow_detail, atom_uuids = cached
+        if not lazy:
+            if atom_uuids is None:
+                for atom_detail in self.get_atoms_for_flow(fd_uuid):
+                    flow_detail.add(atom_detail)
+            else:
+                for atom_uuid in atom_uuids:
+                    flow_detail.add(self.get_atom_details(atom_uuid))
+        return flow_detail
+
+    def get_atoms_for_flow(self, fd_uuid):
+        atom_uuids = self._backend.children(_FLOW, fd_uuid)
+        if atom_uuids is None:
+            generation = self._backend.generation
+            atom_details = list(self._connection.get_atoms_for_flow(fd_uuid))
+            for atom_detail in atom_details:
+                self._backend.put(_ATOM, atom_detail, generation=generation)
+            return atom_details
+        return [self.get_atom_details(atom_uuid) for atom_uuid in atom_uuids]
+
+    def get_atom_details(self, ad_uuid):
+        cached = self._backend.get(_ATOM, ad_uuid)
+        if cached is None:
+            generation = self._backend.generation
+            version = self._backend.fetch_version(_ATOM, ad_uuid)
+            atom_detail = self._connection.get_atom_details(ad_uuid)
+            self._backend.put(_ATOM, atom_detail, version=version,
+                              generation=generation)
+            return atom_detail
+        return cached[0]
@@ -105,6 +105,20 @@ class PathBasedConnection(base.Connection):
     def _get_item(self, path):
         """Fetch a single item from the backend"""
 
+    def _get_items(self, paths):
+        """Fetch many items from the backend (missing items are omitted)
+
+        Backends that can pipeline (or otherwise batch) fetches should
+        override this, the default fetches each item one after the other.
+        """
+        items = {}
+        for path in paths:
+            try:
+                items[path] = self._get_item(path)
+            except exc.NotFound:
+                pass
+        return items
+
     @abc.abstractmethod
     def _set_item(self, path, value, transaction):
         """Write a single item to the backend"""
@@ -117,6 +131,25 @@ class PathBasedConnection(base.Connection):
     def _get_children(self, path):
         """Get a list of child items of a path"""
 
+    def _get_children_many(self, paths):
+        """Get the child items of many paths (missing paths are omitted)
+
+        Backends that can pipeline (or otherwise batch) listings should
+        override this, the default lists each path one after the other.
+        """
+        children = {}
+        for path in paths:
+            try:
+                children[path] = self._get_children(path)
+            except exc.NotFound:
+                pass
+        return children
+
+    def _del_trees(self, paths, transaction):
+        """Recursively deletes many folders from the backend."""
+        for path in paths:
+            self._del_tree(path, transaction)
+
     @abc.abstractmethod
     def _ensure_path(self, path):
         """Recursively ensure that a path (folder) in the backend exists"""
@@ -152,6 +185,23 @@ class PathBasedConnection(base.Connection):
         self._set_item(path, self._serialize(obj), transaction)
         return obj
 
+    def _update_objects(self, objs, transaction, ignore_missing=False):
+        paths = [self._get_obj_path(obj) for obj in objs]
+        items = self._get_items(paths)
+        updated_objs = []
+        for path, obj in zip(paths, objs):
+            try:
+                item_data = items[path]
+            except KeyError:
+                if not ignore_missing:
+                    raise exc.NotFound("Item not found: %s" % path)
+            else:
+                existing_obj = self._deserialize(type(obj), item_data)
+                obj = existing_obj.merge(obj)
+            self._set_item(path, self._serialize(obj), transaction)
+            updated_objs.append(obj)
+        return updated_objs
+
     def get_logbooks(self, lazy=False):
         for book_uuid in self._get_children(self.book_path):
             yield self.get_logbook(book_uuid, lazy=lazy)
@@ -168,12 +218,13 @@ class PathBasedConnection(base.Connection):
     def save_logbook(self, book):
         book_path = self._get_obj_path(book)
         with self._transaction() as transaction:
-            self._update_object(book, transaction, ignore_missing=True)
-            for flow_details in book:
-                flow_path = self._get_obj_path(flow_details)
-                link_path = self._join_path(book_path, flow_details.uuid)
-                self._do_update_flow_details(flow_details, transaction,
-                                             ignore_missing=True)
+            self._update_objects([book], transaction, ignore_missing=True)
+            flow_details = list(book)
+            self._do_update_flows_details(flow_details, transaction,
+                                          ignore_missing=True)
+            for flow_detail in flow_details:
+                flow_path = self._get_obj_path(flow_detail)
+                link_path = self._join_path(book_path, flow_detail.uuid)
                 self._create_link(flow_path, link_path, transaction)
         return book
 
@@ -191,22 +242,32 @@ class PathBasedConnection(base.Connection):
                 flow_details.add(atom_details)
         return flow_details
 
-    def _do_update_flow_details(self, flow_detail, transaction,
-                                ignore_missing=False):
-        flow_path = self._get_obj_path(flow_detail)
-        self._update_object(flow_detail, transaction,
-                            ignore_missing=ignore_missing)
-        for atom_details in flow_detail:
-            atom_path = self._get_obj_path(atom_details)
-            link_path = self._join_path(flow_path, atom_details.uuid)
-            self._create_link(atom_path, link_path, transaction)
-            self._update_object(atom_details, transaction, ignore_missing=True)
-        return flow_detail
+    def _do_update_flows_details(self, flow_details, transaction,
+                                 ignore_missing=False):
+        # NOTE: all the flow details (and then all of the atom
+        # details contained in them) are fetched as a group so that backends
+        # that can batch (or pipeline) their reads only have to do a few
+        # round trips (instead of one per object); the writes are then all
+        # added to the same transaction.
+        self._update_objects(flow_details, transaction,
+                             ignore_missing=ignore_missing)
+        atom_details = [atom_detail
+                        for flow_detail in flow_details
+                        for atom_detail in flow_detail]
+        self._update_objects(atom_details, transaction, ignore_missing=True)
+        for flow_detail in flow_details:
+            flow_path = self._get_obj_path(flow_detail)
+            for atom_detail in flow_detail:
+                atom_path = self._get_obj_path(atom_detail)
+                link_path = self._join_path(flow_path, atom_detail.uuid)
+                self._create_link(atom_path, link_path, transaction)
+        return flow_details
 
     def update_flow_details(self, flow_detail, ignore_missing=False):
         with self._transaction() as transaction:
-            return self._do_update_flow_details(flow_detail, transaction,
-                                                ignore_missing=ignore_missing)
+            self._do_update_flows_details([flow_detail], transaction,
+                                          ignore_missing=ignore_missing)
+        return flow_detail
 
     def get_atoms_for_flow(self, flow_uuid):
         flow_path = self._join_path(self.flow_path, flow_uuid)
@@ -223,19 +284,35 @@ class PathBasedConnection(base.Connection):
             return self._update_object(atom_detail, transaction,
                                        ignore_missing=ignore_missing)
 
-    def _do_destroy_logbook(self, book_uuid, transaction):
-        book_path = self._join_path(self.book_path, book_uuid)
-        for flow_uuid in self._get_children(book_path):
-            flow_path = self._join_path(self.flow_path, flow_uuid)
-            for atom_uuid in self._get_children(flow_path):
-                atom_path = self._join_path(self.atom_path, atom_uuid)
-                self._del_tree(atom_path, transaction)
-            self._del_tree(flow_path, transaction)
-        self._del_tree(book_path, transaction)
+    def _do_destroy_logbooks(self, book_uuids, transaction):
+        book_paths = [self._join_path(self.book_path, book_uuid)
+                      for book_uuid in book_uuids]
+        flows_by_book = self._get_children_many(book_paths)
+        flow_paths = [self._join_path(self.flow_path, flow_uuid)
+                      for book_path in book_paths
+                      for flow_uuid in flows_by_book.get(book_path, [])]
+        atoms_by_flow = self._get_children_many(flow_paths)
+        atom_paths = [self._join_path(self.atom_path, atom_uuid)
+                      for flow_path in flow_paths
+                      for atom_uuid in atoms_by_flow.get(flow_path, [])]
+        book_paths = [book_path for book_path in book_paths
+                      if book_path in flows_by_book]
+        flow_paths = [flow_path for flow_path in flow_paths
+                      if flow_path in atoms_by_flow]
+        self._del_trees(atom_paths, transaction)
+        self._del_trees(flow_paths, transaction)
+        self._del_trees(book_paths, transaction)
+        return len(book_paths)
 
     def destroy_logbook(self, book_uuid):
         with self._transaction() as transaction:
-            return self._do_destroy_logbook(book_uuid, transaction)
+            if not self._do_destroy_logbooks([book_uuid], transaction):
+                raise exc.NotFound("No logbook found with"
+                                   " uuid '%s'" % book_uuid)
+
+    def destroy_logbooks(self, book_uuids):
+        with self._transaction() as transaction:
+            return self._do_destroy_logbooks(book_uuids, transaction)
 
     def clear_all(self):
         with self._transaction() as transaction:
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import datetime
+import heapq
+import io
+import os
+import threading
+
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+
+from taskflow import exceptions as exc
+from taskflow import logging
+from taskflow.persistence import base
+from taskflow import states
+
+LOG = logging.getLogger(__name__)
+
+#: Flow detail states that (by default) make a logbook eligible for pruning.
+FINISHED_STATES = frozenset([states.SUCCESS, states.REVERTED, states.FAILURE])
+
+#: Default number of logbooks that are deleted (and archived) together.
+DEFAULT_BATCH_SIZE = 100
+
+# Used to order logbooks that have no creation time (as the oldest ones).
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class RetentionPolicy(object):
+    """Decides which logbooks are to be pruned.
+
+    A logbook is only ever pruned if all of its flow details are in one of
+    the provided ``states`` (by default all of the :py:data:`.FINISHED_STATES`
+    states, ``None`` disables this check). From those logbooks the ones that
+    were last updated more than ``max_age`` seconds ago are pruned, and if a
+    ``max_count`` is provided then only the newest ``max_count`` of the
+    remaining logbooks are retained (the others are pruned). When neither
+    ``max_age`` nor ``max_count`` is provided all logbooks that pass the
+    states check are pruned.
+    """
+
+    def __init__(self, max_age=None, max_count=None, states=FINISHED_STATES):
+        if max_age is not None:
+            max_age = float(max_age)
+            if max_age < 0:
+                raise ValueError("Maximum age must be greater than or"
+                                 " equal to zero")
+        if max_count is not None:
+            max_count = int(max_count)
+            if max_count < 0:
+                raise ValueError("Maximum count must be greater than or"
+                                 " equal to zero")
+        self.max_age = max_age
+        self.max_count = max_count
+        if states is not None:
+            states = frozenset(states)
+        self.states = states
+
+    def is_finished(self, flow_states):
+        """Checks if a logbooks flow detail states are all needed states."""
+        if self.states is None:
+            return True
+        return all(state in self.states for state in flow_states)
+
+    def is_expired(self, book, now=None):
+        """Checks if a logbook was last touched more than max age ago."""
+        if self.max_age is None:
+            return self.max_count is None
+        if now is None:
+            now = timeutils.utcnow()
+        touched_at = book.updated_at or book.created_at
+        if touched_at is None:
+            return True
+        return timeutils.delta_seconds(touched_at, now) > self.max_age
+
+
+class FileArchiver(object):
+    """Archives logbooks to a file (one json document per line).
+
+    Each line contains a logbook (in ``dict`` form) under the ``logbook``
+    key and its flow details (and their atom details) under the
+    ``flow_details`` key; the file is flushed and synced to disk before
+    the archived logbooks are deleted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @staticmethod
+    def _format_book(book):
+        flow_details = []
+        for fd in book:
+            flow_details.append({
+                'flow_detail': fd.to_dict(),
+                'atom_details': [base._format_atom(ad) for ad in fd],
+            })
+        return {
+            'logbook': book.to_dict(marshal_time=True),
+            'flow_details': flow_details,
+        }
+
+    def archive(self, books):
+        with io.open(self.path, 'ab') as fh:
+            for book in books:
+                line = jsonutils.dumps(self._format_book(book)) + "\n"
+                fh.write(line.encode('utf-8'))
+            fh.flush()
+            os.fsync(fh.fileno())
+
+
+class Pruner(object):
+    """Streams through a backends logbooks and prunes them (in batches).
+
+    Logbooks are examined one at a time (backends that support
+    :py:meth:`~taskflow.persistence.base.Connection.get_logbooks_page` are
+    asked for them, and their flow detail states, a page at a time), the
+    ones that the given :py:class:`.RetentionPolicy` selects are collected
+    into batches of ``batch_size`` logbooks that are then (optionally)
+    archived using the provided ``archiver`` and destroyed together using
+    :py:meth:`~taskflow.persistence.base.Connection.destroy_logbooks` (which
+    backends implement using bulk deletes). To allow pruning to happen
+    beside active users of the same backend (for example a conductor) a
+    ``max_rate`` (in logbooks deleted per second) can be provided, batches
+    will then be delayed as needed to stay under that rate.
+    """
+
+    def __init__(self, backend, policy,
+                 batch_size=DEFAULT_BATCH_SIZE, max_rate=None, archiver=None):
+        batch_size = int(batch_size)
+        if batch_size < 1:
+            raise ValueError("Batch size must be greater than or"
+                             " equal to one")
+        if max_rate is not None:
+            max_rate = float(max_rate)
+            if max_rate <= 0:
+                raise ValueError("Maximum rate must be greater than zero")
+        self._backend = backend
+        self._policy = policy
+        self._batch_size = batch_size
+        self._max_rate = max_rate
+        self._archiver = archiver
+        self._stopped = threading.Event()
+
+    def stop(self):
+        """Requests that any active (and future) pruning stops early."""
+        self._stopped.set()
+
+    def reset(self):
+        """Resets a prior stop request (allowing pruning again)."""
+        self._stopped.clear()
+
+    def _iter_books(self, conn):
+        try:
+            page = conn.get_logbooks_page(limit=self._batch_size)
+        except exc.NotImplementedError:
+            # Generic (and slower) path, for backends that can not page.
+            for book in conn.get_logbooks(lazy=True):
+                flow_details = conn.get_flows_for_book(book.uuid, lazy=True)
+                yield (book, [fd.state for fd in flow_details])
+            return
+        while page:
+            for book, flow_states in page:
+                yield (book, flow_states)
+            if len(page) < self._batch_size:
+                return
+            book = page[-1][0]
+            page = conn.get_logbooks_page(marker=(book.created_at, book.uuid),
+                                          limit=self._batch_size)
+
+    def _iter_candidates(self, conn, statistics):
+        now = timeutils.utcnow()
+        retained = []
+        for book, flow_states in self._iter_books(conn):
+            if self._stopped.is_set():
+                return
+            statistics['examined'] += 1
+            if not self._policy.is_finished(flow_states):
+                continue
+            if self._policy.is_expired(book, now=now):
+                yield book.uuid
+            elif self._policy.max_count is not None:
+                # Only keep the newest 'max_count' around (as we go).
+                heapq.heappush(retained, (book.created_at or _EPOCH,
+                                          book.uuid))
+                if len(retained) > self._policy.max_count:
+                    _created_at, book_uuid = heapq.heappop(retained)
+                    yield book_uuid
+
+    def _prune_batch(self, conn, book_uuids, statistics):
+        if self._archiver is not None:
+            books = [conn.get_logbook(book_uuid) for book_uuid in book_uuids]
+            self._archiver.archive(books)
+            statistics['archived'] += len(books)
+        statistics['pruned'] += conn.destroy_logbooks(book_uuids)
+        statistics['batches'] += 1
+
+    def _throttle(self, started_at, statistics):
+        if self._max_rate is None:
+            return
+        wanted = statistics['pruned'] / self._max_rate
+        delay = wanted - (timeutils.now() - started_at)
+        if delay > 0:
+            statistics['delayed'] += delay
+            self._stopped.wait(delay)
+
+    def prune(self):
+        """Prunes the logbooks the policy selects.
+
+        :returns: a dictionary of statistics about what was done (how many
+                  logbooks were ``examined``, ``archived`` and ``pruned``,
+                  how many ``batches`` were done and how many seconds
+                  pruning was ``delayed`` for to stay under the maximum
+                  rate)
+        """
+        statistics = {
+            'examined': 0,
+            'archived': 0,
+            'pruned': 0,
+            'batches': 0,
+            'delayed': 0.0,
+        }
+        started_at = timeutils.now()
+        with contextlib.closing(self._backend.get_connection()) as conn:
+            batch = []
+            for book_uuid in self._iter_candidates(conn, statistics):
+                batch.append(book_uuid)
+                if len(batch) >= self._batch_size:
+                    self._prune_batch(conn, batch, statistics)
+                    batch = []
+                    self._throttle(started_at, statistics)
+                    if self._stopped.is_set():
+                        break
+            if batch and not self._stopped.is_set():
+                self._prune_batch(conn, batch, statistics)
+        LOG.debug("Pruning examined %(examined)s logbooks and pruned"
+                  " %(pruned)s of them (in %(batches)s batches)", statistics)
+        return statistics
@@ -19,8 +19,10 @@ import threading
 import time
 
 from taskflow import exceptions as excp
+from taskflow.jobs import base as jobs_base
 from taskflow.persistence.backends import impl_dir
 from taskflow import states
+from taskflow.test import mock
 from taskflow.tests import utils as test_utils
 from taskflow.utils import persistence_utils as p_utils
 from taskflow.utils import threading_utils
@@ -176,6 +178,77 @@ class BoardTestMixin(object):
             possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
             self.assertEqual(0, len(possible_jobs))
 
+    def test_posting_claim_many(self):
+
+        with connect_close(self.board):
+            with self.flush(self.client):
+                for _i in range(0, 4):
+                    self.board.post('test', p_utils.temporary_log_book())
+
+            possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
+            self.assertEqual(4, len(possible_jobs))
+            with self.flush(self.client):
+                self.board.claim(possible_jobs[0], self.board.name + "-1")
+                claimed = self.board.claim_many(possible_jobs,
+                                                self.board.name, limit=2)
+            self.assertEqual(possible_jobs[1:3], claimed)
+            for j in claimed:
+                self.assertEqual(self.board.name, self.board.find_owner(j))
+                self.assertEqual(states.CLAIMED, j.state)
+
+            with self.flush(self.client):
+                claimed = self.board.claim_many(possible_jobs,
+                                                self.board.name)
+            self.assertEqual(possible_jobs[3:], claimed)
+            possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
+            self.assertEqual(0, len(possible_jobs))
+            self.assertEqual([], self.board.claim_many([], self.board.name))
+
+    def test_posting_many(self):
+        books = [p_utils.temporary_log_book() for _i in range(0, 3)]
+        postings = [
+            {'name': 'test-0', 'book': books[0]},
+            {'name': 'test-1', 'book': books[1], 'details': {'a': 1}},
+            {'name': 'test-2', 'book': books[2],
+             'priority': jobs_base.JobPriority.HIGH},
+        ]
+
+        with connect_close(self.board):
+            self.assertEqual([], self.board.post_many([]))
+            with self.flush(self.client):
+                jobs = self.board.post_many(postings)
+            self.assertEqual(['test-0', 'test-1', 'test-2'],
+                             [j.name for j in jobs])
+            self.assertEqual([b.uuid for b in books],
+                             [j.book_uuid for j in jobs])
+            self.assertEqual({'a': 1}, jobs[1].details)
+            self.assertEqual(jobs_base.JobPriority.HIGH, jobs[2].priority)
+            self.assertEqual(3, self.board.job_count)
+            possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
+            self.assertEqual(sorted(j.uuid for j in jobs),
+                             sorted(j.uuid for j in possible_jobs))
+            for j in jobs:
+                self.assertEqual(states.UNCLAIMED, j.state)
+
+    def test_iter_unclaimed_filtered(self):
+
+        with connect_close(self.board):
+            with self.flush(self.client):
+                for _i in range(0, 3):
+                    self.board.post('test', p_utils.temporary_log_book())
+                possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
+                self.board.claim_many(possible_jobs, self.board.name,
+                                      limit=2)
+
+            job_cls = type(possible_jobs[0])
+            with mock.patch.object(job_cls, 'state',
+                                   new_callable=mock.PropertyMock,
+                                   return_value=states.UNCLAIMED) as state:
+                unclaimed = list(self.board.iterjobs(only_unclaimed=True))
+            # Only the unclaimed job should have had its state checked.
+            self.assertEqual(possible_jobs[2:], unclaimed)
+            self.assertEqual(1, state.call_count)
+
     def test_posting_consume_wait(self):
         with connect_close(self.board):
             jb = self.board.post('test', p_utils.temporary_log_book())
@@ -16,6 +16,7 @@
 
 import time
 
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
 import testtools
@@ -24,8 +25,10 @@ from taskflow import exceptions as excp
 from taskflow.jobs.backends import impl_redis
 from taskflow import states
 from taskflow import test
+from taskflow.test import mock
 from taskflow.tests.unit.jobs import base
 from taskflow.tests import utils as test_utils
+from taskflow.utils import misc
 from taskflow.utils import persistence_utils as p_utils
 from taskflow.utils import redis_utils as ru
 
@@ -36,15 +39,21 @@ REDIS_AVAILABLE = test_utils.redis_available(
 
 @testtools.skipIf(not REDIS_AVAILABLE, 'redis is not available')
 class RedisJobboardTest(test.TestCase, base.BoardTestMixin):
+    board_conf = {}
+
     def close_client(self, client):
         client.close()
 
-    def create_board(self, persistence=None):
-        namespace = uuidutils.generate_uuid()
+    def create_board(self, persistence=None, namespace=None, conf=None):
+        if namespace is None:
+            namespace = uuidutils.generate_uuid()
         client = ru.RedisClient()
         config = {
             'namespace': six.b("taskflow-%s" % namespace),
         }
+        config.update(self.board_conf)
+        if conf:
+            config.update(conf)
         kwargs = {
             'client': client,
             'persistence': persistence,
@@ -99,6 +108,182 @@ class RedisJobboardTest(test.TestCase, base.BoardTestMixin):
             possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
             self.assertEqual(0, len(possible_jobs))
 
+    def test_posting_claim_not_indexed(self):
+        with base.connect_close(self.board):
+            with self.flush(self.client):
+                self.board.post('test', p_utils.temporary_log_book())
+            j = list(self.board.iterjobs(only_unclaimed=True))[0]
+            self.board.claim(j, self.board.name)
+            self.assertEqual(set([j.key]),
+                             self.client.smembers(self.board.claimed_key))
+
+            # Claims that are not in the claimed set (for example made by
+            # older boards) are still filtered out (by checking the state).
+            self.client.delete(self.board.claimed_key)
+            possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
+            self.assertEqual(0, len(possible_jobs))
+
+            self.board.abandon(j, self.board.name)
+            self.assertEqual(set(),
+                             self.client.smembers(self.board.claimed_key))
+
+    def test_claim_monitor_expiry(self):
+        monitor = impl_redis.RedisClaimMonitor(self.board, interval=0.1)
+        with base.connect_close(self.board):
+            with self.flush(self.client):
+                self.board.post('test', p_utils.temporary_log_book())
+                self.board.post('test', p_utils.temporary_log_book())
+            j, j2 = list(self.board.iterjobs(only_unclaimed=True))
+            self.board.claim(j, self.board.name, expiry=0.5)
+            self.board.claim(j2, self.board.name)
+            watch = monitor.watch(j, self.board.name)
+            watch2 = monitor.watch(j2, self.board.name)
+            self.assertFalse(watch.is_lost())
+            self.assertTrue(watch.wait(test_utils.WAIT_TIMEOUT))
+            self.assertTrue(watch.is_lost())
+            self.assertFalse(watch2.is_lost())
+            monitor.unwatch(watch)
+            monitor.unwatch(watch2)
+        statistics = monitor.statistics
+        self.assertEqual(1, statistics['losses'])
+        self.assertEqual(0, statistics['watched'])
+        self.assertGreater(0, statistics['remote_checks'])
+
+    def test_posting_many_atomic(self):
+        with base.connect_close(self.board):
+            with self.flush(self.client):
+                j = self.board.post('test', p_utils.temporary_log_book())
+            postings = [{'name': 'test-%s' % i} for i in range(0, 3)]
+            # Make the last posting collide with the existing job (which
+            # should make none of them get posted).
+            uuids = [uuidutils.generate_uuid(), uuidutils.generate_uuid(),
+                     j.uuid]
+            with mock.patch.object(impl_redis.uuidutils, 'generate_uuid',
+                                   side_effect=uuids):
+                self.assertRaises(excp.JobFailure,
+                                  self.board.post_many, postings)
+            self.assertEqual(1, self.board.job_count)
+            with self.flush(self.client):
+                jobs = self.board.post_many(postings)
+            self.assertEqual(4, self.board.job_count)
+            # All sequences come from a single increment (and those of the
+            # failed attempt were skipped).
+            self.assertEqual([j.sequence + 4, j.sequence + 5,
+                              j.sequence + 6],
+                             [job.sequence for job in jobs])
+
+    def test_lease_renewal(self):
+        client, board = self.create_board(conf={'renew_claims': True})
+        with base.connect_close(board):
+            with self.flush(client):
+                board.post('test', p_utils.temporary_log_book())
+                board.post('test', p_utils.temporary_log_book())
+            j, j2 = list(board.iterjobs(only_unclaimed=True))
+            self.assertEqual([j, j2],
+                             board.claim_many([j, j2], board.name,
+                                              expiry=0.3))
+            self.assertEqual(2, board.lease_manager.statistics['leases'])
+            # Both claims would have expired by now, if not renewed...
+            time.sleep(0.9)
+            self.assertEqual(board.name, board.find_owner(j))
+            self.assertEqual(board.name, board.find_owner(j2))
+            self.assertEqual(0, len(list(board.iterjobs(only_unclaimed=True))))
+            board.abandon(j, board.name)
+            board.consume(j2, board.name)
+        statistics = board.lease_manager.statistics
+        self.assertEqual(0, statistics['leases'])
+        self.assertEqual(0, statistics['failures'])
+        self.assertGreater(1, statistics['renewals'])
+        # Due leases are renewed together (not one at a time).
+        self.assertEqual(statistics['renewals'], statistics['batches'] * 2)
+
+    def test_lease_renewal_failure(self):
+        with base.connect_close(self.board):
+            with self.flush(self.client):
+                self.board.post('test', p_utils.temporary_log_book())
+                self.board.post('test', p_utils.temporary_log_book())
+            j, j2 = list(self.board.iterjobs(only_unclaimed=True))
+            self.board.claim(j, self.board.name, expiry=60)
+            self.board.claim(j2, self.board.name, expiry=60)
+            watch = self.board.claim_monitor.watch(j, self.board.name)
+            watch2 = self.board.claim_monitor.watch(j2, self.board.name)
+            leases = self.board.lease_manager
+            leases.add(j, self.board.name, 60)
+            leases.add(j2, self.board.name, 60)
+            self.client.delete(j.owner_key)
+            failed = leases.renew(force=True)
+            self.assertEqual([j], [lease.job for lease in failed])
+            self.assertTrue(watch.is_lost())
+            self.assertFalse(watch2.is_lost())
+            self.board.claim_monitor.unwatch(watch)
+            self.board.claim_monitor.unwatch(watch2)
+            self.assertEqual(1, leases.statistics['leases'])
+            self.assertEqual(1, leases.statistics['failures'])
+            self.board.abandon(j2, self.board.name)
+            self.assertEqual(0, leases.statistics['leases'])
+
     def setUp(self):
         super(RedisJobboardTest, self).setUp()
         self.client, self.board = self.create_board()
+
+
+@testtools.skipIf(not REDIS_AVAILABLE, 'redis is not available')
+class RedisNotifyJobboardTest(RedisJobboardTest):
+    board_conf = {'notify': True}
+
+    def _wait_for(self, predicate):
+        watch = timeutils.StopWatch(duration=test_utils.WAIT_TIMEOUT)
+        watch.start()
+        while not predicate():
+            if watch.expired():
+                self.fail("Condition not met in %s seconds"
+                          % test_utils.WAIT_TIMEOUT)
+            time.sleep(0.01)
+
+    def test_iterjobs_uses_cache(self):
+        with base.connect_close(self.board):
+            self.board.post('test', p_utils.temporary_log_book())
+            with mock.patch.object(self.client, 'hgetall') as hgetall:
+                jobs = list(self.board.iterjobs())
+                self.assertEqual(1, self.board.job_count)
+                self.assertFalse(hgetall.called)
+            self.assertEqual(1, len(jobs))
+            jobs = list(self.board.iterjobs(ensure_fresh=True))
+            self.assertEqual(1, len(jobs))
+
+    def test_connect_fetches_existing(self):
+        with base.connect_close(self.board):
+            self.board.post('test', p_utils.temporary_log_book())
+        with base.connect_close(self.board):
+            self.assertEqual(1, self.board.job_count)
+
+    def test_notified_post_removal(self):
+        namespace = self.board.namespace[len(b"taskflow-"):]
+        other_client, other_board = self.create_board(
+            namespace=misc.binary_decode(namespace))
+        with base.connect_close(self.board, other_board):
+            j = self.board.post('test', p_utils.temporary_log_book())
+            self._wait_for(lambda: other_board.job_count == 1)
+            other_j = list(other_board.iterjobs())[0]
+            self.assertEqual(j.uuid, other_j.uuid)
+            self.board.claim(j, self.board.name)
+            self.board.consume(j, self.board.name)
+            self.assertEqual(0, self.board.job_count)
+            self._wait_for(lambda: other_board.job_count == 0)
+
+            j = other_board.post('test', p_utils.temporary_log_book())
+            self._wait_for(lambda: self.board.job_count == 1)
+            other_board.claim(j, other_board.name)
+            other_board.trash(j, other_board.name)
+            self._wait_for(lambda: self.board.job_count == 0)
+
+    def test_resync_on_reconnect(self):
+        with base.connect_close(self.board):
+            self.board.post('test', p_utils.temporary_log_book())
+            # Simulate missing a notification (by removing it behind the
+            # boards back) and then losing the notification connection.
+            self.client.hdel(self.board.listings_key,
+                             list(self.board.iterjobs())[0].key)
+            self.assertEqual(1, self.board.job_count)
+            self.client.client_kill_filter(_type='pubsub')
+            self._wait_for(lambda: self.board.job_count == 0)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import time
+
+from taskflow import exceptions as excp
+from taskflow.jobs import backends
+from taskflow.jobs.backends import impl_sqlite
+from taskflow.jobs import base as jobs_base
+from taskflow import states
+from taskflow import test
+from taskflow.tests.unit.jobs import base
+from taskflow.utils import persistence_utils as p_utils
+
+
+class SqliteJobboardTest(test.TestCase, base.BoardTestMixin):
+    def create_board(self, persistence=None, path=None, conf=None):
+        if path is None:
+            path = self.db_path
+        board_conf = {'path': path}
+        if conf:
+            board_conf.update(conf)
+        board = impl_sqlite.SqliteJobBoard('test-board', board_conf,
+                                           persistence=persistence)
+        self.addCleanup(board.close)
+        return (None, board)
+
+    def test_fetch(self):
+        conf = {'board': 'sqlite', 'path': self.db_path}
+        with backends.backend('test-board', conf) as board:
+            self.assertIsInstance(board, impl_sqlite.SqliteJobBoard)
+            self.assertTrue(board.connected)
+
+    def test_posting_claim_other_board(self):
+        # Another board (with its own connection) is like another process.
+        _client, board = self.create_board()
+        with base.connect_close(self.board, board):
+            j = self.board.post('test', p_utils.temporary_log_book())
+            j2 = list(board.iterjobs(only_unclaimed=True))[0]
+            self.assertEqual(j.uuid, j2.uuid)
+            board.claim(j2, board.name + "-1")
+            self.assertRaises(excp.UnclaimableJob,
+                              self.board.claim, j, self.board.name)
+            self.assertEqual(board.name + "-1", self.board.find_owner(j))
+            self.assertRaises(excp.JobFailure,
+                              self.board.consume, j, self.board.name)
+            board.consume(j2, board.name + "-1")
+            self.assertEqual(states.COMPLETE, j.state)
+            self.assertEqual(0, self.board.job_count)
+
+    def test_posting_claim_expiry(self):
+        _client, board = self.create_board(conf={'renew_claims': False})
+        with base.connect_close(board):
+            j = board.post('test', p_utils.temporary_log_book())
+            board.claim(j, board.name, expiry=0.2)
+            self.assertEqual(states.CLAIMED, j.state)
+            self.assertIsNotNone(j.expires_in())
+            self.assertEqual(0, board.lease_manager.statistics['leases'])
+            time.sleep(0.3)
+            self.assertEqual(states.UNCLAIMED, j.state)
+            self.assertIsNone(board.find_owner(j))
+            self.assertFalse(j.extend_expiry(10))
+            board.claim(j, board.name + "-1")
+            self.assertIsNone(j.expires_in())
+
+    def test_posting_claim_expiry_renewed(self):
+        _client, board = self.create_board()
+        with base.connect_close(self.board, board):
+            self.board.post('test', p_utils.temporary_log_book())
+            self.board.post('test', p_utils.temporary_log_book())
+            j, j2 = list(board.iterjobs(only_unclaimed=True))
+            board.claim(j, board.name, expiry=0.3)
+            self.assertEqual([j2], board.claim_many([j2], board.name,
+                                                    expiry=0.3))
+            self.assertEqual(2, board.lease_manager.statistics['leases'])
+            # Both claims would have expired by now, if not renewed...
+            time.sleep(0.9)
+            self.assertEqual(board.name, self.board.find_owner(j))
+            self.assertEqual(board.name, self.board.find_owner(j2))
+            self.assertEqual([], self.board.claim_many([j, j2],
+                                                       self.board.name))
+            board.abandon(j, board.name)
+            board.consume(j2, board.name)
+            self.assertEqual(0, board.lease_manager.statistics['leases'])
+        statistics = board.lease_manager.statistics
+        self.assertEqual(0, statistics['failures'])
+        self.assertGreater(1, statistics['renewals'])
+
+    def test_next_unclaimed_priority(self):
+        priorities = [
+            jobs_base.JobPriority.LOW, jobs_base.JobPriority.HIGH,
+            jobs_base.JobPriority.NORMAL, jobs_base.JobPriority.HIGH,
+        ]
+        with base.connect_close(self.board):
+            posted = [self.board.post('test', p_utils.temporary_log_book(),
+                                      priority=priority)
+                      for priority in priorities]
+            self.assertEqual([posted[1], posted[3]],
+                             self.board.next_unclaimed(limit=2))
+            self.board.claim(posted[1], self.board.name)
+            self.assertEqual([posted[3], posted[2], posted[0]],
+                             list(self.board.iterjobs(only_unclaimed=True)))
+
+    def test_posting_trash(self):
+        with base.connect_close(self.board):
+            j = self.board.post('test', p_utils.temporary_log_book())
+            self.assertRaises(excp.NotFound,
+                              self.board.trash, j, self.board.name)
+            self.board.claim(j, self.board.name)
+            self.board.trash(j, self.board.name)
+            self.assertEqual(0, self.board.job_count)
+            self.assertEqual(states.COMPLETE, j.state)
+            with self.board._cursor() as cursor:
+                cursor.execute("SELECT uuid FROM trash")
+                self.assertEqual([(j.uuid,)], cursor.fetchall())
+
+    def test_wait_other_board(self):
+        _client, board = self.create_board()
+        with base.connect_close(self.board, board):
+            self.assertRaises(excp.NotFound, self.board.wait, timeout=0.05)
+            board.post('test', p_utils.temporary_log_book())
+            self.assertEqual(1, len(list(self.board.wait(timeout=1.0))))
+
+    def test_lease_renewal(self):
+        with base.connect_close(self.board):
+            j = self.board.post('test', p_utils.temporary_log_book())
+            self.board.claim(j, self.board.name, expiry=60)
+            self.board.lease_manager.add(j, self.board.name, 60)
+            self.assertEqual([], self.board.lease_manager.renew(force=True))
+            self.board.lease_manager.add(j, self.board.name + "-1", 60)
+            failed = self.board.lease_manager.renew(force=True)
+            self.assertEqual([j], [lease.job for lease in failed])
+
+    def setUp(self):
+        super(SqliteJobboardTest, self).setUp()
+        self.db_path = os.path.join(self.makeTmpDir(), 'jobs.db')
+        self.client, self.board = self.create_board()
@@ -15,11 +15,14 @@
 #    under the License.
 
 import contextlib
+import functools
 import threading
+import time
 
 from kazoo.protocol import paths as k_paths
 from kazoo.recipe import watchers
 from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
 import testtools
@@ -27,6 +30,7 @@ from zake import fake_client
 from zake import utils as zake_utils
 
 from taskflow import exceptions as excp
+from taskflow.jobs import base as jobs_base
 from taskflow.jobs.backends import impl_zookeeper
 from taskflow import states
 from taskflow import test
@@ -143,9 +147,9 @@ class ZookeeperJobboardTest(test.TestCase, ZookeeperBoardTestMixin):
 
 
 class ZakeJobboardTest(test.TestCase, ZookeeperBoardTestMixin):
-    def create_board(self, persistence=None):
-        client = fake_client.FakeClient()
-        board = impl_zookeeper.ZookeeperJobBoard('test-board', {},
+    def create_board(self, persistence=None, conf=None, storage=None):
+        client = fake_client.FakeClient(storage=storage)
+        board = impl_zookeeper.ZookeeperJobBoard('test-board', conf or {},
                                                  client=client,
                                                  persistence=persistence)
         self.addCleanup(board.close)
@@ -200,6 +204,59 @@ class ZakeJobboardTest(test.TestCase, ZookeeperBoardTestMixin):
                     self.client.storage.pop(path)
             self.assertEqual(states.UNCLAIMED, j.state)
 
+    def test_posting_claim_many_contended(self):
+
+        with base.connect_close(self.board):
+            with self.flush(self.client):
+                for _i in range(0, 3):
+                    self.board.post('test', p_utils.temporary_log_book())
+            possible_jobs = list(self.board.iterjobs(only_unclaimed=True))
+            with self.flush(self.client):
+                self.board.claim(possible_jobs[0], self.board.name + "-1")
+
+            # Make it appear that the first job was claimed by someone else
+            # after the (pipelined) lock checks happened.
+            exists_result = mock.Mock()
+            exists_result.get.return_value = None
+            with mock.patch.object(self.client, 'exists_async',
+                                   return_value=exists_result):
+                with mock.patch.object(
+                        self.client, 'transaction',
+                        side_effect=self.client.transaction) as txn:
+                    with self.flush(self.client):
+                        claimed = self.board.claim_many(
+                            possible_jobs, self.board.name, limit=2)
+            self.assertEqual(possible_jobs[1:], claimed)
+            self.assertEqual(2, txn.call_count)
+            for j in possible_jobs:
+                self.assertEqual(states.CLAIMED, j.state)
+
+    def test_posting_many_chunked(self):
+        postings = [{'name': 'test-%s' % i} for i in range(0, 3)]
+        chunk_operations = functools.partial(kazoo_utils.chunk_operations,
+                                             max_bytes=1)
+        checked_commit = kazoo_utils.checked_commit
+        commits = [
+            checked_commit,
+            mock.Mock(side_effect=kazoo_utils.KazooTransactionException(
+                "Transaction failed", [])),
+        ]
+
+        with base.connect_close(self.board):
+            with mock.patch.object(impl_zookeeper.kazoo_utils,
+                                   'chunk_operations',
+                                   side_effect=chunk_operations):
+                with mock.patch.object(
+                        impl_zookeeper.kazoo_utils, 'checked_commit',
+                        side_effect=lambda txn: commits.pop(0)(txn)):
+                    self.assertRaises(excp.JobFailure,
+                                      self.board.post_many, postings)
+            # Each job was in its own chunk, so only the first one (whose
+            # chunk was committed) got posted.
+            self.assertEqual(['test-0'],
+                             [j.name for j in self.board.iterjobs(
+                                 ensure_fresh=True)])
+
     def test_trashing_claimed_job(self):
 
         with base.connect_close(self.board):
@@ -264,6 +321,83 @@ class ZakeJobboardTest(test.TestCase, ZookeeperBoardTestMixin):
             'details': {},
         }, jsonutils.loads(misc.binary_decode(paths[path_key]['data'])))
 
+    def _wait_hydrated(self, board, count):
+        watch = timeutils.StopWatch(duration=test_utils.WAIT_TIMEOUT)
+        watch.start()
+        while not watch.expired():
+            statistics = board.hydration_statistics
+            if (statistics['hydrated'] >= count and
+                    not statistics['queued'] and
+                    not statistics['hydrating']):
+                return statistics
+            time.sleep(0.01)
+        self.fail("Jobs were not hydrated in time")
+
+    def test_hydration_bounded(self):
+        _client, board = self.create_board(conf={'max_hydrations': 2},
+                                           storage=self.client.storage)
+        with base.connect_close(self.board):
+            for _i in range(0, 10):
+                self.board.post('test', p_utils.temporary_log_book())
+            outstanding = []
+            get_async = board._client.get_async
+
+            def tracking_get_async(path, *args, **kwargs):
+                outstanding.append(len(board._hydrating))
+                return get_async(path, *args, **kwargs)
+
+            with mock.patch.object(board._client, 'get_async',
+                                   side_effect=tracking_get_async):
+                with base.connect_close(board):
+                    statistics = self._wait_hydrated(board, 10)
+                    self.assertEqual(10, board.job_count)
+        self.assertEqual(10, len(outstanding))
+        self.assertLessEqual(max(outstanding), 2)
+        self.assertEqual(10, statistics['hydrated'])
+        self.assertGreaterEqual(statistics['latency'],
+                                statistics['max_latency'])
+
+    def test_hydration_lazy_decode(self):
+        book = p_utils.temporary_log_book()
+        _client, board = self.create_board(storage=self.client.storage)
+        with base.connect_close(self.board):
+            self.board.post('test', book, details={'a': 1})
+            with base.connect_close(board):
+                self._wait_hydrated(board, 1)
+                j = list(board.iterjobs())[0]
+                self.assertIsNotNone(j._raw_data)
+                self.assertEqual({'a': 1}, j.details)
+                self.assertIsNone(j._raw_data)
+                self.assertEqual(book.uuid, j.book_uuid)
+                self.assertEqual(book.name, j.book_name)
+
+    def test_hydration_top_k(self):
+        _client, board = self.create_board(conf={'max_indexed': 2},
+                                           storage=self.client.storage)
+        priorities = [
+            jobs_base.JobPriority.LOW, jobs_base.JobPriority.HIGH,
+            jobs_base.JobPriority.NORMAL, jobs_base.JobPriority.HIGH,
+        ]
+        with base.connect_close(self.board):
+            posted = [self.board.post('test', p_utils.temporary_log_book(),
+                                      priority=priority)
+                      for priority in priorities]
+            with base.connect_close(board):
+                statistics = self._wait_hydrated(board, 4)
+                self.assertEqual(2, statistics['unindexed'])
+                self.assertEqual(2, board.job_count)
+                jobs = list(board.iterjobs())
+                self.assertEqual(set([posted[1].uuid, posted[3].uuid]),
+                                 set(j.uuid for j in jobs))
+                # Make room (the next best jobs should then get indexed).
+                for j in jobs:
+                    board.claim(j, board.name)
+                    board.consume(j, board.name)
+                self._wait_hydrated(board, 6)
+                self.assertEqual(0, board.hydration_statistics['unindexed'])
+                self.assertEqual(set([posted[0].uuid, posted[2].uuid]),
+                                 set(j.uuid for j in board.iterjobs()))
+
     def test_register_entity(self):
         conductor_name = "conductor-abc@localhost:4123"
         entity_instance = entity.Entity("conductor",
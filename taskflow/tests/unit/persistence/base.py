@@ -331,6 +331,65 @@ class PersistenceTestMixin(object):
             conn.destroy_logbook(lb_id)
             self.assertRaises(exc.NotFound, conn.destroy_logbook, lb_id)
 
+    def test_logbook_destroy_many(self):
+        lb_ids = []
+        with contextlib.closing(self._get_connection()) as conn:
+            for i in range(0, 3):
+                lb_id = uuidutils.generate_uuid()
+                lb = models.LogBook(name='lb-%s' % i, uuid=lb_id)
+                fd = models.FlowDetail('test', uuid=uuidutils.generate_uuid())
+                fd.add(models.TaskDetail("detail-1",
+                                         uuid=uuidutils.generate_uuid()))
+                lb.add(fd)
+                conn.save_logbook(lb)
+                lb_ids.append(lb_id)
+        with contextlib.closing(self._get_connection()) as conn:
+            destroyed = conn.destroy_logbooks(
+                lb_ids[0:2] + [uuidutils.generate_uuid()])
+            self.assertEqual(2, destroyed)
+        with contextlib.closing(self._get_connection()) as conn:
+            for lb_id in lb_ids[0:2]:
+                self.assertRaises(exc.NotFound, conn.get_logbook, lb_id)
+            lb = conn.get_logbook(lb_ids[2])
+            self.assertEqual(1, len(lb))
+            self.assertEqual(0, conn.destroy_logbooks([]))
+
+    def test_logbooks_page(self):
+        lb_ids = []
+        with contextlib.closing(self._get_connection()) as conn:
+            for i in range(0, 5):
+                lb_id = uuidutils.generate_uuid()
+                lb = models.LogBook(name='lb-%s' % i, uuid=lb_id)
+                for state in [states.SUCCESS, states.RUNNING][0:i % 3]:
+                    fd = models.FlowDetail('test',
+                                           uuid=uuidutils.generate_uuid())
+                    fd.state = state
+                    lb.add(fd)
+                conn.save_logbook(lb)
+                lb_ids.append(lb_id)
+        with contextlib.closing(self._get_connection()) as conn:
+            try:
+                page = conn.get_logbooks_page(limit=2)
+            except exc.NotImplementedError:
+                self.skipTest("Paging through logbooks is not supported")
+            pages = []
+            while page:
+                pages.append(page)
+                lb = page[-1][0]
+                page = conn.get_logbooks_page(marker=(lb.created_at, lb.uuid),
+                                              limit=2)
+            self.assertEqual([2, 2, 1], [len(page) for page in pages])
+            seen = dict((lb.uuid, (lb, flow_states))
+                        for page in pages for lb, flow_states in page)
+            self.assertEqual(set(lb_ids), set(seen))
+            for i, lb_id in enumerate(lb_ids):
+                lb, flow_states = seen[lb_id]
+                self.assertEqual('lb-%s' % i, lb.name)
+                self.assertEqual(0, len(lb))
+                self.assertEqual(
+                    sorted([states.SUCCESS, states.RUNNING][0:i % 3]),
+                    sorted(flow_states))
+
     def test_task_detail_retry_type_(self):
         lb_id = uuidutils.generate_uuid()
         lb_name = 'lb-%s' % (lb_id)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+from oslo_utils import uuidutils
+
+from taskflow.persistence import backends
+from taskflow.persistence.backends import impl_memory
+from taskflow.persistence import caching
+from taskflow.persistence import models
+from taskflow import states
+from taskflow import test
+from taskflow.test import mock
+from taskflow.tests.unit.persistence import base
+
+
+def _make_book(flow_count=1, atom_count=2):
+    lb = models.LogBook('lb', uuid=uuidutils.generate_uuid())
+    for i in range(0, flow_count):
+        fd = models.FlowDetail('fd-%s' % i, uuid=uuidutils.generate_uuid())
+        for j in range(0, atom_count):
+            fd.add(models.TaskDetail('td-%s' % j,
+                                     uuid=uuidutils.generate_uuid()))
+        lb.add(fd)
+    return lb
+
+
+class CachingPersistenceTest(test.TestCase, base.PersistenceTestMixin):
+    def setUp(self):
+        super(CachingPersistenceTest, self).setUp()
+        self._backend = caching.CachingBackend(impl_memory.MemoryBackend({}))
+
+    def _get_connection(self):
+        return self._backend.get_connection()
+
+    def tearDown(self):
+        conn = self._get_connection()
+        conn.clear_all()
+        self._backend = None
+        super(CachingPersistenceTest, self).tearDown()
+
+    def test_caching_backend_fetch(self):
+        conf = {'connection': 'memory://?cache=true&cache_max_bytes=1024'}
+        with contextlib.closing(backends.fetch(conf)) as be:
+            self.assertIsInstance(be, caching.CachingBackend)
+            self.assertIsInstance(be.backend, impl_memory.MemoryBackend)
+
+    def test_no_caching_backend_fetch(self):
+        conf = {'connection': 'memory://?cache=false'}
+        with contextlib.closing(backends.fetch(conf)) as be:
+            self.assertIsInstance(be, impl_memory.MemoryBackend)
+
+    def test_invalid_options(self):
+        wrapped = impl_memory.MemoryBackend({})
+        self.assertRaises(ValueError, caching.CachingBackend,
+                          wrapped, {'cache_max_bytes': 0})
+        self.assertRaises(ValueError, caching.CachingBackend,
+                          wrapped, {'cache_ttl': -1})
+
+    def test_read_through(self):
+        lb = _make_book(flow_count=2, atom_count=3)
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            lb2 = conn.get_logbook(lb.uuid)
+            self.assertEqual(2, len(lb2))
+            with mock.patch.object(conn, '_connection') as wrapped_conn:
+                lb3 = conn.get_logbook(lb.uuid)
+                fd = conn.get_flow_details(next(iter(lb)).uuid)
+                atoms = conn.get_atoms_for_flow(fd.uuid)
+                self.assertFalse(wrapped_conn.mock_calls)
+        self.assertEqual(2, len(lb3))
+        self.assertEqual(3, len(fd))
+        self.assertEqual(3, len(atoms))
+        for fd in lb:
+            fd3 = lb3.find(fd.uuid)
+            self.assertIsNotNone(fd3)
+            for td in fd:
+                self.assertIsNotNone(fd3.find(td.uuid))
+        self.assertGreater(0, self._backend.statistics['hits'])
+        self.assertGreater(0, self._backend.statistics['entries'])
+
+    def test_returns_copies(self):
+        lb = _make_book()
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            fd = conn.get_flow_details(next(iter(lb)).uuid)
+            fd.state = states.SUCCESS
+            fd2 = conn.get_flow_details(fd.uuid)
+        self.assertIsNot(fd, fd2)
+        self.assertIsNone(fd2.state)
+
+    def test_invalidate_on_writes(self):
+        lb = _make_book()
+        fd = next(iter(lb))
+        td = next(iter(fd))
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            self.assertIsNone(conn.get_atom_details(td.uuid).state)
+            td.state = states.FAILURE
+            conn.update_atom_details(td)
+            self.assertEqual(states.FAILURE,
+                             conn.get_atom_details(td.uuid).state)
+            self.assertIsNone(conn.get_flow_details(fd.uuid).state)
+            fd.state = states.RUNNING
+            td2 = models.TaskDetail('td-new', uuid=uuidutils.generate_uuid())
+            fd.add(td2)
+            conn.update_flow_details(fd)
+            fd2 = conn.get_flow_details(fd.uuid)
+            self.assertEqual(states.RUNNING, fd2.state)
+            self.assertIsNotNone(fd2.find(td2.uuid))
+            self.assertEqual(3, len(conn.get_atoms_for_flow(fd.uuid)))
+        self.assertGreater(0, self._backend.statistics['invalidations'])
+
+    def test_racing_write_not_cached(self):
+        lb = _make_book()
+        fd = next(iter(lb))
+        td = next(iter(fd))
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            wrapped_get = conn._connection.get_atom_details
+            writer = self._get_connection()
+
+            def racing_get(ad_uuid):
+                # Another writer changes (and invalidates) the atom after
+                # this reader fetched it but before it gets cached...
+                stale = wrapped_get(ad_uuid)
+                td.state = states.FAILURE
+                writer.update_atom_details(td)
+                return stale
+
+            with mock.patch.object(conn._connection, 'get_atom_details',
+                                   side_effect=racing_get):
+                self.assertIsNone(conn.get_atom_details(td.uuid).state)
+            self.assertEqual(states.FAILURE,
+                             conn.get_atom_details(td.uuid).state)
+            self.assertEqual(0, self._backend.statistics['hits'])
+            self.assertEqual(states.FAILURE,
+                             conn.get_atom_details(td.uuid).state)
+            self.assertEqual(1, self._backend.statistics['hits'])
+
+    def test_forgotten_invalidations(self):
+        lb = _make_book()
+        fd = next(iter(lb))
+        generation = self._backend.generation
+        with mock.patch.object(caching, '_MAX_INVALIDATIONS', 1):
+            self._backend.invalidate('flow', fd.uuid)
+            self._backend.invalidate('flow', lb.uuid)
+        # Keys whose invalidation was forgotten are treated as changed.
+        self._backend.put('flow', fd, generation=generation)
+        self.assertEqual(0, self._backend.statistics['entries'])
+        self._backend.put('flow', fd, generation=self._backend.generation)
+        self.assertEqual(1, self._backend.statistics['entries'])
+
+    def test_destroy_logbook_invalidates(self):
+        lb = _make_book()
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            conn.get_logbook(lb.uuid)
+            conn.destroy_logbook(lb.uuid)
+        self.assertEqual(0, self._backend.statistics['entries'])
+
+    def test_ttl_expiry(self):
+        self._backend = caching.CachingBackend(impl_memory.MemoryBackend({}),
+                                               {'cache_ttl': 10})
+        lb = _make_book()
+        fd = next(iter(lb))
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            with mock.patch('oslo_utils.timeutils.now', return_value=0):
+                conn.get_flow_details(fd.uuid, lazy=True)
+            with mock.patch('oslo_utils.timeutils.now', return_value=5):
+                conn.get_flow_details(fd.uuid, lazy=True)
+            self.assertEqual(1, self._backend.statistics['hits'])
+            with mock.patch('oslo_utils.timeutils.now', return_value=20):
+                conn.get_flow_details(fd.uuid, lazy=True)
+            self.assertEqual(1, self._backend.statistics['hits'])
+
+    def test_version_validation(self):
+        versions = {}
+        validator = lambda kind, uuid: versions.get(uuid, 0)
+        self._backend = caching.CachingBackend(
+            impl_memory.MemoryBackend({}), {'cache_validator': validator})
+        lb = _make_book()
+        fd = next(iter(lb))
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            conn.get_flow_details(fd.uuid, lazy=True)
+            conn.get_flow_details(fd.uuid, lazy=True)
+            self.assertEqual(1, self._backend.statistics['hits'])
+            # Simulate some other writer changing it behind our back...
+            versions[fd.uuid] = 1
+            conn.get_flow_details(fd.uuid, lazy=True)
+            self.assertEqual(1, self._backend.statistics['hits'])
+            conn.get_flow_details(fd.uuid, lazy=True)
+            self.assertEqual(2, self._backend.statistics['hits'])
+
+    def test_memory_budget(self):
+        self._backend = caching.CachingBackend(impl_memory.MemoryBackend({}),
+                                               {'cache_max_bytes': 4096})
+        lb = _make_book(flow_count=20, atom_count=5)
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            lb2 = conn.get_logbook(lb.uuid)
+        self.assertEqual(20, len(lb2))
+        statistics = self._backend.statistics
+        self.assertGreater(0, statistics['evictions'])
+        self.assertGreaterEqual(statistics['bytes'], 4096)
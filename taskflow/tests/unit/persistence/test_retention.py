@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import datetime
+import os
+import shutil
+import tempfile
+
+from oslo_serialization import jsonutils
+from oslo_utils import uuidutils
+
+from taskflow.persistence.backends import impl_memory
+from taskflow.persistence.backends import impl_sqlalchemy
+from taskflow.persistence import models
+from taskflow.persistence import retention
+from taskflow import states
+from taskflow import test
+from taskflow.test import mock
+
+
+class PrunerTest(test.TestCase):
+    def setUp(self):
+        super(PrunerTest, self).setUp()
+        self.backend = self._make_backend()
+
+    def _make_backend(self):
+        return impl_memory.MemoryBackend({})
+
+    def _save_book(self, state=states.SUCCESS, age=0):
+        lb = models.LogBook('lb', uuid=uuidutils.generate_uuid())
+        lb.created_at = (datetime.datetime.utcnow() -
+                         datetime.timedelta(seconds=age))
+        fd = models.FlowDetail('fd', uuid=uuidutils.generate_uuid())
+        fd.state = state
+        fd.add(models.TaskDetail('td', uuid=uuidutils.generate_uuid()))
+        lb.add(fd)
+        # Adding a flow detail touches the updated at time, so undo that.
+        lb.updated_at = None
+        with contextlib.closing(self.backend.get_connection()) as conn:
+            conn.save_logbook(lb)
+        return lb.uuid
+
+    def _book_uuids(self):
+        with contextlib.closing(self.backend.get_connection()) as conn:
+            return set(lb.uuid for lb in conn.get_logbooks(lazy=True))
+
+    def test_invalid_options(self):
+        self.assertRaises(ValueError, retention.RetentionPolicy, max_age=-1)
+        self.assertRaises(ValueError, retention.RetentionPolicy, max_count=-1)
+        policy = retention.RetentionPolicy()
+        self.assertRaises(ValueError, retention.Pruner,
+                          self.backend, policy, batch_size=0)
+        self.assertRaises(ValueError, retention.Pruner,
+                          self.backend, policy, max_rate=0)
+
+    def test_prune_by_state(self):
+        finished = [self._save_book(state=s)
+                    for s in (states.SUCCESS, states.REVERTED, states.FAILURE)]
+        running = self._save_book(state=states.RUNNING)
+        pruner = retention.Pruner(self.backend, retention.RetentionPolicy())
+        statistics = pruner.prune()
+        self.assertEqual(4, statistics['examined'])
+        self.assertEqual(len(finished), statistics['pruned'])
+        self.assertEqual(set([running]), self._book_uuids())
+
+    def test_prune_by_age(self):
+        old = [self._save_book(age=3600) for _i in range(0, 3)]
+        new = [self._save_book() for _i in range(0, 2)]
+        policy = retention.RetentionPolicy(max_age=600)
+        statistics = retention.Pruner(self.backend, policy).prune()
+        self.assertEqual(len(old), statistics['pruned'])
+        self.assertEqual(set(new), self._book_uuids())
+
+    def test_prune_by_count(self):
+        books = [self._save_book(age=100 - i) for i in range(0, 10)]
+        policy = retention.RetentionPolicy(max_count=3)
+        statistics = retention.Pruner(self.backend, policy).prune()
+        self.assertEqual(7, statistics['pruned'])
+        self.assertEqual(set(books[-3:]), self._book_uuids())
+
+    def test_prune_batches(self):
+        for _i in range(0, 10):
+            self._save_book()
+        pruner = retention.Pruner(self.backend, retention.RetentionPolicy(),
+                                  batch_size=3)
+        with contextlib.closing(self.backend.get_connection()) as conn:
+            conn_cls = type(conn)
+        destroy_logbooks = conn_cls.destroy_logbooks
+        with mock.patch.object(conn_cls, 'destroy_logbooks', autospec=True,
+                               side_effect=destroy_logbooks) as destroy:
+            statistics = pruner.prune()
+        self.assertEqual(4, destroy.call_count)
+        self.assertEqual(4, statistics['batches'])
+        self.assertEqual(10, statistics['pruned'])
+        self.assertEqual(set(), self._book_uuids())
+
+    def test_prune_rate_limited(self):
+        for _i in range(0, 4):
+            self._save_book()
+        pruner = retention.Pruner(self.backend, retention.RetentionPolicy(),
+                                  batch_size=2, max_rate=2)
+        with mock.patch.object(pruner._stopped, 'wait') as wait:
+            statistics = pruner.prune()
+        self.assertEqual(4, statistics['pruned'])
+        self.assertEqual(2, wait.call_count)
+        self.assertGreater(0, statistics['delayed'])
+
+    def test_prune_stopped(self):
+        for _i in range(0, 4):
+            self._save_book()
+        pruner = retention.Pruner(self.backend, retention.RetentionPolicy())
+        pruner.stop()
+        self.assertEqual(0, pruner.prune()['pruned'])
+        self.assertEqual(4, len(self._book_uuids()))
+        pruner.reset()
+        self.assertEqual(4, pruner.prune()['pruned'])
+
+    def test_prune_archived(self):
+        books = [self._save_book() for _i in range(0, 3)]
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        archive_path = os.path.join(tmp_dir, 'archive.json')
+        archiver = retention.FileArchiver(archive_path)
+        pruner = retention.Pruner(self.backend, retention.RetentionPolicy(),
+                                  batch_size=2, archiver=archiver)
+        statistics = pruner.prune()
+        self.assertEqual(3, statistics['archived'])
+        with open(archive_path) as fh:
+            archived = [jsonutils.loads(line) for line in fh]
+        self.assertEqual(set(books),
+                         set(a['logbook']['uuid'] for a in archived))
+        for a in archived:
+            self.assertEqual(1, len(a['flow_details']))
+            self.assertEqual(1, len(a['flow_details'][0]['atom_details']))
+        self.assertEqual(set(), self._book_uuids())
+
+
+class SqlitePrunerTest(PrunerTest):
+    def _make_backend(self):
+        fd, db_location = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.unlink, db_location)
+        backend = impl_sqlalchemy.SQLAlchemyBackend({
+            'connection': 'sqlite:///%s' % db_location,
+        })
+        self.addCleanup(backend.close)
+        with contextlib.closing(backend.get_connection()) as conn:
+            conn.upgrade()
+        return backend
+
+    def test_prune_paged(self):
+        books = [self._save_book(age=100 - i) for i in range(0, 10)]
+        running = self._save_book(state=states.RUNNING, age=200)
+        policy = retention.RetentionPolicy(max_count=2)
+        pruner = retention.Pruner(self.backend, policy, batch_size=3)
+        with mock.patch.object(impl_sqlalchemy.Connection,
+                               'get_flows_for_book') as get_flows:
+            statistics = pruner.prune()
+        self.assertFalse(get_flows.called)
+        self.assertEqual(11, statistics['examined'])
+        self.assertEqual(8, statistics['pruned'])
+        self.assertEqual(set(books[-2:] + [running]), self._book_uuids())
@@ -24,7 +24,9 @@ from zake import fake_client
 from taskflow import exceptions as exc
 from taskflow.persistence import backends
 from taskflow.persistence.backends import impl_zookeeper
+from taskflow.persistence import models
 from taskflow import test
+from taskflow.test import mock
 from taskflow.tests.unit.persistence import base
 from taskflow.tests import utils as test_utils
 from taskflow.utils import kazoo_utils
@@ -98,3 +100,106 @@ class ZakePersistenceTest(test.TestCase, base.PersistenceTestMixin):
         conf = {'connection': 'zookeeper:'}
         with contextlib.closing(backends.fetch(conf)) as be:
             self.assertIsInstance(be, impl_zookeeper.ZkBackend)
+
+    def _make_book(self, flow_count, atom_count):
+        lb_id = uuidutils.generate_uuid()
+        lb = models.LogBook(name='lb-%s' % lb_id, uuid=lb_id)
+        for i in range(0, flow_count):
+            fd = models.FlowDetail('flow-%s' % i,
+                                   uuid=uuidutils.generate_uuid())
+            for j in range(0, atom_count):
+                td = models.TaskDetail('task-%s' % j,
+                                       uuid=uuidutils.generate_uuid())
+                td.meta = {'blob': 'x' * 512}
+                fd.add(td)
+            lb.add(fd)
+        return lb
+
+    def test_save_logbook_single_transaction(self):
+        lb = self._make_book(2, 10)
+        with mock.patch.object(self.client, 'transaction',
+                               wraps=self.client.transaction) as txn:
+            with contextlib.closing(self._get_connection()) as conn:
+                conn.save_logbook(lb)
+            self.assertEqual(1, txn.call_count)
+        with contextlib.closing(self._get_connection()) as conn:
+            lb2 = conn.get_logbook(lb.uuid)
+        self.assertEqual(2, len(lb2))
+        for fd in lb:
+            self.assertEqual(10, len(lb2.find(fd.uuid)))
+
+    def test_save_logbook_pipelined_reads(self):
+        lb = self._make_book(2, 10)
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+        patches = {}
+        for name in ('get', 'get_async', 'exists', 'exists_async'):
+            patcher = mock.patch.object(self.client, name,
+                                        wraps=getattr(self.client, name))
+            patches[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+        with contextlib.closing(self._get_connection()) as conn:
+            conn.save_logbook(lb)
+            conn.update_flow_details(next(iter(lb)))
+        # All reads and existence checks should have went through the
+        # asynchronous (pipelined) api.
+        self.assertGreater(0, patches['get_async'].call_count)
+        self.assertGreater(0, patches['exists_async'].call_count)
+        self.assertEqual(patches['get_async'].call_count,
+                         patches['get'].call_count)
+        self.assertEqual(patches['exists_async'].call_count,
+                         patches['exists'].call_count)
+
+    def test_save_logbook_chunked_transactions(self):
+        conf = {
+            'path': '/taskflow-chunked',
+            'transaction_max_bytes': 4096,
+        }
+        backend = impl_zookeeper.ZkBackend(conf, client=self.client)
+        with contextlib.closing(backend.get_connection()) as conn:
+            conn.upgrade()
+        lb = self._make_book(3, 20)
+        with mock.patch.object(self.client, 'transaction',
+                               wraps=self.client.transaction) as txn:
+            with contextlib.closing(backend.get_connection()) as conn:
+                conn.save_logbook(lb)
+            self.assertGreater(1, txn.call_count)
+        with contextlib.closing(backend.get_connection()) as conn:
+            lb2 = conn.get_logbook(lb.uuid)
+        self.assertEqual(3, len(lb2))
+        for fd in lb:
+            fd2 = lb2.find(fd.uuid)
+            self.assertEqual(20, len(fd2))
+            for td in fd:
+                self.assertEqual(td.meta, fd2.find(td.uuid).meta)
+
+    def test_invalid_transaction_max_bytes(self):
+        conf = {
+            'path': '/taskflow',
+            'transaction_max_bytes': 0,
+        }
+        self.assertRaises(ValueError, impl_zookeeper.ZkBackend,
+                          conf, client=self.client)
+
+
+class ChunkOperationsTest(test.TestCase):
+    def test_no_operations(self):
+        self.assertEqual([], list(kazoo_utils.chunk_operations([])))
+
+    def test_single_chunk(self):
+        ops = [('create', '/a', b'a'), ('set_data', '/b', b'b')]
+        chunks = list(kazoo_utils.chunk_operations(ops))
+        self.assertEqual([ops], chunks)
+
+    def test_split_ordered(self):
+        ops = [('create', '/%s' % i, b'x' * 100) for i in range(0, 10)]
+        op_size = kazoo_utils.estimate_operation_size('/0', b'x' * 100)
+        chunks = list(kazoo_utils.chunk_operations(ops,
+                                                   max_bytes=op_size * 3))
+        self.assertEqual(4, len(chunks))
+        self.assertEqual(ops, [op for chunk in chunks for op in chunk])
+
+    def test_oversized_operation(self):
+        ops = [('create', '/a', b'x' * 1000), ('delete', '/b')]
+        chunks = list(kazoo_utils.chunk_operations(ops, max_bytes=100))
+        self.assertEqual([[ops[0]], [ops[1]]], chunks)
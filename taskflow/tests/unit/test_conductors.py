@@ -16,20 +16,32 @@
 
 import collections
 import contextlib
+import os
+import signal
 import threading
+import time
 
 import futurist
+from oslo_utils import timeutils
 import testscenarios
 from zake import fake_client
 
 from taskflow.conductors import backends
+from taskflow.conductors.backends import impl_process
+from taskflow.conductors import flow_cache
+from taskflow.conductors import limiters
+from taskflow.conductors import selection
 from taskflow import engines
+from taskflow import exceptions as excp
+from taskflow.jobs.backends import impl_sqlite
 from taskflow.jobs.backends import impl_zookeeper
 from taskflow.jobs import base
 from taskflow.patterns import linear_flow as lf
+from taskflow.persistence.backends import impl_dir
 from taskflow.persistence.backends import impl_memory
 from taskflow import states as st
 from taskflow import test
+from taskflow.test import mock
 from taskflow.tests import utils as test_utils
 from taskflow.utils import persistence_utils as pu
 from taskflow.utils import threading_utils
@@ -44,6 +56,16 @@ def close_many(*closeables):
             c.close()
 
 
+def wait_for(predicate, timeout=test_utils.WAIT_TIMEOUT, delay=0.01):
+    watch = timeutils.StopWatch(duration=timeout)
+    watch.start()
+    while not predicate():
+        if watch.expired():
+            return False
+        time.sleep(delay)
+    return True
+
+
 def test_factory(blowup):
     f = lf.Flow("test")
     if not blowup:
@@ -196,6 +218,126 @@ class ManyConductorTest(testscenarios.TestWithScenarios,
             self.assertTrue(components.conductor.wait(test_utils.WAIT_TIMEOUT))
             self.assertFalse(components.conductor.dispatching)
 
+    def test_run_claims_many(self):
+        components = self.make_components()
+        components.conductor.connect()
+        consumed = []
+        consumed_event = threading.Event()
+
+        def on_consume(state, details):
+            consumed.append(details['job'])
+            if len(consumed) == 3:
+                consumed_event.set()
+
+        components.board.notifier.register(base.REMOVAL, on_consume)
+        with close_many(components.conductor, components.client):
+            lb, fd = pu.temporary_flow_detail(components.persistence)
+            engines.save_factory_details(fd, test_factory,
+                                         [False], {},
+                                         backend=components.persistence)
+            for _i in range(0, 3):
+                components.board.post('poke', lb,
+                                      details={'flow_uuid': fd.uuid})
+            with mock.patch.object(
+                    components.board, 'claim_many',
+                    side_effect=components.board.claim_many) as claim_many:
+                with mock.patch.object(components.board, 'claim') as claim:
+                    t = threading_utils.daemon_thread(
+                        components.conductor.run)
+                    t.start()
+                    self.assertTrue(
+                        consumed_event.wait(test_utils.WAIT_TIMEOUT))
+                    components.conductor.stop()
+                    self.assertTrue(
+                        components.conductor.wait(test_utils.WAIT_TIMEOUT))
+            self.assertTrue(claim_many.called)
+            self.assertFalse(claim.called)
+
+    def test_run_skips_claimed_head(self):
+        components = self.make_components()
+        components.conductor.connect()
+        consumed_event = threading.Event()
+
+        def on_consume(event, details):
+            consumed_event.set()
+
+        components.conductor.notifier.register('job_consumed', on_consume)
+        with close_many(components.conductor, components.client):
+            lb, fd = pu.temporary_flow_detail(components.persistence)
+            engines.save_factory_details(fd, test_factory,
+                                         [False], {},
+                                         backend=components.persistence)
+            head = components.board.post('poke', lb,
+                                         details={'flow_uuid': fd.uuid})
+            components.board.claim(head, 'other')
+            job = components.board.post('poke', lb,
+                                        details={'flow_uuid': fd.uuid})
+            t = threading_utils.daemon_thread(components.conductor.run)
+            t.start()
+            self.assertTrue(consumed_event.wait(test_utils.WAIT_TIMEOUT))
+            components.conductor.stop()
+            self.assertTrue(components.conductor.wait(test_utils.WAIT_TIMEOUT))
+            self.assertEqual(st.COMPLETE, job.state)
+            self.assertEqual(st.CLAIMED, head.state)
+            self.assertEqual(1, components.board.job_count)
+
+    def test_engine_templates_released(self):
+        for flow_cache_size, held in [(0, 0), (2, 1)]:
+            self.conductor_kwargs = dict(self.conductor_kwargs,
+                                         flow_cache_size=flow_cache_size)
+            components = self.make_components()
+            components.conductor.connect()
+            with close_many(components.conductor, components.client):
+                lb, fd = pu.temporary_flow_detail(components.persistence)
+                engines.save_factory_details(fd, test_factory,
+                                             [False], {},
+                                             backend=components.persistence)
+                job = components.board.post('poke', lb,
+                                            details={'flow_uuid': fd.uuid})
+                engine = components.conductor._engine_from_job(job)
+                # Only engines running a cached flow are tracked (until
+                # they are released).
+                self.assertEqual(held, len(components.conductor._templates))
+                components.conductor._release_engine(engine)
+                self.assertEqual(0, len(components.conductor._templates))
+
+    def test_run_flow_cache(self):
+        self.conductor_kwargs = dict(self.conductor_kwargs, flow_cache_size=2)
+        components = self.make_components()
+        components.conductor.connect()
+        consumed = set()
+
+        def on_consume(event, details):
+            consumed.add(details['job'].uuid)
+
+        components.conductor.notifier.register('job_consumed', on_consume)
+        fds = []
+        with close_many(components.conductor, components.client):
+            t = threading_utils.daemon_thread(components.conductor.run)
+            t.start()
+            for _i in range(0, 2):
+                lb, fd = pu.temporary_flow_detail(components.persistence)
+                engines.save_factory_details(fd, test_factory,
+                                             [False], {},
+                                             backend=components.persistence)
+                job = components.board.post('poke', lb,
+                                            details={'flow_uuid': fd.uuid})
+                # The conductor consumes the job only after it is done with
+                # (and has returned) the flow it ran.
+                self.assertTrue(wait_for(lambda: job.uuid in consumed))
+                fds.append((lb.uuid, fd.uuid))
+            components.conductor.stop()
+            self.assertTrue(components.conductor.wait(test_utils.WAIT_TIMEOUT))
+
+        statistics = components.conductor.flow_cache.statistics
+        self.assertEqual(1, statistics['misses'])
+        self.assertEqual(1, statistics['hits'])
+        with contextlib.closing(
+                components.persistence.get_connection()) as conn:
+            for lb_uuid, fd_uuid in fds:
+                fd = conn.get_logbook(lb_uuid).find(fd_uuid)
+                self.assertEqual(st.SUCCESS, fd.state)
+
     def test_fail_run(self):
         components = self.make_components()
         components.conductor.connect()
@@ -420,6 +562,410 @@ class ManyConductorTest(testscenarios.TestWithScenarios,
             self.assertFalse(consumed_event.is_set())
 
 
+class SelectionPolicyTest(test.TestCase):
+    def make_jobs(self, *tenants):
+        jobs = []
+        for i, tenant in enumerate(tenants):
+            job = mock.Mock(uuid='job-%s' % i, details={'tenant': tenant})
+            job.name = '%s-%s' % (tenant, i)
+            jobs.append(job)
+        return jobs
+
+    def select(self, policy, job_it, limit, claim=True):
+        jobs = policy.select(job_it, limit)
+        if claim:
+            for job in jobs:
+                policy.job_claimed(job)
+        return [job.name for job in jobs]
+
+    def test_ordered(self):
+        job_it = iter(self.make_jobs('a', 'a', 'b'))
+        policy = selection.OrderedPolicy()
+        self.assertEqual(['a-0', 'a-1'], self.select(policy, job_it, 2))
+        self.assertEqual(['b-2'], self.select(policy, job_it, 2))
+        self.assertEqual([], self.select(policy, job_it, 2))
+
+    def test_capped(self):
+        jobs = self.make_jobs('a', 'a', 'a', 'b', 'a', 'c')
+        policy = selection.CappedPolicy(caps={'a': 2})
+        job_it = iter(jobs)
+        self.assertEqual(['a-0', 'a-1', 'b-3', 'c-5'],
+                         self.select(policy, job_it, 10))
+        self.assertEqual([], self.select(policy, job_it, 10))
+        self.assertEqual({'a': 2, 'b': 1, 'c': 1}, policy.in_flight)
+        policy.job_finished(jobs[0])
+        policy.job_finished(jobs[3])
+        self.assertEqual(['a-2'], self.select(policy, job_it, 10))
+        self.assertEqual({'a': 2, 'c': 1}, policy.in_flight)
+        # A new pass over the jobboard starts with a new index.
+        self.assertEqual([], self.select(policy, iter(jobs[4:5]), 10))
+        policy.job_finished(jobs[1])
+        self.assertEqual(['a-4'], self.select(policy, iter(jobs[4:5]), 10))
+
+    def test_fair_share(self):
+        jobs = self.make_jobs(*(['a'] * 6 + ['b'] * 3))
+        policy = selection.FairSharePolicy()
+        self.assertEqual(['a-0', 'b-6', 'a-1', 'b-7'],
+                         self.select(policy, iter(jobs), 4))
+
+    def test_fair_share_weighted(self):
+        jobs = self.make_jobs(*(['a'] * 3 + ['b'] * 6))
+        policy = selection.FairSharePolicy(weights={'b': 2})
+        job_it = iter(jobs)
+        self.assertEqual(['a-0', 'b-3', 'b-4'],
+                         self.select(policy, job_it, 3))
+        self.assertEqual(['a-1', 'b-5', 'b-6'],
+                         self.select(policy, job_it, 3))
+
+    def test_fair_share_idle_key(self):
+        policy = selection.FairSharePolicy()
+        job_it = iter(self.make_jobs('a', 'a', 'a', 'a'))
+        self.assertEqual(['a-0', 'a-1', 'a-2'],
+                         self.select(policy, job_it, 3))
+        # A key that was idle does not get to catch up on what it missed
+        # (it starts from where the other key currently is instead).
+        job_it = iter(self.make_jobs('b', 'b', 'b', 'a', 'a'))
+        self.assertEqual(['b-0', 'b-1', 'a-3', 'b-2'],
+                         self.select(policy, job_it, 4))
+
+    def test_unclaimed_not_charged(self):
+        jobs = self.make_jobs('a', 'a', 'b')
+        policy = selection.FairSharePolicy()
+        job_it = iter(jobs)
+        self.assertEqual(['a-0'], self.select(policy, job_it, 1,
+                                              claim=False))
+        self.assertEqual(['a-1', 'b-2'], self.select(policy, job_it, 2))
+
+    def test_bad_options(self):
+        self.assertRaises(ValueError, selection.CappedPolicy, caps={'a': 0})
+        self.assertRaises(ValueError, selection.CappedPolicy, max_pending=0)
+        self.assertRaises(ValueError, selection.FairSharePolicy,
+                          weights={'a': -1})
+
+    def test_conductor_fair_share(self):
+        persistence = impl_memory.MemoryBackend()
+        client = fake_client.FakeClient()
+        board = impl_zookeeper.ZookeeperJobBoard('testing', {},
+                                                 client=client,
+                                                 persistence=persistence)
+        policy = selection.FairSharePolicy()
+        conductor = backends.fetch('blocking', 'testing', board,
+                                   persistence=persistence, wait_timeout=0.1,
+                                   selection_policy=policy)
+        conductor.connect()
+        consumed = collections.OrderedDict()
+        consumed_event = threading.Event()
+
+        def on_consume(event, details):
+            job = details['job']
+            consumed.setdefault(job.uuid, job.details['tenant'])
+            if len(consumed) == 5:
+                consumed_event.set()
+
+        conductor.notifier.register('job_consumed', on_consume)
+        with close_many(conductor, client):
+            lb, fd = pu.temporary_flow_detail(persistence)
+            engines.save_factory_details(fd, test_factory,
+                                         [False], {},
+                                         backend=persistence)
+            for tenant in ['a', 'a', 'a', 'a', 'b']:
+                board.post('poke', lb,
+                           details={'flow_uuid': fd.uuid, 'tenant': tenant})
+            # The selection is only fair across the jobs the conductor can
+            # see, so wait for all of them to be known first.
+            self.assertTrue(wait_for(lambda: board.job_count == 5))
+            t = threading_utils.daemon_thread(conductor.run)
+            t.start()
+            self.assertTrue(consumed_event.wait(test_utils.WAIT_TIMEOUT))
+            conductor.stop()
+            self.assertTrue(conductor.wait(test_utils.WAIT_TIMEOUT))
+        self.assertEqual(['a', 'b', 'a', 'a', 'a'], list(consumed.values()))
+
+
+class AIMDLimiterTest(test.TestCase):
+    def make_limiter(self, **kwargs):
+        kwargs.setdefault('load_func', None)
+        return limiters.AIMDLimiter(**kwargs)
+
+    def test_increase_when_saturated(self):
+        limiter = self.make_limiter(initial=2, maximum=4)
+        for _i in range(0, 3):
+            self.assertIsNone(limiter.record(1.0, 0.0, 2))
+        self.assertEqual(3, limiter.limit)
+        # Not using all of the limit is no reason to increase it.
+        for _i in range(0, 10):
+            limiter.record(1.0, 0.0, 1)
+        self.assertEqual(3, limiter.limit)
+        for _i in range(0, 20):
+            limiter.record(1.0, 0.0, 4)
+        self.assertEqual(4, limiter.limit)
+
+    def test_decrease_on_latency(self):
+        limiter = self.make_limiter(initial=8)
+        for _i in range(0, 10):
+            limiter.record(1.0, 0.0, 1)
+        self.assertEqual('latency', limiter.record(10.0, 0.0, 8))
+        self.assertEqual(6, limiter.limit)
+        # Backs off at most once per limits worth of completions.
+        for _i in range(0, 5):
+            self.assertIsNone(limiter.record(10.0, 0.0, 8))
+        self.assertEqual(6, limiter.limit)
+        self.assertEqual('latency', limiter.record(10.0, 0.0, 8))
+        self.assertEqual(4, limiter.limit)
+
+    def test_decrease_on_queue_time(self):
+        limiter = self.make_limiter(initial=4)
+        for _i in range(0, 10):
+            limiter.record(1.0, 0.0, 1)
+        self.assertEqual('queue_time', limiter.record(1.0, 0.9, 4))
+        self.assertEqual(3, limiter.limit)
+        signals = limiter.signals
+        self.assertEqual(3, signals['limit'])
+        self.assertEqual(0.45, signals['queue_time'])
+
+    def test_decrease_on_load(self):
+        load = [0.5]
+        limiter = self.make_limiter(initial=4, minimum=2, max_load=1.0,
+                                    load_func=lambda: load[0])
+        for _i in range(0, 4):
+            limiter.record(1.0, 0.0, 1)
+        load[0] = 2.0
+        self.assertEqual('load', limiter.record(1.0, 0.0, 1))
+        self.assertEqual(3, limiter.limit)
+        for _i in range(0, 20):
+            limiter.record(1.0, 0.0, 1)
+        self.assertEqual(2, limiter.limit)
+        self.assertEqual(2.0, limiter.signals['load'])
+
+    def test_bad_options(self):
+        self.assertRaises(ValueError, limiters.AIMDLimiter, initial=0)
+        self.assertRaises(ValueError, limiters.AIMDLimiter,
+                          initial=8, maximum=4)
+        self.assertRaises(ValueError, limiters.AIMDLimiter, backoff=1)
+        self.assertRaises(ValueError, limiters.AIMDLimiter, tolerance=1)
+
+    def test_conductor_notifies(self):
+        persistence = impl_memory.MemoryBackend()
+        client = fake_client.FakeClient()
+        board = impl_zookeeper.ZookeeperJobBoard('testing', {},
+                                                 client=client,
+                                                 persistence=persistence)
+        limiter = self.make_limiter(initial=1)
+        conductor = backends.fetch('nonblocking', 'testing', board,
+                                   persistence=persistence, wait_timeout=0.1,
+                                   concurrency_limiter=limiter)
+        conductor.connect()
+        changes = []
+        changed_event = threading.Event()
+
+        def on_limit(event, details):
+            changes.append(details)
+            changed_event.set()
+
+        conductor.notifier.register('concurrency_limit', on_limit)
+        with close_many(conductor, client):
+            lb, fd = pu.temporary_flow_detail(persistence)
+            engines.save_factory_details(fd, test_factory,
+                                         [False], {},
+                                         backend=persistence)
+            board.post('poke', lb, details={'flow_uuid': fd.uuid})
+            t = threading_utils.daemon_thread(conductor.run)
+            t.start()
+            self.assertTrue(changed_event.wait(test_utils.WAIT_TIMEOUT))
+            conductor.stop()
+            self.assertTrue(conductor.wait(test_utils.WAIT_TIMEOUT))
+        self.assertEqual(1, changes[0]['previous_limit'])
+        self.assertEqual(2, changes[0]['limit'])
+        self.assertIsNone(changes[0]['reason'])
+        self.assertIsNotNone(changes[0]['latency'])
+
+
+class FlowCacheTest(test.TestCase):
+    def make_flow_detail(self, factory=test_factory, args=(False,)):
+        _lb, fd = pu.temporary_flow_detail()
+        engines.save_factory_details(fd, factory, list(args), {})
+        return fd
+
+    def test_factories_cached(self):
+        cache = flow_cache.FlowCache()
+        fd = self.make_flow_detail()
+        with mock.patch.object(flow_cache.importutils, 'import_class',
+                               return_value=test_factory) as import_class:
+            t1 = cache.checkout(fd)
+            t2 = cache.checkout(fd)
+        self.assertEqual(1, import_class.call_count)
+        self.assertIsNot(t1.flow, t2.flow)
+        self.assertIsNone(t1.key)
+        cache.checkin(t1)
+        self.assertEqual(0, cache.statistics['idle'])
+
+    def test_statistics(self):
+        cache = flow_cache.FlowCache(max_templates=1)
+        self.assertEqual({'hits': 0, 'misses': 0, 'reloads': 0, 'idle': 0},
+                         cache.statistics)
+
+    def test_templates_reused(self):
+        cache = flow_cache.FlowCache(max_templates=2)
+        fd = self.make_flow_detail()
+        t1 = cache.checkout(fd)
+        cache.checkin(t1)
+        self.assertIs(t1, cache.checkout(fd))
+        # Different factory arguments get a different template.
+        self.assertIsNot(t1, cache.checkout(self.make_flow_detail(
+            args=[True])))
+        self.assertEqual(1, cache.statistics['hits'])
+        self.assertEqual(2, cache.statistics['misses'])
+
+    def test_templates_not_shared(self):
+        cache = flow_cache.FlowCache(max_templates=1)
+        fd = self.make_flow_detail()
+        t1 = cache.checkout(fd)
+        t2 = cache.checkout(fd)
+        self.assertIsNot(t1, t2)
+        cache.checkin(t1)
+        cache.checkin(t2)
+        self.assertEqual(1, cache.statistics['idle'])
+        self.assertIs(t2, cache.checkout(fd))
+        self.assertIsNot(t1, cache.checkout(fd))
+
+    def test_reload(self):
+        cache = flow_cache.FlowCache(max_templates=1)
+        fd = self.make_flow_detail()
+        t1 = cache.checkout(fd)
+        cache.reload()
+        cache.checkin(t1)
+        self.assertEqual(0, cache.statistics['idle'])
+        self.assertIsNot(t1, cache.checkout(fd))
+
+    def test_missing_factory(self):
+        cache = flow_cache.FlowCache()
+        _lb, fd = pu.temporary_flow_detail()
+        self.assertRaises(ValueError, cache.checkout, fd)
+        fd.meta = {'factory': {'name': 'taskflow.tests.not_a_factory'}}
+        self.assertRaises(ImportError, cache.checkout, fd)
+
+
+class ProcessConductorTest(test.TestCase):
+    def setUp(self):
+        super(ProcessConductorTest, self).setUp()
+        tmp_dir = self.makeTmpDir()
+        self.board_conf = {
+            'board': 'sqlite',
+            'path': os.path.join(tmp_dir, 'jobs.db'),
+        }
+        self.persistence_conf = {
+            'connection': 'dir',
+            'path': os.path.join(tmp_dir, 'books'),
+        }
+        self.persistence = impl_dir.DirBackend(self.persistence_conf)
+        self.addCleanup(self.persistence.close)
+        self.board = impl_sqlite.SqliteJobBoard('testing', self.board_conf,
+                                                persistence=self.persistence)
+        self.board.connect()
+        self.addCleanup(self.board.close)
+
+    def make_conductor(self, workers=2, board_conf=None, **kwargs):
+        if board_conf is None:
+            board_conf = self.board_conf
+        return backends.fetch('process', 'testing', board_conf,
+                              persistence=self.persistence_conf,
+                              wait_timeout=0.1, workers=workers, **kwargs)
+
+    def post(self, factory=test_factory, args=(False,), store=None):
+        lb, fd = pu.temporary_flow_detail(self.persistence)
+        engines.save_factory_details(fd, factory, list(args), {},
+                                     backend=self.persistence)
+        return self.board.post('poke', lb,
+                               details={'flow_uuid': fd.uuid,
+                                        'store': store or {}})
+
+    def test_bad_options(self):
+        self.assertRaises(TypeError, backends.fetch, 'process', 'testing',
+                          self.board, persistence=self.persistence_conf)
+        self.assertRaises(TypeError, backends.fetch, 'process', 'testing',
+                          self.board_conf, persistence=self.persistence)
+        self.assertRaises(ValueError, self.make_conductor, workers=0)
+        self.assertRaises(ValueError, self.make_conductor, max_restarts=-1)
+
+    def test_run_max_dispatches(self):
+        for _i in range(0, 4):
+            self.post()
+        conductor = self.make_conductor()
+        consumed = []
+        conductor.notifier.register(
+            'job_consumed', lambda event, details: consumed.append(details))
+        conductor.run(max_dispatches=4)
+        self.assertFalse(conductor.dispatching)
+        self.assertEqual(0, self.board.job_count)
+        statistics = conductor.statistics
+        self.assertEqual(4, statistics['dispatched'])
+        self.assertEqual(4, statistics['job_consumed'])
+        self.assertEqual(0, statistics['children'])
+        owners = set(details['conductor'] for details in consumed)
+        self.assertTrue(owners.issubset(set(['testing-0', 'testing-1'])))
+
+    def test_stop_drains(self):
+        job = self.post(factory=sleep_factory, args=(),
+                        store={'duration': 0.5})
+        conductor = self.make_conductor(workers=1)
+        running = threading.Event()
+        conductor.notifier.register(
+            'running_start', lambda event, details: running.set())
+        t = threading_utils.daemon_thread(conductor.run)
+        t.start()
+        self.assertTrue(running.wait(test_utils.WAIT_TIMEOUT))
+        conductor.stop()
+        self.assertTrue(conductor.wait(test_utils.WAIT_TIMEOUT))
+        t.join()
+        self.assertEqual(st.COMPLETE, job.state)
+        self.assertEqual(1, conductor.statistics['job_consumed'])
+        self.assertEqual(0, conductor.statistics['job_abandoned'])
+
+    def test_restart_crashed(self):
+        conductor = self.make_conductor(workers=1)
+        started = []
+
+        def on_child_started(event, details):
+            started.append(details['pid'])
+            if len(started) == 1:
+                os.kill(details['pid'], signal.SIGKILL)
+
+        consumed = threading.Event()
+        conductor.notifier.register('child_started', on_child_started)
+        conductor.notifier.register(
+            'job_consumed', lambda event, details: consumed.set())
+        t = threading_utils.daemon_thread(conductor.run)
+        t.start()
+        self.post()
+        self.assertTrue(consumed.wait(test_utils.WAIT_TIMEOUT))
+        conductor.stop()
+        self.assertTrue(conductor.wait(test_utils.WAIT_TIMEOUT))
+        t.join()
+        self.assertEqual(1, conductor.statistics['restarts'])
+        self.assertEqual(2, len(set(started)))
+
+    @mock.patch.object(impl_process.ProcessConductor, 'RESTART_DELAY', 0.05)
+    def test_restart_gives_up(self):
+        # Children fail right away (the board has no database path).
+        conductor = self.make_conductor(workers=1,
+                                        board_conf={'board': 'sqlite'},
+                                        max_restarts=2)
+        started = []
+        conductor.notifier.register(
+            'child_started',
+            lambda event, details: started.append(timeutils.now()))
+        self.assertRaises(excp.ConductorFailure, conductor.run)
+        self.assertFalse(conductor.dispatching)
+        self.assertEqual(3, len(started))
+        statistics = conductor.statistics
+        self.assertEqual(2, statistics['restarts'])
+        self.assertEqual(0, statistics['children'])
+        # Each restart waits (twice as long as the previous one did).
+        self.assertGreaterEqual(0.05, started[1] - started[0])
+        self.assertGreaterEqual(0.1, started[2] - started[1])
+        self.assertFalse(hasattr(conductor, 'flow_cache'))
+
+
 class NonBlockingExecutorTest(test.TestCase):
     def test_bad_wait_timeout(self):
         persistence = impl_memory.MemoryBackend()
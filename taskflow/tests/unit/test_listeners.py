@@ -113,7 +113,7 @@ class TestClaimListener(test.TestCase, EngineMakerMixin):
         removed = 0
         for p, data in six.iteritems(children):
             if p.endswith(".lock"):
-                self.client.storage.pop(p)
+                self.client.delete(p)
                 removed += 1
         return removed
 
@@ -144,11 +144,16 @@ class TestClaimListener(test.TestCase, EngineMakerMixin):
         try_destroy = True
         ran_states = []
         with claims.CheckingClaimListener(e, job,
-                                          self.board, self.board.name):
+                                          self.board,
+                                          self.board.name) as listener:
             for state in e.run_iter():
                 ran_states.append(state)
                 if state == states.SCHEDULING and try_destroy:
                     try_destroy = bool(self._destroy_locks())
+                    # The loss is noticed (by the claim monitor) in the
+                    # background, so wait for that to happen...
+                    self.assertTrue(
+                        listener.watch.wait(test_utils.WAIT_TIMEOUT))
 
         self.assertEqual(states.SUSPENDED, e.storage.get_flow_state())
         self.assertEqual(1, ran_states.count(states.ANALYZING))
@@ -166,7 +171,7 @@ class TestClaimListener(test.TestCase, EngineMakerMixin):
         destroyed_at = -1
         with claims.CheckingClaimListener(e, job, self.board,
                                           self.board.name,
-                                          on_job_loss=handler):
+                                          on_job_loss=handler) as listener:
             for i, state in enumerate(e.run_iter()):
                 ran_states.append(state)
                 if state == states.SCHEDULING and try_destroy:
@@ -174,6 +179,8 @@ class TestClaimListener(test.TestCase, EngineMakerMixin):
                     if destroyed:
                         destroyed_at = i
                         try_destroy = False
+                        self.assertTrue(
+                            listener.watch.wait(test_utils.WAIT_TIMEOUT))
 
         self.assertTrue(handler.called)
         self.assertEqual(10, ran_states.count(states.SCHEDULING))
@@ -190,17 +197,37 @@ class TestClaimListener(test.TestCase, EngineMakerMixin):
         change_owner = True
         ran_states = []
         with claims.CheckingClaimListener(e, job,
-                                          self.board, self.board.name):
+                                          self.board,
+                                          self.board.name) as listener:
             for state in e.run_iter():
                 ran_states.append(state)
                 if state == states.SCHEDULING and change_owner:
                     change_owner = bool(self._change_owner('test-2'))
+                    self.assertTrue(
+                        listener.watch.wait(test_utils.WAIT_TIMEOUT))
 
         self.assertEqual(states.SUSPENDED, e.storage.get_flow_state())
         self.assertEqual(1, ran_states.count(states.ANALYZING))
         self.assertEqual(1, ran_states.count(states.SCHEDULING))
         self.assertEqual(1, ran_states.count(states.WAITING))
 
+    def test_claim_checks_local(self):
+        job = self._post_claim_job('test')
+        f = self._make_dummy_flow(10)
+        e = self._make_engine(f)
+
+        monitor = self.board.claim_monitor
+        with claims.CheckingClaimListener(e, job,
+                                          self.board, self.board.name):
+            self.assertEqual(1, monitor.statistics['watched'])
+            e.run()
+        self.assertEqual(states.SUCCESS, e.storage.get_flow_state())
+        statistics = monitor.statistics
+        self.assertEqual(0, statistics['watched'])
+        self.assertEqual(0, statistics['losses'])
+        self.assertEqual(1, statistics['remote_checks'])
+        self.assertGreater(10, statistics['local_checks'])
+
 
 class TestDurationListener(test.TestCase, EngineMakerMixin):
     def test_deregister(self):
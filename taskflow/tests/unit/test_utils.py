@@ -25,6 +25,7 @@ import testscenarios
 
 from taskflow import test
 from taskflow.utils import misc
+from taskflow.utils import schema_utils
 from taskflow.utils import threading_utils
 
 
@@ -353,3 +354,34 @@ class TestSafeCopyDictRaises(testscenarios.TestWithScenarios):
 
     def test_exceptions(self):
         self.assertRaises(self.exception, misc.safe_copy_dict, self.original)
+
+
+class TestSchemaValidate(test.TestCase):
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+            },
+        },
+        "required": ["items"],
+    }
+
+    def test_validate(self):
+        schema_utils.schema_validate({'items': [1]}, self.SCHEMA)
+        schema_utils.schema_validate({'items': (1,)}, self.SCHEMA)
+        self.assertRaises(schema_utils.ValidationError,
+                          schema_utils.schema_validate, {}, self.SCHEMA)
+        self.assertRaises(schema_utils.ValidationError,
+                          schema_utils.schema_validate, {'items': 1},
+                          self.SCHEMA)
+
+    def test_validator_cached(self):
+        validator = schema_utils.fetch_validator(self.SCHEMA)
+        self.assertIs(validator, schema_utils.fetch_validator(self.SCHEMA))
+        other = dict(self.SCHEMA)
+        self.assertIsNot(validator, schema_utils.fetch_validator(other))
+
+    def test_bad_schema(self):
+        self.assertRaises(schema_utils.SchemaError,
+                          schema_utils.schema_validate, {}, {'type': 1})
@@ -16,6 +16,9 @@
 
 from taskflow.engines.worker_based import engine
 from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import payloads
+from taskflow.engines.worker_based import selection
+from taskflow.engines.worker_based import serializers
 from taskflow.patterns import linear_flow as lf
 from taskflow.persistence import backends
 from taskflow import test
@@ -51,7 +54,16 @@ class TestWorkerBasedActionEngine(test.MockTestCase):
                                      transport_options=None,
                                      transition_timeout=mock.ANY,
                                      retry_options=None,
-                                     worker_expiry=mock.ANY)
+                                     worker_expiry=mock.ANY,
+                                     selection_policy=None,
+                                     validation_rate=1.0,
+                                     serializer='json',
+                                     batch_window=None,
+                                     batch_size=64,
+                                     payload_store=None,
+                                     payload_threshold=payloads.THRESHOLD,
+                                     drop_unwatched_events=False,
+                                     passive_discovery=False)
         ]
         self.assertEqual(expected_calls, self.master_mock.mock_calls)
 
@@ -60,6 +72,8 @@ class TestWorkerBasedActionEngine(test.MockTestCase):
         topics = ['test-topic1', 'test-topic2']
         exchange = 'test-exchange'
         broker_url = 'test-url'
+        policy = selection.PowerOfTwoPolicy()
+        store = payloads.DirectoryStore('/tmp')
         eng = self._create_engine(
             url=broker_url,
             exchange=exchange,
@@ -68,7 +82,16 @@ class TestWorkerBasedActionEngine(test.MockTestCase):
             transition_timeout=200,
             topics=topics,
             retry_options={},
-            worker_expiry=1)
+            worker_expiry=1,
+            selection_policy=policy,
+            validation_rate=0.5,
+            serializer=serializers.MSGPACK,
+            batch_window=0.05,
+            batch_size=10,
+            payload_store=store,
+            payload_threshold=1024,
+            drop_unwatched_events=True,
+            passive_discovery=True)
         expected_calls = [
             mock.call.executor_class(uuid=eng.storage.flow_uuid,
                                      url=broker_url,
@@ -78,7 +101,16 @@ class TestWorkerBasedActionEngine(test.MockTestCase):
                                      transport_options={},
                                      transition_timeout=200,
                                      retry_options={},
-                                     worker_expiry=1)
+                                     worker_expiry=1,
+                                     selection_policy=policy,
+                                     validation_rate=0.5,
+                                     serializer=serializers.MSGPACK,
+                                     batch_window=0.05,
+                                     batch_size=10,
+                                     payload_store=store,
+                                     payload_threshold=1024,
+                                     drop_unwatched_events=True,
+                                     passive_discovery=True)
         ]
         self.assertEqual(expected_calls, self.master_mock.mock_calls)
 
@@ -20,6 +20,7 @@ except ImportError:
     from kombu.transport import base as message
 
 from taskflow.engines.worker_based import dispatcher
+from taskflow import exceptions as excp
 from taskflow import test
 from taskflow.test import mock
 
@@ -78,3 +79,44 @@ class TestDispatcher(test.TestCase):
         self.assertTrue(msg.ack_log_error.called)
         self.assertFalse(msg.acknowledged)
         self.assertFalse(on_hello.called)
+
+    def test_validation_sampled(self):
+        on_hello = mock.MagicMock()
+        validator = mock.MagicMock()
+        handlers = {'hello': dispatcher.Handler(on_hello,
+                                                validator=validator)}
+        d = dispatcher.TypeDispatcher(type_handlers=handlers,
+                                      validation_rate=0.25)
+        for _i in range(0, 8):
+            d.on_message("", mock_acked_message(properties={'type': 'hello'}))
+        self.assertEqual(2, validator.call_count)
+        self.assertEqual(8, on_hello.call_count)
+        self.assertEqual({'validated': 2, 'skipped': 6}, d.statistics)
+
+    def test_validation_skipped(self):
+        on_hello = mock.MagicMock()
+        validator = mock.MagicMock()
+        handlers = {'hello': dispatcher.Handler(on_hello,
+                                                validator=validator)}
+        d = dispatcher.TypeDispatcher(type_handlers=handlers,
+                                      validation_rate=0)
+        d.on_message("", mock_acked_message(properties={'type': 'hello'}))
+        self.assertFalse(validator.called)
+        self.assertTrue(on_hello.called)
+        self.assertEqual({'validated': 0, 'skipped': 1}, d.statistics)
+
+    def test_validation_rejected(self):
+        on_hello = mock.MagicMock()
+        validator = mock.MagicMock(side_effect=excp.InvalidFormat("bad"))
+        handlers = {'hello': dispatcher.Handler(on_hello,
+                                                validator=validator)}
+        d = dispatcher.TypeDispatcher(type_handlers=handlers)
+        msg = mock_acked_message(properties={'type': 'hello'})
+        d.on_message("", msg)
+        self.assertTrue(msg.reject_log_error.called)
+        self.assertFalse(on_hello.called)
+        self.assertEqual({'validated': 1, 'skipped': 0}, d.statistics)
+
+    def test_bad_validation_rate(self):
+        self.assertRaises(ValueError, dispatcher.TypeDispatcher,
+                          validation_rate=1.5)
@@ -31,6 +31,28 @@ class Task(task.Task):
         pass
 
 
+class ResettableTask(task.Task):
+
+    def __init__(self, *args, **kwargs):
+        super(ResettableTask, self).__init__(*args, **kwargs)
+        self.resets = 0
+
+    def execute(self, *args, **kwargs):
+        pass
+
+    def reset(self):
+        self.resets += 1
+
+
+class BrokenResetTask(task.Task):
+
+    def execute(self, *args, **kwargs):
+        pass
+
+    def reset(self):
+        raise RuntimeError("Woot!")
+
+
 class TestEndpoint(test.TestCase):
 
     def setUp(self):
@@ -81,3 +103,60 @@ class TestEndpoint(test.TestCase):
                                      result=self.task_result,
                                      failures={})
         self.assertIsNone(result)
+
+    def test_not_pooled(self):
+        task = self.task_ep.generate(name='test')
+        self.assertFalse(self.task_ep.pooling)
+        self.assertFalse(self.task_ep.release(task, name='test'))
+        self.assertIsNot(task, self.task_ep.generate(name='test'))
+        self.assertEqual(0, self.task_ep.warm())
+
+    def test_pooled(self):
+        endpoint = ep.Endpoint(ResettableTask, pool_size=2)
+        task = endpoint.generate(name='test', version=(1, 0))
+        self.assertTrue(endpoint.release(task, name='test', version=(1, 0)))
+        self.assertEqual(1, task.resets)
+        self.assertIs(task, endpoint.generate(name='test', version=[1, 0]))
+        self.assertEqual({'hits': 1, 'misses': 1, 'pooled': 0},
+                         endpoint.statistics)
+
+    def test_pooled_by_name_and_version(self):
+        endpoint = ep.Endpoint(ResettableTask, pool_size=2)
+        task = endpoint.generate(name='test', version=(1, 0))
+        endpoint.release(task, name='test', version=(1, 0))
+        self.assertIsNot(task, endpoint.generate(name='other',
+                                                 version=(1, 0)))
+        self.assertIsNot(task, endpoint.generate(name='test',
+                                                 version=(2, 0)))
+        self.assertEqual({'hits': 0, 'misses': 3, 'pooled': 1},
+                         endpoint.statistics)
+
+    def test_pool_size_limited(self):
+        endpoint = ep.Endpoint(ResettableTask, pool_size=1)
+        tasks = [endpoint.generate(name='test') for _i in range(0, 2)]
+        self.assertTrue(endpoint.release(tasks[0], name='test'))
+        self.assertFalse(endpoint.release(tasks[1], name='test'))
+        self.assertEqual(1, endpoint.statistics['pooled'])
+
+    def test_failed_reset_not_pooled(self):
+        endpoint = ep.Endpoint(BrokenResetTask, pool_size=1)
+        task = endpoint.generate(name='test')
+        self.assertFalse(endpoint.release(task, name='test'))
+        self.assertEqual(0, endpoint.statistics['pooled'])
+
+    def test_warm(self):
+        endpoint = ep.Endpoint(ResettableTask, pool_size=2)
+        self.assertEqual(4, endpoint.warm(names=['a', 'b']))
+        self.assertEqual(0, endpoint.warm(names=['a']))
+        task = endpoint.generate(name='a', version=(1, 0))
+        self.assertEqual('a', task.name)
+        self.assertEqual({'hits': 1, 'misses': 0, 'pooled': 3},
+                         endpoint.statistics)
+
+    def test_warm_default_name(self):
+        endpoint = ep.Endpoint(ResettableTask, pool_size=1)
+        self.assertEqual(1, endpoint.warm())
+        task = endpoint.generate(
+            name=reflection.get_class_name(ResettableTask), version=(1, 0))
+        self.assertEqual(1, task.resets)
+        self.assertEqual(1, endpoint.statistics['hits'])
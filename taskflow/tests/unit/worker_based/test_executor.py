@@ -17,7 +17,10 @@
 import threading
 import time
 
+from oslo_utils import reflection
+
 from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import payloads
 from taskflow.engines.worker_based import protocol as pr
 from taskflow import task as task_atom
 from taskflow import test
@@ -85,7 +88,9 @@ class TestWorkerTaskExecutor(test.MockTestCase):
                             on_wait=ex._on_wait,
                             url=self.broker_url, transport=mock.ANY,
                             transport_options=mock.ANY,
-                            retry_options=mock.ANY),
+                            retry_options=mock.ANY,
+                            validation_rate=1.0,
+                            receive_broadcasts=False),
             mock.call.proxy.dispatcher.type_handlers.update(mock.ANY),
         ]
         self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
@@ -179,17 +184,76 @@ class TestWorkerTaskExecutor(test.MockTestCase):
 
     @mock.patch('oslo_utils.timeutils.now')
     def test_on_wait_task_expired(self, mock_now):
-        mock_now.side_effect = [0, 120]
+        mock_now.return_value = 120
 
         self.request_inst_mock.expired = True
         self.request_inst_mock.created_on = 0
 
         ex = self.executor()
-        ex._ongoing_requests[self.task_uuid] = self.request_inst_mock
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
         self.assertEqual(1, len(ex._ongoing_requests))
 
         ex._on_wait()
         self.assertEqual(0, len(ex._ongoing_requests))
+        self.assertEqual([], ex._deadlines)
+
+    @mock.patch('oslo_utils.timeutils.now')
+    def test_on_wait_task_deadline_not_reached(self, mock_now):
+        mock_now.return_value = self.timeout - 1
+
+        self.request_inst_mock.created_on = 0
+        expired = mock.PropertyMock(return_value=True)
+        type(self.request_inst_mock).expired = expired
+
+        ex = self.executor()
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        ex._on_wait()
+        self.assertEqual(1, len(ex._ongoing_requests))
+        # Requests that have not reached their deadline are not looked at.
+        self.assertFalse(expired.called)
+
+    def test_on_wait_waiting_matching_only(self):
+        tasks = [test_utils.DummyTask(), test_utils.TaskOneReturn()]
+        requests = [mock.MagicMock(uuid='uuid-%s' % i, task=task,
+                                   current_state=pr.WAITING, created_on=0,
+                                   expired=False)
+                    for i, task in enumerate(tasks)]
+        self.request_mock.side_effect = requests
+        ex = self.executor()
+        for request in requests:
+            ex.execute_task(request.task, request.uuid, self.task_args)
+        self.assertEqual(2, len(ex._waiting_requests))
+
+        notify = pr.Notify(topic=self.executor_topic,
+                           tasks=[reflection.get_class_name(tasks[0])])
+        ex._finder.process_response(notify.to_dict(), mock.MagicMock())
+        requests[1].reset_mock()
+        ex._on_wait()
+
+        requests[0].transition_and_log_error.assert_called_once_with(
+            pr.PENDING, logger=mock.ANY)
+        self.proxy_inst_mock.publish.assert_called_with(
+            requests[0], self.executor_topic, reply_to=self.executor_uuid,
+            correlation_id=requests[0].uuid, serializer='json')
+        self.assertEqual([], requests[1].mock_calls)
+        self.assertEqual([reflection.get_class_name(tasks[1])],
+                         list(ex._waiting_requests))
+
+    def test_on_wait_passive_discovery(self):
+        ex = self.executor(passive_discovery=True)
+        ex._on_wait()
+        self.assertFalse(self.proxy_inst_mock.publish.called)
+
+        # Topics are only asked to notify when a request waits for a worker.
+        self.request_inst_mock.current_state = pr.WAITING
+        self.request_inst_mock.task = self.task
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        ex._on_wait()
+        self.proxy_inst_mock.publish.assert_called_once_with(
+            mock.ANY, [self.executor_topic], reply_to=self.executor_uuid,
+            headers={pr.Notify.EXTENDED_HEADER: True})
+        notify = self.proxy_inst_mock.publish.call_args[0][0]
+        self.assertIsInstance(notify, pr.Notify)
 
     def test_execute_task(self):
         ex = self.executor()
@@ -199,13 +263,15 @@ class TestWorkerTaskExecutor(test.MockTestCase):
         expected_calls = [
             mock.call.Request(self.task, self.task_uuid, 'execute',
                               self.task_args, timeout=self.timeout,
-                              result=mock.ANY, failures=mock.ANY),
+                              result=mock.ANY, failures=mock.ANY,
+                              events=None),
             mock.call.request.transition_and_log_error(pr.PENDING,
                                                        logger=mock.ANY),
             mock.call.proxy.publish(self.request_inst_mock,
                                     self.executor_topic,
                                     reply_to=self.executor_uuid,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.assertEqual(expected_calls, self.master_mock.mock_calls)
 
@@ -219,16 +285,38 @@ class TestWorkerTaskExecutor(test.MockTestCase):
             mock.call.Request(self.task, self.task_uuid, 'revert',
                               self.task_args, timeout=self.timeout,
                               failures=self.task_failures,
-                              result=self.task_result),
+                              result=self.task_result, events=None),
             mock.call.request.transition_and_log_error(pr.PENDING,
                                                        logger=mock.ANY),
             mock.call.proxy.publish(self.request_inst_mock,
                                     self.executor_topic,
                                     reply_to=self.executor_uuid,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.assertEqual(expected_calls, self.master_mock.mock_calls)
 
+    def test_execute_task_watched_events(self):
+        ex = self.executor(drop_unwatched_events=True)
+        progress_callback = lambda *args, **kwargs: None
+        ex.execute_task(self.task, self.task_uuid, self.task_args,
+                        progress_callback=progress_callback)
+        self.request_mock.assert_called_once_with(
+            self.task, self.task_uuid, 'execute', self.task_args,
+            timeout=self.timeout, result=mock.ANY, failures=mock.ANY,
+            events=[task_atom.EVENT_UPDATE_PROGRESS])
+
+    def test_execute_task_watched_events_any(self):
+        task = test_utils.DummyTask()
+        task.notifier.register(task.notifier.ANY,
+                               lambda *args, **kwargs: None)
+        ex = self.executor(drop_unwatched_events=True)
+        ex.execute_task(task, self.task_uuid, self.task_args)
+        self.request_mock.assert_called_once_with(
+            task, self.task_uuid, 'execute', self.task_args,
+            timeout=self.timeout, result=mock.ANY, failures=mock.ANY,
+            events=None)
+
     def test_execute_task_topic_not_found(self):
         ex = self.executor()
         ex.execute_task(self.task, self.task_uuid, self.task_args)
@@ -236,7 +324,8 @@ class TestWorkerTaskExecutor(test.MockTestCase):
         expected_calls = [
             mock.call.Request(self.task, self.task_uuid, 'execute',
                               self.task_args, timeout=self.timeout,
-                              result=mock.ANY, failures=mock.ANY),
+                              result=mock.ANY, failures=mock.ANY,
+                              events=None),
         ]
         self.assertEqual(expected_calls, self.master_mock.mock_calls)
 
@@ -249,19 +338,178 @@ class TestWorkerTaskExecutor(test.MockTestCase):
         expected_calls = [
             mock.call.Request(self.task, self.task_uuid, 'execute',
                               self.task_args, timeout=self.timeout,
-                              result=mock.ANY, failures=mock.ANY),
+                              result=mock.ANY, failures=mock.ANY,
+                              events=None),
             mock.call.request.transition_and_log_error(pr.PENDING,
                                                        logger=mock.ANY),
             mock.call.proxy.publish(self.request_inst_mock,
                                     self.executor_topic,
                                     reply_to=self.executor_uuid,
-                                    correlation_id=self.task_uuid),
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
             mock.call.request.transition_and_log_error(pr.FAILURE,
                                                        logger=mock.ANY),
             mock.call.request.set_result(mock.ANY)
         ]
         self.assertEqual(expected_calls, self.master_mock.mock_calls)
 
+    def _batching_executor(self):
+        ex = self.executor(batch_window=60)
+        worker, _new = ex._finder._add(self.executor_topic, [self.task.name])
+        worker.batching = True
+        self.request_inst_mock.current_state = pr.PENDING
+        ex._batcher.start()
+        self.addCleanup(ex._batcher.stop, flush=False)
+        return ex
+
+    def test_execute_task_batched(self):
+        ex = self._batching_executor()
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        self.assertEqual(0, self.proxy_inst_mock.publish.call_count)
+
+        ex._batcher.flush()
+        self.assertEqual(1, self.proxy_inst_mock.publish.call_count)
+        args, kwargs = self.proxy_inst_mock.publish.call_args
+        self.assertIsInstance(args[0], pr.BatchRequest)
+        self.assertEqual([self.request_inst_mock] * 2, args[0].requests)
+        self.assertEqual((self.executor_topic,), args[1:])
+        self.assertEqual({'reply_to': self.executor_uuid,
+                          'correlation_id': None,
+                          'serializer': 'json'}, kwargs)
+
+    def test_execute_task_batched_single(self):
+        ex = self._batching_executor()
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        ex._batcher.flush()
+        self.proxy_inst_mock.publish.assert_called_once_with(
+            self.request_inst_mock, self.executor_topic,
+            reply_to=self.executor_uuid, correlation_id=self.task_uuid,
+            serializer='json')
+
+    def test_execute_task_batched_expired(self):
+        ex = self._batching_executor()
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        self.request_inst_mock.current_state = pr.FAILURE
+        ex._batcher.flush()
+        self.assertEqual(0, self.proxy_inst_mock.publish.call_count)
+
+    def test_execute_task_batched_publish_error(self):
+        self.proxy_inst_mock.publish.side_effect = Exception('Woot!')
+        requests = [mock.MagicMock(uuid=uuid, current_state=pr.PENDING,
+                                   created_on=0)
+                    for uuid in ('uuid-1', 'uuid-2')]
+        self.request_mock.side_effect = requests
+        ex = self._batching_executor()
+        for request in requests:
+            ex.execute_task(self.task, request.uuid, self.task_args)
+        self.assertEqual(2, len(ex._ongoing_requests))
+        ex._batcher.flush()
+        self.assertEqual(0, len(ex._ongoing_requests))
+        for request in requests:
+            request.transition_and_log_error.assert_called_with(
+                pr.FAILURE, logger=mock.ANY)
+            self.assertEqual(1, request.set_result.call_count)
+
+    def test_execute_task_batched_size(self):
+        ex = self.executor(batch_window=60, batch_size=2)
+        worker, _new = ex._finder._add(self.executor_topic, [self.task.name])
+        worker.batching = True
+        self.request_inst_mock.current_state = pr.PENDING
+        ex._batcher.start()
+        self.addCleanup(ex._batcher.stop, flush=False)
+        for _i in range(0, 3):
+            ex.execute_task(self.task, self.task_uuid, self.task_args)
+        self.assertEqual(1, self.proxy_inst_mock.publish.call_count)
+        self.assertEqual(1, len(ex._batcher))
+
+    def test_execute_task_not_batched_worker(self):
+        ex = self.executor(batch_window=60)
+        ex._finder._add(self.executor_topic, [self.task.name])
+        ex._batcher.start()
+        self.addCleanup(ex._batcher.stop, flush=False)
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        self.assertEqual(1, self.proxy_inst_mock.publish.call_count)
+        self.assertEqual(0, len(ex._batcher))
+
+    def test_execute_task_offloads_payloads(self):
+        store = mock.MagicMock(name='store', uri='file:///shared')
+        self.request_inst_mock.offload.return_value = ['key']
+        ex = self.executor(payload_store=store)
+        worker, _new = ex._finder._add(self.executor_topic, [self.task.name])
+        worker.payload_store = store.uri
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        self.request_inst_mock.offload.assert_called_once_with(ex._offloader)
+        self.assertEqual({self.task_uuid: ['key']}, ex._payload_keys)
+
+        response = pr.Response(pr.SUCCESS, result=self.task_result)
+        ex._process_response(response.to_dict(), self.message_mock)
+        store.delete.assert_called_once_with('key')
+        self.assertEqual({}, ex._payload_keys)
+
+    def test_execute_task_not_offloaded_other_store(self):
+        store = mock.MagicMock(name='store', uri='file:///shared')
+        ex = self.executor(payload_store=store)
+        ex._finder._add(self.executor_topic, [self.task.name])
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        self.assertFalse(self.request_inst_mock.offload.called)
+        self.assertEqual(1, self.proxy_inst_mock.publish.call_count)
+
+    def test_execute_task_offload_failure(self):
+        store = mock.MagicMock(name='store', uri='file:///shared')
+        self.request_inst_mock.offload.side_effect = IOError("Woot!")
+        ex = self.executor(payload_store=store)
+        worker, _new = ex._finder._add(self.executor_topic, [self.task.name])
+        worker.payload_store = store.uri
+        ex.execute_task(self.task, self.task_uuid, self.task_args)
+        self.assertFalse(self.proxy_inst_mock.publish.called)
+        self.assertEqual(0, len(ex._ongoing_requests))
+        self.request_inst_mock.set_result.assert_called_once_with(mock.ANY)
+
+    def test_on_message_response_offloaded_result(self):
+        store = mock.MagicMock(name='store', uri='file:///shared')
+        ex = self.executor(payload_store=store)
+        offloader = payloads.Offloader(store, threshold=0)
+        store.put.return_value = 'key'
+        reference, _key = offloader.offload(self.task_result)
+        store.get.return_value = store.put.call_args[0][0]
+        response = pr.Response(pr.SUCCESS, result=reference)
+        ex._ongoing_requests[self.task_uuid] = self.request_inst_mock
+        ex._process_response(response.to_dict(), self.message_mock)
+
+        self.request_inst_mock.set_result.assert_called_once_with(
+            result=self.task_result)
+        store.delete.assert_called_once_with('key')
+
+    def test_on_message_response_offloaded_result_unknown_task(self):
+        store = mock.MagicMock(name='store', uri='file:///shared')
+        ex = self.executor(payload_store=store)
+        store.put.return_value = 'key'
+        reference, _key = payloads.Offloader(store, threshold=0).offload(
+            self.task_result)
+        response = pr.Response(pr.SUCCESS, result=reference)
+        ex._process_response(response.to_dict(), self.message_mock)
+        store.delete.assert_called_once_with('key')
+
+    def test_on_message_batch_response(self):
+        batch = pr.BatchResponse([
+            (self.task_uuid, pr.Response(pr.RUNNING)),
+            (self.task_uuid, pr.Response(pr.SUCCESS,
+                                         result=self.task_result)),
+            ('unknown-uuid', pr.Response(pr.RUNNING)),
+        ])
+        ex = self.executor()
+        ex._ongoing_requests[self.task_uuid] = self.request_inst_mock
+        ex._process_batch_response(batch.to_dict(), self.message_mock)
+
+        self.assertEqual(0, len(ex._ongoing_requests))
+        expected_calls = [
+            mock.call.transition_and_log_error(pr.RUNNING, logger=mock.ANY),
+            mock.call.transition_and_log_error(pr.SUCCESS, logger=mock.ANY),
+            mock.call.set_result(result=self.task_result),
+        ]
+        self.assertEqual(expected_calls, self.request_inst_mock.mock_calls)
+
     def test_start_stop(self):
         ex = self.executor()
         ex.start()
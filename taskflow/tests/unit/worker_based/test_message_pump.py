@@ -57,6 +57,33 @@ class TestMessagePump(test.TestCase):
         self.assertTrue(on_notify.called)
         on_notify.assert_called_with({}, mock.ANY)
 
+    def test_notify_headers(self):
+        barrier = threading.Event()
+        received = []
+
+        def on_notify(data, message):
+            received.append(dict(message.headers))
+            barrier.set()
+
+        handlers = {pr.NOTIFY: dispatcher.Handler(on_notify)}
+        p = proxy.Proxy(TEST_TOPIC, TEST_EXCHANGE, handlers,
+                        transport='memory',
+                        transport_options={
+                            'polling_interval': POLLING_INTERVAL,
+                        })
+
+        t = threading_utils.daemon_thread(p.start)
+        t.start()
+        p.wait()
+        p.publish(pr.Notify(), TEST_TOPIC,
+                  headers={pr.Notify.EXTENDED_HEADER: True})
+
+        self.assertTrue(barrier.wait(test_utils.WAIT_TIMEOUT))
+        p.stop()
+        t.join()
+
+        self.assertEqual([{pr.Notify.EXTENDED_HEADER: True}], received)
+
     def test_response(self):
         barrier = threading.Event()
 
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+
+from taskflow.engines.worker_based import payloads
+from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import serializers
+from taskflow import exceptions as exc
+from taskflow import test
+from taskflow.test import mock
+from taskflow.tests import utils
+
+
+class TestPayloads(test.TestCase):
+
+    def setUp(self):
+        super(TestPayloads, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.store = payloads.DirectoryStore(self.path)
+        self.offloader = payloads.Offloader(self.store, threshold=64)
+
+    def test_store(self):
+        key = self.store.put(b'data')
+        self.assertEqual(b'data', self.store.get(key))
+        self.store.delete(key)
+        self.assertRaises(exc.NotFound, self.store.get, key)
+        self.store.delete(key)
+        self.assertEqual([], os.listdir(self.path))
+
+    def test_store_rejects_paths(self):
+        self.assertRaises(exc.NotFound, self.store.get, '../escape')
+
+    def test_small_not_offloaded(self):
+        value, key = self.offloader.offload([1, 2, 3])
+        self.assertIsNone(key)
+        self.assertEqual([1, 2, 3], value)
+        self.assertFalse(payloads.is_reference(value))
+
+    def test_small_not_serialized(self):
+        for value in [None, True, 1, 2 ** 63, -1.5, b'x' * 59, u'\u00e9' * 14]:
+            with mock.patch.object(serializers, 'dumps') as dumps:
+                self.assertEqual((value, None), self.offloader.offload(value))
+                self.assertFalse(dumps.called)
+        reference, key = self.offloader.offload(u'\u00e9' * 40)
+        self.assertTrue(payloads.is_reference(reference))
+        self.assertEqual(u'\u00e9' * 40, self.offloader.fetch(reference))
+        self.offloader.delete([key])
+
+    def test_offload_fetch(self):
+        value = list(range(0, 100))
+        reference, key = self.offloader.offload(value)
+        self.assertTrue(payloads.is_reference(reference))
+        self.assertEqual(key, payloads.Offloader.get_key(reference))
+        self.assertEqual(value, self.offloader.fetch(reference))
+        self.offloader.delete([key])
+        self.assertRaises(exc.NotFound, self.offloader.fetch, reference)
+
+    def test_fetch_checks_hash(self):
+        reference, key = self.offloader.offload(list(range(0, 100)))
+        with open(os.path.join(self.path, key), 'wb') as fh:
+            fh.write(b'corrupted')
+        self.assertRaises(exc.InvalidFormat, self.offloader.fetch, reference)
+
+    def test_request_offload(self):
+        request = pr.Request(utils.DummyTask("hi"), 'uuid', pr.REVERT,
+                             {'small': 1, 'big': 'x' * 100}, timeout=60,
+                             result='y' * 100)
+        keys = request.offload(self.offloader)
+        self.assertEqual(2, len(keys))
+        data = request.to_dict()
+        self.assertEqual(self.store.uri, data['payload_store'])
+        self.assertEqual(1, data['arguments']['small'])
+        self.assertEqual('x' * 100,
+                         self.offloader.fetch(data['arguments']['big']))
+        result_type, result = data['result']
+        self.assertEqual('success', result_type)
+        self.assertEqual('y' * 100, self.offloader.fetch(result))
+        pr.Request.validate(data)
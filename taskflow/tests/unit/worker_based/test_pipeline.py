@@ -14,27 +14,42 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+import shutil
+import tempfile
+import time
+
 import futurist
 from futurist import waiters
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
 from taskflow.engines.action_engine import executor as base_executor
 from taskflow.engines.worker_based import endpoint
 from taskflow.engines.worker_based import executor as worker_executor
+from taskflow.engines.worker_based import payloads
+from taskflow.engines.worker_based import protocol as pr
 from taskflow.engines.worker_based import server as worker_server
+from taskflow import task
 from taskflow import test
+from taskflow.test import mock
 from taskflow.tests import utils as test_utils
 from taskflow.types import failure
 from taskflow.utils import threading_utils
 
 
+class EchoTask(task.Task):
+    def execute(self, value):
+        return value
+
+
 TEST_EXCHANGE, TEST_TOPIC = ('test-exchange', 'test-topic')
 WAIT_TIMEOUT = 1.0
 POLLING_INTERVAL = 0.01
 
 
 class TestPipeline(test.TestCase):
-    def _fetch_server(self, task_classes):
+    def _fetch_server(self, task_classes, **kwargs):
         endpoints = []
         for cls in task_classes:
             endpoints.append(endpoint.Endpoint(cls))
@@ -44,11 +59,11 @@ class TestPipeline(test.TestCase):
             transport='memory',
             transport_options={
                 'polling_interval': POLLING_INTERVAL,
-            })
+            }, **kwargs)
         server_thread = threading_utils.daemon_thread(server.start)
         return (server, server_thread)
 
-    def _fetch_executor(self):
+    def _fetch_executor(self, **kwargs):
         executor = worker_executor.WorkerTaskExecutor(
             uuidutils.generate_uuid(),
             TEST_EXCHANGE,
@@ -56,12 +71,14 @@ class TestPipeline(test.TestCase):
             transport='memory',
             transport_options={
                 'polling_interval': POLLING_INTERVAL,
-            })
+            }, **kwargs)
         return executor
 
-    def _start_components(self, task_classes):
-        server, server_thread = self._fetch_server(task_classes)
-        executor = self._fetch_executor()
+    def _start_components(self, task_classes, server_kwargs=None,
+                          **executor_kwargs):
+        server, server_thread = self._fetch_server(task_classes,
+                                                   **(server_kwargs or {}))
+        executor = self._fetch_executor(**executor_kwargs)
         self.addCleanup(executor.stop)
         self.addCleanup(server_thread.join)
         self.addCleanup(server.stop)
@@ -100,3 +117,107 @@ class TestPipeline(test.TestCase):
         self.assertIsInstance(result, failure.Failure)
         self.assertEqual(RuntimeError, result.check(RuntimeError))
         self.assertEqual(base_executor.EXECUTED, action)
+
+    def test_batched_execution_pipeline(self):
+        task_classes = [
+            test_utils.TaskOneReturn,
+            test_utils.TaskWithFailure,
+        ]
+        executor, server = self._start_components(task_classes,
+                                                  batch_window=0.05)
+        self.assertEqual(0, executor.wait_for_workers(timeout=WAIT_TIMEOUT))
+
+        with mock.patch.object(executor._proxy, 'publish',
+                               wraps=executor._proxy.publish) as publish:
+            fs = []
+            for _i in range(0, 5):
+                fs.append(executor.execute_task(test_utils.TaskOneReturn(),
+                                                uuidutils.generate_uuid(),
+                                                {}))
+            f = executor.execute_task(test_utils.TaskWithFailure(),
+                                      uuidutils.generate_uuid(), {})
+            waiters.wait_for_all(fs + [f])
+
+        for f_done in fs:
+            self.assertEqual((base_executor.EXECUTED, 1), f_done.result())
+        action, result = f.result()
+        self.assertEqual(base_executor.EXECUTED, action)
+        self.assertEqual(RuntimeError, result.check(RuntimeError))
+        batches = [call[0][0] for call in publish.call_args_list
+                   if isinstance(call[0][0], pr.BatchRequest)]
+        self.assertTrue(batches)
+        self.assertEqual(6, sum(len(batch.requests) for batch in batches))
+
+    def test_offloaded_execution_pipeline(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        store = payloads.DirectoryStore(path)
+        executor, server = self._start_components(
+            [EchoTask], server_kwargs={
+                'payload_store': store,
+                'payload_threshold': 1024,
+            }, payload_store=store, payload_threshold=1024)
+        self.assertEqual(0, executor.wait_for_workers(timeout=WAIT_TIMEOUT))
+
+        value = 'x' * 4096
+        with mock.patch.object(executor._proxy, 'publish',
+                               wraps=executor._proxy.publish) as publish:
+            f = executor.execute_task(EchoTask(), uuidutils.generate_uuid(),
+                                      {'value': value})
+            waiters.wait_for_any([f])
+
+        self.assertEqual((base_executor.EXECUTED, value), f.result())
+        requests = [call[0][0].to_dict() for call in publish.call_args_list
+                    if isinstance(call[0][0], pr.Request)]
+        self.assertTrue(payloads.is_reference(
+            requests[0]['arguments']['value']))
+        # Everything sent out-of-band was cleaned up once it finished.
+        self.assertEqual([], os.listdir(path))
+
+    def test_passive_discovery_pipeline(self):
+        # The worker only announces itself when it starts (and stops).
+        executor, server = self._start_components(
+            [test_utils.TaskOneReturn],
+            server_kwargs={'heartbeat_period': 60},
+            passive_discovery=True)
+        with mock.patch.object(executor._proxy, 'publish',
+                               wraps=executor._proxy.publish) as publish:
+            watch = timeutils.StopWatch()
+            watch.start()
+            self.assertEqual(0,
+                             executor.wait_for_workers(timeout=WAIT_TIMEOUT))
+            # Found (well) before the worker would have been asked to notify.
+            self.assertLess(watch.elapsed(), pr.NOTIFY_PERIOD)
+            f = executor.execute_task(test_utils.TaskOneReturn(),
+                                      uuidutils.generate_uuid(), {})
+            self.assertEqual((base_executor.EXECUTED, 1), f.result())
+
+        # Nothing besides the request itself was sent to the worker.
+        self.assertEqual(1, publish.call_count)
+        self.assertIsInstance(publish.call_args[0][0], pr.Request)
+
+        server.stop()
+        watch = timeutils.StopWatch(duration=WAIT_TIMEOUT)
+        watch.start()
+        while executor._finder.total_workers and not watch.expired():
+            time.sleep(POLLING_INTERVAL)
+        self.assertEqual(0, executor._finder.total_workers)
+
+    def test_passive_discovery_heartbeats(self):
+        executor, server = self._start_components(
+            [test_utils.TaskOneReturn],
+            server_kwargs={'heartbeat_period': POLLING_INTERVAL},
+            passive_discovery=True)
+        self.assertEqual(0, executor.wait_for_workers(timeout=WAIT_TIMEOUT))
+        with mock.patch.object(executor._proxy, 'publish',
+                               wraps=executor._proxy.publish) as publish:
+            watch = timeutils.StopWatch(duration=WAIT_TIMEOUT)
+            watch.start()
+            processed = executor._finder.messages_processed
+            while (executor._finder.messages_processed < processed + 3 and
+                   not watch.expired()):
+                time.sleep(POLLING_INTERVAL)
+        # The worker kept announcing itself without being asked to.
+        self.assertGreaterEqual(processed + 3,
+                                executor._finder.messages_processed)
+        self.assertEqual(0, publish.call_count)
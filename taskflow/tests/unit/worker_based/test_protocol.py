@@ -45,6 +45,23 @@ class TestProtocolValidation(test.TestCase):
         msg = pr.Notify(topic="bob", tasks=['a', 'b', 'c'])
         pr.Notify.validate(msg.to_dict(), True)
 
+    def test_reply_notify_with_load(self):
+        msg = pr.Notify(topic="bob", tasks=['a'], capacity=4,
+                        in_flight=2, queued=0)
+        pr.Notify.validate(msg.to_dict(), True)
+        self.assertEqual(4, msg.capacity)
+        self.assertEqual(2, msg.in_flight)
+        self.assertEqual(0, msg.queued)
+
+    def test_reply_notify_invalid_load(self):
+        msg = {
+            'topic': 'bob',
+            'tasks': ['a'],
+            'in_flight': -1,
+        }
+        self.assertRaises(excp.InvalidFormat,
+                          pr.Notify.validate, msg, True)
+
     def test_reply_notify_invalid(self):
         msg = {
             'topic': {},
@@ -94,6 +111,55 @@ class TestProtocolValidation(test.TestCase):
         msg = pr.Response('STUFF')
         self.assertRaises(excp.InvalidFormat, pr.Response.validate, msg)
 
+    def test_batch_request(self):
+        requests = [pr.Request(utils.DummyTask("hi-%s" % i),
+                               uuidutils.generate_uuid(),
+                               pr.EXECUTE, {}, 1.0) for i in range(0, 3)]
+        msg = pr.BatchRequest(requests).to_dict()
+        pr.BatchRequest.validate(msg)
+        self.assertEqual([r.uuid for r in requests],
+                         [entry['uuid'] for entry in msg['requests']])
+
+    def test_batch_request_invalid(self):
+        request = pr.Request(utils.DummyTask("hi"),
+                             uuidutils.generate_uuid(),
+                             pr.EXECUTE, {}, 1.0)
+        msg = pr.BatchRequest([request]).to_dict()
+        msg['requests'][0]['request']['action'] = 'NOTHING'
+        self.assertRaises(excp.InvalidFormat, pr.BatchRequest.validate, msg)
+        self.assertRaises(excp.InvalidFormat, pr.BatchRequest.validate,
+                          {'requests': [{'uuid': 'a'}]})
+
+    def test_batch_response(self):
+        msg = pr.BatchResponse([
+            ('a', pr.Response(pr.RUNNING)),
+            ('a', pr.Response(pr.SUCCESS, result=1)),
+        ])
+        pr.BatchResponse.validate(msg.to_dict())
+
+    def test_batch_response_invalid(self):
+        msg = pr.BatchResponse([
+            ('a', pr.Response('STUFF')),
+        ])
+        self.assertRaises(excp.InvalidFormat, pr.BatchResponse.validate,
+                          msg.to_dict())
+
+    def test_announcement(self):
+        notify = pr.Notify(topic="bob", tasks=['a'], capacity=4)
+        msg = pr.Announcement('worker-1', notify, leaving=True).to_dict()
+        pr.Announcement.validate(msg)
+        announcement = pr.Announcement.from_dict(msg)
+        self.assertEqual('worker-1', announcement.identity)
+        self.assertTrue(announcement.leaving)
+        self.assertEqual(4, announcement.notify.capacity)
+
+    def test_announcement_invalid(self):
+        notify = pr.Notify(topic="bob", tasks='not yours')
+        msg = pr.Announcement('worker-1', notify).to_dict()
+        self.assertRaises(excp.InvalidFormat, pr.Announcement.validate, msg)
+        self.assertRaises(excp.InvalidFormat, pr.Announcement.validate,
+                          {'worker': {'topic': 'bob', 'tasks': []}})
+
 
 class TestProtocol(test.TestCase):
 
@@ -135,6 +201,47 @@ class TestProtocol(test.TestCase):
         for s in (pr.PENDING, pr.WAITING):
             self.assertRaises(excp.InvalidState, request.transition, s)
 
+    def test_request_all_transitions(self):
+        allowed = set([
+            (pr.WAITING, pr.PENDING),
+            (pr.WAITING, pr.FAILURE),
+            (pr.PENDING, pr.RUNNING),
+            (pr.PENDING, pr.FAILURE),
+            (pr.RUNNING, pr.SUCCESS),
+            (pr.RUNNING, pr.FAILURE),
+        ])
+        all_states = (pr.WAITING, pr.PENDING, pr.RUNNING,
+                      pr.SUCCESS, pr.FAILURE)
+        for start_state in all_states:
+            for end_state in all_states:
+                request = self.request()
+                request._state = start_state
+                if start_state == end_state:
+                    self.assertFalse(request.transition(end_state))
+                elif (start_state, end_state) in allowed:
+                    self.assertTrue(request.transition(end_state))
+                    self.assertEqual(end_state, request.current_state)
+                else:
+                    self.assertRaises(excp.InvalidState,
+                                      request.transition, end_state)
+                    self.assertEqual(start_state, request.current_state)
+        self.assertEqual(sorted(allowed),
+                         sorted((start_state, end_state)
+                                for (start_state, _event, end_state)
+                                in pr.build_a_machine()))
+
+    def test_request_transition_log_error(self):
+        request = self.request()
+        logger = mock.MagicMock()
+        self.assertFalse(request.transition_and_log_error(pr.SUCCESS,
+                                                          logger=logger))
+        self.assertEqual(1, logger.warn.call_count)
+        self.assertEqual(pr.WAITING, request.current_state)
+
+    def test_request_slots(self):
+        request = self.request()
+        self.assertFalse(hasattr(request, '__dict__'))
+
     def test_creation(self):
         request = self.request()
         self.assertEqual(self.task_uuid, request.uuid)
@@ -162,6 +269,13 @@ class TestProtocol(test.TestCase):
         request = self.request(result=a_failure)
         self.assertEqual(expected, request.to_dict())
 
+    def test_to_dict_with_events(self):
+        request = self.request(events=['update_progress'])
+        data = request.to_dict()
+        self.assertEqual(self.request_to_dict(events=['update_progress']),
+                         data)
+        pr.Request.validate(data)
+
     def test_to_dict_with_failures(self):
         a_failure = failure.Failure.from_exception(RuntimeError('Woot!'))
         request = self.request(failures={self.task.name: a_failure})
@@ -74,16 +74,33 @@ class TestProxy(test.MockTestCase):
     def _queue_name(self, topic):
         return "%s_%s" % (self.exchange, topic)
 
-    def proxy_start_calls(self, calls, exc_type=mock.ANY):
-        return [
+    @property
+    def _broadcast_exchange_name(self):
+        return "%s_broadcast" % self.exchange
+
+    def proxy_start_calls(self, calls, exc_type=mock.ANY,
+                          receive_broadcasts=False):
+        queue_calls = [
             mock.call.Queue(name=self._queue_name(self.topic),
                             exchange=self.exchange_inst_mock,
                             routing_key=self.topic,
                             durable=False,
                             auto_delete=True,
                             channel=self.conn_inst_mock),
-            mock.call.connection.Consumer(queues=self.queue_inst_mock,
-                                          callbacks=[mock.ANY]),
+        ]
+        if receive_broadcasts:
+            queue_calls.append(
+                mock.call.Queue(name="%s_broadcast_%s" % (self.exchange,
+                                                          self.topic),
+                                exchange=self.exchange_inst_mock,
+                                routing_key=self.topic,
+                                durable=False,
+                                auto_delete=True,
+                                channel=self.conn_inst_mock))
+        return queue_calls + [
+            mock.call.connection.Consumer(
+                queues=[self.queue_inst_mock] * len(queue_calls),
+                callbacks=[mock.ANY]),
             mock.call.connection.Consumer().__enter__(),
             mock.call.connection.ensure(mock.ANY, mock.ANY,
                                         interval_start=mock.ANY,
@@ -136,7 +153,11 @@ class TestProxy(test.MockTestCase):
                                  transport_options=None),
             mock.call.Exchange(name=self.exchange,
                                durable=False,
-                               auto_delete=True)
+                               auto_delete=True),
+            mock.call.Exchange(name=self._broadcast_exchange_name,
+                               type='fanout',
+                               durable=False,
+                               auto_delete=True),
         ]
         self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
 
@@ -149,7 +170,11 @@ class TestProxy(test.MockTestCase):
                                  transport_options=transport_opts),
             mock.call.Exchange(name=self.exchange,
                                durable=False,
-                               auto_delete=True)
+                               auto_delete=True),
+            mock.call.Exchange(name=self._broadcast_exchange_name,
+                               type='fanout',
+                               durable=False,
+                               auto_delete=True),
         ]
         self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
 
@@ -171,10 +196,31 @@ class TestProxy(test.MockTestCase):
                                               correlation_id=task_uuid,
                                               declare=[self.queue_inst_mock],
                                               type=msg_mock.TYPE,
-                                              reply_to=None)
+                                              reply_to=None,
+                                              serializer='json',
+                                              headers=None)
         ], routing_key)
         self.master_mock.assert_has_calls(master_mock_calls)
 
+    def test_broadcast(self):
+        msg_mock = mock.MagicMock()
+        msg_data = 'msg-data'
+        msg_mock.to_dict.return_value = msg_data
+
+        p = self.proxy(reset_master_mock=True)
+        p.broadcast(msg_mock)
+
+        mock_producer = mock.call.connection.Producer().__enter__()
+        master_mock_calls = [
+            mock_producer.publish(body=msg_data,
+                                  exchange=self.exchange_inst_mock,
+                                  declare=[self.exchange_inst_mock],
+                                  type=msg_mock.TYPE,
+                                  serializer='json'),
+        ]
+        self.master_mock.assert_has_calls(master_mock_calls)
+        self.assertEqual(0, self.queue_mock.call_count)
+
     def test_start(self):
         try:
             # KeyboardInterrupt will be raised after two iterations
@@ -189,6 +235,21 @@ class TestProxy(test.MockTestCase):
         ], exc_type=KeyboardInterrupt)
         self.master_mock.assert_has_calls(master_calls)
 
+    def test_start_receiving_broadcasts(self):
+        try:
+            # KeyboardInterrupt will be raised after two iterations
+            self.proxy(reset_master_mock=True,
+                       receive_broadcasts=True).start()
+        except KeyboardInterrupt:
+            pass
+
+        master_calls = self.proxy_start_calls([
+            mock.call.connection.drain_events(timeout=self.de_period),
+            mock.call.connection.drain_events(timeout=self.de_period),
+            mock.call.connection.drain_events(timeout=self.de_period),
+        ], exc_type=KeyboardInterrupt, receive_broadcasts=True)
+        self.master_mock.assert_has_calls(master_calls)
+
     def test_start_with_on_wait(self):
         try:
             # KeyboardInterrupt will be raised after two iterations
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import array
+
+from kombu import serialization
+
+from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import serializers
+from taskflow import test
+from taskflow.tests import utils
+
+
+def _round_trip(obj, name=serializers.MSGPACK):
+    content_type, content_encoding, data = serialization.dumps(obj,
+                                                               serializer=name)
+    return content_type, serialization.loads(data, content_type,
+                                             content_encoding)
+
+
+class TestSerializers(test.TestCase):
+
+    def test_round_trip_request(self):
+        request = pr.Request(utils.DummyTask("hi"), 'uuid', pr.EXECUTE,
+                             {'a': 1, 'b': [1, 2]}, timeout=60)
+        content_type, data = _round_trip(request.to_dict())
+        self.assertEqual(serializers.MSGPACK,
+                         serializers.from_content_type(content_type))
+        # Should be the same as what json produces (tuples become lists).
+        self.assertEqual(_round_trip(request.to_dict(), serializers.JSON)[1],
+                         data)
+        pr.Request.validate(data)
+
+    def test_round_trip_binary(self):
+        payload = {
+            'blob': b'\x00\x01\xff',
+            'text': u'été',
+            'numbers': array.array('d', [1.5, 2.5, 3.5]),
+        }
+        _content_type, data = _round_trip(payload)
+        self.assertEqual(payload, data)
+        self.assertIsInstance(data['blob'], bytes)
+        self.assertIsInstance(data['numbers'], array.array)
+
+    def test_negotiate(self):
+        self.assertEqual(serializers.JSON,
+                         serializers.negotiate(serializers.MSGPACK, None))
+        self.assertEqual(serializers.JSON,
+                         serializers.negotiate(serializers.MSGPACK,
+                                               [serializers.JSON]))
+        self.assertEqual(serializers.MSGPACK,
+                         serializers.negotiate(serializers.MSGPACK,
+                                               serializers.SUPPORTED))
+        self.assertEqual(serializers.JSON,
+                         serializers.negotiate(serializers.JSON,
+                                               serializers.SUPPORTED))
+
+    def test_from_content_type(self):
+        self.assertEqual(serializers.JSON,
+                         serializers.from_content_type('application/json'))
+        self.assertEqual(serializers.JSON,
+                         serializers.from_content_type('application/x-yaml'))
+        self.assertEqual(serializers.JSON,
+                         serializers.from_content_type(None))
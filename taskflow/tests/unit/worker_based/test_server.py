@@ -14,16 +14,27 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from oslo_utils import timeutils
 import six
 
 from taskflow.engines.worker_based import endpoint as ep
+from taskflow.engines.worker_based import payloads
 from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import serializers
 from taskflow.engines.worker_based import server
 from taskflow import task as task_atom
 from taskflow import test
 from taskflow.test import mock
 from taskflow.tests import utils
 from taskflow.types import failure
+from taskflow.utils import schema_utils as su
+from taskflow.utils import threading_utils
 
 
 class TestServer(test.MockTestCase):
@@ -55,6 +66,8 @@ class TestServer(test.MockTestCase):
         self.message_mock.properties = {'correlation_id': self.task_uuid,
                                         'reply_to': self.reply_to,
                                         'type': pr.REQUEST}
+        self.message_mock.content_type = 'application/json'
+        self.message_mock.headers = {}
         self.master_mock.attach_mock(self.executor_mock, 'executor')
         self.master_mock.attach_mock(self.message_mock, 'message')
 
@@ -86,9 +99,10 @@ class TestServer(test.MockTestCase):
         # check calls
         master_mock_calls = [
             mock.call.Proxy(self.server_topic, self.server_exchange,
-                            type_handlers=mock.ANY, url=self.broker_url,
+                            type_handlers=mock.ANY, on_wait=mock.ANY,
+                            url=self.broker_url,
                             transport=mock.ANY, transport_options=mock.ANY,
-                            retry_options=mock.ANY)
+                            retry_options=mock.ANY, validation_rate=1.0)
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
         self.assertEqual(3, len(s._endpoints))
@@ -99,13 +113,77 @@ class TestServer(test.MockTestCase):
         # check calls
         master_mock_calls = [
             mock.call.Proxy(self.server_topic, self.server_exchange,
-                            type_handlers=mock.ANY, url=self.broker_url,
+                            type_handlers=mock.ANY, on_wait=mock.ANY,
+                            url=self.broker_url,
                             transport=mock.ANY, transport_options=mock.ANY,
-                            retry_options=mock.ANY)
+                            retry_options=mock.ANY, validation_rate=1.0)
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
         self.assertEqual(len(self.endpoints), len(s._endpoints))
 
+    def test_process_notify_old_executor(self):
+        # Executors that do not set the header only accept responses that
+        # match the schema they have always had (no extra fields allowed).
+        old_schema = {
+            "type": "object",
+            'properties': {
+                'topic': {
+                    "type": "string",
+                },
+                'tasks': {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                    },
+                }
+            },
+            "required": ["topic", 'tasks'],
+            "additionalProperties": False,
+        }
+        store = payloads.DirectoryStore('/shared')
+        s = self.server(reset_master_mock=True, capacity=2,
+                        payload_store=store)
+        s._process_notify({}, self.message_mock)
+        notify = self.proxy_inst_mock.publish.call_args[0][0]
+        su.schema_validate(notify.to_dict(), old_schema)
+        self.assertEqual(sorted(s._endpoints.keys()), sorted(notify.tasks))
+
+    def test_process_notify_reports_load(self):
+        self.message_mock.headers = {pr.Notify.EXTENDED_HEADER: True}
+        s = self.server(reset_master_mock=True, capacity=2)
+        s._process_notify({}, self.message_mock)
+        notify = self.proxy_inst_mock.publish.call_args[0][0]
+        self.assertEqual({
+            'topic': self.server_topic,
+            'tasks': sorted(s._endpoints.keys()),
+            'capacity': 2,
+            'in_flight': 0,
+            'queued': 0,
+            'serializers': list(serializers.SUPPORTED),
+            'batching': True,
+        }, dict(notify.to_dict(), tasks=sorted(notify.tasks)))
+
+    def test_process_notify_reports_payload_store(self):
+        store = payloads.DirectoryStore('/shared')
+        self.message_mock.headers = {pr.Notify.EXTENDED_HEADER: True}
+        s = self.server(reset_master_mock=True, payload_store=store)
+        s._process_notify({}, self.message_mock)
+        notify = self.proxy_inst_mock.publish.call_args[0][0]
+        self.assertEqual(store.uri, notify.payload_store)
+
+    def test_tracked_load(self):
+        s = self.server(reset_master_mock=True)
+        runs = []
+        self.executor_mock.submit.side_effect = lambda *args: runs.append(args)
+        process = s._delayed_process(lambda content, message: s.load,
+                                     tracked=True)
+        process({}, self.message_mock)
+        process({}, self.message_mock)
+        self.assertEqual({'in_flight': 2, 'queued': 2}, s.load)
+        on_run, args = runs[0][0], runs[0][1:]
+        self.assertEqual({'in_flight': 2, 'queued': 1}, on_run(*args))
+        self.assertEqual({'in_flight': 1, 'queued': 1}, s.load)
+
     def test_parse_request(self):
         request = self.make_request()
         bundle = pr.Request.from_dict(request)
@@ -157,7 +235,8 @@ class TestServer(test.MockTestCase):
         self.master_mock.assert_has_calls([
             mock.call.Response(pr.FAILURE),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ])
         self.assertTrue(mocked_exception.called)
 
@@ -182,21 +261,119 @@ class TestServer(test.MockTestCase):
         master_mock_calls = [
             mock.call.Response(pr.RUNNING),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid),
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
             mock.call.Response(pr.EVENT, details={'progress': 0.0},
                                event_type=task_atom.EVENT_UPDATE_PROGRESS),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid),
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
             mock.call.Response(pr.EVENT, details={'progress': 1.0},
                                event_type=task_atom.EVENT_UPDATE_PROGRESS),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid),
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
             mock.call.Response(pr.SUCCESS, result=5),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
 
+    def test_on_update_progress_coalesced(self):
+        request = self.make_request(task=utils.ProgressingTask(), arguments={})
+        s = self.server(reset_master_mock=True, event_interval=60)
+        s._process_request(request, self.message_mock)
+
+        # The first progress update is sent right away, the last is held
+        # back (and sent before the final reply).
+        master_mock_calls = [
+            mock.call.Response(pr.RUNNING),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
+            mock.call.Response(pr.EVENT, details={'progress': 0.0},
+                               event_type=task_atom.EVENT_UPDATE_PROGRESS),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
+            mock.call.Response(pr.EVENT, details={'progress': 1.0},
+                               event_type=task_atom.EVENT_UPDATE_PROGRESS),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
+            mock.call.Response(pr.SUCCESS, result=5),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
+        ]
+        self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
+
+    def test_on_update_progress_trailing(self):
+        release = threading.Event()
+
+        class TrailingTask(task_atom.Task):
+            def execute(self):
+                self.update_progress(0.1)
+                self.update_progress(0.5)
+                release.wait(utils.WAIT_TIMEOUT)
+                return 5
+
+        endpoints = [ep.Endpoint(task_cls=TrailingTask)]
+        request = self.make_request(task=TrailingTask(), arguments={})
+        s = self.server(reset_master_mock=True, endpoints=endpoints,
+                        event_interval=0.01)
+        t = threading_utils.daemon_thread(s._process_request, request,
+                                          self.message_mock)
+        t.start()
+        try:
+            # The last progress update is sent (from the wait cycle) once
+            # the interval passed, even though the task emits nothing else.
+            trailing = mock.call.Response(
+                pr.EVENT, details={'progress': 0.5},
+                event_type=task_atom.EVENT_UPDATE_PROGRESS)
+            watch = timeutils.StopWatch(duration=utils.WAIT_TIMEOUT)
+            watch.start()
+            while trailing not in self.master_mock.mock_calls:
+                self.assertFalse(watch.expired())
+                s._on_wait()
+                time.sleep(0.01)
+            self.assertNotIn(mock.call.Response(pr.SUCCESS, result=5),
+                             self.master_mock.mock_calls)
+        finally:
+            release.set()
+            t.join()
+        self.assertIn(mock.call.Response(pr.SUCCESS, result=5),
+                      self.master_mock.mock_calls)
+
+    def test_on_update_progress_not_wanted(self):
+        request = self.make_request(task=utils.ProgressingTask(), arguments={})
+        request['events'] = []
+        s = self.server(reset_master_mock=True)
+        s._process_request(request, self.message_mock)
+
+        master_mock_calls = [
+            mock.call.Response(pr.RUNNING),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
+            mock.call.Response(pr.SUCCESS, result=5),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
+        ]
+        self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
+
+    def test_on_events_sent_together(self):
+        s = self.server(reset_master_mock=True)
+        s._on_events(self.reply_to, self.task_uuid, 'json', [
+            (task_atom.EVENT_UPDATE_PROGRESS, {'progress': 0.5}),
+            ('custom', {}),
+        ])
+        response = self.proxy_inst_mock.publish.call_args[0][0]
+        self.assertIsInstance(response, pr.BatchResponse)
+        self.assertEqual(2, len(response.responses))
+
     def test_process_request(self):
         # create server and process request
         s = self.server(reset_master_mock=True)
@@ -206,13 +383,113 @@ class TestServer(test.MockTestCase):
         master_mock_calls = [
             mock.call.Response(pr.RUNNING),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid),
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
             mock.call.Response(pr.SUCCESS, result=1),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
 
+    def test_process_request_pooled(self):
+        endpoint = ep.Endpoint(task_cls=utils.ProgressingTask, pool_size=1)
+        request = self.make_request(task=utils.ProgressingTask(), arguments={})
+        s = self.server(reset_master_mock=True, endpoints=[endpoint])
+        s._process_request(request, self.message_mock)
+        s._process_request(request, self.message_mock)
+
+        self.assertEqual({'hits': 1, 'misses': 1, 'pooled': 1},
+                         endpoint.statistics)
+        task = endpoint.generate(name=request['task_name'],
+                                 version=request['task_version'])
+        # The pooled instance must no longer send events to the engine.
+        self.assertEqual(0, len(task.notifier))
+
+    def test_process_request_offloaded_payloads(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        store = payloads.DirectoryStore(path)
+        offloader = payloads.Offloader(store, threshold=0)
+        request = pr.Request(self.task, self.task_uuid, self.task_action,
+                             self.task_args, timeout=60)
+        keys = request.offload(offloader)
+        s = self.server(reset_master_mock=True, payload_store=store,
+                        payload_threshold=0)
+        s._process_request(request.to_dict(), self.message_mock)
+
+        state, result = [(c[0][0], c[1].get('result'))
+                         for c in self.response_mock.call_args_list][-1]
+        self.assertEqual(pr.SUCCESS, state)
+        self.assertTrue(payloads.is_reference(result))
+        self.assertEqual(1, offloader.fetch(result))
+        # Only the engine deletes payloads (once it is done with them).
+        self.assertEqual(len(keys) + 1, len(os.listdir(path)))
+
+    def test_process_request_offloaded_payloads_no_store(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        offloader = payloads.Offloader(payloads.DirectoryStore(path),
+                                       threshold=0)
+        request = pr.Request(self.task, self.task_uuid, self.task_action,
+                             self.task_args, timeout=60)
+        request.offload(offloader)
+        s = self.server(reset_master_mock=True)
+        s._process_request(request.to_dict(), self.message_mock)
+
+        state, result = [(c[0][0], c[1].get('result'))
+                         for c in self.response_mock.call_args_list][-1]
+        self.assertEqual(pr.FAILURE, state)
+        self.assertIn('taskflow.exceptions.NotFound',
+                      result['exc_type_names'])
+
+    def test_process_request_replies_with_request_serializer(self):
+        self.message_mock.content_type = 'application/x-taskflow-msgpack'
+        s = self.server(reset_master_mock=True)
+        s._process_request(self.make_request(), self.message_mock)
+
+        master_mock_calls = [
+            mock.call.Response(pr.RUNNING),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer=serializers.MSGPACK),
+            mock.call.Response(pr.SUCCESS, result=1),
+            mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
+                                    correlation_id=self.task_uuid,
+                                    serializer=serializers.MSGPACK)
+        ]
+        self.master_mock.assert_has_calls(master_mock_calls)
+
+    def test_process_batch_request(self):
+        self.executor_mock.submit.side_effect = lambda func, *args: func(*args)
+        batch = {
+            'requests': [
+                {'uuid': 'uuid-1', 'request': self.make_request()},
+                {'uuid': 'uuid-2', 'request': self.make_request()},
+            ],
+        }
+        s = self.server(reset_master_mock=True)
+        s._replies.start()
+        self.addCleanup(s._replies.stop, flush=False)
+        s._process_batch_request(batch, self.message_mock)
+        self.assertEqual(0, self.proxy_inst_mock.publish.call_count)
+        self.assertEqual({'in_flight': 0, 'queued': 0}, s.load)
+
+        s._replies.flush()
+        self.assertEqual([
+            mock.call(pr.RUNNING),
+            mock.call(pr.SUCCESS, result=1),
+            mock.call(pr.RUNNING),
+            mock.call(pr.SUCCESS, result=1),
+        ], self.response_mock.mock_calls)
+        args, kwargs = self.proxy_inst_mock.publish.call_args
+        self.assertEqual(1, self.proxy_inst_mock.publish.call_count)
+        self.assertIsInstance(args[0], pr.BatchResponse)
+        self.assertEqual(['uuid-1', 'uuid-1', 'uuid-2', 'uuid-2'],
+                         [uuid for uuid, _response in args[0].responses])
+        self.assertEqual((self.reply_to,), args[1:])
+        self.assertEqual({'serializer': 'json'}, kwargs)
+
     @mock.patch("taskflow.engines.worker_based.server.LOG.warn")
     def test_process_request_parse_message_failure(self, mocked_exception):
         self.message_mock.properties = {}
@@ -241,7 +518,8 @@ class TestServer(test.MockTestCase):
             mock.call.Response(pr.FAILURE, result=failure_dict),
             mock.call.proxy.publish(self.response_inst_mock,
                                     self.reply_to,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
 
@@ -262,7 +540,8 @@ class TestServer(test.MockTestCase):
             mock.call.Response(pr.FAILURE, result=failure_dict),
             mock.call.proxy.publish(self.response_inst_mock,
                                     self.reply_to,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
 
@@ -284,7 +563,8 @@ class TestServer(test.MockTestCase):
             mock.call.Response(pr.FAILURE, result=failure_dict),
             mock.call.proxy.publish(self.response_inst_mock,
                                     self.reply_to,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
 
@@ -304,11 +584,13 @@ class TestServer(test.MockTestCase):
         master_mock_calls = [
             mock.call.Response(pr.RUNNING),
             mock.call.proxy.publish(self.response_inst_mock, self.reply_to,
-                                    correlation_id=self.task_uuid),
+                                    correlation_id=self.task_uuid,
+                                    serializer='json'),
             mock.call.Response(pr.FAILURE, result=failure_dict),
             mock.call.proxy.publish(self.response_inst_mock,
                                     self.reply_to,
-                                    correlation_id=self.task_uuid)
+                                    correlation_id=self.task_uuid,
+                                    serializer='json')
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
 
@@ -341,3 +623,51 @@ class TestServer(test.MockTestCase):
             mock.call.proxy.stop()
         ]
         self.master_mock.assert_has_calls(master_mock_calls)
+
+    def test_start_stop_announced(self):
+        s = self.server(reset_master_mock=True, heartbeat_period=5)
+        s.start()
+        s.stop()
+
+        # check calls
+        master_mock_calls = [
+            mock.call.proxy.broadcast(mock.ANY),
+            mock.call.proxy.start(),
+            mock.call.proxy.broadcast(mock.ANY),
+            mock.call.proxy.stop(),
+        ]
+        self.master_mock.assert_has_calls(master_mock_calls)
+        started, stopped = [c[0][0] for c in
+                            self.proxy_inst_mock.broadcast.call_args_list]
+        self.assertIsInstance(started, pr.Announcement)
+        self.assertFalse(started.leaving)
+        self.assertEqual(self.server_topic, started.notify.topic)
+        self.assertTrue(stopped.leaving)
+        self.assertEqual(started.identity, stopped.identity)
+
+    @mock.patch('oslo_utils.timeutils.now')
+    def test_heartbeat(self, mock_now):
+        mock_now.return_value = 0
+        s = self.server(reset_master_mock=True, heartbeat_period=5)
+        s.start()
+        self.assertEqual(1, self.proxy_inst_mock.broadcast.call_count)
+        mock_now.return_value = 4
+        s._on_wait()
+        self.assertEqual(1, self.proxy_inst_mock.broadcast.call_count)
+        mock_now.return_value = 6
+        s._on_wait()
+        s._on_wait()
+        self.assertEqual(2, self.proxy_inst_mock.broadcast.call_count)
+
+    def test_no_heartbeat(self):
+        s = self.server(reset_master_mock=True)
+        s.start()
+        s._on_wait()
+        s.stop()
+        self.assertFalse(self.proxy_inst_mock.broadcast.called)
+
+    def test_announce_failure_logged(self):
+        self.proxy_inst_mock.broadcast.side_effect = RuntimeError('Woot!')
+        s = self.server(reset_master_mock=True, heartbeat_period=5)
+        s.start()
+        self.assertEqual(1, self.proxy_inst_mock.start.call_count)
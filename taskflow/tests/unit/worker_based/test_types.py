@@ -14,8 +14,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 from oslo_utils import reflection
 
+from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import selection
+from taskflow.engines.worker_based import serializers
 from taskflow.engines.worker_based import types as worker_types
 from taskflow import test
 from taskflow.test import mock
@@ -77,3 +82,309 @@ class TestProxyFinder(test.TestCase):
         self.assertEqual(added[-1][0].identity, w.identity)
         w = finder.get_worker_for_task(utils.DummyTask)
         self.assertIn(w.identity, [w_a[0].identity for w_a in added[0:2]])
+
+    def test_load_reported(self):
+        finder = worker_types.ProxyWorkerFinder('me', mock.MagicMock(), [])
+        notify = pr.Notify(topic='dummy-topic', tasks=['a'], capacity=4,
+                           in_flight=3, queued=1)
+        finder.process_response(notify.to_dict(), mock.MagicMock())
+        w = finder.get_worker_for_task('a')
+        self.assertEqual(4, w.capacity)
+        self.assertEqual(3, w.reported_in_flight)
+        self.assertEqual(1, w.reported_queued)
+        self.assertEqual(3, w.outstanding)
+        self.assertEqual(0.75, w.load)
+
+    def test_serializer_negotiated(self):
+        finder = worker_types.ProxyWorkerFinder(
+            'me', mock.MagicMock(), [], serializer=serializers.MSGPACK)
+        for topic, extra in [('old', {}),
+                             ('json-only', {'serializers': ['json']}),
+                             ('new', {'serializers': ['json', 'msgpack',
+                                                      serializers.MSGPACK]})]:
+            notify = pr.Notify(topic=topic, tasks=[topic], **extra)
+            finder.process_response(notify.to_dict(), mock.MagicMock())
+        self.assertEqual(serializers.JSON,
+                         finder.get_worker_for_task('old').serializer)
+        self.assertEqual(serializers.JSON,
+                         finder.get_worker_for_task('json-only').serializer)
+        self.assertEqual(serializers.MSGPACK,
+                         finder.get_worker_for_task('new').serializer)
+
+    def test_notify_asks_for_extended(self):
+        proxy = mock.MagicMock()
+        finder = worker_types.ProxyWorkerFinder('me', proxy, ['a-topic'])
+        finder.maybe_publish()
+        proxy.publish.assert_called_once_with(
+            mock.ANY, ['a-topic'], reply_to='me',
+            headers={pr.Notify.EXTENDED_HEADER: True})
+
+    def test_old_worker_reply(self):
+        # Workers that do not know about the header reply with only their
+        # topic and tasks (which must still be usable, with defaults).
+        finder = worker_types.ProxyWorkerFinder(
+            'me', mock.MagicMock(), [], serializer=serializers.MSGPACK)
+        notify = pr.Notify(topic='old', tasks=['a'])
+        pr.Notify.validate(notify.to_dict(), True)
+        finder.process_response(notify.to_dict(), mock.MagicMock())
+        w = finder.get_worker_for_task('a')
+        self.assertIsNone(w.capacity)
+        self.assertEqual(0, w.reported_in_flight)
+        self.assertEqual(serializers.JSON, w.serializer)
+        self.assertFalse(w.batching)
+        self.assertIsNone(w.payload_store)
+
+    def test_in_flight_tracked(self):
+        finder = worker_types.ProxyWorkerFinder('me', mock.MagicMock(), [])
+        w, _emit = finder._add('dummy-topic', [utils.DummyTask])
+        finder.request_sent('a', w)
+        finder.request_sent('b', w)
+        self.assertEqual(2, w.in_flight)
+        self.assertEqual(2, w.outstanding)
+        # Tasks changing replaces the worker (the count moves along).
+        w2, _emit = finder._add('dummy-topic', [utils.NastyTask])
+        self.assertIsNot(w, w2)
+        self.assertEqual(2, w2.in_flight)
+        finder.request_finished('a')
+        finder.request_finished('a')
+        self.assertEqual(1, w2.in_flight)
+        finder.reset()
+        finder.request_finished('b')
+        self.assertEqual(1, w2.in_flight)
+
+    def test_announcements(self):
+        finder = worker_types.ProxyWorkerFinder('me', mock.MagicMock(),
+                                                ['dummy-topic'])
+
+        def announce(identity, leaving=False, topic='dummy-topic'):
+            notify = pr.Notify(topic=topic, tasks=['a'], capacity=2)
+            announcement = pr.Announcement(identity, notify, leaving=leaving)
+            finder.process_announcement(announcement.to_dict(),
+                                        mock.MagicMock())
+
+        announce('w1')
+        announce('w2')
+        # Workers on topics the finder was not told about are not used.
+        announce('w3', topic='other-topic')
+        self.assertEqual(1, finder.total_workers)
+        self.assertEqual(2, finder.messages_processed)
+        self.assertEqual(2, finder.get_worker_for_task('a').capacity)
+        # The topic still has a worker consuming from it.
+        announce('w1', leaving=True)
+        self.assertEqual(1, finder.total_workers)
+        announce('w2', leaving=True)
+        self.assertEqual(0, finder.total_workers)
+        self.assertIsNone(finder.get_worker_for_task('a'))
+
+
+class TestSelectionPolicies(test.TestCase):
+
+    @staticmethod
+    def _make_workers(*outstanding):
+        workers = []
+        for i, (in_flight, capacity) in enumerate(outstanding):
+            w = worker_types.TopicWorker('topic-%s' % i, [utils.DummyTask],
+                                         identity=i)
+            w.in_flight = in_flight
+            w.capacity = capacity
+            workers.append(w)
+        return workers
+
+    def test_finder_uses_policy(self):
+        policy = mock.MagicMock()
+        finder = worker_types.ProxyWorkerFinder('me', mock.MagicMock(), [],
+                                                selection_policy=policy)
+        w, _emit = finder._add('dummy-topic', [utils.DummyTask])
+        self.assertIs(w, finder.get_worker_for_task(utils.DummyTask))
+        self.assertFalse(policy.select.called)
+        w2, _emit = finder._add('dummy-topic-2', [utils.DummyTask])
+        policy.select.return_value = w2
+        self.assertIs(w2, finder.get_worker_for_task(utils.DummyTask))
+        policy.select.assert_called_once_with(utils.DummyTask, mock.ANY)
+
+    def test_has_worker_skips_policy(self):
+        policy = mock.MagicMock()
+        finder = worker_types.ProxyWorkerFinder('me', mock.MagicMock(), [],
+                                                selection_policy=policy)
+        self.assertFalse(finder.has_worker_for_task(utils.DummyTask))
+        finder._add('dummy-topic', [utils.DummyTask])
+        finder._add('dummy-topic-2', [utils.DummyTask])
+        self.assertTrue(finder.has_worker_for_task(utils.DummyTask))
+        self.assertFalse(finder.has_worker_for_task(utils.NastyTask))
+        self.assertFalse(policy.select.called)
+
+    def test_least_outstanding(self):
+        workers = self._make_workers((3, None), (1, None), (2, None))
+        policy = selection.LeastOutstandingPolicy()
+        for _i in range(0, 10):
+            self.assertIs(workers[1], policy.select(None, workers))
+
+    def test_least_outstanding_capacity(self):
+        workers = self._make_workers((2, None), (3, 8))
+        policy = selection.LeastOutstandingPolicy()
+        self.assertIs(workers[1], policy.select(None, workers))
+
+    def test_least_outstanding_reported(self):
+        workers = self._make_workers((0, None), (1, None))
+        workers[0].reported_in_flight = 5
+        policy = selection.LeastOutstandingPolicy()
+        self.assertIs(workers[1], policy.select(None, workers))
+
+    def test_power_of_two(self):
+        workers = self._make_workers((0, None), (5, None), (5, None))
+        policy = selection.PowerOfTwoPolicy()
+        counts = [0, 0, 0]
+        for _i in range(0, 300):
+            counts[policy.select(None, workers).identity] += 1
+        # The idle worker is selected whenever it is one of the two picked
+        # (about two thirds of the time).
+        self.assertTrue(counts[0] > counts[1] + counts[2])
+        two = workers[0:2]
+        for _i in range(0, 10):
+            self.assertIs(workers[0], policy.select(None, two))
+
+    def test_weighted(self):
+        workers = self._make_workers((0, None), (0, None))
+        policy = selection.WeightedPolicy(weights={'topic-1': 3})
+        counts = [0, 0]
+        for _i in range(0, 2000):
+            counts[policy.select(None, workers).identity] += 1
+        self.assertTrue(counts[1] > 2 * counts[0])
+        workers[1].in_flight = 11
+        counts = [0, 0]
+        for _i in range(0, 2000):
+            counts[policy.select(None, workers).identity] += 1
+        self.assertTrue(counts[0] > 2 * counts[1])
+
+    def test_weighted_bad_weights(self):
+        self.assertRaises(ValueError, selection.WeightedPolicy,
+                          weights={'a': 0})
+        self.assertRaises(ValueError, selection.WeightedPolicy,
+                          default_weight=-1)
+
+
+class TestBatcher(test.TestCase):
+    def _make_batcher(self, window=60, max_size=None):
+        flushed = []
+        batcher = worker_types.Batcher(
+            lambda key, items: flushed.append((key, items)), window,
+            max_size=max_size)
+        return (batcher, flushed)
+
+    def test_not_started(self):
+        batcher, flushed = self._make_batcher()
+        batcher.add('a', 1)
+        batcher.add('a', 2)
+        self.assertEqual([('a', [1]), ('a', [2])], flushed)
+
+    def test_flush(self):
+        batcher, flushed = self._make_batcher()
+        batcher.start()
+        self.addCleanup(batcher.stop)
+        batcher.add('a', 1)
+        batcher.add('b', 2)
+        batcher.add('a', 3)
+        self.assertEqual([], flushed)
+        self.assertEqual(3, len(batcher))
+        batcher.flush()
+        self.assertEqual([('a', [1, 3]), ('b', [2])], sorted(flushed))
+        self.assertEqual(0, len(batcher))
+
+    def test_max_size(self):
+        batcher, flushed = self._make_batcher(max_size=2)
+        batcher.start()
+        self.addCleanup(batcher.stop)
+        for i in range(0, 5):
+            batcher.add('a', i)
+        self.assertEqual([('a', [0, 1]), ('a', [2, 3])], flushed)
+        self.assertEqual(1, len(batcher))
+
+    def test_window(self):
+        flushed = []
+        ev = threading.Event()
+
+        def flush(key, items):
+            flushed.append((key, items))
+            ev.set()
+
+        batcher = worker_types.Batcher(flush, 0.01)
+        batcher.start()
+        self.addCleanup(batcher.stop)
+        batcher.add('a', 1)
+        self.assertTrue(ev.wait(5))
+        self.assertEqual([('a', [1])], flushed)
+
+    def test_stop(self):
+        batcher, flushed = self._make_batcher()
+        batcher.start()
+        batcher.add('a', 1)
+        self.assertEqual([], batcher.stop())
+        self.assertEqual([('a', [1])], flushed)
+        batcher.add('a', 2)
+        self.assertEqual([('a', [1]), ('a', [2])], flushed)
+
+    def test_stop_discard(self):
+        batcher, flushed = self._make_batcher()
+        batcher.start()
+        batcher.add('a', 1)
+        batcher.add('b', 2)
+        self.assertEqual([1, 2], sorted(batcher.stop(flush=False)))
+        self.assertEqual([], flushed)
+
+    def test_bad_arguments(self):
+        self.assertRaises(ValueError, worker_types.Batcher, None, 0)
+        self.assertRaises(ValueError, worker_types.Batcher, None, 1,
+                          max_size=0)
+
+
+class TestEventCoalescer(test.TestCase):
+    def _make_coalescer(self, interval=60):
+        sent = []
+        coalescer = worker_types.EventCoalescer(
+            sent.append, interval=interval, coalesced=['progress'])
+        return (coalescer, sent)
+
+    def test_not_coalesced(self):
+        coalescer, sent = self._make_coalescer(interval=None)
+        coalescer.add('progress', 0.5)
+        coalescer.add('progress', 0.7)
+        self.assertEqual([[('progress', 0.5)], [('progress', 0.7)]], sent)
+
+    def test_coalesced(self):
+        coalescer, sent = self._make_coalescer()
+        coalescer.add('progress', 0.1)
+        coalescer.add('progress', 0.5)
+        coalescer.add('other', {})
+        coalescer.add('progress', 0.7)
+        self.assertEqual([[('progress', 0.1)]], sent)
+        coalescer.flush()
+        coalescer.flush()
+        self.assertEqual([[('progress', 0.1)],
+                          [('other', {}), ('progress', 0.7)]], sent)
+
+    @mock.patch('oslo_utils.timeutils.now')
+    def test_sent_after_interval(self, mock_now):
+        mock_now.return_value = 0
+        coalescer, sent = self._make_coalescer(interval=1)
+        coalescer.add('progress', 0.1)
+        coalescer.add('progress', 0.5)
+        mock_now.return_value = 2
+        coalescer.add('progress', 0.7)
+        self.assertEqual([[('progress', 0.1)], [('progress', 0.7)]], sent)
+
+    @mock.patch('oslo_utils.timeutils.now')
+    def test_trailing_sent_when_expired(self, mock_now):
+        mock_now.return_value = 0
+        coalescer, sent = self._make_coalescer(interval=1)
+        coalescer.add('progress', 0.1)
+        coalescer.add('progress', 0.5)
+        coalescer.flush_expired()
+        self.assertEqual([[('progress', 0.1)]], sent)
+        # Nothing else is emitted, the held back event is still sent once
+        # the interval has passed.
+        mock_now.return_value = 2
+        coalescer.flush_expired()
+        coalescer.flush_expired()
+        self.assertEqual([[('progress', 0.1)], [('progress', 0.5)]], sent)
+        coalescer.flush()
+        self.assertEqual(2, len(sent))
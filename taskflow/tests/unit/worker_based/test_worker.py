@@ -18,6 +18,8 @@ from oslo_utils import reflection
 import six
 
 from taskflow.engines.worker_based import endpoint
+from taskflow.engines.worker_based import payloads
+from taskflow.engines.worker_based import protocol as pr
 from taskflow.engines.worker_based import worker
 from taskflow import test
 from taskflow.test import mock
@@ -61,7 +63,14 @@ class TestWorker(test.MockTestCase):
                              url=self.broker_url,
                              transport_options=mock.ANY,
                              transport=mock.ANY,
-                             retry_options=mock.ANY)
+                             retry_options=mock.ANY,
+                             capacity=None,
+                             validation_rate=1.0,
+                             batch_window=pr.BATCH_WINDOW,
+                             payload_store=None,
+                             payload_threshold=payloads.THRESHOLD,
+                             event_interval=None,
+                             heartbeat_period=None)
         ]
         self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
 
@@ -83,7 +92,14 @@ class TestWorker(test.MockTestCase):
                              url=self.broker_url,
                              transport_options=mock.ANY,
                              transport=mock.ANY,
-                             retry_options=mock.ANY)
+                             retry_options=mock.ANY,
+                             capacity=10,
+                             validation_rate=1.0,
+                             batch_window=pr.BATCH_WINDOW,
+                             payload_store=None,
+                             payload_threshold=payloads.THRESHOLD,
+                             event_interval=None,
+                             heartbeat_period=None)
         ]
         self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
 
@@ -96,7 +112,14 @@ class TestWorker(test.MockTestCase):
                              url=self.broker_url,
                              transport_options=mock.ANY,
                              transport=mock.ANY,
-                             retry_options=mock.ANY)
+                             retry_options=mock.ANY,
+                             capacity=None,
+                             validation_rate=1.0,
+                             batch_window=pr.BATCH_WINDOW,
+                             payload_store=None,
+                             payload_threshold=payloads.THRESHOLD,
+                             event_interval=None,
+                             heartbeat_period=None)
         ]
         self.assertEqual(master_mock_calls, self.master_mock.mock_calls)
 
@@ -191,5 +214,38 @@ class TestWorker(test.MockTestCase):
 
         assert any(e.name == self.task_name for e in endpoints)
 
+    def test_derive_endpoints_pooled(self):
+        endpoints = worker.Worker._derive_endpoints([self.task_cls],
+                                                    pool_size=2)
+
+        self.assertTrue(endpoints[0].pooling)
+
+    def test_derive_endpoints_pooled_per_task(self):
+        endpoints = worker.Worker._derive_endpoints(
+            [self.task_cls, utils.TaskOneReturn],
+            pool_size={self.task_cls: 2})
+
+        pooling = dict((e.name, e.pooling) for e in endpoints)
+        self.assertEqual({
+            self.task_name: True,
+            reflection.get_class_name(utils.TaskOneReturn): False,
+        }, pooling)
+
+    def test_run_warms_pools(self):
+        w = self.worker(reset_master_mock=True, tasks=[self.task_cls],
+                        pool_size=2, warm_up={self.task_name: ['a', 'b']})
+        w.run(display_banner=False)
+
+        self.assertEqual({
+            self.task_name: {'hits': 0, 'misses': 0, 'pooled': 4},
+        }, w.pool_statistics)
+
+    def test_banner_pool_statistics(self):
+        buf = six.StringIO()
+        w = self.worker(tasks=[self.task_cls], pool_size=1,
+                        warm_up={self.task_cls: ['a']})
+        w.run(banner_writer=buf.write)
+        self.assertIn('Task pools', buf.getvalue())
+
     def test_derive_endpoints_unexpected_task_type(self):
         self.assertRaises(TypeError, worker.Worker._derive_endpoints, [111])
@@ -26,6 +26,15 @@ from taskflow import logging
 
 LOG = logging.getLogger(__name__)
 
+#: Default maximum (estimated) number of bytes a single transaction is
+#: allowed to send to zookeeper (this is kept a little under the default
+#: ``jute.maxbuffer`` zookeeper server setting of ``0xfffff`` bytes).
+DEFAULT_MAX_TXN_BYTES = 1000000
+
+# Rough estimate of the per-operation framing overhead that a multi-op
+# request adds (operation header, version, flags, default acls...).
+_TXN_OPERATION_OVERHEAD = 64
+
 
 def _parse_hosts(hosts):
     if isinstance(hosts, six.string_types):
@@ -110,6 +119,64 @@ def checked_commit(txn):
     return results
 
 
+def estimate_operation_size(path, value=None):
+    """Estimates how many bytes a transaction operation will send."""
+    size = _TXN_OPERATION_OVERHEAD + len(path)
+    if value:
+        size += len(value)
+    return size
+
+
+def chunk_operations(operations, max_bytes=DEFAULT_MAX_TXN_BYTES):
+    """Splits transaction operations into chunks under a byte limit.
+
+    Each operation is expected to be a tuple of the transaction method
+    name (for example ``create``, ``set_data``, ``delete``) followed by the
+    arguments to provide to that method (the first argument **must** be
+    the path the operation acts upon, the second optional one the data
+    that is being written). The order of the provided operations is
+    retained across (and inside of) the chunks that are yielded.
+
+    NOTE: an operation that by itself exceeds the byte limit will
+    be placed in a chunk of its own (zookeeper will likely reject it, but
+    that is better than silently dropping it).
+    """
+    chunk = []
+    chunk_size = 0
+    for op in operations:
+        op_size = estimate_operation_size(*op[1:3])
+        if chunk and chunk_size + op_size > max_bytes:
+            yield chunk
+            chunk = []
+            chunk_size = 0
+        chunk.append(op)
+        chunk_size += op_size
+    if chunk:
+        yield chunk
+
+
+def chunked_commit(client, operations, max_bytes=DEFAULT_MAX_TXN_BYTES):
+    """Commits operations using as few (checked) transactions as possible.
+
+    The operations are split up using :py:func:`.chunk_operations` and then
+    each chunk is committed (in order) as a single multi-op transaction
+    via :py:func:`.checked_commit`. When everything fits into one chunk this
+    is a single atomic round trip, when it does not then each chunk is
+    atomic on its own, but the whole set of operations is **not** (a failure
+    in a later chunk does **not** undo the earlier committed chunks).
+
+    :returns: the number of transactions that were committed
+    """
+    committed = 0
+    for chunk in chunk_operations(operations, max_bytes=max_bytes):
+        txn = client.transaction()
+        for op in chunk:
+            getattr(txn, op[0])(*op[1:])
+        checked_commit(txn)
+        committed += 1
+    return committed
+
+
 def finalize_client(client):
     """Stops and closes a client, even if it wasn't started."""
     client.stop()
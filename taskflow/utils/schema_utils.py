@@ -14,8 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import jsonschema
 from jsonschema import exceptions as schema_exc
+from jsonschema import validators
 
 # Special jsonschema validation types/adjustments.
 _SCHEMA_TYPES = {
@@ -29,6 +29,55 @@ ValidationError = schema_exc.ValidationError
 SchemaError = schema_exc.SchemaError
 
 
+# Compiled validators, keyed by the id of the schema they were compiled from
+# (the schema itself is kept alongside so that its id can not be reused).
+_VALIDATORS = {}
+
+# Maximum number of compiled validators kept (schemas that are created on the
+# fly, instead of being constants, should not make the cache grow forever).
+_MAX_VALIDATORS = 256
+
+
+def _compile(schema):
+    cls = validators.validator_for(schema)
+    cls.check_schema(schema)
+    type_checker = getattr(cls, 'TYPE_CHECKER', None)
+    if type_checker is None:
+        return cls(schema, types=_SCHEMA_TYPES)
+    # Newer jsonschema versions replaced (and deprecated) the types argument
+    # with pluggable type checkers.
+    for type_name, py_types in _SCHEMA_TYPES.items():
+        type_checker = type_checker.redefine(
+            type_name,
+            lambda checker, instance, py_types=py_types: isinstance(
+                instance, py_types))
+    cls = validators.extend(cls, type_checker=type_checker)
+    return cls(schema)
+
+
+def fetch_validator(schema):
+    """Fetches a (compiled and cached) validator for the given json schema.
+
+    NOTE: schemas are expected to be long lived (typically module
+    or class level constants) and must not be mutated after they have been
+    used, since the validator compiled for them is reused.
+    """
+    try:
+        cached_schema, validator = _VALIDATORS[id(schema)]
+    except KeyError:
+        pass
+    else:
+        if cached_schema is schema:
+            return validator
+    validator = _compile(schema)
+    if len(_VALIDATORS) >= _MAX_VALIDATORS:
+        _VALIDATORS.clear()
+    _VALIDATORS[id(schema)] = (schema, validator)
+    return validator
+
+
 def schema_validate(data, schema):
     """Validates given data using provided json schema."""
-    jsonschema.validate(data, schema, types=_SCHEMA_TYPES)
+    error = schema_exc.best_match(fetch_validator(schema).iter_errors(data))
+    if error is not None:
+        raise error
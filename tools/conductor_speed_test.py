@@ -0,0 +1,132 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare the throughput of CPU bound jobs as more conductor processes are used.
+
+Jobs are posted to a (local) sqlite jobboard and their logbooks are saved
+using a directory based persistence backend (both in a temporary directory),
+then a process conductor is ran (with an increasing number of child
+processes) until all the jobs have been dispatched.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from oslo_utils import timeutils
+from six.moves import range as compat_range
+
+from taskflow.conductors import backends as conductor_backends
+from taskflow import engines
+from taskflow.jobs.backends import impl_sqlite
+from taskflow.patterns import linear_flow as lf
+from taskflow.persistence.backends import impl_dir
+from taskflow import task
+from taskflow.utils import persistence_utils as p_utils
+
+
+class BurnTask(task.Task):
+    def execute(self, loops):
+        total = 0
+        for i in compat_range(0, loops):
+            total += i * i
+        return total
+
+
+def burn_flow():
+    f = lf.Flow('burn')
+    f.add(BurnTask('burn'))
+    return f
+
+
+def post_jobs(board, persistence, jobs, loops):
+    for _i in compat_range(0, jobs):
+        lb, fd = p_utils.temporary_flow_detail(persistence)
+        engines.save_factory_details(fd, burn_flow, [], {},
+                                     backend=persistence)
+        board.post('burn', lb, details={
+            'flow_uuid': fd.uuid,
+            'store': {'loops': loops},
+        })
+
+
+def run(workers, jobs, loops):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        board_conf = {
+            'board': 'sqlite',
+            'path': os.path.join(tmp_dir, 'jobs.db'),
+        }
+        persistence_conf = {
+            'connection': 'dir',
+            'path': os.path.join(tmp_dir, 'books'),
+        }
+        persistence = impl_dir.DirBackend(persistence_conf)
+        board = impl_sqlite.SqliteJobBoard('speed-test', board_conf,
+                                           persistence=persistence)
+        board.connect()
+        try:
+            post_jobs(board, persistence, jobs, loops)
+        finally:
+            board.close()
+            persistence.close()
+        conductor = conductor_backends.fetch('process', 'speed-test',
+                                             board_conf,
+                                             persistence=persistence_conf,
+                                             wait_timeout=0.05,
+                                             workers=workers)
+        watch = timeutils.StopWatch()
+        watch.start()
+        conductor.run(max_dispatches=jobs)
+        return watch.elapsed(), conductor.statistics
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', "-j",
+                        dest='jobs', action='store', type=int,
+                        default=64, metavar="<number>",
+                        help='how many jobs to post and run (default: 64)')
+    parser.add_argument('--loops', "-l",
+                        dest='loops', action='store', type=int,
+                        default=200000, metavar="<number>",
+                        help='how many loops each job burns (CPU) for'
+                             ' (default: 200000)')
+    parser.add_argument('--workers', "-w",
+                        dest='workers', action='store', type=int,
+                        default=multiprocessing.cpu_count(),
+                        metavar="<number>",
+                        help='maximum number of conductor processes to'
+                             ' try (default: %s)'
+                             % multiprocessing.cpu_count())
+    args = parser.parse_args()
+    jobs = max(1, args.jobs)
+    baseline = None
+    workers = 1
+    while workers <= max(1, args.workers):
+        elapsed, statistics = run(workers, jobs, args.loops)
+        if baseline is None:
+            baseline = elapsed
+        print("- %2s process(es): %s jobs (%s consumed) in %0.3f seconds"
+              " (%0.1f jobs/second, %0.2fx)"
+              % (workers, jobs, statistics['job_consumed'], elapsed,
+                 jobs / max(elapsed, 1e-6), baseline / max(elapsed, 1e-6)))
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
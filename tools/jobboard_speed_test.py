@@ -0,0 +1,151 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare the throughput of jobboards (post/iterate/claim/consume jobs).
+
+The sqlite board uses a temporary database file, the zookeeper board uses
+a (local, in-memory) zake client and the redis board uses a redis server
+running on localhost (it is skipped if one is not running).
+"""
+
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import six
+from six.moves import range as compat_range
+
+from taskflow.jobs.backends import impl_redis
+from taskflow.jobs.backends import impl_sqlite
+from taskflow.jobs.backends import impl_zookeeper
+from taskflow.utils import redis_utils
+
+
+@contextlib.contextmanager
+def sqlite_board():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'jobs.db')
+        board = impl_sqlite.SqliteJobBoard('speed-test', {'path': path})
+        board.connect()
+        with contextlib.closing(board):
+            yield board
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+@contextlib.contextmanager
+def zake_board():
+    from zake import fake_client
+    client = fake_client.FakeClient()
+    board = impl_zookeeper.ZookeeperJobBoard('speed-test', {},
+                                             client=client,
+                                             emit_notifications=False)
+    board.connect()
+    with contextlib.closing(board):
+        yield board
+
+
+@contextlib.contextmanager
+def redis_board():
+    namespace = six.b("taskflow-speed-test-%s" % uuidutils.generate_uuid())
+    client = redis_utils.RedisClient()
+    board = impl_redis.RedisJobBoard('speed-test', {'namespace': namespace},
+                                     client=client)
+    board.connect()
+    try:
+        with contextlib.closing(board):
+            yield board
+    finally:
+        keys = client.keys(namespace + b"*")
+        if keys:
+            client.delete(*keys)
+        client.close()
+
+
+BOARDS = {
+    'sqlite': sqlite_board,
+    'zake': zake_board,
+    'redis': redis_board,
+}
+
+
+def time_it(results, name, func):
+    watch = timeutils.StopWatch()
+    watch.start()
+    func()
+    results.append((name, watch.elapsed()))
+
+
+def run(board, jobs, bulk):
+    results = []
+    if bulk:
+        postings = [{'name': 'job-%s' % i} for i in compat_range(0, jobs)]
+        time_it(results, "post", lambda: board.post_many(postings))
+    else:
+        time_it(results, "post",
+                lambda: [board.post('job-%s' % i)
+                         for i in compat_range(0, jobs)])
+    found = []
+    time_it(results, "iterate",
+            lambda: found.extend(board.iterjobs(only_unclaimed=True,
+                                                ensure_fresh=True)))
+    if bulk:
+        time_it(results, "claim",
+                lambda: board.claim_many(found, board.name))
+    else:
+        time_it(results, "claim",
+                lambda: [board.claim(j, board.name) for j in found])
+    time_it(results, "consume",
+            lambda: [board.consume(j, board.name) for j in found])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', "-j",
+                        dest='jobs', action='store', type=int,
+                        default=500, metavar="<number>",
+                        help='how many jobs to post, claim and consume'
+                             ' (default: 500)')
+    parser.add_argument('--bulk', "-b",
+                        dest='bulk', action='store_true',
+                        default=False,
+                        help='post and claim using the bulk methods'
+                             ' (default: False)')
+    parser.add_argument('boards', nargs='*', metavar="<board>",
+                        default=sorted(BOARDS),
+                        help='boards to test (default: all of them)')
+    args = parser.parse_args()
+    jobs = max(1, args.jobs)
+    for name in args.boards:
+        try:
+            with BOARDS[name]() as board:
+                results = run(board, jobs, args.bulk)
+        except Exception as e:
+            print("%s: skipped (%s)" % (name, e))
+            continue
+        print(name)
+        print("-" * len(name))
+        for op, elapsed in results:
+            print("- %-8s %s jobs in %0.3f seconds (%0.1f jobs/second)"
+                  % (op, jobs, elapsed, jobs / max(elapsed, 1e-6)))
+        print("")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare sending worker-based engine requests one at a time and in batches.
+
+A worker is started (using kombu's in-memory transport) and many small
+requests are submitted at once (like a wide flow would), with and without
+request batching, and how long it took for all of them to finish (and how
+many messages were sent between the executor and the worker) is reported.
+"""
+
+import argparse
+
+from futurist import waiters
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import proxy
+from taskflow.engines.worker_based import worker
+from taskflow import task
+from taskflow.utils import threading_utils as tu
+
+
+class NoopTask(task.Task):
+    def execute(self):
+        pass
+
+
+def counting_publish(counter, publish=proxy.Proxy.publish):
+
+    def _publish(self, *args, **kwargs):
+        counter[0] += 1
+        return publish(self, *args, **kwargs)
+
+    return _publish
+
+
+def run(batch_window, args):
+    shared_conf = {
+        'exchange': 'speed-test-%s' % uuidutils.generate_uuid(),
+        'transport': 'memory',
+        'transport_options': {
+            'polling_interval': 0.01,
+        },
+    }
+    w = worker.Worker(topic='worker', tasks=[NoopTask],
+                      threads_count=args.threads, **shared_conf)
+    runner = tu.daemon_thread(w.run, display_banner=False)
+    runner.start()
+    w.wait()
+    original_publish = proxy.Proxy.publish
+    counter = [0]
+    proxy.Proxy.publish = counting_publish(counter)
+    try:
+        ex = executor.WorkerTaskExecutor(
+            uuidutils.generate_uuid(), shared_conf['exchange'], ['worker'],
+            transport=shared_conf['transport'],
+            transport_options=shared_conf['transport_options'],
+            batch_window=batch_window)
+        ex.start()
+        try:
+            ex.wait_for_workers()
+            counter[0] = 0
+            noop = NoopTask()
+            watch = timeutils.StopWatch()
+            watch.start()
+            fs = [ex.execute_task(noop, uuidutils.generate_uuid(), {})
+                  for _i in compat_range(0, args.requests)]
+            waiters.wait_for_all(fs)
+            return (watch.elapsed(), counter[0])
+        finally:
+            ex.stop()
+    finally:
+        proxy.Proxy.publish = original_publish
+        w.stop()
+        runner.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=1000, metavar="<number>",
+                        help='how many requests to send (default: 1000)')
+    parser.add_argument('--threads', "-t",
+                        dest='threads', action='store', type=int,
+                        default=4, metavar="<number>",
+                        help='how many threads the worker has (default: 4)')
+    parser.add_argument('--window', "-w",
+                        dest='window', action='store', type=float,
+                        default=0.01, metavar="<seconds>",
+                        help='how long requests are batched for'
+                             ' (default: 0.01)')
+    args = parser.parse_args()
+    args.requests = max(1, args.requests)
+    for name, batch_window in [('unbatched', None),
+                               ('batched', args.window)]:
+        elapsed, messages = run(batch_window, args)
+        print("- %-10s %s requests in %0.3f seconds (%0.1f/second) using"
+              " %s messages" % (name, args.requests, elapsed,
+                                args.requests / max(elapsed, 1e-6), messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the cost of the worker-based executor periodic request cleanup.
+
+Many requests are submitted (half of them to a known worker, the other
+half for a task no worker can perform, so they wait) and then how long the
+cleanup the executor does on every wait cycle (expiring requests and
+checking if waiting requests can now be sent to a worker) takes is measured
+for idle cycles and for cycles after a worker notification was received.
+"""
+
+import argparse
+
+from oslo_utils import reflection
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import protocol as pr
+from taskflow.test import mock
+from taskflow.tests import utils
+
+
+def measure(func, cycles):
+    watch = timeutils.StopWatch()
+    watch.start()
+    for _i in compat_range(0, cycles):
+        func()
+    return watch.elapsed() / cycles * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=10000, metavar="<number>",
+                        help='how many requests are ongoing'
+                             ' (default: 10000)')
+    parser.add_argument('--cycles', "-c",
+                        dest='cycles', action='store', type=int,
+                        default=200, metavar="<number>",
+                        help='how many cleanup cycles to measure'
+                             ' (default: 200)')
+    args = parser.parse_args()
+    ex = executor.WorkerTaskExecutor(uuidutils.generate_uuid(), 'exchange',
+                                     ['worker'], transport='memory')
+    # Nothing is really sent anywhere (only the bookkeeping is measured).
+    ex._proxy.publish = mock.MagicMock()
+    notify = pr.Notify(topic='worker', tasks=[
+        reflection.get_class_name(utils.DummyTask),
+    ])
+    ex._finder.process_response(notify.to_dict(), mock.MagicMock())
+    for i in compat_range(0, max(2, args.requests)):
+        if i % 2:
+            task = utils.DummyTask()
+        else:
+            task = utils.TaskOneReturn()
+        ex.execute_task(task, uuidutils.generate_uuid(), {})
+    ex._clean()
+    idle_us = measure(ex._clean, args.cycles)
+
+    def notified_clean():
+        ex._finder.process_response(notify.to_dict(), mock.MagicMock())
+        ex._clean()
+
+    notified_us = measure(notified_clean, args.cycles)
+    print("- %s ongoing requests: idle cycle %0.1f us, cycle after a"
+          " worker notification %0.1f us" % (len(ex._ongoing_requests),
+                                             idle_us, notified_us))
+
+
+if __name__ == "__main__":
+    main()
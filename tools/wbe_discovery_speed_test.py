@@ -0,0 +1,141 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare worker-based engine worker discovery with and without polling.
+
+Many executors are started (using kombu's in-memory transport), then many
+workers (each on its own topic) are started and how long it took for every
+executor to find every worker is reported, with and without the executors
+passively discovering workers (from their announcements); then how many
+messages were sent while the executors and workers sat idle is reported.
+"""
+
+import argparse
+import time
+
+from kombu import pools
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import proxy
+from taskflow.engines.worker_based import worker
+from taskflow import task
+from taskflow.utils import threading_utils as tu
+
+
+class NoopTask(task.Task):
+    def execute(self):
+        pass
+
+
+def counting(counter, func):
+
+    def _counting(self, *args, **kwargs):
+        counter[0] += 1
+        return func(self, *args, **kwargs)
+
+    return _counting
+
+
+def run(passive_discovery, args):
+    shared_conf = {
+        'exchange': 'speed-test-%s' % uuidutils.generate_uuid(),
+        'transport': 'memory',
+        'transport_options': {
+            'polling_interval': 0.01,
+        },
+    }
+    topics = ['worker-%s' % i for i in compat_range(0, args.workers)]
+    if passive_discovery:
+        heartbeat_period = pr.HEARTBEAT_PERIOD
+    else:
+        heartbeat_period = None
+    executors = []
+    workers = []
+    original_publish = proxy.Proxy.publish
+    original_broadcast = proxy.Proxy.broadcast
+    counter = [0]
+    proxy.Proxy.publish = counting(counter, original_publish)
+    proxy.Proxy.broadcast = counting(counter, original_broadcast)
+    try:
+        for _i in compat_range(0, args.engines):
+            ex = executor.WorkerTaskExecutor(
+                uuidutils.generate_uuid(), shared_conf['exchange'], topics,
+                transport=shared_conf['transport'],
+                transport_options=shared_conf['transport_options'],
+                passive_discovery=passive_discovery)
+            ex.start()
+            executors.append(ex)
+        watch = timeutils.StopWatch()
+        watch.start()
+        for topic in topics:
+            w = worker.Worker(topic=topic, tasks=[NoopTask],
+                              heartbeat_period=heartbeat_period,
+                              **shared_conf)
+            runner = tu.daemon_thread(w.run, display_banner=False)
+            runner.start()
+            workers.append((w, runner))
+        for ex in executors:
+            ex.wait_for_workers(workers=args.workers)
+        elapsed = watch.elapsed()
+        counter[0] = 0
+        time.sleep(args.idle)
+        return (elapsed, counter[0])
+    finally:
+        for ex in executors:
+            ex.stop()
+        for w, runner in workers:
+            w.stop()
+            runner.join()
+        proxy.Proxy.publish = original_publish
+        proxy.Proxy.broadcast = original_broadcast
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--engines', "-e",
+                        dest='engines', action='store', type=int,
+                        default=3, metavar="<number>",
+                        help='how many executors to start (default: 3)')
+    parser.add_argument('--workers', "-w",
+                        dest='workers', action='store', type=int,
+                        default=3, metavar="<number>",
+                        help='how many workers to start (default: 3)')
+    parser.add_argument('--idle', "-i",
+                        dest='idle', action='store', type=float,
+                        default=11, metavar="<seconds>",
+                        help='how long to count the messages sent while'
+                             ' idle for (default: 11)')
+    args = parser.parse_args()
+    # NOTE: every started executor and worker holds a connection
+    # (from kombu's connection pool, which in-memory connections all share)
+    # while it consumes, so keep some free for publishing with.
+    if args.engines + args.workers > pools.get_limit() - 2:
+        parser.error("At most %s executors and workers can be started"
+                     % (pools.get_limit() - 2))
+    args.engines = max(1, args.engines)
+    args.workers = max(1, args.workers)
+    for name, passive_discovery in [('polling', False),
+                                    ('passive', True)]:
+        elapsed, messages = run(passive_discovery, args)
+        print("- %-8s %s executors found %s workers in %0.3f seconds, %s"
+              " messages were sent in %0.1f idle seconds"
+              % (name, args.engines, args.workers, elapsed, messages,
+                 args.idle))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare worker-based engine event messages with and without coalescing.
+
+A worker is started (using kombu's in-memory transport) and requests for a
+task that updates its progress many times are sent to it, with and without
+the worker coalescing events, and how long the requests took (and how many
+messages the worker sent back) is reported.
+"""
+
+import argparse
+
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import proxy
+from taskflow.engines.worker_based import worker
+from taskflow import task
+from taskflow.utils import threading_utils as tu
+
+# How many times the task updates its progress.
+UPDATES = 1000
+
+
+class ChattyTask(task.Task):
+    def execute(self):
+        for i in compat_range(0, UPDATES):
+            self.update_progress(float(i) / UPDATES)
+
+
+def counting_publish(counter, publish=proxy.Proxy.publish):
+
+    def _publish(self, *args, **kwargs):
+        counter[0] += 1
+        return publish(self, *args, **kwargs)
+
+    return _publish
+
+
+def run(event_interval, args):
+    shared_conf = {
+        'exchange': 'speed-test-%s' % uuidutils.generate_uuid(),
+        'transport': 'memory',
+        'transport_options': {
+            'polling_interval': 0.001,
+        },
+    }
+    w = worker.Worker(topic='worker', tasks=[ChattyTask],
+                      event_interval=event_interval, **shared_conf)
+    runner = tu.daemon_thread(w.run, display_banner=False)
+    runner.start()
+    w.wait()
+    original_publish = proxy.Proxy.publish
+    counter = [0]
+    proxy.Proxy.publish = counting_publish(counter)
+    try:
+        ex = executor.WorkerTaskExecutor(
+            uuidutils.generate_uuid(), shared_conf['exchange'], ['worker'],
+            transport=shared_conf['transport'],
+            transport_options=shared_conf['transport_options'])
+        ex.start()
+        try:
+            ex.wait_for_workers()
+            counter[0] = 0
+            chatty = ChattyTask()
+            progress = []
+
+            def on_progress(event_type, details):
+                progress.append(details['progress'])
+
+            watch = timeutils.StopWatch()
+            watch.start()
+            for _i in compat_range(0, args.requests):
+                ex.execute_task(chatty, uuidutils.generate_uuid(), {},
+                                progress_callback=on_progress).result()
+            return (watch.elapsed(), counter[0], len(progress))
+        finally:
+            ex.stop()
+    finally:
+        proxy.Proxy.publish = original_publish
+        w.stop()
+        runner.join()
+
+
+def main():
+    global UPDATES
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=10, metavar="<number>",
+                        help='how many requests to send (default: 10)')
+    parser.add_argument('--updates', "-u",
+                        dest='updates', action='store', type=int,
+                        default=1000, metavar="<number>",
+                        help='how many times the task updates its progress'
+                             ' (default: 1000)')
+    parser.add_argument('--interval', "-i",
+                        dest='interval', action='store', type=float,
+                        default=0.1, metavar="<seconds>",
+                        help='how often coalesced events are sent'
+                             ' (default: 0.1)')
+    args = parser.parse_args()
+    args.requests = max(1, args.requests)
+    UPDATES = max(1, args.updates)
+    for name, event_interval in [('uncoalesced', None),
+                                 ('coalesced', args.interval)]:
+        elapsed, messages, updates = run(event_interval, args)
+        print("- %-12s %s requests in %0.3f seconds using %s messages"
+              " (%s progress updates received)" % (name, args.requests,
+                                                   elapsed, messages,
+                                                   updates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare sending large worker-based engine payloads inline and out-of-band.
+
+A worker is started (using kombu's in-memory transport) and requests with a
+large argument (that the task returns back) are sent to it, with the payload
+inline in the messages and sent through a temporary directory store, and the
+round trips per second (and how many bytes went through the broker) is
+reported.
+"""
+
+import argparse
+import shutil
+import tempfile
+
+from kombu import serialization
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import payloads
+from taskflow.engines.worker_based import proxy
+from taskflow.engines.worker_based import worker
+from taskflow import task
+from taskflow.utils import threading_utils as tu
+
+
+class EchoTask(task.Task):
+    def execute(self, value):
+        return value
+
+
+def counting_publish(counter, publish=proxy.Proxy.publish):
+
+    def _publish(self, msg, *args, **kwargs):
+        data = serialization.dumps(msg.to_dict(), serializer='json')[2]
+        counter[0] += len(data)
+        return publish(self, msg, *args, **kwargs)
+
+    return _publish
+
+
+def run(store, args):
+    shared_conf = {
+        'exchange': 'speed-test-%s' % uuidutils.generate_uuid(),
+        'transport': 'memory',
+        'transport_options': {
+            'polling_interval': 0.001,
+        },
+    }
+    w = worker.Worker(topic='worker', tasks=[EchoTask],
+                      payload_store=store, **shared_conf)
+    runner = tu.daemon_thread(w.run, display_banner=False)
+    runner.start()
+    w.wait()
+    original_publish = proxy.Proxy.publish
+    counter = [0]
+    proxy.Proxy.publish = counting_publish(counter)
+    try:
+        ex = executor.WorkerTaskExecutor(
+            uuidutils.generate_uuid(), shared_conf['exchange'], ['worker'],
+            transport=shared_conf['transport'],
+            transport_options=shared_conf['transport_options'],
+            payload_store=store)
+        ex.start()
+        try:
+            ex.wait_for_workers()
+            counter[0] = 0
+            echo = EchoTask()
+            value = 'x' * args.size
+            watch = timeutils.StopWatch()
+            watch.start()
+            for _i in compat_range(0, args.requests):
+                ex.execute_task(echo, uuidutils.generate_uuid(),
+                                {'value': value}).result()
+            return (args.requests / max(watch.elapsed(), 1e-6), counter[0])
+        finally:
+            ex.stop()
+    finally:
+        proxy.Proxy.publish = original_publish
+        w.stop()
+        runner.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=20, metavar="<number>",
+                        help='how many requests to send (default: 20)')
+    parser.add_argument('--size', "-s",
+                        dest='size', action='store', type=int,
+                        default=4 * 1024 * 1024, metavar="<bytes>",
+                        help='how large the argument of each request is'
+                             ' (default: 4MiB)')
+    args = parser.parse_args()
+    args.requests = max(1, args.requests)
+    path = tempfile.mkdtemp()
+    try:
+        for name, store in [('inline', None),
+                            ('out-of-band', payloads.DirectoryStore(path))]:
+            per_second, broker_bytes = run(store, args)
+            print("- %-12s %0.1f round trips/second, %s bytes sent through"
+                  " the broker" % (name, per_second, broker_bytes))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare worker-based engine request latency with and without task pooling.
+
+A worker is started (using kombu's in-memory transport) that can perform a
+task with a slow constructor (like one that loads a model or opens a client
+would have) and requests are sent to it one after another, with and without
+the worker pooling (and warming up) task instances, and how long each
+request took on average (and the worker pool statistics) is reported.
+"""
+
+import argparse
+import time
+
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import worker
+from taskflow import task
+from taskflow.utils import threading_utils as tu
+
+# How long (in seconds) creating the task takes.
+CONSTRUCTOR_DELAY = 0.0
+
+
+class SlowConstructorTask(task.Task):
+    def __init__(self, *args, **kwargs):
+        super(SlowConstructorTask, self).__init__(*args, **kwargs)
+        time.sleep(CONSTRUCTOR_DELAY)
+
+    def execute(self):
+        pass
+
+
+def run(pool_size, args):
+    shared_conf = {
+        'exchange': 'speed-test-%s' % uuidutils.generate_uuid(),
+        'transport': 'memory',
+        'transport_options': {
+            'polling_interval': 0.001,
+        },
+    }
+    slow = SlowConstructorTask(name='slow')
+    warm_up = None
+    if pool_size:
+        warm_up = {SlowConstructorTask: [slow.name]}
+    w = worker.Worker(topic='worker', tasks=[SlowConstructorTask],
+                      pool_size=pool_size, warm_up=warm_up, **shared_conf)
+    runner = tu.daemon_thread(w.run, display_banner=False)
+    runner.start()
+    w.wait()
+    try:
+        ex = executor.WorkerTaskExecutor(
+            uuidutils.generate_uuid(), shared_conf['exchange'], ['worker'],
+            transport=shared_conf['transport'],
+            transport_options=shared_conf['transport_options'])
+        ex.start()
+        try:
+            ex.wait_for_workers()
+            watch = timeutils.StopWatch()
+            watch.start()
+            for _i in compat_range(0, args.requests):
+                ex.execute_task(slow, uuidutils.generate_uuid(), {}).result()
+            return (watch.elapsed() / args.requests * 1000,
+                    w.pool_statistics)
+        finally:
+            ex.stop()
+    finally:
+        w.stop()
+        runner.join()
+
+
+def main():
+    global CONSTRUCTOR_DELAY
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=100, metavar="<number>",
+                        help='how many requests to send (default: 100)')
+    parser.add_argument('--delay', "-d",
+                        dest='delay', action='store', type=float,
+                        default=0.05, metavar="<seconds>",
+                        help='how long creating the task takes'
+                             ' (default: 0.05)')
+    args = parser.parse_args()
+    args.requests = max(1, args.requests)
+    CONSTRUCTOR_DELAY = args.delay
+    for name, pool_size in [('unpooled', None), ('pooled', 1)]:
+        latency_ms, pool_statistics = run(pool_size, args)
+        print("- %-9s %s requests, %0.2f ms per request (pools: %s)"
+              % (name, args.requests, latency_ms, pool_statistics))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the overhead of creating worker-based engine requests and moving them
+through their states (from creation to having their result set).
+
+For comparison the cost of building (and running the same transitions
+through) a request state machine per request is also measured.
+"""
+
+import argparse
+
+from oslo_utils import timeutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import protocol as pr
+from taskflow.tests import utils
+
+TRANSITIONS = (pr.PENDING, pr.RUNNING, pr.SUCCESS)
+
+
+def run_requests(task, count):
+    for i in compat_range(0, count):
+        request = pr.Request(task, str(i), pr.EXECUTE, {})
+        for state in TRANSITIONS:
+            request.transition_and_log_error(state)
+        request.set_result(i)
+
+
+def run_machines(task, count):
+    for _i in compat_range(0, count):
+        machine = pr.build_a_machine()
+        machine.initialize()
+        for state in TRANSITIONS:
+            machine.process_event(pr.make_an_event(state))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=20000, metavar="<number>",
+                        help='how many requests to create (default: 20000)')
+    args = parser.parse_args()
+    count = max(1, args.requests)
+    task = utils.DummyTask()
+    for name, func in [('requests', run_requests),
+                       ('machine per request', run_machines)]:
+        watch = timeutils.StopWatch()
+        watch.start()
+        func(task, count)
+        elapsed = watch.elapsed()
+        print("- %-20s %s in %0.3f seconds (%0.2f us each, %0.1f/second)"
+              % (name, count, elapsed, elapsed / count * 1e6,
+                 count / max(elapsed, 1e-6)))
+
+
+if __name__ == "__main__":
+    main()
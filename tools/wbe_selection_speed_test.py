@@ -0,0 +1,141 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare request latency of worker selection policies (heterogeneous workers).
+
+A set of workers (using kombu's in-memory transport) is started where one
+of the workers has far fewer threads than the others, then requests (that
+sleep for a short time) are sent at a steady rate using each of the worker
+selection policies and the latency (from submission to the result being
+received) percentiles are reported.
+"""
+
+import argparse
+import time
+
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import selection
+from taskflow.engines.worker_based import worker
+from taskflow import task
+from taskflow.utils import threading_utils as tu
+
+POLICIES = [
+    ('random', selection.RandomPolicy),
+    ('least-outstanding', selection.LeastOutstandingPolicy),
+    ('power-of-two', selection.PowerOfTwoPolicy),
+    ('weighted', selection.WeightedPolicy),
+]
+
+
+class SleepTask(task.Task):
+    def execute(self, duration):
+        time.sleep(duration)
+
+
+def percentile(latencies, percent):
+    index = int(round(percent / 100.0 * (len(latencies) - 1)))
+    return latencies[index]
+
+
+def run(policy, args):
+    shared_conf = {
+        'exchange': 'speed-test-%s' % uuidutils.generate_uuid(),
+        'transport': 'memory',
+        'transport_options': {
+            'polling_interval': 0.01,
+        },
+    }
+    threads = [1] + [args.threads] * (args.workers - 1)
+    workers = []
+    topics = []
+    try:
+        for i, threads_count in enumerate(threads):
+            topic = 'worker-%s' % i
+            w = worker.Worker(topic=topic, tasks=[SleepTask],
+                              threads_count=threads_count, **shared_conf)
+            runner = tu.daemon_thread(w.run, display_banner=False)
+            runner.start()
+            w.wait()
+            workers.append((runner, w))
+            topics.append(topic)
+        ex = executor.WorkerTaskExecutor(
+            uuidutils.generate_uuid(), shared_conf['exchange'], topics,
+            transport=shared_conf['transport'],
+            transport_options=shared_conf['transport_options'],
+            selection_policy=policy)
+        ex.start()
+        try:
+            ex.wait_for_workers(workers=len(threads))
+            pending = []
+            sleep_task = SleepTask()
+            for _i in compat_range(0, args.requests):
+                watch = timeutils.StopWatch()
+                watch.start()
+                fut = ex.execute_task(sleep_task, uuidutils.generate_uuid(),
+                                      {'duration': args.duration})
+                fut.add_done_callback(lambda _fut, watch=watch: watch.stop())
+                pending.append((fut, watch))
+                time.sleep(args.interval)
+            latencies = []
+            for fut, watch in pending:
+                fut.result()
+                latencies.append(watch.elapsed())
+            return sorted(latencies)
+        finally:
+            ex.stop()
+    finally:
+        for runner, w in workers:
+            w.stop()
+            runner.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=400, metavar="<number>",
+                        help='how many requests to send (default: 400)')
+    parser.add_argument('--workers', "-w",
+                        dest='workers', action='store', type=int,
+                        default=3, metavar="<number>",
+                        help='how many workers to start (default: 3)')
+    parser.add_argument('--threads', "-t",
+                        dest='threads', action='store', type=int,
+                        default=4, metavar="<number>",
+                        help='how many threads each worker (other than the'
+                             ' single threaded one) has (default: 4)')
+    parser.add_argument('--duration', "-d",
+                        dest='duration', action='store', type=float,
+                        default=0.02, metavar="<seconds>",
+                        help='how long each request sleeps for'
+                             ' (default: 0.02)')
+    parser.add_argument('--interval', "-i",
+                        dest='interval', action='store', type=float,
+                        default=0.005, metavar="<seconds>",
+                        help='how long to wait between sending requests'
+                             ' (default: 0.005)')
+    args = parser.parse_args()
+    args.workers = max(2, args.workers)
+    for name, policy_cls in POLICIES:
+        latencies = run(policy_cls(), args)
+        print("- %-18s p50 %0.3fs, p90 %0.3fs, p99 %0.3fs, max %0.3fs"
+              % (name, percentile(latencies, 50), percentile(latencies, 90),
+                 percentile(latencies, 99), latencies[-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare the worker-based engine message serializers (size and throughput).
+
+For each serializer the size of (and time taken to encode and decode) a
+request message is measured, then requests are sent to a worker (using
+kombu's in-memory transport) and the number of round trips (request sent to
+result received) per second is reported.
+"""
+
+import argparse
+
+from kombu import serialization
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+from six.moves import range as compat_range
+
+from taskflow.engines.worker_based import executor
+from taskflow.engines.worker_based import protocol as pr
+from taskflow.engines.worker_based import serializers
+from taskflow.engines.worker_based import worker
+from taskflow import task
+from taskflow.utils import threading_utils as tu
+
+
+class EchoTask(task.Task):
+    def execute(self, values):
+        return values
+
+
+def make_arguments(args):
+    return {
+        'values': {
+            'floats': [i * 0.5 for i in compat_range(0, args.values)],
+            'ints': list(compat_range(0, args.values)),
+            'names': ['value-%s' % i for i in compat_range(0, args.values)],
+        },
+    }
+
+
+def run_codec(name, args):
+    request = pr.Request(EchoTask(), uuidutils.generate_uuid(), pr.EXECUTE,
+                         make_arguments(args), timeout=60)
+    body = request.to_dict()
+    content_type, content_encoding, data = serialization.dumps(
+        body, serializer=name)
+    watch = timeutils.StopWatch()
+    watch.start()
+    for _i in compat_range(0, args.encodes):
+        serialization.dumps(body, serializer=name)
+    encode_elapsed = watch.elapsed()
+    watch.restart()
+    for _i in compat_range(0, args.encodes):
+        serialization.loads(data, content_type, content_encoding)
+    decode_elapsed = watch.elapsed()
+    return (len(data), encode_elapsed / args.encodes * 1e6,
+            decode_elapsed / args.encodes * 1e6)
+
+
+def run_round_trips(name, args):
+    shared_conf = {
+        'exchange': 'speed-test-%s' % uuidutils.generate_uuid(),
+        'transport': 'memory',
+        'transport_options': {
+            'polling_interval': 0.001,
+        },
+    }
+    w = worker.Worker(topic='worker', tasks=[EchoTask], **shared_conf)
+    runner = tu.daemon_thread(w.run, display_banner=False)
+    runner.start()
+    w.wait()
+    try:
+        ex = executor.WorkerTaskExecutor(
+            uuidutils.generate_uuid(), shared_conf['exchange'], ['worker'],
+            transport=shared_conf['transport'],
+            transport_options=shared_conf['transport_options'],
+            serializer=name)
+        ex.start()
+        try:
+            ex.wait_for_workers()
+            echo = EchoTask()
+            arguments = make_arguments(args)
+            watch = timeutils.StopWatch()
+            watch.start()
+            for _i in compat_range(0, args.requests):
+                fut = ex.execute_task(echo, uuidutils.generate_uuid(),
+                                      arguments)
+                fut.result()
+            return args.requests / max(watch.elapsed(), 1e-6)
+        finally:
+            ex.stop()
+    finally:
+        w.stop()
+        runner.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--values', "-v",
+                        dest='values', action='store', type=int,
+                        default=200, metavar="<number>",
+                        help='how many values of each kind the request'
+                             ' arguments contain (default: 200)')
+    parser.add_argument('--encodes', "-e",
+                        dest='encodes', action='store', type=int,
+                        default=2000, metavar="<number>",
+                        help='how many times to encode and decode the'
+                             ' request (default: 2000)')
+    parser.add_argument('--requests', "-r",
+                        dest='requests', action='store', type=int,
+                        default=200, metavar="<number>",
+                        help='how many requests to send to the worker'
+                             ' (default: 200)')
+    args = parser.parse_args()
+    args.encodes = max(1, args.encodes)
+    args.requests = max(1, args.requests)
+    for name in (serializers.JSON, serializers.MSGPACK):
+        size, encode_us, decode_us = run_codec(name, args)
+        per_second = run_round_trips(name, args)
+        print("- %-16s %6s bytes, encode %7.1f us, decode %7.1f us,"
+              " %0.1f round trips/second"
+              % (name, size, encode_us, decode_us, per_second))
+
+
+if __name__ == "__main__":
+    main()